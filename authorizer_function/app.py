@@ -2,15 +2,18 @@
 import json
 import logging
 import os
-from workmail_common.utils import (
-    handle_error,
-    get_secret_value,
-)
+from workmail_common.secrets import get_secret_value
+from workmail_common.errors import handle_error
+from workmail_common.instrumentation import instrumented_handler
+from workmail_common.priming import prime
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+prime(clients=["secretsmanager"], secrets=["TOKEN_SECRET_NAME"])
 
+
+@instrumented_handler
 def lambda_handler(event, context):
     """Main handler for Api Gateway authorizer"""
     logger.info(f"Received request: " + json.dumps(event))
@@ -31,6 +34,9 @@ def lambda_handler(event, context):
             return {"isAuthorized": False}
 
         secret = get_secret_value(secret_name)
+        if token != secret:
+            # The cached token may predate a rotation; re-check against a fresh copy.
+            secret = get_secret_value(secret_name, force_refresh=True)
 
         if token != secret:
             logger.warning("Invalid token")
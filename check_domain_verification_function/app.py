@@ -1,21 +1,26 @@
 # check_domain_verification_function/app.py
 import logging
 import os
-from workmail_common.utils import (
-    get_aws_client,
-    validate,
-)
+from workmail_common.aws import get_aws_client
+from workmail_common.validation import validate
+from workmail_common.instrumentation import instrumented_handler
+from workmail_common.priming import prime
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "schemas/input_schema.json"
+)
+
+prime(clients=["workmail"], schemas=[SCHEMA_PATH])
+
 
+@instrumented_handler
 def lambda_handler(event, context):
     try:
         logger.info(f"Received event: {event}")
-        pwd = os.path.dirname(os.path.abspath(__file__))
-        schema_path = os.path.join(pwd, "schemas/input_schema.json")
-        if not validate(event, schema_path):
+        if not validate(event, SCHEMA_PATH):
             raise Exception("Input validation failed")
 
         organization_id = event["organization_id"]
@@ -0,0 +1,29 @@
+# Generated by scripts/compile_schemas.py from check_domain_verification_function/schemas/input_schema.json. Do not edit.
+SCHEMA_SHA256 = "9735a4f18a3289bde9b4fa284afa2cceccdaa007f28d665a145030f8245b61f2"
+VERSION = "2.21.1"
+from decimal import Decimal
+from fastjsonschema import JsonSchemaValueException
+
+
+NoneType = type(None)
+
+def validate(data, custom_formats={}, name_prefix=None):
+    if not isinstance(data, (dict)):
+        raise JsonSchemaValueException("" + (name_prefix or "data") + " must be object", value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'properties': {'organization_id': {'type': 'string'}, 'vanity_name': {'type': 'string'}}, 'required': ['organization_id', 'vanity_name'], 'additionalProperties': True}, rule='type')
+    data_is_dict = isinstance(data, dict)
+    if data_is_dict:
+        data__missing_keys = set(['organization_id', 'vanity_name']) - data.keys()
+        if data__missing_keys:
+            raise JsonSchemaValueException("" + (name_prefix or "data") + " must contain " + (str(sorted(data__missing_keys)) + " properties"), value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'properties': {'organization_id': {'type': 'string'}, 'vanity_name': {'type': 'string'}}, 'required': ['organization_id', 'vanity_name'], 'additionalProperties': True}, rule='required')
+        data_keys = set(data.keys())
+        if "organization_id" in data_keys:
+            data_keys.remove("organization_id")
+            data__organizationid = data["organization_id"]
+            if not isinstance(data__organizationid, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".organization_id must be string", value=data__organizationid, name="" + (name_prefix or "data") + ".organization_id", definition={'type': 'string'}, rule='type')
+        if "vanity_name" in data_keys:
+            data_keys.remove("vanity_name")
+            data__vanityname = data["vanity_name"]
+            if not isinstance(data__vanityname, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".vanity_name must be string", value=data__vanityname, name="" + (name_prefix or "data") + ".vanity_name", definition={'type': 'string'}, rule='type')
+    return data
\ No newline at end of file
@@ -1,17 +1,39 @@
 # create_hosted_zone_function/app.py
 import boto3
+import hashlib
 import logging
 import os
-import uuid
-from typing import Dict, Any, List, Tuple
+import time
+from botocore.exceptions import WaiterError
+from typing import Dict, Any, List, Optional, Tuple
+from workmail_common.aws import get_aws_client
+from workmail_common.db import run_checkpointed, workflow_key
+from workmail_common.errors import client_error_code
+from workmail_common.instrumentation import instrumented_handler
+from workmail_common.priming import prime
 
 # Initialize logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+prime(clients=["route53"], db=True)
+
+# Route 53 ChangeResourceRecordSets request limits.
+ROUTE53_MAX_CHANGES_PER_BATCH = 1000
+ROUTE53_MAX_RECORDS_PER_BATCH = 1000
+ROUTE53_MAX_VALUE_CHARS_PER_BATCH = 32000
+
+DNS_CHANGE_POLL_SECONDS = 5
+DNS_INSYNC_SAFETY_SECONDS = 10
+
+CHECKPOINT_STEP = "create_hosted_zone"
+
 
 def get_config():
     required_vars = [
+        "DB_SECRET_ARN",
+        "DB_CLUSTER_ARN",
+        "DATABASE_NAME",
         "VPC_ID",
         "VPC_REGION",
         "DELEGATION_SET_ID",
@@ -24,30 +46,78 @@ def get_config():
                 f"Environment variable {var} is required but not set."
             )
         config[var] = value
+    config["DNS_INSYNC_WAIT_SECONDS"] = float(
+        os.environ.get("DNS_INSYNC_WAIT_SECONDS", "0")
+    )
     return config
 
 
+def caller_reference(key: str) -> str:
+    """The CallerReference every attempt of a workflow creates its zone with."""
+    return f"workmail-{hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]}"
+
+
+def find_hosted_zone(
+    domain_name: str, reference: str, route53_client: boto3.client
+) -> Optional[str]:
+    """
+    The id of the zone for domain_name created under reference (or a successor
+    of it), or None if that zone has since been deleted.
+    """
+    name = f"{domain_name.rstrip('.')}."
+    response = route53_client.list_hosted_zones_by_name(DNSName=name, MaxItems="100")
+    for zone in response["HostedZones"]:
+        if zone["Name"] != name:
+            break
+        if zone["CallerReference"] == reference or zone["CallerReference"].startswith(
+            f"{reference}-"
+        ):
+            return zone["Id"]
+    return None
+
+
 def create_hosted_zone(
     domain_name: str,
     route53_client: boto3.client,
     config: Dict[str, Any],
+    reference: str,
 ) -> str:
-    """Create a Route 53 Hosted Zone."""
+    """
+    Create a Route 53 Hosted Zone, or return the one an earlier attempt made.
+
+    The CallerReference is derived from the workflow key, so a retry gets
+    HostedZoneAlreadyExists and resumes with the existing zone. A reference
+    whose zone was deleted (the domain was cancelled and is provisioned
+    again) is followed by one suffixed with the current time.
+    """
     try:
         logger.info(f"Creating Route 53 hosted zone for domain {domain_name}")
-        create_hosted_zone_response = route53_client.create_hosted_zone(
-            Name=domain_name,
-            VPC={
-                "VPCRegion": config["VPC_REGION"],
-                "VPCId": config["VPC_ID"],
-            },
-            CallerReference=str(uuid.uuid4()),
-            HostedZoneConfig={
-                "Comment": "WorkMail domain",
-                "PrivateZone": False,
-            },
-            DelegationSetId=config["DELEGATION_SET_ID"],
-        )
+        try:
+            create_hosted_zone_response = route53_client.create_hosted_zone(
+                Name=domain_name,
+                VPC={
+                    "VPCRegion": config["VPC_REGION"],
+                    "VPCId": config["VPC_ID"],
+                },
+                CallerReference=reference,
+                HostedZoneConfig={
+                    "Comment": "WorkMail domain",
+                    "PrivateZone": False,
+                },
+                DelegationSetId=config["DELEGATION_SET_ID"],
+            )
+        except Exception as e:
+            if client_error_code(e) != "HostedZoneAlreadyExists":
+                raise
+            hosted_zone_id = find_hosted_zone(domain_name, reference, route53_client)
+            if hosted_zone_id:
+                logger.info(
+                    f"Resuming with Route 53 hosted zone {hosted_zone_id} for domain {domain_name}"
+                )
+                return hosted_zone_id
+            return create_hosted_zone(
+                domain_name, route53_client, config, f"{reference}-{int(time.time())}"
+            )
         hosted_zone_id = create_hosted_zone_response["HostedZone"]["Id"]
         logger.info(
             f"Created Route 53 hosted zone {hosted_zone_id} for domain {domain_name}"
@@ -57,60 +127,167 @@ def create_hosted_zone(
         raise e
 
 
+def build_record_changes(dns_records: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Turn WorkMail DNS records into UPSERT changes, one per name and type.
+
+    Route 53 rejects a ChangeBatch that touches the same record set twice, so
+    values sharing a name and type are merged into one record set.
+    """
+    record_sets: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for record in dns_records:
+        recordtype = record["Type"]
+        hostname = record["Hostname"]
+        value = record["Value"]
+        if recordtype == "TXT":
+            value = f'"{value}"'
+        record_set = record_sets.setdefault(
+            (hostname, recordtype),
+            {
+                "Name": hostname,
+                "Type": recordtype,
+                "TTL": 300,
+                "ResourceRecords": [],
+            },
+        )
+        if {"Value": value} not in record_set["ResourceRecords"]:
+            record_set["ResourceRecords"].append({"Value": value})
+    return [
+        {"Action": "UPSERT", "ResourceRecordSet": record_set}
+        for record_set in record_sets.values()
+    ]
+
+
+def chunk_changes(changes: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    """
+    Split changes into as few ChangeBatches as Route 53's request limits allow.
+
+    UPSERTs count twice toward both the ResourceRecord and the value
+    character limits.
+    """
+    batches: List[List[Dict[str, Any]]] = []
+    batch: List[Dict[str, Any]] = []
+    records = characters = 0
+    for change in changes:
+        values = change["ResourceRecordSet"]["ResourceRecords"]
+        weight = 2 if change["Action"] == "UPSERT" else 1
+        change_records = weight * len(values)
+        change_characters = weight * sum(len(v["Value"]) for v in values)
+        if batch and (
+            len(batch) >= ROUTE53_MAX_CHANGES_PER_BATCH
+            or records + change_records > ROUTE53_MAX_RECORDS_PER_BATCH
+            or characters + change_characters > ROUTE53_MAX_VALUE_CHARS_PER_BATCH
+        ):
+            batches.append(batch)
+            batch = []
+            records = characters = 0
+        batch.append(change)
+        records += change_records
+        characters += change_characters
+    if batch:
+        batches.append(batch)
+    return batches
+
+
 def add_dns_records(
     hosted_zone_id: str,
     dns_records: List[Dict[str, str]],
     route53_client: boto3.client,
-) -> None:
-    """Add DNS records to a Route 53 Hosted Zone."""
+) -> List[str]:
+    """Add DNS records to a Route 53 Hosted Zone; returns the ChangeInfo ids."""
     try:
         record_count = len(dns_records)
         logger.info(
             f"Adding {record_count} DNS records to Route 53 hosted zone {hosted_zone_id}"
         )
-        real_count = 0
-        for record in dns_records:
-            recordtype = record["Type"]
-            hostname = record["Hostname"]
-            value = record["Value"]
-            if recordtype == "TXT":
-                value = f'"{value}"'
-            route53_client.change_resource_record_sets(
+        change_ids = []
+        for changes in chunk_changes(build_record_changes(dns_records)):
+            response = route53_client.change_resource_record_sets(
                 HostedZoneId=hosted_zone_id,
-                ChangeBatch={
-                    "Changes": [
-                        {
-                            "Action": "UPSERT",
-                            "ResourceRecordSet": {
-                                "Name": hostname,
-                                "Type": recordtype,
-                                "TTL": 300,
-                                "ResourceRecords": [{"Value": value}],
-                            },
-                        }
-                    ]
-                },
+                ChangeBatch={"Changes": changes},
             )
-            real_count += 1
+            change_ids.append(response["ChangeInfo"]["Id"])
         logger.info(
-            f"Added {real_count} DNS records to Route 53 hosted zone {hosted_zone_id}"
+            f"Added {record_count} DNS records to Route 53 hosted zone {hosted_zone_id} "
+            f"in {len(change_ids)} change batch(es): {change_ids}"
         )
+        return change_ids
     except Exception as e:
         raise e
 
 
+def wait_for_dns_changes(
+    change_ids: List[str],
+    route53_client: boto3.client,
+    timeout_seconds: float,
+) -> bool:
+    """
+    Wait up to timeout_seconds for the changes to reach INSYNC.
+
+    Returns False instead of raising when the wait runs out: the records are
+    already accepted, and propagation is confirmed later by domain verification.
+    """
+    if timeout_seconds <= 0:
+        return False
+    deadline = time.monotonic() + timeout_seconds
+    waiter = route53_client.get_waiter("resource_record_sets_changed")
+    for change_id in change_ids:
+        remaining = deadline - time.monotonic()
+        max_attempts = int(remaining // DNS_CHANGE_POLL_SECONDS)
+        if max_attempts < 1:
+            logger.warning(f"Timed out waiting for {change_id} to reach INSYNC")
+            return False
+        try:
+            waiter.wait(
+                Id=change_id,
+                WaiterConfig={
+                    "Delay": DNS_CHANGE_POLL_SECONDS,
+                    "MaxAttempts": max_attempts,
+                },
+            )
+        except WaiterError as e:
+            logger.warning(f"Gave up waiting for {change_id} to reach INSYNC: {e}")
+            return False
+    logger.info(f"DNS changes {change_ids} are INSYNC")
+    return True
+
+
+@instrumented_handler
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    """Lambda handler."""
+    """
+    Lambda handler.
+
+    Returns only this step's own keys, so the state machine can merge them
+    with the output of the steps that run alongside it.
+    """
     logger.info(f"Event: {event}")
     try:
         config = get_config()
-        route53_client = boto3.client("route53")
-        hosted_zone_id = create_hosted_zone(
-            event["vanity_name"], route53_client, config
-        )
-        dns_records = event["dns_records"]
-        add_dns_records(hosted_zone_id, dns_records, route53_client)
-        return event
+        route53_client = get_aws_client("route53")
+
+        key = workflow_key(event["contact_id"], event["vanity_name"])
+
+        def provision() -> Dict[str, Any]:
+            hosted_zone_id = create_hosted_zone(
+                event["vanity_name"], route53_client, config, caller_reference(key)
+            )
+            dns_records = event["dns_records"]
+            change_ids = add_dns_records(hosted_zone_id, dns_records, route53_client)
+            budget = 0.0
+            if config["DNS_INSYNC_WAIT_SECONDS"] > 0:
+                # Never wait into the last seconds of the invocation.
+                budget = min(
+                    config["DNS_INSYNC_WAIT_SECONDS"],
+                    context.get_remaining_time_in_millis() / 1000
+                    - DNS_INSYNC_SAFETY_SECONDS,
+                )
+            return {
+                "hosted_zone_id": hosted_zone_id,
+                "dns_change_id": change_ids[-1] if change_ids else None,
+                "dns_insync": wait_for_dns_changes(change_ids, route53_client, budget),
+            }
+
+        return run_checkpointed(config, key, CHECKPOINT_STEP, provision)
     except Exception as e:
         logger.error(f"An error occurred: {e}")
         raise e
@@ -2,14 +2,26 @@ import json
 import logging
 import os
 
-from workmail_common.utils import get_aws_client, keap_contact_create_note_via_proxy
+from workmail_common.aws import get_aws_client
+from workmail_common.db import db_connection, run_checkpointed, workflow_key
+from workmail_common.errors import client_error_code
+from workmail_common.outbox import enqueue_keap_note
+from workmail_common.instrumentation import instrumented_handler
+from workmail_common.priming import prime
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+prime(clients=["iam"], db=True)
+
+CHECKPOINT_STEP = "create_iam_user"
+
 
 def get_config():
     required_vars = [
+        "DB_SECRET_ARN",
+        "DB_CLUSTER_ARN",
+        "DATABASE_NAME",
         "AWS_ACCOUNT_ID",
         "KEAP_API_KEY_SECRET_NAME",
         "PROXY_ENDPOINT",
@@ -26,62 +38,70 @@ def get_config():
     return config
 
 
-def lambda_handler(event, context):
-    try:
-        logger.info(f"Received event: {json.dumps(event)}")
-
-        contact_id = event["contact_id"]
-        domain_name = event["vanity_name"]
-        # configuration_set = f"{organization_id}-config-set"
-
-        config = get_config()
+def create_iam_user(contact_id, domain_name, iam, config):
+    """
+    Create the domain's sending user and send its credentials to Keap.
 
-        # Create IAM User
-        logger.info(f"Attempting to create IAM User for domain {domain_name}")
-        iam = get_aws_client("iam")
-        iam_user_name = f"workmail_{domain_name}"
+    A retry after a partial attempt resumes with the user that attempt
+    created. That attempt's access keys are deleted first, so only the key
+    in the note sent now stays valid and the two-key limit is never hit.
+    """
+    # Create IAM User
+    logger.info(f"Attempting to create IAM User for domain {domain_name}")
+    iam_user_name = f"workmail_{domain_name}"
 
+    try:
         create_user_response = iam.create_user(UserName=iam_user_name)
         logger.info(f"IAM User created: {create_user_response['User']['UserName']}")
+    except Exception as e:
+        if client_error_code(e) != "EntityAlreadyExists":
+            raise
+        logger.info(f"IAM User {iam_user_name} already exists, resuming")
+        for key in iam.list_access_keys(UserName=iam_user_name)["AccessKeyMetadata"]:
+            iam.delete_access_key(
+                UserName=iam_user_name, AccessKeyId=key["AccessKeyId"]
+            )
+            logger.info(f"Deleted earlier access key of user: {iam_user_name}")
 
-        # Define the SES policy with dynamic ARNs
-        policy_document = {
-            "Version": "2012-10-17",
-            "Statement": [
-                {
-                    "Sid": "AllowSESSendEmail",
-                    "Effect": "Allow",
-                    "Action": ["ses:SendEmail", "ses:SendRawEmail"],
-                    "Resource": [
-                        # f"arn:aws:ses:us-east-1:{os.getenv('AWS_ACCOUNT_ID')}:configuration-set/{configuration_set}",
-                        f"arn:aws:ses:us-east-1:{os.getenv('AWS_ACCOUNT_ID')}:identity/{domain_name}",
-                    ],
-                },
-                {
-                    "Sid": "AllowSESListIdentities",
-                    "Effect": "Allow",
-                    "Action": "ses:ListIdentities",
-                    "Resource": "*",
-                },
-            ],
-        }
-
-        logger.info(f"Attempting to attach policy to user: {iam_user_name}")
-        policy_response = iam.put_user_policy(
-            UserName=iam_user_name,
-            PolicyName=f"workmail_{domain_name}_fluentsmtp_policy",
-            PolicyDocument=json.dumps(policy_document),
-        )
-        logger.info(f"Policy attached to user: {policy_response}")
-
-        # Generate and return API key for IAM user
-        logger.info(f"Attempting to create access key for user: {iam_user_name}")
-        access_key = iam.create_access_key(UserName=iam_user_name)
-        api_key = access_key["AccessKey"]["AccessKeyId"]
-        secret_key = access_key["AccessKey"]["SecretAccessKey"]
-        logger.info(f"Access key created for user: {iam_user_name}")
-
-        keap_contact_create_note_via_proxy(
+    # Define the SES policy with dynamic ARNs
+    policy_document = {
+        "Version": "2012-10-17",
+        "Statement": [
+            {
+                "Sid": "AllowSESSendEmail",
+                "Effect": "Allow",
+                "Action": ["ses:SendEmail", "ses:SendRawEmail"],
+                "Resource": [
+                    # f"arn:aws:ses:us-east-1:{os.getenv('AWS_ACCOUNT_ID')}:configuration-set/{configuration_set}",
+                    f"arn:aws:ses:us-east-1:{os.getenv('AWS_ACCOUNT_ID')}:identity/{domain_name}",
+                ],
+            },
+            {
+                "Sid": "AllowSESListIdentities",
+                "Effect": "Allow",
+                "Action": "ses:ListIdentities",
+                "Resource": "*",
+            },
+        ],
+    }
+
+    logger.info(f"Attempting to attach policy to user: {iam_user_name}")
+    policy_response = iam.put_user_policy(
+        UserName=iam_user_name,
+        PolicyName=f"workmail_{domain_name}_fluentsmtp_policy",
+        PolicyDocument=json.dumps(policy_document),
+    )
+    logger.info(f"Policy attached to user: {policy_response}")
+
+    # Generate and return API key for IAM user
+    logger.info(f"Attempting to create access key for user: {iam_user_name}")
+    access_key = iam.create_access_key(UserName=iam_user_name)
+    api_key = access_key["AccessKey"]["AccessKeyId"]
+    secret_key = access_key["AccessKey"]["SecretAccessKey"]
+    logger.info(f"Access key created for user: {iam_user_name}")
+
+    with db_connection(config) as connection:
+        enqueue_keap_note(
             contact_id,
             "IAM User Info",
             {
@@ -89,14 +109,41 @@ def lambda_handler(event, context):
                 "API Key": api_key,
                 "Secret Key": secret_key,
             },
-            config,
+            connection,
+            secret_fields=("API Key", "Secret Key"),
         )
+        connection.commit()
+
+    return {
+        "iamUserName": iam_user_name,
+        "apiKey": api_key,
+        "secretKey": secret_key,
+    }
+
 
-        return {
-            "iamUserName": iam_user_name,
-            "apiKey": api_key,
-            "secretKey": secret_key,
-        }
+@instrumented_handler
+def lambda_handler(event, context):
+    try:
+        logger.info(f"Received event: {json.dumps(event)}")
+
+        contact_id = event["contact_id"]
+        domain_name = event["vanity_name"]
+        # configuration_set = f"{organization_id}-config-set"
+
+        config = get_config()
+        iam = get_aws_client("iam")
+
+        # The secret key is only delivered once, via the Keap note (queued in
+        # keap_outbox until sent); it is never written to the checkpoint table.
+        return run_checkpointed(
+            config,
+            workflow_key(contact_id, domain_name),
+            CHECKPOINT_STEP,
+            lambda: create_iam_user(contact_id, domain_name, iam, config),
+            recorded=lambda output: {
+                key: value for key, value in output.items() if key != "secretKey"
+            },
+        )
 
     except Exception as e:
         logger.exception(str(e))
@@ -4,30 +4,53 @@ import json
 import os
 import logging
 import uuid
-import time
-from typing import Dict, Any, List, Tuple
-from workmail_common.utils import (
-    process_input,
-    connect_to_rds,
-    get_aws_clients,
-    keap_contact_create_note_via_proxy,
-    keap_contact_add_to_group_via_proxy,
-)
+from typing import Dict, Any, List, Optional, Tuple
+from workmail_common.aws import get_aws_clients
+from workmail_common.db import db_connection, run_checkpointed, workflow_key
+from workmail_common.outbox import enqueue_keap_tag
+from workmail_common.validation import process_input
+from workmail_common.polling import poll_until
+from workmail_common.instrumentation import instrumented_handler
+from workmail_common.priming import prime
 
 # Initialize logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "schemas/input_schema.json"
+)
+
+prime(
+    clients=["secretsmanager", "ses", "workmail", "route53"],
+    db=True,
+    schemas=[SCHEMA_PATH],
+)
+
+CHECKPOINT_STEP = "create_workmail_org"
+
+# Upper bound on the activation wait; the Lambda's remaining time also caps it.
+ORG_ACTIVATION_TIMEOUT_SECONDS = float(
+    os.environ.get("ORG_ACTIVATION_TIMEOUT_SECONDS", "240")
+)
+
 
 def create_workmail_org(
     organization_name: str,
     vanity_name: str,
     workmail_client: Any,
+    context: Any = None,
+    client_token: Optional[str] = None,
 ) -> Dict[str, Any]:
-    """Create a WorkMail Organization and User."""
+    """
+    Create a WorkMail Organization and User.
+
+    Pass the same client_token on a retry to resume waiting on the
+    organization created by the first attempt instead of creating another.
+    """
     try:
 
-        client_token = str(uuid.uuid4())
+        client_token = client_token or str(uuid.uuid4())
         # Create WorkMail organization
         logger.info(f"Creating WorkMail organization {organization_name}")
         create_org_response = workmail_client.create_organization(
@@ -38,24 +61,30 @@ def create_workmail_org(
 
         # Wait for the organization to become Active
         logger.info(f"Waiting for organization {organization_id} to become Active")
-        i = 0
-        while True:
+
+        def organization_active() -> Optional[Dict[str, Any]]:
             describe_org_response = workmail_client.describe_organization(
                 OrganizationId=organization_id
             )
             state = describe_org_response["State"].upper()
             if state == "ACTIVE":
-                break
-            elif state == "FAILED":
+                return describe_org_response
+            if state == "FAILED":
                 raise ValueError(
                     f"Organization {organization_id} creation failed: {describe_org_response['ErrorMessage']}"
                 )
-            elif i > 10:
-                raise ValueError(
-                    f"Organization {organization_id} took too long to become Active"
-                )
-            time.sleep(2)
-            i += 1
+            return None
+
+        poll_until(
+            organization_active,
+            context,
+            description=f"organization {organization_id} to become Active",
+            timeout_seconds=ORG_ACTIVATION_TIMEOUT_SECONDS,
+            resume_state={
+                "organization_id": organization_id,
+                "client_token": client_token,
+            },
+        )
 
         # Register the domain
         logger.info(
@@ -181,15 +210,28 @@ def register_workmail_organization(
     vanity_name: str,
     organization_id: str,
     connection: Any,
+    pending_tag_id: Optional[int] = None,
 ) -> None:
-    """Register a WorkMail stack in the database."""
+    """
+    Register a WorkMail stack, queueing its Keap pending tag in the same commit.
+
+    An organization already registered (by an attempt that failed later on)
+    is left as it is, so a retry neither duplicates the row nor the tag.
+    """
     logger.info(f"Registering WorkMail stack {organization_id} for ownerid {ownerid}")
     try:
         cursor = connection.cursor()
+        sql = """SELECT 1 FROM workmail_organizations WHERE organization_id = %s LIMIT 1"""
+        cursor.execute(sql, (organization_id,))
+        if cursor.fetchone():
+            logger.info(f"WorkMail organization {organization_id} already registered")
+            return
         sql = """INSERT INTO workmail_organizations (ownerid, email_username, vanity_name, organization_id, state) VALUES (%s, %s, %s, %s, %s)"""
         cursor.execute(
             sql, (ownerid, email_username, vanity_name, organization_id, "PENDING")
         )
+        if pending_tag_id is not None:
+            enqueue_keap_tag([ownerid], pending_tag_id, connection)
         connection.commit()
         logger.info(
             f"Registered WorkMail organization {organization_id} for ownerid {ownerid}"
@@ -201,80 +243,100 @@ def register_workmail_organization(
             cursor.close()
 
 
-def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
-    """Lambda function handler."""
-    logger.info("Handling Lambda event")
-    try:
-
-        config = get_config()
-        aws_clients = get_aws_clients()
-
-        connection = connect_to_rds(aws_clients["secretsmanager_client"], config=config)
-
-        body = json.loads(event["body"])
-
-        pwd = os.path.dirname(os.path.abspath(__file__))
-        schema_path = os.path.join(pwd, "schemas/input_schema.json")
-        clean_input = process_input(body, schema_path)
-
-        contact_id = clean_input["contact_id"]
-        vanity_name = clean_input["vanity_name"]
-        organization_name = clean_input["organization_name"]
-        email_username = clean_input["email_username"]
-        email_address = clean_input["email_address"]
-
+def provision_workmail_org(
+    clean_input: Dict[str, Any],
+    config: Dict[str, str],
+    aws_clients: Dict[str, Any],
+    context: Any = None,
+    client_token: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Create and register the organization; the output feeds the rest of the workflow."""
+    contact_id = clean_input["contact_id"]
+    vanity_name = clean_input["vanity_name"]
+    organization_name = clean_input["organization_name"]
+    email_username = clean_input["email_username"]
+    email_address = clean_input["email_address"]
+
+    with db_connection(config, aws_clients["secretsmanager_client"]) as connection:
         first_name, last_name = get_client_info(
             contact_id,
             connection,
         )
 
-        create_workmail_response = create_workmail_org(
-            organization_name,
-            vanity_name,
-            aws_clients["workmail_client"],
-        )
-        organization_id = create_workmail_response["organization_id"]
-
+    # No connection is held while the organization activates (up to minutes),
+    # so the pool stays available to the rest of the container.
+    create_workmail_response = create_workmail_org(
+        organization_name,
+        vanity_name,
+        aws_clients["workmail_client"],
+        context,
+        client_token=client_token,
+    )
+    organization_id = create_workmail_response["organization_id"]
+
+    # Fetched before registering, so registering is the step's last write.
+    dns_records = get_dns_records(
+        organization_id,
+        vanity_name,
+        aws_clients["workmail_client"],
+    )
+
+    with db_connection(config, aws_clients["secretsmanager_client"]) as connection:
         register_workmail_organization(
             contact_id,
             email_username,
             vanity_name,
             organization_id,
             connection,
+            pending_tag_id=int(config["KEAP_TAG_PENDING"]),
         )
 
-        dns_records = get_dns_records(
-            organization_id,
-            vanity_name,
-            aws_clients["workmail_client"],
-        )
+    # updates = prepare_keap_updates(dns_records)
 
-        # updates = prepare_keap_updates(dns_records)
+    # enqueue_keap_note(contact_id, "workmail_dns_records", updates, connection)
 
-        # keap_contact_create_note_via_proxy(
-        #     contact_id, "workmail_dns_records", updates, config=config
-        # )
+    logger.info("WorkMail organization and user creation initiated")
 
-        keap_contact_add_to_group_via_proxy(
-            contact_id, int(config["KEAP_TAG_PENDING"]), config=config
-        )
+    return {
+        "contact_id": contact_id,
+        "organization_id": organization_id,
+        "organization_name": organization_name,
+        "email_username": email_username,
+        "vanity_name": vanity_name,
+        "email_address": email_address,
+        "first_name": first_name,
+        "last_name": last_name,
+        "dns_records": dns_records,
+    }
+
+
+@instrumented_handler
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Lambda function handler."""
+    logger.info("Handling Lambda event")
+    try:
+
+        config = get_config()
+        aws_clients = get_aws_clients()
 
-        logger.info("WorkMail organization and user creation initiated")
-
-        return {
-            "contact_id": contact_id,
-            "organization_id": organization_id,
-            "organization_name": organization_name,
-            "email_username": email_username,
-            "vanity_name": vanity_name,
-            "email_address": email_address,
-            "first_name": first_name,
-            "last_name": last_name,
-            "dns_records": dns_records,
-        }
+        body = json.loads(event["body"])
+        clean_input = process_input(body, SCHEMA_PATH)
+
+        contact_id = clean_input["contact_id"]
+        vanity_name = clean_input["vanity_name"]
+        return run_checkpointed(
+            config,
+            workflow_key(contact_id, vanity_name),
+            CHECKPOINT_STEP,
+            lambda: provision_workmail_org(
+                clean_input,
+                config,
+                aws_clients,
+                context,
+                client_token=event.get("client_token"),
+            ),
+            aws_clients["secretsmanager_client"],
+        )
     except Exception as e:
         logger.exception(str(e))
         raise e
-    finally:
-        if "connection" in locals() and connection.is_connected():
-            connection.close()
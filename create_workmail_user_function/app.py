@@ -4,17 +4,31 @@ import os
 import random
 import string
 from typing import Any, Dict
-from workmail_common.utils import (
-    connect_to_rds,
-    get_aws_client,
-    validate,
-    keap_contact_create_note_via_proxy,
-    keap_contact_add_to_group_via_proxy,
-)
+from workmail_common.aws import get_aws_client
+from workmail_common.db import db_connection, run_checkpointed, workflow_key
+from workmail_common.outbox import enqueue_keap_note, enqueue_keap_tag
+from workmail_common.validation import validate
+from workmail_common.instrumentation import instrumented_handler
+from workmail_common.priming import prime
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "schemas/input_schema.json"
+)
+
+prime(
+    clients=["workmail", "ses"],
+    db=True,
+    schemas=[SCHEMA_PATH],
+)
+
+CHECKPOINT_STEP = "create_workmail_user"
+# Recorded as soon as the mailbox exists, so a retry of a later failure
+# resets the password instead of failing to create the same user again.
+MAILBOX_CHECKPOINT_STEP = "create_workmail_user.mailbox"
+
 
 def generate_random_password(length: int = 12) -> str:
     """Generate a random password."""
@@ -87,8 +101,10 @@ def set_ses_notifications(
         raise e
 
 
-def update_workmail_registration(contact_id, organization_id, connection):
-    """Update the WorkMail registration for a contact."""
+def update_workmail_registration(
+    contact_id, organization_id, connection, credentials=None, complete_tag_id=None
+):
+    """Mark the stack ACTIVE, queueing its Keap note and tag in the same commit."""
     try:
         logger.info(f"Updating WorkMail registration for contact {contact_id}")
         cursor = connection.cursor(dictionary=True)
@@ -97,6 +113,16 @@ def update_workmail_registration(contact_id, organization_id, connection):
             sql,
             ("ACTIVE", contact_id, organization_id),
         )
+        if credentials is not None:
+            enqueue_keap_note(
+                contact_id,
+                "workmail_credentials",
+                credentials,
+                connection,
+                secret_fields=("API7",),
+            )
+        if complete_tag_id is not None:
+            enqueue_keap_tag([contact_id], complete_tag_id, connection)
         connection.commit()
         logger.info(
             f"Updated WorkMail registration to ACTIVE for organization {organization_id}"
@@ -108,34 +134,28 @@ def update_workmail_registration(contact_id, organization_id, connection):
             cursor.close()
 
 
-def lambda_handler(event, context):
-    try:
-        logger.info(f"Received event: {event}")
-
-        config = get_config()
-
-        pwd = os.path.dirname(os.path.abspath(__file__))
-        schema_path = os.path.join(pwd, "schemas/input_schema.json")
-        if not validate(event, schema_path):
-            raise Exception("Input validation failed")
+def create_workmail_user(
+    event: Dict[str, Any], key: str, config: Dict[str, str]
+) -> Dict[str, Any]:
+    """Create the mailbox, deliver its credentials and mark the stack ACTIVE."""
+    contact_id = event["contact_id"]
+    organization_id = event["organization_id"]
+    organization_name = event["organization_name"]
+    email_username = event["email_username"]
+    email_address = event["email_address"]
+    first_name = event["first_name"]
+    last_name = event["last_name"]
+    display_name = f"{first_name} {last_name}"
 
-        contact_id = event["contact_id"]
-        organization_id = event["organization_id"]
-        organization_name = event["organization_name"]
-        email_username = event["email_username"]
-        email_address = event["email_address"]
-        first_name = event["first_name"]
-        last_name = event["last_name"]
-        display_name = f"{first_name} {last_name}"
-
-        password = generate_random_password()
+    password = generate_random_password()
 
-        logger.info(
-            f"Creating user {email_username} ({email_address}) in organization {organization_name} ({organization_id})"
-        )
+    logger.info(
+        f"Creating user {email_username} ({email_address}) in organization {organization_name} ({organization_id})"
+    )
 
-        workmail_client = get_aws_client("workmail")
+    workmail_client = get_aws_client("workmail")
 
+    def create_mailbox() -> Dict[str, Any]:
         create_user_response = workmail_client.create_user(
             OrganizationId=organization_id,
             Name=email_username,
@@ -155,33 +175,63 @@ def lambda_handler(event, context):
             EntityId=user_id,
             Email=email_address,
         )
-
-        # Endpoint issue. Fix later.
-        # ses_client = get_aws_client("ses")
-        # set_ses_notifications(email_address, ses_client, config=config)
-
-        custom_fields = {
-            "API6": email_username,
-            "API7": password,
-            "API8": f"{organization_name}.awsapps.com/mail",
-        }
-        keap_contact_create_note_via_proxy(
-            contact_id, "workmail_credentials", custom_fields, config
+        return {"user_id": user_id, "password_set": True}
+
+    # Only the user id is recorded, so a checkpoint hit is recognisable.
+    mailbox = run_checkpointed(
+        config,
+        key,
+        MAILBOX_CHECKPOINT_STEP,
+        create_mailbox,
+        recorded=lambda output: {"user_id": output["user_id"]},
+    )
+    user_id = mailbox["user_id"]
+    if not mailbox.get("password_set"):
+        # Created by an earlier attempt whose password was never delivered.
+        workmail_client.reset_password(
+            OrganizationId=organization_id, UserId=user_id, Password=password
         )
-        keap_contact_add_to_group_via_proxy(
-            contact_id, int(config["KEAP_TAG_COMPLETE"]), config=config
+
+    # Endpoint issue. Fix later.
+    # ses_client = get_aws_client("ses")
+    # set_ses_notifications(email_address, ses_client, config=config)
+
+    custom_fields = {
+        "API6": email_username,
+        "API7": password,
+        "API8": f"{organization_name}.awsapps.com/mail",
+    }
+    with db_connection(config) as connection:
+        update_workmail_registration(
+            contact_id,
+            organization_id,
+            connection,
+            credentials=custom_fields,
+            complete_tag_id=int(config["KEAP_TAG_COMPLETE"]),
         )
 
-        secrets_manager_client = get_aws_client("secretsmanager")
-        connection = connect_to_rds(secrets_manager_client, config)
-        update_workmail_registration(contact_id, organization_id, connection)
+    logger.info(f"User created successfully")
+    return {"userCreated": True, "user_id": user_id}
 
-        logger.info(f"User created successfully")
-        return {"userCreated": True}
+
+@instrumented_handler
+def lambda_handler(event, context):
+    try:
+        logger.info(f"Received event: {event}")
+
+        config = get_config()
+        if not validate(event, SCHEMA_PATH):
+            raise Exception("Input validation failed")
+
+        contact_id = event["contact_id"]
+        key = workflow_key(contact_id, event["vanity_name"])
+
+        return run_checkpointed(
+            config,
+            key,
+            CHECKPOINT_STEP,
+            lambda: create_workmail_user(event, key, config),
+        )
 
     except Exception as e:
         raise e
-
-    finally:
-        if "connection" in locals() and connection.is_connected():
-            connection.close()
@@ -0,0 +1,59 @@
+# Generated by scripts/compile_schemas.py from create_workmail_user_function/schemas/input_schema.json. Do not edit.
+SCHEMA_SHA256 = "62ebeeadd6522492b541eed3cde22b56adf220b02e3619ac839a4ffd6704e810"
+VERSION = "2.21.1"
+from decimal import Decimal
+from fastjsonschema import JsonSchemaValueException
+
+
+NoneType = type(None)
+
+def validate(data, custom_formats={}, name_prefix=None):
+    if not isinstance(data, (dict)):
+        raise JsonSchemaValueException("" + (name_prefix or "data") + " must be object", value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'properties': {'contact_id': {'type': 'integer'}, 'organization_id': {'type': 'string'}, 'organization_name': {'type': 'string'}, 'email_username': {'type': 'string'}, 'vanity_name': {'type': 'string'}, 'email_address': {'type': 'string'}, 'first_name': {'type': 'string'}, 'last_name': {'type': 'string'}}, 'required': ['contact_id', 'organization_id', 'email_username', 'vanity_name', 'email_address', 'first_name', 'last_name'], 'additionalProperties': True}, rule='type')
+    data_is_dict = isinstance(data, dict)
+    if data_is_dict:
+        data__missing_keys = set(['contact_id', 'organization_id', 'email_username', 'vanity_name', 'email_address', 'first_name', 'last_name']) - data.keys()
+        if data__missing_keys:
+            raise JsonSchemaValueException("" + (name_prefix or "data") + " must contain " + (str(sorted(data__missing_keys)) + " properties"), value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'properties': {'contact_id': {'type': 'integer'}, 'organization_id': {'type': 'string'}, 'organization_name': {'type': 'string'}, 'email_username': {'type': 'string'}, 'vanity_name': {'type': 'string'}, 'email_address': {'type': 'string'}, 'first_name': {'type': 'string'}, 'last_name': {'type': 'string'}}, 'required': ['contact_id', 'organization_id', 'email_username', 'vanity_name', 'email_address', 'first_name', 'last_name'], 'additionalProperties': True}, rule='required')
+        data_keys = set(data.keys())
+        if "contact_id" in data_keys:
+            data_keys.remove("contact_id")
+            data__contactid = data["contact_id"]
+            if not isinstance(data__contactid, (int)) and not (isinstance(data__contactid, float) and data__contactid.is_integer()) or isinstance(data__contactid, bool):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".contact_id must be integer", value=data__contactid, name="" + (name_prefix or "data") + ".contact_id", definition={'type': 'integer'}, rule='type')
+        if "organization_id" in data_keys:
+            data_keys.remove("organization_id")
+            data__organizationid = data["organization_id"]
+            if not isinstance(data__organizationid, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".organization_id must be string", value=data__organizationid, name="" + (name_prefix or "data") + ".organization_id", definition={'type': 'string'}, rule='type')
+        if "organization_name" in data_keys:
+            data_keys.remove("organization_name")
+            data__organizationname = data["organization_name"]
+            if not isinstance(data__organizationname, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".organization_name must be string", value=data__organizationname, name="" + (name_prefix or "data") + ".organization_name", definition={'type': 'string'}, rule='type')
+        if "email_username" in data_keys:
+            data_keys.remove("email_username")
+            data__emailusername = data["email_username"]
+            if not isinstance(data__emailusername, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".email_username must be string", value=data__emailusername, name="" + (name_prefix or "data") + ".email_username", definition={'type': 'string'}, rule='type')
+        if "vanity_name" in data_keys:
+            data_keys.remove("vanity_name")
+            data__vanityname = data["vanity_name"]
+            if not isinstance(data__vanityname, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".vanity_name must be string", value=data__vanityname, name="" + (name_prefix or "data") + ".vanity_name", definition={'type': 'string'}, rule='type')
+        if "email_address" in data_keys:
+            data_keys.remove("email_address")
+            data__emailaddress = data["email_address"]
+            if not isinstance(data__emailaddress, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".email_address must be string", value=data__emailaddress, name="" + (name_prefix or "data") + ".email_address", definition={'type': 'string'}, rule='type')
+        if "first_name" in data_keys:
+            data_keys.remove("first_name")
+            data__firstname = data["first_name"]
+            if not isinstance(data__firstname, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".first_name must be string", value=data__firstname, name="" + (name_prefix or "data") + ".first_name", definition={'type': 'string'}, rule='type')
+        if "last_name" in data_keys:
+            data_keys.remove("last_name")
+            data__lastname = data["last_name"]
+            if not isinstance(data__lastname, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".last_name must be string", value=data__lastname, name="" + (name_prefix or "data") + ".last_name", definition={'type': 'string'}, rule='type')
+    return data
\ No newline at end of file
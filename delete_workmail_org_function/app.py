@@ -2,21 +2,60 @@
 import json
 import os
 import logging
+import threading
+import time
 import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from botocore.exceptions import ClientError, BotoCoreError
-from typing import Dict, Any
-from workmail_common.utils import (
-    handle_error,
-    validate,
-    connect_to_rds,
-    get_aws_clients,
-    keap_contact_add_to_group_via_proxy,
-)
+from fastjsonschema import JsonSchemaException
+from typing import Dict, Any, Callable, List, Tuple
+from workmail_common.aws import get_aws_client, get_aws_clients
+from workmail_common.db import clear_checkpoints, db_connection, workflow_key
+from workmail_common.outbox import enqueue_keap_tag
+from workmail_common.validation import validate, get_validator
+from workmail_common.errors import client_error_code, handle_error
+from workmail_common.instrumentation import instrumented_handler
+from workmail_common.priming import prime
 
 # Initialize logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "schemas/input_schema.json"
+)
+
+prime(
+    clients=["secretsmanager", "ses", "workmail", "route53", "iam"],
+    db=True,
+    schemas=[SCHEMA_PATH],
+)
+
+BATCH_ROUTE_KEY = "POST /workmail/cancel/batch"
+# A bulk cancel runs behind API Gateway's 29 second integration timeout, so a
+# batch is kept to what CANCEL_MAX_CONCURRENCY teardowns can get through in
+# CANCEL_BATCH_TIME_BUDGET_SECONDS. Items not started by then are reported
+# NOT_STARTED for the caller to resubmit.
+MAX_BATCH_ITEMS = int(os.environ.get("MAX_BATCH_ITEMS", "25"))
+CANCEL_BATCH_TIME_BUDGET_SECONDS = float(
+    os.environ.get("CANCEL_BATCH_TIME_BUDGET_SECONDS", "20")
+)
+# Concurrent delete_organization calls during a bulk cancel.
+CANCEL_MAX_CONCURRENCY = int(os.environ.get("CANCEL_MAX_CONCURRENCY", "5"))
+# Concurrent teardown steps for one organization.
+TEARDOWN_MAX_WORKERS = int(os.environ.get("TEARDOWN_MAX_WORKERS", "4"))
+
+# Set on every zone create_hosted_zone_function creates.
+HOSTED_ZONE_COMMENT = "WorkMail domain"
+ROUTE53_MAX_CHANGES_PER_BATCH = 1000
+# Error codes meaning the artifact is already gone.
+NOT_FOUND_ERROR_CODES = {
+    "EntityNotFoundException",
+    "NoSuchEntity",
+    "NoSuchHostedZone",
+    "OrganizationNotFoundException",
+}
+
 
 def get_config():
     required_vars = [
@@ -94,12 +133,17 @@ def delete_workmail_organization(
         raise
 
 
-def unregister_workmail_organization(organization_id, connection) -> bool:
+def unregister_workmail_organization(
+    organization_id, connection, contact_id=None, cancel_tag_id=None
+) -> bool:
+    """Unregister the stack, queueing the contact's Keap cancel tag in the same commit."""
     try:
         logger.info(f"Attempting to unregister WorkMail organization {organization_id}")
         cursor = connection.cursor()
         sql = """DELETE FROM workmail_organizations WHERE organization_id = %s"""
         cursor.execute(sql, (organization_id,))
+        if cancel_tag_id is not None:
+            enqueue_keap_tag([contact_id], cancel_tag_id, connection)
         connection.commit()
         logger.info(f"Unregistered WorkMail organization {organization_id}")
         return True
@@ -110,50 +154,423 @@ def unregister_workmail_organization(organization_id, connection) -> bool:
             cursor.close()
 
 
+def get_workmail_organization_ids(
+    keys: List[Tuple[int, str]], connection: Any
+) -> Dict[Tuple[int, str], str]:
+    """Look up the organization ids for many (contact_id, vanity_name) pairs at once."""
+    if not keys:
+        return {}
+    try:
+        cursor = connection.cursor()
+        placeholders = ", ".join(["(%s, %s)"] * len(keys))
+        sql = f"""SELECT ownerid, vanity_name, organization_id FROM workmail_organizations WHERE (ownerid, vanity_name) IN ({placeholders})"""
+        cursor.execute(sql, tuple(value for key in keys for value in key))
+        organization_ids = {}
+        for ownerid, vanity_name, organization_id in cursor.fetchall():
+            organization_ids.setdefault((ownerid, vanity_name), organization_id)
+        logger.info(f"Found {len(organization_ids)} of {len(keys)} WorkMail stacks")
+        return organization_ids
+    except Exception as e:
+        logger.error(f"Unexpected error querying RDS: {e}")
+        raise
+    finally:
+        if "cursor" in locals() and cursor:
+            cursor.close()
+
+
+def delete_workmail_users(organization_id: str, workmail_client: Any) -> int:
+    """Deregister and delete every user of an organization; returns the count."""
+    deleted = 0
+    paginator = workmail_client.get_paginator("list_users")
+    for page in paginator.paginate(OrganizationId=organization_id):
+        for user in page.get("Users", []):
+            if user.get("State") == "DELETED" or user.get("UserRole") == "SYSTEM_USER":
+                continue
+            if user.get("State") == "ENABLED":
+                workmail_client.deregister_from_work_mail(
+                    OrganizationId=organization_id, EntityId=user["Id"]
+                )
+            workmail_client.delete_user(
+                OrganizationId=organization_id, UserId=user["Id"]
+            )
+            deleted += 1
+    logger.info(f"Deleted {deleted} user(s) of WorkMail organization {organization_id}")
+    return deleted
+
+
+def find_hosted_zones(domain_name: str, route53_client: Any) -> List[str]:
+    """Ids of the public zones create_hosted_zone_function made for a domain."""
+    zone_name = f"{domain_name.rstrip('.')}."
+    hosted_zone_ids = []
+    kwargs = {"DNSName": zone_name}
+    while True:
+        response = route53_client.list_hosted_zones_by_name(**kwargs)
+        zones = response.get("HostedZones", [])
+        for zone in zones:
+            if zone["Name"] != zone_name:
+                return hosted_zone_ids
+            if zone.get("Config", {}).get("Comment") == HOSTED_ZONE_COMMENT:
+                hosted_zone_ids.append(zone["Id"])
+        if not response.get("IsTruncated") or not zones:
+            return hosted_zone_ids
+        kwargs = {
+            "DNSName": response["NextDNSName"],
+            "HostedZoneId": response["NextHostedZoneId"],
+        }
+
+
+def delete_record_sets(hosted_zone_id: str, route53_client: Any) -> int:
+    """
+    Delete every record set but the zone's own NS and SOA; returns the count.
+
+    All pages are listed before anything is deleted, so deletions cannot
+    shift the pagination.
+    """
+    paginator = route53_client.get_paginator("list_resource_record_sets")
+    changes, apex = [], None
+    for page in paginator.paginate(HostedZoneId=hosted_zone_id):
+        for record_set in page.get("ResourceRecordSets", []):
+            if record_set["Type"] == "SOA":
+                apex = record_set["Name"]
+            changes.append({"Action": "DELETE", "ResourceRecordSet": record_set})
+    changes = [
+        change
+        for change in changes
+        if not (
+            change["ResourceRecordSet"]["Type"] in ("NS", "SOA")
+            and change["ResourceRecordSet"]["Name"] == apex
+        )
+    ]
+    for start in range(0, len(changes), ROUTE53_MAX_CHANGES_PER_BATCH):
+        route53_client.change_resource_record_sets(
+            HostedZoneId=hosted_zone_id,
+            ChangeBatch={
+                "Changes": changes[start : start + ROUTE53_MAX_CHANGES_PER_BATCH]
+            },
+        )
+    logger.info(f"Deleted {len(changes)} record set(s) from {hosted_zone_id}")
+    return len(changes)
+
+
+def delete_iam_access_keys(user_name: str, iam_client: Any) -> int:
+    deleted = 0
+    paginator = iam_client.get_paginator("list_access_keys")
+    for page in paginator.paginate(UserName=user_name):
+        for access_key in page.get("AccessKeyMetadata", []):
+            iam_client.delete_access_key(
+                UserName=user_name, AccessKeyId=access_key["AccessKeyId"]
+            )
+            deleted += 1
+    return deleted
+
+
+def delete_iam_user_policies(user_name: str, iam_client: Any) -> int:
+    deleted = 0
+    paginator = iam_client.get_paginator("list_user_policies")
+    for page in paginator.paginate(UserName=user_name):
+        for policy_name in page.get("PolicyNames", []):
+            iam_client.delete_user_policy(UserName=user_name, PolicyName=policy_name)
+            deleted += 1
+    return deleted
+
+
+def run_teardown(
+    steps: Dict[str, Tuple[Callable[[], Any], List[str]]],
+    max_workers: int = TEARDOWN_MAX_WORKERS,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run teardown steps on a thread pool, each once its dependencies are done.
+
+    steps maps a name to (run, names it depends on). Every step ends up
+    DELETED, NOT_FOUND (already gone, which still unblocks its dependents),
+    FAILED (with the exception under "error") or SKIPPED (a dependency
+    failed). Successful steps keep run()'s return value under "result".
+    """
+    outcomes: Dict[str, Dict[str, Any]] = {}
+    pending = dict(steps)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while pending or running:
+            scheduled = True
+            while scheduled:
+                scheduled = False
+                for name, (run, depends_on) in list(pending.items()):
+                    blocked_by = [
+                        dependency
+                        for dependency in depends_on
+                        if outcomes.get(dependency, {}).get("status")
+                        in ("FAILED", "SKIPPED")
+                    ]
+                    if blocked_by:
+                        outcomes[name] = {"status": "SKIPPED", "blocked_by": blocked_by}
+                    elif all(dependency in outcomes for dependency in depends_on):
+                        running[executor.submit(run)] = name
+                    else:
+                        continue
+                    del pending[name]
+                    scheduled = True
+            if not running:
+                if pending:
+                    raise ValueError(f"Unsatisfiable teardown steps: {list(pending)}")
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    outcomes[name] = {"status": "DELETED", "result": future.result()}
+                except ClientError as e:
+                    if client_error_code(e) in NOT_FOUND_ERROR_CODES:
+                        outcomes[name] = {"status": "NOT_FOUND"}
+                    else:
+                        logger.error(f"Teardown step {name} failed: {e}")
+                        outcomes[name] = {"status": "FAILED", "error": e}
+                except Exception as e:
+                    logger.error(f"Teardown step {name} failed: {e}")
+                    outcomes[name] = {"status": "FAILED", "error": e}
+    return outcomes
+
+
+def teardown_workmail_stack(
+    organization_id: str, vanity_name: str, aws_clients: Dict[str, Any]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Delete everything one provisioning run created for a domain.
+
+    Independent chains run concurrently; within a chain the order is
+    users -> organization -> SES identity, record sets -> hosted zone, and
+    access keys and inline policies -> IAM user.
+    """
+    workmail_client = aws_clients["workmail_client"]
+    route53_client = aws_clients["route53_client"]
+    iam_client = aws_clients["iam_client"]
+    iam_user_name = f"workmail_{vanity_name}"
+
+    steps = {
+        "workmail_users": (
+            lambda: delete_workmail_users(organization_id, workmail_client),
+            [],
+        ),
+        "workmail_organization": (
+            lambda: delete_workmail_organization(organization_id, workmail_client),
+            ["workmail_users"],
+        ),
+        "ses_identity": (
+            lambda: aws_clients["ses_client"].delete_identity(Identity=vanity_name),
+            ["workmail_organization"],
+        ),
+        "iam_access_keys": (
+            lambda: delete_iam_access_keys(iam_user_name, iam_client),
+            [],
+        ),
+        "iam_user_policies": (
+            lambda: delete_iam_user_policies(iam_user_name, iam_client),
+            [],
+        ),
+        "iam_user": (
+            lambda: iam_client.delete_user(UserName=iam_user_name),
+            ["iam_access_keys", "iam_user_policies"],
+        ),
+    }
+    for hosted_zone_id in find_hosted_zones(vanity_name, route53_client):
+        records_step = f"route53_record_sets:{hosted_zone_id}"
+        steps[records_step] = (
+            lambda zone=hosted_zone_id: delete_record_sets(zone, route53_client),
+            [],
+        )
+        steps[f"route53_hosted_zone:{hosted_zone_id}"] = (
+            lambda zone=hosted_zone_id: route53_client.delete_hosted_zone(Id=zone),
+            [records_step],
+        )
+    return run_teardown(steps)
+
+
+def summarize_teardown(outcomes: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    return {name: outcome["status"] for name, outcome in sorted(outcomes.items())}
+
+
+def parse_cancellations(body: Any) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Validate each cancellation with the compiled input schema.
+
+    Returns the valid cancellations and a report entry for every item.
+    """
+    if isinstance(body, dict):
+        body = body.get("items")
+    if not isinstance(body, list) or not body:
+        raise ValueError("Request body must be a non-empty array of items")
+    if len(body) > MAX_BATCH_ITEMS:
+        raise ValueError(f"A batch may contain at most {MAX_BATCH_ITEMS} items")
+
+    validator = get_validator(SCHEMA_PATH)
+    valid, report = [], []
+    for index, item in enumerate(body):
+        entry = {"index": index}
+        report.append(entry)
+        try:
+            validator(item)
+        except JsonSchemaException as e:
+            entry.update(status="INVALID", error=e.message)
+            continue
+        entry.update(contact_id=item["contact_id"], vanity_name=item["vanity_name"])
+        valid.append(entry)
+    return valid, report
+
+
+def cancel_batch(
+    body: Any, config: Dict[str, str], aws_clients: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """
+    Cancel many organizations and report the outcome of each.
+
+    One query resolves every organization id and the teardowns run
+    concurrently (CANCEL_MAX_CONCURRENCY at a time). Each organization is
+    unregistered, with its Keap cancel tag queued in the same commit, as soon
+    as its own teardown finishes, so an invocation cut short leaves no deleted
+    organization registered. The commits take turns, so the batch holds at
+    most one pooled connection.
+    """
+    valid, report = parse_cancellations(body)
+    deadline = time.monotonic() + CANCEL_BATCH_TIME_BUDGET_SECONDS
+
+    with db_connection(config, aws_clients["secretsmanager_client"]) as connection:
+        organization_ids = get_workmail_organization_ids(
+            list({(e["contact_id"], e["vanity_name"]) for e in valid}), connection
+        )
+
+    to_delete, claimed = [], set()
+    for entry in valid:
+        organization_id = organization_ids.get(
+            (entry["contact_id"], entry["vanity_name"])
+        )
+        if organization_id is None:
+            entry.update(
+                status="NOT_FOUND",
+                error=f"No WorkMail organization_id found with contact_id={entry['contact_id']} and vanity_name={entry['vanity_name']}",
+            )
+        elif organization_id in claimed:
+            entry.update(organization_id=organization_id, status="DUPLICATE")
+        else:
+            claimed.add(organization_id)
+            entry["organization_id"] = organization_id
+            to_delete.append(entry)
+
+    db_lock = threading.Lock()
+
+    def unregister(entry: Dict[str, Any]) -> None:
+        with db_lock, db_connection(
+            config, aws_clients["secretsmanager_client"]
+        ) as connection:
+            unregistered = unregister_workmail_organization(
+                entry["organization_id"],
+                connection,
+                contact_id=entry["contact_id"],
+                cancel_tag_id=int(config["KEAP_TAG_CANCEL"]),
+            )
+            # A new order for the same domain must start from scratch.
+            clear_checkpoints(
+                [workflow_key(entry["contact_id"], entry["vanity_name"])], connection
+            )
+        if not unregistered:
+            logger.error(
+                f"Failed to unregister WorkMail organization {entry['organization_id']}. Please remove entry from workmail_organizations table."
+            )
+        entry.update(tag_queued=unregistered, unregistered=unregistered)
+
+    def delete(entry: Dict[str, Any]) -> None:
+        if time.monotonic() >= deadline:
+            entry["status"] = "NOT_STARTED"
+            return
+        try:
+            outcomes = teardown_workmail_stack(
+                entry["organization_id"], entry["vanity_name"], aws_clients
+            )
+        except Exception as e:
+            entry.update(status="FAILED", error=str(e))
+            return
+        entry["teardown"] = summarize_teardown(outcomes)
+        organization = outcomes["workmail_organization"]
+        if organization["status"] == "DELETED":
+            entry.update(status="DELETED", state=organization["result"].get("State"))
+        elif organization["status"] == "NOT_FOUND":
+            entry.update(status="DELETED", state="DELETED")
+        else:
+            entry.update(
+                status="FAILED", error=str(organization.get("error", "SKIPPED"))
+            )
+            return
+        try:
+            unregister(entry)
+        except Exception as e:
+            logger.error(
+                f"Failed to unregister WorkMail organization {entry['organization_id']}: {e}"
+            )
+            entry.update(tag_queued=False, unregistered=False)
+
+    with ThreadPoolExecutor(max_workers=CANCEL_MAX_CONCURRENCY) as executor:
+        list(executor.map(delete, to_delete))
+    return report
+
+
+@instrumented_handler
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """Lambda function handler."""
     logger.info("Handling Lambda event")
     try:
         config = get_config()
         aws_clients = get_aws_clients()
-
-        connection = connect_to_rds(aws_clients["secretsmanager_client"], config=config)
+        if "iam_client" not in aws_clients:
+            aws_clients["iam_client"] = get_aws_client("iam")
 
         body = json.loads(event["body"])
 
-        pwd = os.path.dirname(os.path.abspath(__file__))
-        schema_path = os.path.join(pwd, "schemas/input_schema.json")
-        validate(body, schema_path)
+        if event.get("routeKey") == BATCH_ROUTE_KEY:
+            report = cancel_batch(body, config, aws_clients)
+            return {
+                "statusCode": 200,
+                "body": json.dumps(
+                    {"message": "Processed cancellation batch.", "items": report}
+                ),
+            }
+        validate(body, SCHEMA_PATH)
 
         contact_id = body["contact_id"]
         vanity_name = body["vanity_name"]
 
-        organization_id = get_workmail_organization_id(
-            contact_id, vanity_name, connection
-        )
-        delete_workmail_organization_response = delete_workmail_organization(
-            organization_id, aws_clients["workmail_client"]
-        )
-        keap_contact_add_to_group_via_proxy(
-            contact_id, int(config["KEAP_TAG_CANCEL"]), config=config
-        )
-        if not unregister_workmail_organization(
-            organization_id,
-            connection,
-        ):
-            logger.error(
-                f"Failed to unregister WorkMail organization {organization_id}. Please remove entry from workmail_organizations table."
+        with db_connection(config, aws_clients["secretsmanager_client"]) as connection:
+            organization_id = get_workmail_organization_id(
+                contact_id, vanity_name, connection
             )
+        outcomes = teardown_workmail_stack(organization_id, vanity_name, aws_clients)
+        organization = outcomes["workmail_organization"]
+        if "error" in organization:
+            raise organization["error"]
+        if organization["status"] == "SKIPPED":
+            raise RuntimeError(
+                f"WorkMail organization {organization_id} was not deleted: "
+                f"{organization['blocked_by']} failed"
+            )
+        state = (organization.get("result") or {}).get("State", "DELETED")
+
+        with db_connection(config, aws_clients["secretsmanager_client"]) as connection:
+            if not unregister_workmail_organization(
+                organization_id,
+                connection,
+                contact_id=contact_id,
+                cancel_tag_id=int(config["KEAP_TAG_CANCEL"]),
+            ):
+                logger.error(
+                    f"Failed to unregister WorkMail organization {organization_id}. Please remove entry from workmail_organizations table."
+                )
+            clear_checkpoints([workflow_key(contact_id, vanity_name)], connection)
 
         return {
             "statusCode": 200,
             "body": json.dumps(
                 {
                     "message": "Deleted workmail organization.",
-                    "organization_id": delete_workmail_organization_response[
-                        "OrganizationId"
-                    ],
-                    "state": delete_workmail_organization_response["State"],
+                    "organization_id": organization_id,
+                    "state": state,
+                    "teardown": summarize_teardown(outcomes),
                 }
             ),
         }
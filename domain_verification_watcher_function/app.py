@@ -0,0 +1,302 @@
+# domain_verification_watcher_function/app.py
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Set, Tuple
+from botocore.exceptions import ClientError
+from workmail_common.aws import get_aws_client
+from workmail_common.db import db_connection
+from workmail_common.validation import validate
+from workmail_common.errors import client_error_code
+from workmail_common.instrumentation import instrumented_handler
+from workmail_common.priming import prime
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "schemas/input_schema.json"
+)
+
+prime(clients=["workmail", "stepfunctions"], db=True, schemas=[SCHEMA_PATH])
+
+VERIFIED = "VERIFIED"
+
+# Errors from SendTaskSuccess meaning the execution is no longer waiting on the
+# token (it timed out into the polling fallback, or was stopped).
+STALE_TOKEN_ERRORS = {"TaskTimedOut", "TaskDoesNotExist", "InvalidToken"}
+
+# SES GetIdentityVerificationAttributes / GetIdentityDkimAttributes accept at
+# most 100 identities per call.
+SES_IDENTITIES_PER_CALL = 100
+SES_SUCCESS = "Success"
+SWEEP_MAX_WORKERS = int(os.environ.get("SWEEP_MAX_WORKERS", "8"))
+
+
+def get_config():
+    required_vars = [
+        "DB_SECRET_ARN",
+        "DB_CLUSTER_ARN",
+        "DATABASE_NAME",
+    ]
+    config = {}
+    for var in required_vars:
+        value = os.environ.get(var)
+        if not value:
+            raise EnvironmentError(
+                f"Environment variable {var} is required but not set."
+            )
+        config[var] = value
+    return config
+
+
+def is_domain_verified(
+    organization_id: str, vanity_name: str, workmail_client: Any
+) -> bool:
+    """True once both ownership and DKIM verification have succeeded."""
+    mail_domain_response = workmail_client.get_mail_domain(
+        OrganizationId=organization_id, DomainName=vanity_name
+    )
+    ownership_verification_status = mail_domain_response.get(
+        "OwnershipVerificationStatus"
+    )
+    dkim_verification_status = mail_domain_response.get("DkimVerificationStatus")
+    logger.info(
+        f"Domain {vanity_name} (orgid: {organization_id}): Ownership = {ownership_verification_status}, Dkim = {dkim_verification_status}"
+    )
+    return (
+        ownership_verification_status == VERIFIED
+        and dkim_verification_status == VERIFIED
+    )
+
+
+def resume_workflow(task_token: str, organization_id: str, sfn_client: Any) -> bool:
+    """
+    Complete the execution's waiting task with a verified result.
+
+    Returns False if the token is no longer valid, so the caller can drop it.
+    """
+    try:
+        sfn_client.send_task_success(
+            taskToken=task_token, output=json.dumps({"domainVerified": True})
+        )
+        logger.info(f"Resumed workflow for organization {organization_id}")
+        return True
+    except ClientError as e:
+        if client_error_code(e) not in STALE_TOKEN_ERRORS:
+            raise
+        logger.warning(
+            f"Task token for organization {organization_id} is no longer valid: {e}"
+        )
+        return False
+
+
+def register_watch(organization_id: str, task_token: str, connection: Any) -> None:
+    """Store the task token on the organization's row for the watcher to resume."""
+    try:
+        cursor = connection.cursor()
+        sql = """UPDATE workmail_organizations SET verification_task_token = %s WHERE organization_id = %s"""
+        cursor.execute(sql, (task_token, organization_id))
+        connection.commit()
+        logger.info(f"Watching domain verification for organization {organization_id}")
+    except Exception as e:
+        raise
+    finally:
+        if "cursor" in locals() and cursor:
+            cursor.close()
+
+
+def get_pending_organizations(connection: Any) -> List[Dict[str, Any]]:
+    """
+    Every pending organization with an execution waiting on its domain.
+
+    Organizations without a task token belong to polling-mode workflows (or
+    ones that timed out into the polling fallback); those check their domain
+    themselves, so the sweep has nothing to do for them.
+    """
+    try:
+        cursor = connection.cursor()
+        sql = """SELECT organization_id, vanity_name, verification_task_token FROM workmail_organizations WHERE state = %s AND verification_task_token IS NOT NULL"""
+        cursor.execute(sql, ("PENDING",))
+        return [
+            {
+                "organization_id": organization_id,
+                "vanity_name": vanity_name,
+                "task_token": task_token,
+            }
+            for organization_id, vanity_name, task_token in cursor.fetchall()
+        ]
+    except Exception as e:
+        raise
+    finally:
+        if "cursor" in locals() and cursor:
+            cursor.close()
+
+
+def clear_watches(organization_ids: List[str], connection: Any) -> None:
+    if not organization_ids:
+        return
+    try:
+        cursor = connection.cursor()
+        placeholders = ", ".join(["%s"] * len(organization_ids))
+        sql = f"""UPDATE workmail_organizations SET verification_task_token = NULL WHERE organization_id IN ({placeholders})"""
+        cursor.execute(sql, tuple(organization_ids))
+        connection.commit()
+    except Exception as e:
+        raise
+    finally:
+        if "cursor" in locals() and cursor:
+            cursor.close()
+
+
+def ses_verification_candidates(
+    domains: List[str], ses_client: Any, executor: ThreadPoolExecutor
+) -> Tuple[Set[str], Set[str]]:
+    """
+    Pre-screen domains with batched SES lookups.
+
+    Returns (ready, unknown): domains whose SES ownership and DKIM checks both
+    succeeded, and domains SES has no identity for (WorkMail must decide).
+    """
+
+    def lookup(batch: List[str]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        verification = ses_client.get_identity_verification_attributes(
+            Identities=batch
+        )["VerificationAttributes"]
+        dkim = ses_client.get_identity_dkim_attributes(Identities=batch)[
+            "DkimAttributes"
+        ]
+        return verification, dkim
+
+    batches = [
+        domains[i : i + SES_IDENTITIES_PER_CALL]
+        for i in range(0, len(domains), SES_IDENTITIES_PER_CALL)
+    ]
+    ready, unknown = set(), set()
+    for batch, (verification, dkim) in zip(batches, executor.map(lookup, batches)):
+        for domain in batch:
+            if domain not in verification or domain not in dkim:
+                unknown.add(domain)
+            elif (
+                verification[domain].get("VerificationStatus") == SES_SUCCESS
+                and dkim[domain].get("DkimVerificationStatus") == SES_SUCCESS
+            ):
+                ready.add(domain)
+    return ready, unknown
+
+
+def watch_domain(
+    event: Dict[str, Any], config: Dict[str, str], workmail_client: Any, sfn_client: Any
+) -> Dict[str, Any]:
+    """
+    Handle the state machine's waitForTaskToken invocation.
+
+    Domains that are already verified are resumed at once; otherwise the token
+    is stored and a later scheduled sweep resumes the execution.
+    """
+    if not validate(event, SCHEMA_PATH):
+        raise Exception("Input validation failed")
+
+    organization_id = event["organization_id"]
+    if is_domain_verified(organization_id, event["vanity_name"], workmail_client):
+        resume_workflow(event["task_token"], organization_id, sfn_client)
+        return {"watching": False, "resumed": True}
+
+    with db_connection(config) as connection:
+        register_watch(organization_id, event["task_token"], connection)
+    return {"watching": True, "resumed": False}
+
+
+def sweep_pending_domains(
+    config: Dict[str, str], clients: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Check every waiting pending organization and resume the ones that are ready.
+
+    SES batch lookups (SES_IDENTITIES_PER_CALL identities per call) narrow the
+    field; WorkMail then confirms the candidates concurrently, since its
+    status is what the workflow gates on. Each verified execution is resumed
+    once: its token is cleared afterwards, stale or not.
+    """
+    with db_connection(config) as connection:
+        pending = get_pending_organizations(connection)
+    if not pending:
+        return {"checked": 0, "resumed": []}
+    logger.info(f"Checking {len(pending)} pending organization(s)")
+
+    with ThreadPoolExecutor(max_workers=SWEEP_MAX_WORKERS) as executor:
+        domains = sorted({organization["vanity_name"] for organization in pending})
+        ready, unknown = ses_verification_candidates(domains, clients["ses"], executor)
+        candidates = [
+            organization
+            for organization in pending
+            if organization["vanity_name"] in ready | unknown
+        ]
+
+        def confirm(organization: Dict[str, Any]) -> bool:
+            try:
+                return is_domain_verified(
+                    organization["organization_id"],
+                    organization["vanity_name"],
+                    clients["workmail"],
+                )
+            except ClientError as e:
+                # One bad domain must not hold up the rest of the sweep.
+                logger.error(
+                    f"Failed to check organization {organization['organization_id']}: {e}"
+                )
+                return False
+
+        verified = [
+            organization
+            for organization, ok in zip(candidates, executor.map(confirm, candidates))
+            if ok
+        ]
+        resumed_flags = list(
+            executor.map(
+                lambda organization: resume_workflow(
+                    organization["task_token"],
+                    organization["organization_id"],
+                    clients["stepfunctions"],
+                ),
+                verified,
+            )
+        )
+
+    with db_connection(config) as connection:
+        # Resumed and stale tokens alike are done with.
+        clear_watches(
+            [organization["organization_id"] for organization in verified], connection
+        )
+    return {
+        "checked": len(pending),
+        "resumed": [
+            organization["organization_id"]
+            for organization, resumed in zip(verified, resumed_flags)
+            if resumed
+        ],
+    }
+
+
+@instrumented_handler
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Lambda handler: task-token registration, or the scheduled bulk sweep."""
+    logger.info(f"Received event: {event}")
+    try:
+        config = get_config()
+        if "task_token" in event:
+            return watch_domain(
+                event,
+                config,
+                get_aws_client("workmail"),
+                get_aws_client("stepfunctions"),
+            )
+        clients = {
+            service: get_aws_client(service)
+            for service in ("ses", "stepfunctions", "workmail")
+        }
+        return sweep_pending_domains(config, clients)
+    except Exception as e:
+        logger.exception(str(e))
+        raise e
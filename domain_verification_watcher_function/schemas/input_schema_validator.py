@@ -0,0 +1,38 @@
+# Generated by scripts/compile_schemas.py from domain_verification_watcher_function/schemas/input_schema.json. Do not edit.
+SCHEMA_SHA256 = "9800319641f87b8cdc96a7e535adbd1c72d738ec0ea896ec0cf1205b25cb8e6a"
+VERSION = "2.21.1"
+from decimal import Decimal
+from fastjsonschema import JsonSchemaValueException
+
+
+NoneType = type(None)
+
+def validate(data, custom_formats={}, name_prefix=None):
+    if not isinstance(data, (dict)):
+        raise JsonSchemaValueException("" + (name_prefix or "data") + " must be object", value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'properties': {'organization_id': {'type': 'string'}, 'vanity_name': {'type': 'string'}, 'task_token': {'type': 'string', 'minLength': 1}}, 'required': ['organization_id', 'vanity_name', 'task_token'], 'additionalProperties': True}, rule='type')
+    data_is_dict = isinstance(data, dict)
+    if data_is_dict:
+        data__missing_keys = set(['organization_id', 'vanity_name', 'task_token']) - data.keys()
+        if data__missing_keys:
+            raise JsonSchemaValueException("" + (name_prefix or "data") + " must contain " + (str(sorted(data__missing_keys)) + " properties"), value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'properties': {'organization_id': {'type': 'string'}, 'vanity_name': {'type': 'string'}, 'task_token': {'type': 'string', 'minLength': 1}}, 'required': ['organization_id', 'vanity_name', 'task_token'], 'additionalProperties': True}, rule='required')
+        data_keys = set(data.keys())
+        if "organization_id" in data_keys:
+            data_keys.remove("organization_id")
+            data__organizationid = data["organization_id"]
+            if not isinstance(data__organizationid, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".organization_id must be string", value=data__organizationid, name="" + (name_prefix or "data") + ".organization_id", definition={'type': 'string'}, rule='type')
+        if "vanity_name" in data_keys:
+            data_keys.remove("vanity_name")
+            data__vanityname = data["vanity_name"]
+            if not isinstance(data__vanityname, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".vanity_name must be string", value=data__vanityname, name="" + (name_prefix or "data") + ".vanity_name", definition={'type': 'string'}, rule='type')
+        if "task_token" in data_keys:
+            data_keys.remove("task_token")
+            data__tasktoken = data["task_token"]
+            if not isinstance(data__tasktoken, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".task_token must be string", value=data__tasktoken, name="" + (name_prefix or "data") + ".task_token", definition={'type': 'string', 'minLength': 1}, rule='type')
+            if isinstance(data__tasktoken, str):
+                data__tasktoken_len = len(data__tasktoken)
+                if data__tasktoken_len < 1:
+                    raise JsonSchemaValueException("" + (name_prefix or "data") + ".task_token must be longer than or equal to 1 characters", value=data__tasktoken, name="" + (name_prefix or "data") + ".task_token", definition={'type': 'string', 'minLength': 1}, rule='minLength')
+    return data
\ No newline at end of file
@@ -0,0 +1,156 @@
+# keap_outbox_drain_function/app.py
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+from workmail_common.db import db_connection
+from workmail_common.instrumentation import instrumented_handler
+from workmail_common.keap import KeapTagApplier, keap_contact_create_note_via_proxy
+from workmail_common.outbox import (
+    KEAP_APPLY_TAG,
+    KEAP_CREATE_NOTE,
+    claim_keap_outbox,
+    complete_keap_outbox,
+    is_settled,
+)
+from workmail_common.polling import remaining_time_seconds
+from workmail_common.priming import prime
+from workmail_common.secrets import delete_secret, get_secret_value
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+prime(secrets=["KEAP_API_KEY_SECRET_NAME"], db=True)
+
+# Rows claimed per round.
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "500"))
+DRAIN_MAX_WORKERS = int(os.environ.get("DRAIN_MAX_WORKERS", "4"))
+# Stop claiming new rounds with less than this left, so a round always finishes.
+DRAIN_TIME_RESERVE_SECONDS = float(os.environ.get("DRAIN_TIME_RESERVE_SECONDS", "60"))
+
+
+def get_config():
+    required_vars = [
+        "DB_SECRET_ARN",
+        "DB_CLUSTER_ARN",
+        "DATABASE_NAME",
+        "KEAP_API_KEY_SECRET_NAME",
+        "PROXY_ENDPOINT",
+        "PROXY_ENDPOINT_HOST",
+    ]
+    config = {}
+    for var in required_vars:
+        value = os.environ.get(var)
+        if not value:
+            raise EnvironmentError(
+                f"Environment variable {var} is required but not set."
+            )
+        config[var] = value
+    return config
+
+
+def send_items(items: List[Dict[str, Any]], config: Dict[str, str]) -> Dict[int, str]:
+    """
+    Send claimed items to Keap; return the error for each item that failed.
+
+    Tag applications go through a KeapTagApplier, so each tag is one applyTags
+    call per KEAP_APPLY_TAGS_MAX_CONTACTS contacts and a partly failed call
+    only fails the items of the contacts Keap did not tag. A tag item counts
+    as sent only if the applier confirms it. Every note is its own call.
+    """
+    errors: Dict[int, str] = {}
+    notes = []
+    tag_items: Dict[Tuple[int, int], List[int]] = {}
+    applier = KeapTagApplier(config, max_workers=DRAIN_MAX_WORKERS)
+    for item in items:
+        if item["kind"] == KEAP_APPLY_TAG:
+            key = (item["tag_id"], item["contact_id"])
+            tag_items.setdefault(key, []).append(item["id"])
+            applier.add(item["contact_id"], item["tag_id"])
+        elif item["kind"] == KEAP_CREATE_NOTE:
+            notes.append(item)
+        else:
+            logger.error(f"Unknown Keap outbox item kind {item['kind']!r}")
+            errors[item["id"]] = f"Unknown kind {item['kind']!r}"
+
+    def send_note(item: Dict[str, Any]) -> None:
+        try:
+            keap_contact_create_note_via_proxy(
+                item["contact_id"], item["title"], note_content(item), config
+            )
+        except Exception as e:
+            logger.warning(f"Keap note for outbox item {item['id']} failed: {e}")
+            errors[item["id"]] = str(e)
+
+    with ThreadPoolExecutor(max_workers=DRAIN_MAX_WORKERS) as executor:
+        list(executor.map(send_note, notes))
+    applier.flush()
+    # Only tags the applier reports as applied count as sent; anything it
+    # neither applied nor failed is retried rather than deleted.
+    applied = set(applier.applied)
+    for key, item_ids in tag_items.items():
+        if key in applied:
+            continue
+        error = applier.failures.get(key, "Tag application was not confirmed")
+        errors.update({item_id: error for item_id in item_ids})
+    logger.info(
+        f"Sent {len(tag_items)} tag application(s) in {applier.calls} applyTags call(s)"
+    )
+    return errors
+
+
+def note_content(item: Dict[str, Any]) -> Dict[str, Any]:
+    """A note's content with the fields held in its secret filled back in."""
+    if not item.get("secret_ref"):
+        return item["content"]
+    secret = json.loads(get_secret_value(item["secret_ref"]))
+    return {key: secret.get(key, value) for key, value in item["content"].items()}
+
+
+def delete_note_secrets(items: List[Dict[str, Any]], errors: Dict[int, str]) -> None:
+    """Delete the secrets of the notes that were sent or given up on."""
+    for item in items:
+        if not item.get("secret_ref") or not is_settled(item, errors):
+            continue
+        try:
+            delete_secret(item["secret_ref"])
+        except Exception as e:
+            logger.error(
+                f"Could not delete secret {item['secret_ref']} of outbox item {item['id']}: {e}"
+            )
+
+
+def drain_outbox(config: Dict[str, str], context: Any = None) -> Dict[str, int]:
+    """Send due outbox items round by round until none are left or time runs short."""
+    totals = {"sent": 0, "retrying": 0, "failed": 0}
+    while True:
+        with db_connection(config) as connection:
+            items = claim_keap_outbox(OUTBOX_BATCH_SIZE, connection)
+        if not items:
+            break
+        errors = send_items(items, config)
+        with db_connection(config) as connection:
+            outcome = complete_keap_outbox(items, errors, connection)
+        delete_note_secrets(items, errors)
+        for key, count in outcome.items():
+            totals[key] += count
+        remaining = remaining_time_seconds(context)
+        if len(items) < OUTBOX_BATCH_SIZE or (
+            remaining is not None and remaining < DRAIN_TIME_RESERVE_SECONDS
+        ):
+            break
+    logger.info(f"Drained Keap outbox: {totals}")
+    return totals
+
+
+@instrumented_handler
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """Lambda handler: scheduled drain of the Keap outbox."""
+    logger.info(f"Received event: {event}")
+    try:
+        config = get_config()
+        return drain_outbox(config, context)
+    except Exception as e:
+        logger.exception(str(e))
+        raise e
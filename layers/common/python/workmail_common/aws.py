@@ -0,0 +1,85 @@
+# workmail_common/aws.py
+import logging
+import socket
+import threading
+import boto3
+from botocore.config import Config
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+from workmail_common.instrumentation import instrument_client
+from workmail_common.ratelimit import rate_limit_client
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+DEFAULT_CLIENT_CONFIG = Config(
+    connect_timeout=5, retries={"max_attempts": 2, "mode": "adaptive"}
+)
+
+# Clients are created once per Lambda container and reused by warm invocations.
+_aws_clients: Dict[Tuple[str, Optional[str], Config], Any] = {}
+_aws_clients_lock = threading.Lock()
+
+
+def get_account_id():
+    return get_aws_client("sts").get_caller_identity().get("Account")
+
+
+def get_aws_clients() -> Dict[str, Any]:
+    logger.info("Initializing AWS clients")
+    try:
+        return {
+            "secretsmanager_client": get_aws_client("secretsmanager"),
+            "ses_client": get_aws_client("ses"),
+            "workmail_client": get_aws_client("workmail"),
+            "route53_client": get_aws_client("route53"),
+        }
+    except Exception as e:
+        raise
+
+
+def get_aws_client(
+    service_name: str,
+    region_name: Optional[str] = None,
+    config: Optional[Config] = None,
+) -> boto3.client:
+    """
+    Return the container-wide client for a service, creating it on first use.
+
+    Clients are keyed by (service_name, region_name, config). Pass a module-level
+    Config instance when overriding the default so repeat calls hit the cache.
+    Every call the client makes is timed (see workmail_common.instrumentation),
+    and the rate-limited APIs wait for a token first (see workmail_common.ratelimit).
+    """
+    config = config or DEFAULT_CLIENT_CONFIG
+    key = (service_name, region_name, config)
+    client = _aws_clients.get(key)
+    if client is not None:
+        return client
+    with _aws_clients_lock:
+        client = _aws_clients.get(key)
+        if client is None:
+            logger.info(f"Initializing {service_name} client")
+            kwargs = {"config": config}
+            if region_name:
+                kwargs["region_name"] = region_name
+            # Rate limited first, so the latency timer excludes the token wait.
+            client = instrument_client(
+                rate_limit_client(boto3.client(service_name, **kwargs))
+            )
+            _aws_clients[key] = client
+    return client
+
+
+def clear_aws_clients() -> None:
+    """Drop all cached clients (used by tests and after credential changes)."""
+    with _aws_clients_lock:
+        _aws_clients.clear()
+
+
+def resolve_aws_endpoint(client: Any) -> Tuple[str, str]:
+    """Resolve a client's endpoint hostname and IP address for diagnostics."""
+    hostname = urlparse(client.meta.endpoint_url).hostname
+    service_ip = socket.gethostbyname(hostname)
+    logger.info(f"{client.meta.service_model.service_name} endpoint at {service_ip}")
+    return hostname, service_ip
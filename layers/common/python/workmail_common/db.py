@@ -0,0 +1,547 @@
+# workmail_common/db.py
+import hashlib
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+from workmail_common import aws
+from workmail_common.domain import workflow_key  # noqa: F401 (re-exported)
+from workmail_common.errors import is_auth_error
+from workmail_common.instrumentation import InstrumentedConnection, timed
+from workmail_common.secrets import get_secret
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# mysql.connector is imported by the functions that use it, so handlers on the
+# Data API backend (and the modules that never touch the database) skip the driver.
+
+# MySQL pools live for the life of the container. Connections are opened on
+# demand up to DB_POOL_SIZE and pinged (and reconnected if needed) on checkout.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "2"))
+_db_pools: Dict[str, Any] = {}
+_db_pool_opened: Dict[Any, int] = {}
+_db_pools_lock = threading.Lock()
+
+# DB_BACKEND picks how handlers reach the database: pooled mysql.connector
+# connections inside the VPC, or the RDS Data API over HTTPS.
+DB_BACKEND_MYSQL = "mysql"
+DB_BACKEND_DATA_API = "data-api"
+DATA_API_READ_STATEMENTS = {"SELECT", "SHOW", "DESCRIBE", "EXPLAIN"}
+DATA_API_BATCH_SIZE = int(os.environ.get("DATA_API_BATCH_SIZE", "500"))
+_PLACEHOLDER_PATTERN = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"|%s|%%")
+
+
+def connect_to_rds(secret_manager_client: Any, config: Dict[str, str]) -> Any:
+    import mysql.connector
+
+    try:
+        db_secret_arn = config["DB_SECRET_ARN"]
+        database_name = config["DATABASE_NAME"]
+        force_refresh = False
+        while True:
+            db_secret = get_secret(
+                db_secret_arn, secret_manager_client, force_refresh=force_refresh
+            )
+            db_credentials = json.loads(db_secret["SecretString"])
+            try:
+                with timed("mysql", "CONNECT"):
+                    connection = mysql.connector.connect(
+                        user=db_credentials["username"],
+                        password=db_credentials["password"],
+                        host=db_credentials["host"],
+                        database=database_name,
+                    )
+                return InstrumentedConnection(connection)
+            except mysql.connector.Error as e:
+                if force_refresh or not is_auth_error(e):
+                    raise
+                logger.warning(
+                    f"Database rejected cached credentials, refreshing {db_secret_arn}"
+                )
+                force_refresh = True
+    except Exception as e:
+        raise
+
+
+def _db_credentials(
+    config: Dict[str, str], secret_manager_client: Optional[Any], force_refresh: bool
+) -> Dict[str, str]:
+    db_secret = get_secret(
+        config["DB_SECRET_ARN"], secret_manager_client, force_refresh=force_refresh
+    )
+    db_credentials = json.loads(db_secret["SecretString"])
+    return {
+        "user": db_credentials["username"],
+        "password": db_credentials["password"],
+        "host": db_credentials["host"],
+        "database": config["DATABASE_NAME"],
+    }
+
+
+def get_db_pool(
+    config: Dict[str, str], secret_manager_client: Optional[Any] = None
+) -> Any:
+    """Return the container-wide mysql.connector pool for config's database."""
+    key = f"{config['DB_SECRET_ARN']}/{config['DATABASE_NAME']}"
+    pool = _db_pools.get(key)
+    if pool is not None:
+        return pool
+    with _db_pools_lock:
+        pool = _db_pools.get(key)
+        if pool is None:
+            from mysql.connector.pooling import MySQLConnectionPool
+
+            logger.info(f"Creating MySQL connection pool for {config['DATABASE_NAME']}")
+            pool_name = "workmail_" + hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+            pool = MySQLConnectionPool(pool_name=pool_name, pool_size=DB_POOL_SIZE)
+            pool.set_config(**_db_credentials(config, secret_manager_client, False))
+            _db_pools[key] = pool
+            _db_pool_opened[pool] = 0
+    return pool
+
+
+def _checkout_connection(pool: Any) -> Any:
+    from mysql.connector.errors import PoolError
+
+    try:
+        return pool.get_connection()
+    except PoolError:
+        with _db_pools_lock:
+            if _db_pool_opened[pool] >= pool.pool_size:
+                raise
+            logger.info(
+                f"Opening connection {_db_pool_opened[pool] + 1} in {pool.pool_name}"
+            )
+            pool.add_connection()
+            _db_pool_opened[pool] += 1
+        return pool.get_connection()
+
+
+def get_db_connection(
+    config: Dict[str, str], secret_manager_client: Optional[Any] = None
+) -> Any:
+    """
+    Check a live connection out of the pool.
+
+    Idle connections are pinged and reconnected by the pool. If the database
+    rejects the cached credentials (e.g. after a rotation), the secret is
+    refreshed, the pool reconfigured, and the checkout retried once.
+    """
+    import mysql.connector
+
+    pool = get_db_pool(config, secret_manager_client)
+    try:
+        return _checkout_connection(pool)
+    except mysql.connector.Error as e:
+        if not is_auth_error(e) and not is_auth_error(e.__cause__ or e):
+            raise
+        logger.warning(
+            f"Database rejected cached credentials, refreshing {config['DB_SECRET_ARN']}"
+        )
+        pool.set_config(**_db_credentials(config, secret_manager_client, True))
+        return _checkout_connection(pool)
+
+
+@contextmanager
+def _pooled_connection(
+    config: Dict[str, str], secret_manager_client: Optional[Any] = None
+) -> Iterator[Any]:
+    with timed("mysql", "CHECKOUT"):
+        connection = get_db_connection(config, secret_manager_client)
+    try:
+        yield InstrumentedConnection(connection)
+    finally:
+        # Returns the connection to the pool; uncommitted work is rolled back.
+        connection.close()
+
+
+def db_connection(
+    config: Dict[str, str], secret_manager_client: Optional[Any] = None
+) -> ContextManager[Any]:
+    """
+    Borrow a connection from the configured backend for a with-block.
+
+    The connection follows the DB-API subset the handlers use (cursor(),
+    execute() with %s placeholders, fetchone(), commit()), whichever
+    backend DB_BACKEND selects.
+    """
+    return get_db_backend(config, secret_manager_client).connection()
+
+
+class DatabaseBackend:
+    """Interface shared by the mysql.connector and RDS Data API backends."""
+
+    def connection(self) -> ContextManager[Any]:
+        raise NotImplementedError
+
+    def execute_batch(self, sql: str, param_sets: List[Sequence[Any]]) -> int:
+        """Run one statement for every parameter set and commit them together."""
+        if not param_sets:
+            return 0
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            try:
+                cursor.executemany(sql, param_sets)
+                connection.commit()
+            finally:
+                cursor.close()
+        return len(param_sets)
+
+
+class MySQLBackend(DatabaseBackend):
+    """Pooled mysql.connector connections; requires VPC access to the cluster."""
+
+    def __init__(
+        self, config: Dict[str, str], secret_manager_client: Optional[Any] = None
+    ):
+        self.config = config
+        self.secret_manager_client = secret_manager_client
+
+    def connection(self) -> ContextManager[Any]:
+        return _pooled_connection(self.config, self.secret_manager_client)
+
+
+class DataApiBackend(DatabaseBackend):
+    """HTTPS calls to the RDS Data API; no VPC placement or MySQL handshake."""
+
+    def __init__(self, config: Dict[str, str], rds_data_client: Optional[Any] = None):
+        self.config = config
+        self.rds_data_client = rds_data_client or aws.get_aws_client("rds-data")
+
+    @contextmanager
+    def connection(self) -> Iterator["DataApiConnection"]:
+        connection = DataApiConnection(
+            self.rds_data_client,
+            resource_arn=self.config["DB_CLUSTER_ARN"],
+            secret_arn=self.config["DB_SECRET_ARN"],
+            database=self.config["DATABASE_NAME"],
+        )
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+
+def get_db_backend(
+    config: Dict[str, str], secret_manager_client: Optional[Any] = None
+) -> DatabaseBackend:
+    """Return the backend named by DB_BACKEND ("mysql" or "data-api")."""
+    backend = config.get("DB_BACKEND") or os.environ.get("DB_BACKEND", DB_BACKEND_MYSQL)
+    if backend == DB_BACKEND_MYSQL:
+        return MySQLBackend(config, secret_manager_client)
+    if backend == DB_BACKEND_DATA_API:
+        return DataApiBackend(config)
+    raise ValueError(f"Unknown DB_BACKEND '{backend}'")
+
+
+class DedicatedConnection:
+    """
+    A mysql.connector connection of its own, outside the DB_POOL_SIZE pool.
+
+    For work that runs inside a handler's AWS calls (the rate limiter), where
+    the handler may already hold every pooled connection. The connection is
+    opened on first use, reopened when it has dropped, and lent to one
+    with-block at a time. On the Data API backend, where nothing is pooled,
+    each with-block gets a connection of its own as usual.
+    """
+
+    def __init__(
+        self, config: Dict[str, str], secret_manager_client: Optional[Any] = None
+    ):
+        self.backend = get_db_backend(config, secret_manager_client)
+        self._connection: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        if not isinstance(self.backend, MySQLBackend):
+            with self.backend.connection() as connection:
+                yield connection
+            return
+        with self._lock:
+            if self._connection is None or not self._connection.is_connected():
+                self._connection = connect_to_rds(
+                    self.backend.secret_manager_client, self.backend.config
+                )
+            try:
+                yield self._connection
+            finally:
+                # Nothing uncommitted is carried into the next with-block; a
+                # connection that cannot even roll back is reopened next time.
+                try:
+                    self._connection.rollback()
+                except Exception:
+                    self._connection = None
+
+
+def _translate_placeholders(sql: str) -> str:
+    """Rewrite %s placeholders as :p0, :p1, ... leaving quoted literals alone."""
+    index = itertools.count()
+
+    def replace(match: re.Match) -> str:
+        token = match.group(0)
+        if token == "%s":
+            return f":p{next(index)}"
+        if token == "%%":
+            return "%"
+        return token
+
+    return _PLACEHOLDER_PATTERN.sub(replace, sql)
+
+
+def _to_data_api_parameters(params: Sequence[Any]) -> List[Dict[str, Any]]:
+    parameters = []
+    for i, value in enumerate(params or ()):
+        if value is None:
+            field = {"isNull": True}
+        elif isinstance(value, bool):
+            field = {"booleanValue": value}
+        elif isinstance(value, int):
+            field = {"longValue": value}
+        elif isinstance(value, float):
+            field = {"doubleValue": value}
+        elif isinstance(value, (bytes, bytearray)):
+            field = {"blobValue": bytes(value)}
+        else:
+            field = {"stringValue": str(value)}
+        parameters.append({"name": f"p{i}", "value": field})
+    return parameters
+
+
+def _from_data_api_field(field: Dict[str, Any]) -> Any:
+    if field.get("isNull"):
+        return None
+    for key in (
+        "stringValue",
+        "longValue",
+        "doubleValue",
+        "booleanValue",
+        "blobValue",
+        "arrayValue",
+    ):
+        if key in field:
+            return field[key]
+    return None
+
+
+class DataApiCursor:
+    """Cursor over Data API results, mirroring the mysql.connector cursor subset."""
+
+    def __init__(self, connection: "DataApiConnection", dictionary: bool = False):
+        self._connection = connection
+        self._dictionary = dictionary
+        self._rows: List[Any] = []
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> None:
+        response = self._connection.execute_statement(
+            sql, params, include_result_metadata=self._dictionary
+        )
+        rows = [
+            tuple(_from_data_api_field(field) for field in record)
+            for record in response.get("records", [])
+        ]
+        if self._dictionary:
+            columns = [
+                column.get("label") or column.get("name")
+                for column in response.get("columnMetadata", [])
+            ]
+            rows = [dict(zip(columns, row)) for row in rows]
+        self._rows = rows
+        if "records" in response:
+            self.rowcount = len(rows)
+        else:
+            self.rowcount = response.get("numberOfRecordsUpdated", 0)
+        generated = response.get("generatedFields")
+        self.lastrowid = _from_data_api_field(generated[0]) if generated else None
+
+    def executemany(self, sql: str, param_sets: List[Sequence[Any]]) -> None:
+        self._connection.batch_execute_statement(sql, param_sets)
+        self._rows = []
+        self.rowcount = len(param_sets)
+
+    def fetchone(self) -> Optional[Any]:
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self) -> List[Any]:
+        rows, self._rows = self._rows, []
+        return rows
+
+    def close(self) -> None:
+        self._rows = []
+
+
+class DataApiConnection:
+    """
+    DB-API style connection over the RDS Data API.
+
+    A transaction is begun on the first write and ended by commit(),
+    rollback() or close(), so handlers keep mysql.connector's explicit
+    commit semantics. Reads outside a transaction run without one.
+    """
+
+    def __init__(
+        self, rds_data_client: Any, resource_arn: str, secret_arn: str, database: str
+    ):
+        self.client = rds_data_client
+        self._target = {"resourceArn": resource_arn, "secretArn": secret_arn}
+        self.database = database
+        self.transaction_id: Optional[str] = None
+
+    def cursor(self, dictionary: bool = False) -> DataApiCursor:
+        return DataApiCursor(self, dictionary=dictionary)
+
+    def _begin_for(self, sql: str) -> None:
+        if self.transaction_id is not None:
+            return
+        statement = sql.lstrip().split(None, 1)[0].upper() if sql.strip() else ""
+        if statement in DATA_API_READ_STATEMENTS:
+            return
+        response = self.client.begin_transaction(database=self.database, **self._target)
+        self.transaction_id = response["transactionId"]
+
+    def _statement_args(self, sql: str) -> Dict[str, Any]:
+        args = dict(
+            self._target, database=self.database, sql=_translate_placeholders(sql)
+        )
+        if self.transaction_id is not None:
+            args["transactionId"] = self.transaction_id
+        return args
+
+    def execute_statement(
+        self, sql: str, params: Sequence[Any] = (), include_result_metadata=False
+    ) -> Dict[str, Any]:
+        self._begin_for(sql)
+        return self.client.execute_statement(
+            parameters=_to_data_api_parameters(params),
+            includeResultMetadata=include_result_metadata,
+            **self._statement_args(sql),
+        )
+
+    def batch_execute_statement(
+        self, sql: str, param_sets: List[Sequence[Any]]
+    ) -> List[Dict[str, Any]]:
+        """Send the parameter sets in DATA_API_BATCH_SIZE chunks, in one transaction."""
+        self._begin_for(sql)
+        update_results = []
+        for start in range(0, len(param_sets), DATA_API_BATCH_SIZE):
+            chunk = param_sets[start : start + DATA_API_BATCH_SIZE]
+            response = self.client.batch_execute_statement(
+                parameterSets=[_to_data_api_parameters(p) for p in chunk],
+                **self._statement_args(sql),
+            )
+            update_results.extend(response.get("updateResults", []))
+        return update_results
+
+    def commit(self) -> None:
+        if self.transaction_id is not None:
+            self.client.commit_transaction(
+                transactionId=self.transaction_id, **self._target
+            )
+            self.transaction_id = None
+
+    def rollback(self) -> None:
+        if self.transaction_id is not None:
+            self.client.rollback_transaction(
+                transactionId=self.transaction_id, **self._target
+            )
+            self.transaction_id = None
+
+    def close(self) -> None:
+        # Matches a pooled mysql.connector connection: uncommitted work is rolled back.
+        self.rollback()
+
+    def is_connected(self) -> bool:
+        return True
+
+
+def close_db_pools() -> None:
+    """Disconnect and forget all pools (used by tests)."""
+    with _db_pools_lock:
+        for pool in _db_pools.values():
+            pool._remove_connections()
+        _db_pools.clear()
+        _db_pool_opened.clear()
+
+
+def get_checkpoint(key: str, step: str, connection: Any) -> Optional[Dict[str, Any]]:
+    """The recorded output of a completed step, or None."""
+    try:
+        cursor = connection.cursor()
+        sql = """SELECT output FROM workmail_workflow_checkpoints WHERE workflow_key = %s AND step = %s LIMIT 1"""
+        cursor.execute(sql, (key, step))
+        result = cursor.fetchone()
+        return json.loads(result[0]) if result else None
+    finally:
+        if "cursor" in locals() and cursor:
+            cursor.close()
+
+
+def save_checkpoint(
+    key: str, step: str, output: Dict[str, Any], connection: Any
+) -> None:
+    try:
+        cursor = connection.cursor()
+        sql = """REPLACE INTO workmail_workflow_checkpoints (workflow_key, step, output) VALUES (%s, %s, %s)"""
+        cursor.execute(sql, (key, step, json.dumps(output, default=str)))
+        connection.commit()
+        logger.info(f"Checkpointed {step} for {key}")
+    finally:
+        if "cursor" in locals() and cursor:
+            cursor.close()
+
+
+def clear_checkpoints(keys: List[str], connection: Any) -> None:
+    """Forget a workflow's progress, e.g. once its organization is cancelled."""
+    if not keys:
+        return
+    try:
+        cursor = connection.cursor()
+        placeholders = ", ".join(["%s"] * len(keys))
+        sql = f"""DELETE FROM workmail_workflow_checkpoints WHERE workflow_key IN ({placeholders})"""
+        cursor.execute(sql, tuple(keys))
+        connection.commit()
+    finally:
+        if "cursor" in locals() and cursor:
+            cursor.close()
+
+
+def run_checkpointed(
+    config: Dict[str, str],
+    key: str,
+    step: str,
+    run: Callable[[], Dict[str, Any]],
+    secret_manager_client: Optional[Any] = None,
+    recorded: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """
+    Return the step's recorded output if it already completed, else run it.
+
+    A successful run is recorded before returning; recorded() may trim what is
+    stored (e.g. to keep credentials out of the table). The connection is not
+    held while run() executes.
+    """
+    with db_connection(config, secret_manager_client) as connection:
+        output = get_checkpoint(key, step, connection)
+    if output is not None:
+        logger.info(f"Step {step} already completed for {key}; using checkpoint")
+        return output
+    output = run()
+    with db_connection(config, secret_manager_client) as connection:
+        save_checkpoint(key, step, recorded(output) if recorded else output, connection)
+    return output
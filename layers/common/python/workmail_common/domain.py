@@ -0,0 +1,58 @@
+# workmail_common/domain.py
+import re
+from typing import Any
+from urllib.parse import urlparse
+
+
+def extract_domain(url: str) -> (str, str):
+    """
+    Extract the full domain and root domain from a given URL or domain string.
+
+    Args:
+        url (str): The URL or domain to extract.
+
+    Returns:
+        tuple: A tuple containing the full domain (e.g., "blog.example.com") and the root domain (e.g., "example").
+    """
+
+    # Parse the URL, and if it lacks a scheme, add 'http://' to ensure it parses correctly
+    parsed = urlparse(url if "://" in url else f"http://{url}")
+    hostname = parsed.hostname
+
+    if not hostname:
+        raise Exception(f"Invalid URL or domain name: '{url}'")
+
+    # Remove www. if present (normalize the hostname)
+    hostname = hostname.lstrip("www.")
+
+    # Validate the domain using a regex (ensure it has at least one dot)
+    if not re.match(r"^[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$", hostname):
+        raise Exception(f"Invalid domain name: '{hostname}'")
+
+    # Extract the full domain (e.g., blog.example.com)
+    full_domain = hostname
+
+    # Extract the root domain (e.g., 'example' from blog.example.com)
+    domain_parts = full_domain.split(".")
+    if len(domain_parts) >= 2:
+        root_domain = domain_parts[-2]
+    else:
+        raise Exception(f"Unable to extract root domain from: '{full_domain}'")
+
+    return full_domain, root_domain
+
+
+def workflow_key(contact_id: Any, vanity_name: str) -> str:
+    """
+    Identify a provisioning workflow by what it provisions, not by execution.
+
+    The vanity name is normalized with extract_domain(), as process_input()
+    does before provisioning, so "https://www.example.com" and "example.com"
+    share a key (and an execution name) with the checkpoints recorded for
+    the provisioned domain. Raises ValueError for an invalid domain.
+    """
+    try:
+        full_domain, _ = extract_domain(vanity_name.strip().rstrip("."))
+    except Exception as e:
+        raise ValueError(str(e)) from e
+    return f"{int(contact_id)}:{full_domain.lower()}"
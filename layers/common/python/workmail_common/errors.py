@@ -0,0 +1,147 @@
+# workmail_common/errors.py
+import json
+import logging
+import sys
+import threading
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# mysql.connector error numbers for rejected credentials (ER_DBACCESS_DENIED_ERROR,
+# ER_ACCESS_DENIED_ERROR), kept as literals so checking them imports no driver.
+MYSQL_AUTH_ERRNOS = {1044, 1045}
+HTTP_AUTH_STATUS_CODES = {401, 403}
+
+# AWS error codes that mean a request was throttled and is worth retrying later.
+THROTTLING_ERROR_CODES = frozenset(
+    {
+        "Throttling",
+        "ThrottlingException",
+        "TooManyRequestsException",
+        "RequestLimitExceeded",
+        "PriorRequestNotComplete",
+    }
+)
+
+# Exceptions of third-party packages, by defining module. They are only looked up
+# once that module has been imported by someone else: an exception type cannot be
+# raised before its module is loaded, so handle_error() never imports a package.
+OPTIONAL_ERROR_RESPONSES: Dict[
+    str, Dict[str, Tuple[int, Callable[[Exception], str]]]
+] = {
+    "fastjsonschema": {
+        "JsonSchemaException": (
+            400,
+            lambda e: f"Schema validation error: {str(e)}",
+        ),
+    },
+    "requests": {
+        "RequestException": (502, lambda e: "Bad Gateway"),
+    },
+    "botocore.exceptions": {
+        "NoCredentialsError": (500, lambda e: "No AWS credentials found"),
+        "PartialCredentialsError": (500, lambda e: "Partial AWS credentials found"),
+        "ClientError": (500, lambda e: f"{type(e).__name__}: {str(e)}"),
+        "BotoCoreError": (500, lambda e: "An unspecified error occurred"),
+    },
+    "boto3.exceptions": {
+        "Boto3Error": (500, lambda e: "An unspecified error occurred"),
+    },
+}
+
+# handle_error() dispatch: built on first error (and again when another optional
+# module has been loaded since), then resolved once per exception type.
+ErrorResponse = Tuple[type, int, Callable[[Exception], str]]
+_error_responses: Optional[Dict[type, Tuple[int, Callable[[Exception], str]]]] = None
+_error_responses_modules: FrozenSet[str] = frozenset()
+_error_responses_by_type: Dict[type, Optional[ErrorResponse]] = {}
+_error_responses_lock = threading.Lock()
+
+
+def _loaded_optional_modules() -> FrozenSet[str]:
+    return frozenset(name for name in OPTIONAL_ERROR_RESPONSES if name in sys.modules)
+
+
+def _build_error_responses(
+    modules: FrozenSet[str],
+) -> Dict[type, Tuple[int, Callable[[Exception], str]]]:
+    error_responses = {
+        json.JSONDecodeError: (400, lambda e: "Invalid JSON format"),
+        ValueError: (400, lambda e: str(e)),
+        KeyError: (400, lambda e: f"Key error: {e.args[0]}"),
+    }
+    for module_name in modules:
+        module = sys.modules[module_name]
+        for class_name, response in OPTIONAL_ERROR_RESPONSES[module_name].items():
+            error_responses[getattr(module, class_name)] = response
+    return error_responses
+
+
+def _is_unmodeled_client_error(exception_type: type, base: type) -> bool:
+    # Only modeled service exceptions ("...Exception" subclasses of ClientError)
+    # get the "<Name>: <message>" response; other ClientErrors are unexpected.
+    return base.__name__ == "ClientError" and not exception_type.__name__.endswith(
+        "Exception"
+    )
+
+
+def _resolve_error_response(exception_type: type) -> Optional[ErrorResponse]:
+    """Find the most specific handled base class of an exception type (cached)."""
+    global _error_responses, _error_responses_modules
+    if exception_type in _error_responses_by_type:
+        return _error_responses_by_type[exception_type]
+    with _error_responses_lock:
+        modules = _loaded_optional_modules()
+        if _error_responses is None or modules != _error_responses_modules:
+            _error_responses = _build_error_responses(modules)
+            _error_responses_modules = modules
+        resolved = None
+        for base in exception_type.__mro__:
+            if base in _error_responses:
+                if _is_unmodeled_client_error(exception_type, base):
+                    break
+                resolved = (base, *_error_responses[base])
+                break
+        _error_responses_by_type[exception_type] = resolved
+    return resolved
+
+
+def client_error_code(e: Exception) -> str:
+    """Return the AWS error code of a botocore ClientError (or its class name)."""
+    response = getattr(e, "response", None) or {}
+    return response.get("Error", {}).get("Code") or type(e).__name__
+
+
+def is_throttling_error(e: Exception) -> bool:
+    """Return True if an AWS call was rejected because it was throttled."""
+    return client_error_code(e) in THROTTLING_ERROR_CODES
+
+
+def is_auth_error(e: Exception) -> bool:
+    """Return True if an exception means the credentials we sent were rejected."""
+    mysql_connector = sys.modules.get("mysql.connector")
+    if mysql_connector is not None and isinstance(e, mysql_connector.Error):
+        return e.errno in MYSQL_AUTH_ERRNOS
+    response = getattr(e, "response", None)
+    return getattr(response, "status_code", None) in HTTP_AUTH_STATUS_CODES
+
+
+def handle_error(e: Exception) -> Dict[str, Any]:
+    """Handle exceptions."""
+    logger.warning(f"handle_error is attempting to handle a raised exception...")
+    resolved = _resolve_error_response(type(e))
+    if resolved:
+        exception_type, status_code, message_func = resolved
+        logger.error(f"{exception_type.__name__} occurred: {e}")
+        return {
+            "statusCode": status_code,
+            "errorMessage": message_func(e),
+            "isAuthorized": False,
+        }
+    logger.error(f"Unexpected error occurred: {e}")
+    return {
+        "statusCode": 500,
+        "errorMessage": str(e),
+        "isAuthorized": False,
+    }
@@ -0,0 +1,110 @@
+# workmail_common/executions.py
+"""
+Deterministic names for WorkMail workflow executions.
+
+An execution is named after its workflow key, so every entry point that can
+start one (the create endpoint, the intake queue worker and the batch state
+machine) agrees on the name and a repeated request finds the execution it
+repeats instead of provisioning the domain again.
+"""
+
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+from workmail_common.errors import client_error_code
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+EXECUTION_NAME_PREFIX = "create_workmail_workflow"
+# A succeeded execution younger than this is treated as the one a repeated
+# request meant; older or failed ones are followed by a new execution.
+EXECUTION_DEDUP_SECONDS = int(os.environ.get("EXECUTION_DEDUP_SECONDS", "3600"))
+# Closed executions followed before giving up on finding a free name.
+EXECUTION_NAME_MAX_HOPS = 10
+
+
+def execution_name(key: str) -> str:
+    """A valid, deterministic execution name for a workflow key."""
+    contact_id = key.split(":", 1)[0]
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+    return f"{EXECUTION_NAME_PREFIX}_{contact_id}_{digest}"
+
+
+def execution_arn(state_machine_arn: str, name: str) -> str:
+    return f"{state_machine_arn.replace(':stateMachine:', ':execution:', 1)}:{name}"
+
+
+def is_duplicate_of(execution: Dict[str, Any]) -> bool:
+    """Whether a request repeats an existing execution rather than retrying it."""
+    if execution["status"] == "RUNNING":
+        return True
+    if execution["status"] != "SUCCEEDED":
+        return False
+    return time.time() - execution["stopDate"].timestamp() < EXECUTION_DEDUP_SECONDS
+
+
+def successor_name(base_name: str, execution: Dict[str, Any]) -> str:
+    """The name of the execution that follows a closed one."""
+    return f"{base_name}-{int(execution['startDate'].timestamp())}"
+
+
+def start_or_find_execution(
+    sfn_client: Any, state_machine_arn: str, name: str, execution_input: str
+) -> Tuple[str, bool]:
+    """
+    Start the execution called name, or return the one already started for it.
+
+    Step Functions rejects a reused name with ExecutionAlreadyExists. A running
+    or recently succeeded execution is returned as is. Any other closed one is
+    followed by an execution whose name is derived from its start time, so
+    concurrent retries still agree on one name. Returns (executionArn, started).
+    """
+    base_name = name
+    for _ in range(EXECUTION_NAME_MAX_HOPS):
+        try:
+            response = sfn_client.start_execution(
+                stateMachineArn=state_machine_arn,
+                name=name,
+                input=execution_input,
+            )
+            logger.info(f"State machine response: {response}")
+            return response["executionArn"], True
+        except Exception as e:
+            if client_error_code(e) != "ExecutionAlreadyExists":
+                raise
+        arn = execution_arn(state_machine_arn, name)
+        execution = sfn_client.describe_execution(executionArn=arn)
+        if is_duplicate_of(execution):
+            logger.info(f"Execution {arn} already {execution['status']}")
+            return arn, False
+        logger.info(f"Execution {arn} is {execution['status']}, starting a new one")
+        name = successor_name(base_name, execution)
+    raise RuntimeError(f"No free execution name after {EXECUTION_NAME_MAX_HOPS} tries")
+
+
+def find_execution_name(
+    sfn_client: Any, state_machine_arn: str, name: str
+) -> Tuple[str, Optional[str]]:
+    """
+    Resolve the name a new execution should use, without starting it.
+
+    Follows closed executions the same way start_or_find_execution() does.
+    Returns (name, None) for a free name, or (name, executionArn) when a
+    running or recently succeeded execution already covers the request.
+    """
+    base_name = name
+    for _ in range(EXECUTION_NAME_MAX_HOPS):
+        arn = execution_arn(state_machine_arn, name)
+        try:
+            execution = sfn_client.describe_execution(executionArn=arn)
+        except Exception as e:
+            if client_error_code(e) != "ExecutionDoesNotExist":
+                raise
+            return name, None
+        if is_duplicate_of(execution):
+            return name, arn
+        name = successor_name(base_name, execution)
+    raise RuntimeError(f"No free execution name after {EXECUTION_NAME_MAX_HOPS} tries")
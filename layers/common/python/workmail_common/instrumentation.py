@@ -0,0 +1,297 @@
+# workmail_common/instrumentation.py
+"""
+Latency instrumentation for outbound calls, reported as CloudWatch EMF.
+
+Every AWS API call (through botocore before-call/after-call hooks on the
+clients get_aws_client() creates), MySQL statement (through an instrumented
+cursor) and Keap request (through an instrumented requests session) is timed
+and buffered in memory. @instrumented_handler flushes the buffer once per
+invocation: one Embedded Metric Format line per dependency and operation,
+carrying every latency value (CloudWatch derives percentiles from them) and
+a bucketed histogram as a log property. Calls made during init are flushed
+at the start of the first invocation, tagged Phase=init.
+"""
+
+import functools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+METRICS_NAMESPACE = os.environ.get("METRICS_NAMESPACE", "WorkMailLambda")
+# EMF accepts at most 100 values per metric in one document.
+EMF_MAX_VALUES = 100
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+EMF_DIMENSIONS = [["Service", "Dependency"], ["Service", "Dependency", "Operation"]]
+
+_BOTOCORE_STARTED = "workmail_instrumentation_started"
+_SQL_TABLE = re.compile(r"\b(?:FROM|INTO|UPDATE)\s+`?(\w+)", re.IGNORECASE)
+_ID_SEGMENT = re.compile(r"\d+")
+
+# (dependency, operation) -> {"values": [ms, ...], "errors": n}
+_buffer: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_buffer_lock = threading.Lock()
+
+
+def record(
+    dependency: str, operation: str, duration_ms: float, error: bool = False
+) -> None:
+    """Buffer one call's latency until the invocation is flushed."""
+    if not METRICS_ENABLED:
+        return
+    with _buffer_lock:
+        entry = _buffer.setdefault((dependency, operation), {"values": [], "errors": 0})
+        entry["values"].append(round(duration_ms, 3))
+        if error:
+            entry["errors"] += 1
+
+
+@contextmanager
+def timed(dependency: str, operation: str) -> Iterator[None]:
+    """Record how long the with-block took; an exception counts as an error."""
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        record(dependency, operation, (time.perf_counter() - start) * 1000, error)
+
+
+def latency_histogram(values: Sequence[float]) -> Dict[str, int]:
+    """Count values per LATENCY_BUCKETS_MS upper bound (ms)."""
+    histogram = {f"<={bound}": 0 for bound in LATENCY_BUCKETS_MS}
+    histogram[f">{LATENCY_BUCKETS_MS[-1]}"] = 0
+    for value in values:
+        for bound in LATENCY_BUCKETS_MS:
+            if value <= bound:
+                histogram[f"<={bound}"] += 1
+                break
+        else:
+            histogram[f">{LATENCY_BUCKETS_MS[-1]}"] += 1
+    return histogram
+
+
+def emf_documents(
+    buffer: Dict[Tuple[str, str], Dict[str, Any]],
+    properties: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """Render buffered latencies as EMF documents (values chunked per document)."""
+    documents = []
+    timestamp = int(time.time() * 1000)
+    service = os.environ.get("AWS_LAMBDA_FUNCTION_NAME", "local")
+    for (dependency, operation), entry in sorted(buffer.items()):
+        values = entry["values"]
+        for start in range(0, len(values), EMF_MAX_VALUES):
+            chunk = values[start : start + EMF_MAX_VALUES]
+            first = start == 0
+            document = {
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [
+                        {
+                            "Namespace": METRICS_NAMESPACE,
+                            "Dimensions": EMF_DIMENSIONS,
+                            "Metrics": [
+                                {"Name": "Latency", "Unit": "Milliseconds"},
+                                {"Name": "Calls", "Unit": "Count"},
+                                {"Name": "Errors", "Unit": "Count"},
+                            ],
+                        }
+                    ],
+                },
+                "Service": service,
+                "Dependency": dependency,
+                "Operation": operation,
+                "Latency": chunk,
+                "Calls": len(chunk),
+                # Errors are not attributed to values, so report them once.
+                "Errors": entry["errors"] if first else 0,
+                "LatencyHistogram": latency_histogram(chunk),
+            }
+            document.update(properties or {})
+            documents.append(document)
+    return documents
+
+
+def flush(properties: Optional[Dict[str, Any]] = None) -> int:
+    """Write the buffered latencies to stdout as EMF lines; return how many."""
+    with _buffer_lock:
+        buffer = dict(_buffer)
+        _buffer.clear()
+    documents = emf_documents(buffer, properties)
+    if documents:
+        sys.stdout.write("".join(json.dumps(document) + "\n" for document in documents))
+        sys.stdout.flush()
+    return len(documents)
+
+
+def clear_metrics() -> None:
+    """Drop buffered latencies without writing them (used by tests)."""
+    with _buffer_lock:
+        _buffer.clear()
+
+
+def instrumented_handler(
+    handler: Callable[[Any, Any], Any],
+) -> Callable[[Any, Any], Any]:
+    """Flush init-phase latencies before, and the invocation's after, a handler."""
+
+    @functools.wraps(handler)
+    def wrapper(event: Any, context: Any) -> Any:
+        flush({"Phase": "init"})
+        try:
+            return handler(event, context)
+        finally:
+            request_id = getattr(context, "aws_request_id", None)
+            properties = {"Phase": "invoke"}
+            if isinstance(request_id, str):
+                properties["RequestId"] = request_id
+            flush(properties)
+
+    return wrapper
+
+
+def _before_botocore_call(model: Any, context: Dict[str, Any], **kwargs: Any) -> None:
+    context[_BOTOCORE_STARTED] = (
+        model.service_model.service_name,
+        model.name,
+        time.perf_counter(),
+    )
+
+
+def _botocore_call_finished(context: Dict[str, Any], error: bool) -> None:
+    started = context.pop(_BOTOCORE_STARTED, None)
+    if started is None:
+        return
+    service_name, operation, start = started
+    record(service_name, operation, (time.perf_counter() - start) * 1000, error)
+
+
+def _after_botocore_call(
+    http_response: Any, context: Dict[str, Any], **kwargs: Any
+) -> None:
+    # botocore raises for any status of 300 or more once this event returns.
+    _botocore_call_finished(context, getattr(http_response, "status_code", 200) >= 300)
+
+
+def _after_botocore_call_error(context: Dict[str, Any], **kwargs: Any) -> None:
+    # Emitted instead of after-call when the request never got a response.
+    _botocore_call_finished(context, True)
+
+
+def instrument_client(client: Any) -> Any:
+    """Time every API call the client makes, retries included."""
+    if not METRICS_ENABLED:
+        return client
+    events = client.meta.events
+    # First, so the clock starts before any handler that short-circuits the call.
+    events.register_first(
+        "before-call.*.*",
+        _before_botocore_call,
+        unique_id="workmail-latency-before",
+    )
+    events.register(
+        "after-call", _after_botocore_call, unique_id="workmail-latency-after"
+    )
+    events.register(
+        "after-call-error",
+        _after_botocore_call_error,
+        unique_id="workmail-latency-error",
+    )
+    return client
+
+
+def statement_name(sql: str) -> str:
+    """Low-cardinality name for a SQL statement, e.g. 'SELECT app'."""
+    words = sql.split(None, 1)
+    verb = words[0].upper() if words else "UNKNOWN"
+    table = _SQL_TABLE.search(sql)
+    return f"{verb} {table.group(1)}" if table else verb
+
+
+class InstrumentedCursor:
+    """DB-API cursor proxy that times execute() and executemany() by statement."""
+
+    def __init__(self, cursor: Any, dependency: str = "mysql"):
+        self.wrapped = cursor
+        self._dependency = dependency
+
+    def execute(self, sql: str, *args: Any, **kwargs: Any) -> Any:
+        with timed(self._dependency, statement_name(sql)):
+            return self.wrapped.execute(sql, *args, **kwargs)
+
+    def executemany(self, sql: str, *args: Any, **kwargs: Any) -> Any:
+        with timed(self._dependency, statement_name(sql)):
+            return self.wrapped.executemany(sql, *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.wrapped, name)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.wrapped)
+
+
+class InstrumentedConnection:
+    """DB-API connection proxy whose cursors, commits and rollbacks are timed."""
+
+    def __init__(self, connection: Any, dependency: str = "mysql"):
+        self.wrapped = connection
+        self._dependency = dependency
+
+    def cursor(self, *args: Any, **kwargs: Any) -> InstrumentedCursor:
+        return InstrumentedCursor(
+            self.wrapped.cursor(*args, **kwargs), self._dependency
+        )
+
+    def commit(self) -> None:
+        with timed(self._dependency, "COMMIT"):
+            self.wrapped.commit()
+
+    def rollback(self) -> None:
+        with timed(self._dependency, "ROLLBACK"):
+            self.wrapped.rollback()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.wrapped, name)
+
+
+def _request_name(method: str, url: str, headers: Optional[Dict[str, str]]) -> str:
+    # Proxied Keap calls name their target in Forward-to; ids are collapsed.
+    target = (headers or {}).get("Forward-to")
+    if target is None:
+        target = re.sub(r"^[a-z]+://[^/]+", "", url)
+    return f"{method.upper()} {_ID_SEGMENT.sub('{id}', target)}"
+
+
+def instrument_session(session: Any, dependency: str) -> Any:
+    """Time every request a requests.Session sends; 4xx/5xx count as errors."""
+    if not METRICS_ENABLED:
+        return session
+    send = session.request
+
+    @functools.wraps(send)
+    def request(method: str, url: str, *args: Any, **kwargs: Any) -> Any:
+        operation = _request_name(method, url, kwargs.get("headers"))
+        start = time.perf_counter()
+        error = True
+        try:
+            response = send(method, url, *args, **kwargs)
+            error = response.status_code >= 400
+            return response
+        finally:
+            record(dependency, operation, (time.perf_counter() - start) * 1000, error)
+
+    session.request = request
+    return session
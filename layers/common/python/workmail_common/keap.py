@@ -0,0 +1,443 @@
+# workmail_common/keap.py
+import json
+import logging
+import os
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib3.util.retry import Retry
+from workmail_common.errors import HTTP_AUTH_STATUS_CODES
+from workmail_common.instrumentation import instrument_session
+from workmail_common.secrets import SECRET_CACHE_TTL_SECONDS, get_secret_value
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+KEAP_CONNECT_TIMEOUT_SECONDS = float(
+    os.environ.get("KEAP_CONNECT_TIMEOUT_SECONDS", "3.05")
+)
+KEAP_READ_TIMEOUT_SECONDS = float(os.environ.get("KEAP_READ_TIMEOUT_SECONDS", "20"))
+KEAP_POOL_MAXSIZE = int(os.environ.get("KEAP_POOL_MAXSIZE", "10"))
+KEAP_MAX_RETRIES = int(os.environ.get("KEAP_MAX_RETRIES", "3"))
+KEAP_RETRY_BACKOFF_SECONDS = float(os.environ.get("KEAP_RETRY_BACKOFF_SECONDS", "0.5"))
+KEAP_RETRY_MAX_WAIT_SECONDS = float(os.environ.get("KEAP_RETRY_MAX_WAIT_SECONDS", "30"))
+KEAP_RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# A POST (note creation, tag application) is only retried on the statuses
+# that mean Keap turned it away unprocessed. A 5xx may come from a gateway
+# that gave up after Keap acted, and replaying it would duplicate the note.
+KEAP_NON_IDEMPOTENT_RETRY_STATUS_CODES = (429,)
+# Contacts per applyTags call, and how long KeapTagApplier holds a pending
+# tag before sending it without waiting for more contacts.
+KEAP_APPLY_TAGS_MAX_CONTACTS = int(
+    os.environ.get("KEAP_APPLY_TAGS_MAX_CONTACTS", "100")
+)
+KEAP_TAG_WINDOW_SECONDS = float(os.environ.get("KEAP_TAG_WINDOW_SECONDS", "1"))
+# Per-contact applyTags results that mean the contact has the tag.
+KEAP_TAG_APPLIED_STATUSES = ("SUCCESS", "DUPLICATE")
+
+# One session (and connection pool) per Lambda container, so warm invocations
+# skip the TCP and TLS handshakes; clients are cached per token secret.
+_keap_session: Optional[requests.Session] = None
+_keap_clients: Dict[str, "KeapClient"] = {}
+_keap_lock = threading.Lock()
+
+
+class KeapRetry(Retry):
+    """
+    Retry policy whose waits, Retry-After included, never exceed the cap.
+
+    Idempotent methods are retried on every KEAP_RETRY_STATUS_CODES status;
+    others only on KEAP_NON_IDEMPOTENT_RETRY_STATUS_CODES.
+    """
+
+    def is_retry(
+        self, method: str, status_code: int, has_retry_after: bool = False
+    ) -> bool:
+        if (
+            method.upper() not in Retry.DEFAULT_ALLOWED_METHODS
+            and status_code not in KEAP_NON_IDEMPOTENT_RETRY_STATUS_CODES
+        ):
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def get_retry_after(self, response: Any) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, KEAP_RETRY_MAX_WAIT_SECONDS)
+
+
+def keap_retry() -> KeapRetry:
+    # Connection failures and 429 responses (plus 5xx for idempotent methods)
+    # are retried with exponential backoff; read timeouts are not, since Keap
+    # may already have acted on them.
+    return KeapRetry(
+        total=KEAP_MAX_RETRIES,
+        read=0,
+        backoff_factor=KEAP_RETRY_BACKOFF_SECONDS,
+        backoff_max=KEAP_RETRY_MAX_WAIT_SECONDS,
+        status_forcelist=KEAP_RETRY_STATUS_CODES,
+        allowed_methods=None,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def get_keap_session() -> requests.Session:
+    """Return the container-wide pooled, retrying Keap session (every request timed)."""
+    global _keap_session
+    if _keap_session is None:
+        with _keap_lock:
+            if _keap_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=KEAP_POOL_MAXSIZE,
+                    max_retries=keap_retry(),
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _keap_session = instrument_session(session, "keap")
+    return _keap_session
+
+
+class KeapClient:
+    """
+    Keap (and Keap proxy) client on the container-wide session.
+
+    Requests use connect/read timeouts and the session's retry policy. The
+    bearer token is cached on the client. It is re-read from Secrets Manager
+    after SECRET_CACHE_TTL_SECONDS, and once more if Keap rejects it.
+    """
+
+    def __init__(
+        self,
+        secret_name: str,
+        session: Optional[requests.Session] = None,
+        timeout: Optional[Tuple[float, float]] = None,
+    ):
+        self.secret_name = secret_name
+        self.session = session or get_keap_session()
+        self.timeout = timeout or (
+            KEAP_CONNECT_TIMEOUT_SECONDS,
+            KEAP_READ_TIMEOUT_SECONDS,
+        )
+        self._token: Optional[str] = None
+        self._token_fetched_at = 0.0
+        self._token_lock = threading.Lock()
+
+    def bearer_token(self, force_refresh: bool = False) -> str:
+        with self._token_lock:
+            age = time.monotonic() - self._token_fetched_at
+            if force_refresh or self._token is None or age >= SECRET_CACHE_TTL_SECONDS:
+                self._token = get_secret_value(
+                    self.secret_name, force_refresh=force_refresh
+                )
+                self._token_fetched_at = time.monotonic()
+            return self._token
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        payload: Any = None,
+    ) -> requests.Response:
+        """Send a request, refreshing the cached token once if it is rejected."""
+        force_refresh = False
+        while True:
+            request_headers = dict(headers or {})
+            request_headers["Authorization"] = (
+                f"Bearer {self.bearer_token(force_refresh)}"
+            )
+            response = self.session.request(
+                method,
+                url,
+                headers=request_headers,
+                json=payload,
+                timeout=self.timeout,
+            )
+            if force_refresh or response.status_code not in HTTP_AUTH_STATUS_CODES:
+                return response
+            logger.warning("Keap rejected cached token, refreshing secret")
+            force_refresh = True
+
+    def post(
+        self, url: str, headers: Optional[Dict[str, str]] = None, payload: Any = None
+    ) -> requests.Response:
+        return self.request("POST", url, headers, payload)
+
+    def patch(
+        self, url: str, headers: Optional[Dict[str, str]] = None, payload: Any = None
+    ) -> requests.Response:
+        return self.request("PATCH", url, headers, payload)
+
+
+def get_keap_client(config: Dict[str, str]) -> KeapClient:
+    """Return the container-wide KeapClient for config's token secret."""
+    secret_name = config["KEAP_API_KEY_SECRET_NAME"]
+    client = _keap_clients.get(secret_name)
+    if client is not None:
+        return client
+    session = get_keap_session()
+    with _keap_lock:
+        client = _keap_clients.get(secret_name)
+        if client is None:
+            client = KeapClient(secret_name, session)
+            _keap_clients[secret_name] = client
+    return client
+
+
+def clear_keap_clients() -> None:
+    """Drop the cached clients and session (used by tests)."""
+    global _keap_session
+    with _keap_lock:
+        _keap_clients.clear()
+        _keap_session = None
+
+
+# TODO: Remove this. Using ::update_contact_via_proxy instead.
+def update_contact(
+    contact_id: int, custom_fields: Dict[str, str], config: Dict[str, str]
+) -> Dict[str, Any]:
+    """Update contact with custom fields."""
+    logger.info(f"Updating contact {contact_id} with custom fields {custom_fields}")
+    try:
+        keap_base_url = config["KEAP_BASE_URL"]
+        url = f"{keap_base_url}contacts/{contact_id}"
+        headers = {
+            "Content-Type": "application/json",
+        }
+        payload = {"custom_fields": custom_fields}
+        response = get_keap_client(config).patch(url, headers, payload)
+        if response.status_code != 200:
+            raise ValueError(f"Failed to update contact {contact_id}: {response.text}")
+        logger.info(f"Updated contact {contact_id} with custom fields {custom_fields}")
+        return response.json()
+    except Exception as e:
+        raise
+
+
+def keap_contact_add_to_group_via_proxy(
+    contact_id: int, tag_id: int, config: Dict[str, str]
+) -> Dict[str, Any]:
+    """Add contact to a group."""
+    logger.info(f"Applying tag {tag_id} to contact {contact_id}")
+    try:
+        url = config["PROXY_ENDPOINT"]
+        proxy_endpoint_host = config["PROXY_ENDPOINT_HOST"]
+        headers = {
+            "Host": proxy_endpoint_host,
+            "Forward-to": f"tags/{tag_id}/contacts:applyTags",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "contact_ids": [
+                contact_id,
+            ]
+        }
+        response = get_keap_client(config).post(url, headers, payload)
+        if response.status_code != 200:
+            raise ValueError(
+                f"Failed to apply tag {tag_id} to contact {contact_id}: {response.text}"
+            )
+        logger.info(f"Applied tag {tag_id} to contact {contact_id}")
+        return response.json()
+    except Exception as e:
+        logger.error(
+            f"Exception occurred while attempting to apply tag {tag_id} to contact {contact_id}: {e}"
+        )
+        raise
+
+
+def keap_contacts_add_to_group_via_proxy(
+    contact_ids: List[int], tag_id: int, config: Dict[str, str]
+) -> Dict[str, Any]:
+    """Add several contacts to a group with one applyTags call."""
+    logger.info(f"Applying tag {tag_id} to {len(contact_ids)} contact(s)")
+    try:
+        url = config["PROXY_ENDPOINT"]
+        proxy_endpoint_host = config["PROXY_ENDPOINT_HOST"]
+        headers = {
+            "Host": proxy_endpoint_host,
+            "Forward-to": f"tags/{tag_id}/contacts:applyTags",
+            "Content-Type": "application/json",
+        }
+        payload = {"contact_ids": list(contact_ids)}
+        response = get_keap_client(config).post(url, headers, payload)
+        if response.status_code != 200:
+            raise ValueError(
+                f"Failed to apply tag {tag_id} to contacts {contact_ids}: {response.text}"
+            )
+        logger.info(f"Applied tag {tag_id} to contacts {contact_ids}")
+        return response.json()
+    except Exception as e:
+        logger.error(
+            f"Exception occurred while attempting to apply tag {tag_id} to contacts {contact_ids}: {e}"
+        )
+        raise
+
+
+def keap_contact_create_note_via_proxy(
+    contact_id: int, title: str, content: Dict[str, str], config: Dict[str, str]
+) -> Dict[str, Any]:
+    """Update contact with custom fields."""
+    logger.info(f"Sending custom fields for contact {contact_id} via proxy endpoint")
+    logger.info(f"{content}")
+    try:
+        url = config["PROXY_ENDPOINT"]
+        proxy_endpoint_host = config["PROXY_ENDPOINT_HOST"]
+        headers = {
+            "Host": proxy_endpoint_host,
+            "Forward-to": f"contacts/{contact_id}/notes",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "text": json.dumps(content),
+            "title": title,
+            "type": "Other",
+            "user_id": 1,
+        }
+        response = get_keap_client(config).post(url, headers, payload)
+        if response.status_code != 201:
+            raise ValueError(
+                f"Unexpected response code {response.status_code}. Response text: {response.text}"
+            )
+        logger.info(f"Add note to contact {contact_id} via proxy endpoint")
+        return response.json()
+    except Exception as e:
+        logger.error(
+            f"Failed to add note to contact {contact_id} via proxy endpoint: {e}"
+        )
+        raise
+
+
+def tag_application_failures(contact_ids: List[int], result: Any) -> Dict[int, str]:
+    """
+    Return the error for each contact an applyTags call did not tag.
+
+    Keap reports a status per contact id, under "results" or at the top level.
+    A response without per-contact results means every contact was tagged.
+    """
+    statuses = result.get("results", result) if isinstance(result, dict) else None
+    if not isinstance(statuses, dict) or not any(
+        str(contact_id) in statuses for contact_id in contact_ids
+    ):
+        return {}
+    failures = {}
+    for contact_id in contact_ids:
+        status = statuses.get(str(contact_id))
+        if status is None:
+            failures[contact_id] = "Keap returned no result for contact"
+        elif str(status).upper() not in KEAP_TAG_APPLIED_STATUSES:
+            failures[contact_id] = f"Keap returned {status}"
+    return failures
+
+
+class KeapTagApplier:
+    """
+    Coalesces tag applications into one applyTags call per tag.
+
+    add() collects (contact_id, tag_id) pairs. A tag is sent as soon as it has
+    KEAP_APPLY_TAGS_MAX_CONTACTS contacts, everything pending is sent once the
+    oldest pair has waited window_seconds, and flush() (or leaving the with
+    block) sends the rest. Failures are kept per (tag_id, contact_id), so a
+    partly failed call only retries the contacts Keap did not tag.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, str],
+        max_contacts: Optional[int] = None,
+        window_seconds: Optional[float] = None,
+        max_workers: int = 1,
+    ):
+        self.config = config
+        self.max_contacts = max_contacts or KEAP_APPLY_TAGS_MAX_CONTACTS
+        self.window_seconds = (
+            KEAP_TAG_WINDOW_SECONDS if window_seconds is None else window_seconds
+        )
+        self.max_workers = max_workers
+        self.calls = 0
+        self.applied: List[Tuple[int, int]] = []
+        self.failures: Dict[Tuple[int, int], str] = {}
+        # Per tag, the distinct pending contacts in the order they were added.
+        self._pending: Dict[int, Dict[int, None]] = {}
+        self._oldest: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "KeapTagApplier":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.flush()
+
+    def add(self, contact_id: int, tag_id: int) -> None:
+        """Queue a tag for a contact, sending whatever is full or overdue."""
+        with self._lock:
+            pending = self._pending.setdefault(int(tag_id), {})
+            pending[int(contact_id)] = None
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+            overdue = time.monotonic() - self._oldest >= self.window_seconds
+            full = []
+            if len(pending) >= self.max_contacts:
+                full = [(int(tag_id), list(pending))]
+                del self._pending[int(tag_id)]
+        # A chunk filled by this call is sent with the overdue ones, not lost.
+        self._send(full + self._drain_pending() if overdue else full)
+
+    def flush(self) -> Dict[Tuple[int, int], str]:
+        """Send every pending tag; return the failures from this flush."""
+        return self._send(self._drain_pending())
+
+    def _drain_pending(self) -> List[Tuple[int, List[int]]]:
+        """Take every pending tag off the queue, split into applyTags chunks."""
+        with self._lock:
+            groups = list(self._pending.items())
+            self._pending = {}
+            self._oldest = None
+        chunks = []
+        for tag_id, contacts in groups:
+            contact_ids = list(contacts)
+            for start in range(0, len(contact_ids), self.max_contacts):
+                chunks.append((tag_id, contact_ids[start : start + self.max_contacts]))
+        return chunks
+
+    def _send(self, chunks: List[Tuple[int, List[int]]]) -> Dict[Tuple[int, int], str]:
+        if not chunks:
+            return {}
+        if self.max_workers > 1 and len(chunks) > 1:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                outcomes = list(executor.map(self._apply, chunks))
+        else:
+            outcomes = [self._apply(chunk) for chunk in chunks]
+        failures = {}
+        with self._lock:
+            for (tag_id, contact_ids), contact_failures in zip(chunks, outcomes):
+                self.calls += 1
+                for contact_id in contact_ids:
+                    if contact_id in contact_failures:
+                        failures[(tag_id, contact_id)] = contact_failures[contact_id]
+                    else:
+                        self.applied.append((tag_id, contact_id))
+            self.failures.update(failures)
+        return failures
+
+    def _apply(self, chunk: Tuple[int, List[int]]) -> Dict[int, str]:
+        tag_id, contact_ids = chunk
+        try:
+            result = keap_contacts_add_to_group_via_proxy(
+                contact_ids, tag_id, self.config
+            )
+        except Exception as e:
+            return {contact_id: str(e) for contact_id in contact_ids}
+        failures = tag_application_failures(contact_ids, result)
+        if failures:
+            logger.warning(
+                f"Tag {tag_id} was not applied to {len(failures)} of {len(contact_ids)} contact(s)"
+            )
+        return failures
@@ -0,0 +1,223 @@
+# workmail_common/outbox.py
+"""
+Transactional outbox for Keap side effects.
+
+Provisioning functions do not call Keap. They queue the tag application or
+note in keap_outbox on the same connection, and so in the same transaction,
+as their workmail_organizations change; the enqueue helpers never commit.
+KeapOutboxDrainFunction claims due rows, sends them in batches and records
+the outcome: sent rows are deleted, failed ones are retried with exponential
+backoff until OUTBOX_MAX_ATTEMPTS, then kept as FAILED for inspection with
+the note content scrubbed from their payload.
+
+Credentials never go into a row. The note fields named in secret_fields are
+stored in their own Secrets Manager secret (under NOTE_SECRET_PREFIX) and the
+row only keeps its ARN as "secret_ref"; the drainer resolves it when sending
+and deletes the secret once the row is sent or FAILED.
+
+This module only holds the SQL, so queueing does not load the Keap client.
+"""
+
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from workmail_common.secrets import NOTE_SECRET_PREFIX, create_secret
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+KEAP_APPLY_TAG = "apply_tag"
+KEAP_CREATE_NOTE = "create_note"
+OUTBOX_PENDING = "PENDING"
+OUTBOX_FAILED = "FAILED"
+
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_RETRY_BASE_SECONDS = float(os.environ.get("OUTBOX_RETRY_BASE_SECONDS", "30"))
+OUTBOX_RETRY_MAX_SECONDS = float(os.environ.get("OUTBOX_RETRY_MAX_SECONDS", "3600"))
+# How long a claimed row is hidden from other drainers; a drainer that dies
+# mid-batch releases its rows when this runs out.
+OUTBOX_LEASE_SECONDS = int(os.environ.get("OUTBOX_LEASE_SECONDS", "300"))
+
+
+def _enqueue(rows: List[tuple], connection: Any) -> None:
+    if not rows:
+        return
+    try:
+        cursor = connection.cursor()
+        sql = """INSERT INTO keap_outbox (kind, contact_id, tag_id, payload, status, available_at) VALUES (%s, %s, %s, %s, %s, %s)"""
+        cursor.executemany(sql, rows)
+    finally:
+        if "cursor" in locals() and cursor:
+            cursor.close()
+
+
+def enqueue_keap_tag(contact_ids: Iterable[int], tag_id: int, connection: Any) -> None:
+    """Queue applying a tag to contacts; the caller commits it with its change."""
+    now = int(time.time())
+    rows = [
+        (KEAP_APPLY_TAG, int(contact_id), int(tag_id), None, OUTBOX_PENDING, now)
+        for contact_id in contact_ids
+    ]
+    _enqueue(rows, connection)
+    logger.info(f"Queued Keap tag {tag_id} for {len(rows)} contact(s)")
+
+
+def enqueue_keap_note(
+    contact_id: int,
+    title: str,
+    content: Dict[str, str],
+    connection: Any,
+    secret_fields: Sequence[str] = (),
+) -> None:
+    """
+    Queue a note on a contact; the caller commits it with its change.
+
+    The values of secret_fields are moved to a new secret and left as None in
+    the queued content, to be filled back in by the drainer.
+    """
+    note = {"title": title, "content": dict(content)}
+    secret_values = {
+        field: note["content"][field] for field in secret_fields if field in content
+    }
+    if secret_values:
+        for field in secret_values:
+            note["content"][field] = None
+        note["secret_ref"] = create_secret(
+            f"{NOTE_SECRET_PREFIX}{int(contact_id)}/{uuid.uuid4()}",
+            json.dumps(secret_values),
+        )
+    payload = json.dumps(note)
+    row = (
+        KEAP_CREATE_NOTE,
+        int(contact_id),
+        None,
+        payload,
+        OUTBOX_PENDING,
+        int(time.time()),
+    )
+    _enqueue([row], connection)
+    logger.info(f"Queued Keap note {title!r} for contact {contact_id}")
+
+
+def claim_keap_outbox(
+    limit: int, connection: Any, now: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Lease up to limit due rows to this caller and return them, oldest first.
+
+    The lease is a conditional UPDATE, so concurrent drainers never claim the
+    same row. Note payloads are returned decoded as "title" and "content",
+    plus "secret_ref" when part of the content is held in a secret.
+    """
+    now = int(time.time()) if now is None else now
+    claim_id = str(uuid.uuid4())
+    try:
+        cursor = connection.cursor()
+        sql = f"""SELECT id FROM keap_outbox WHERE status = %s AND available_at <= %s ORDER BY id LIMIT {int(limit)}"""
+        cursor.execute(sql, (OUTBOX_PENDING, now))
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return []
+        placeholders = ", ".join(["%s"] * len(ids))
+        sql = f"""UPDATE keap_outbox SET claim_id = %s, available_at = %s WHERE id IN ({placeholders}) AND status = %s AND available_at <= %s"""
+        cursor.execute(
+            sql,
+            (claim_id, now + OUTBOX_LEASE_SECONDS, *ids, OUTBOX_PENDING, now),
+        )
+        connection.commit()
+        sql = """SELECT id, kind, contact_id, tag_id, payload, attempts FROM keap_outbox WHERE claim_id = %s ORDER BY id"""
+        cursor.execute(sql, (claim_id,))
+        items = []
+        for item_id, kind, contact_id, tag_id, payload, attempts in cursor.fetchall():
+            item = {
+                "id": item_id,
+                "kind": kind,
+                "contact_id": contact_id,
+                "tag_id": tag_id,
+                "attempts": attempts,
+            }
+            if payload:
+                item.update(json.loads(payload))
+            items.append(item)
+        logger.info(f"Claimed {len(items)} Keap outbox item(s)")
+        return items
+    finally:
+        if "cursor" in locals() and cursor:
+            cursor.close()
+
+
+def retry_delay(attempts: int) -> float:
+    """Jittered exponential backoff before the next try of a failed item."""
+    delay = min(
+        OUTBOX_RETRY_MAX_SECONDS, OUTBOX_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    )
+    return random.uniform(delay / 2, delay)
+
+
+def is_settled(item: Dict[str, Any], errors: Dict[int, str]) -> bool:
+    """Whether completing a drained item removes it from the queue for good."""
+    return item["id"] not in errors or item["attempts"] + 1 >= OUTBOX_MAX_ATTEMPTS
+
+
+def complete_keap_outbox(
+    items: List[Dict[str, Any]],
+    errors: Dict[int, str],
+    connection: Any,
+    now: Optional[int] = None,
+) -> Dict[str, int]:
+    """
+    Record a drained batch: delete the items that were sent (those not in
+    errors) and reschedule the rest, or mark them FAILED once they have used
+    OUTBOX_MAX_ATTEMPTS. A FAILED note keeps only its title.
+    """
+    now = int(time.time()) if now is None else now
+    sent_ids = [item["id"] for item in items if item["id"] not in errors]
+    retries, failed = [], 0
+    for item in items:
+        if item["id"] not in errors:
+            continue
+        attempts = item["attempts"] + 1
+        scrubbed = None
+        if is_settled(item, errors):
+            status = OUTBOX_FAILED
+            failed += 1
+            logger.error(
+                f"Giving up on Keap outbox item {item['id']} after {attempts} attempts: {errors[item['id']]}"
+            )
+            if item["kind"] == KEAP_CREATE_NOTE:
+                scrubbed = json.dumps({"title": item.get("title")})
+        else:
+            status = OUTBOX_PENDING
+        available_at = now + int(retry_delay(attempts))
+        retries.append(
+            (
+                attempts,
+                available_at,
+                status,
+                errors[item["id"]],
+                scrubbed,
+                item["id"],
+            )
+        )
+    try:
+        cursor = connection.cursor()
+        if sent_ids:
+            placeholders = ", ".join(["%s"] * len(sent_ids))
+            sql = f"""DELETE FROM keap_outbox WHERE id IN ({placeholders})"""
+            cursor.execute(sql, tuple(sent_ids))
+        if retries:
+            sql = """UPDATE keap_outbox SET attempts = %s, available_at = %s, status = %s, last_error = %s, payload = COALESCE(%s, payload), claim_id = NULL WHERE id = %s"""
+            cursor.executemany(sql, retries)
+        connection.commit()
+    finally:
+        if "cursor" in locals() and cursor:
+            cursor.close()
+    return {
+        "sent": len(sent_ids),
+        "retrying": len(retries) - failed,
+        "failed": failed,
+    }
@@ -0,0 +1,115 @@
+# workmail_common/polling.py
+import logging
+import os
+import random
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# poll_until() defaults: poll quickly for the first POLL_FAST_WINDOW_SECONDS,
+# then back off exponentially (with jitter) up to POLL_MAX_DELAY_SECONDS.
+POLL_FAST_WINDOW_SECONDS = float(os.environ.get("POLL_FAST_WINDOW_SECONDS", "10"))
+POLL_FAST_DELAY_SECONDS = 1.0
+POLL_INITIAL_DELAY_SECONDS = 2.0
+POLL_MAX_DELAY_SECONDS = 15.0
+POLL_BACKOFF_RATE = 2.0
+POLL_DEFAULT_TIMEOUT_SECONDS = 60.0
+# Time left unused at the end of the invocation, to report the timeout cleanly.
+POLL_SAFETY_MARGIN_SECONDS = 5.0
+
+
+class PollTimeoutError(TimeoutError):
+    """
+    A poll ran out of budget before its condition was met.
+
+    The operation being waited on is still in progress; resume_state holds what
+    a later invocation needs to pick it up instead of starting over.
+    """
+
+    def __init__(
+        self,
+        message: str,
+        attempts: int = 0,
+        elapsed: float = 0.0,
+        resume_state: Optional[Dict[str, Any]] = None,
+    ):
+        super().__init__(message)
+        self.attempts = attempts
+        self.elapsed = elapsed
+        self.resume_state = resume_state or {}
+
+
+def remaining_time_seconds(context: Any) -> Optional[float]:
+    """Seconds left in the invocation, or None outside Lambda."""
+    get_remaining = getattr(context, "get_remaining_time_in_millis", None)
+    if get_remaining is None:
+        return None
+    return get_remaining() / 1000
+
+
+def poll_delays(
+    fast_window_seconds: float = POLL_FAST_WINDOW_SECONDS,
+    fast_delay_seconds: float = POLL_FAST_DELAY_SECONDS,
+    initial_delay_seconds: float = POLL_INITIAL_DELAY_SECONDS,
+    max_delay_seconds: float = POLL_MAX_DELAY_SECONDS,
+    backoff_rate: float = POLL_BACKOFF_RATE,
+) -> Iterator[float]:
+    """Yield sleep times: a fixed fast window, then jittered exponential backoff."""
+    elapsed = 0.0
+    while elapsed < fast_window_seconds:
+        yield fast_delay_seconds
+        elapsed += fast_delay_seconds
+    delay = initial_delay_seconds
+    while True:
+        # Equal jitter: never less than half the nominal delay.
+        yield delay / 2 + random.uniform(0, delay / 2)
+        delay = min(max_delay_seconds, delay * backoff_rate)
+
+
+def poll_until(
+    check: Callable[[], Any],
+    context: Any = None,
+    description: str = "condition",
+    timeout_seconds: Optional[float] = None,
+    resume_state: Optional[Dict[str, Any]] = None,
+    **delay_options: float,
+) -> Any:
+    """
+    Call check() until it returns something other than None, and return that.
+
+    check() raises to abort. The budget is the smaller of timeout_seconds and
+    the Lambda's remaining time less POLL_SAFETY_MARGIN_SECONDS; when it runs
+    out a PollTimeoutError carrying resume_state is raised.
+    """
+    budget = timeout_seconds
+    remaining = remaining_time_seconds(context)
+    if remaining is not None:
+        remaining -= POLL_SAFETY_MARGIN_SECONDS
+        budget = remaining if budget is None else min(budget, remaining)
+    if budget is None:
+        budget = POLL_DEFAULT_TIMEOUT_SECONDS
+
+    start = time.monotonic()
+    deadline = start + budget
+    attempts = 0
+    for delay in poll_delays(**delay_options):
+        attempts += 1
+        result = check()
+        if result is not None:
+            logger.info(
+                f"{description} after {attempts} attempt(s) in {time.monotonic() - start:.1f}s"
+            )
+            return result
+        left = deadline - time.monotonic()
+        if left <= 0:
+            break
+        time.sleep(min(delay, left))
+    elapsed = time.monotonic() - start
+    raise PollTimeoutError(
+        f"Timed out waiting for {description} after {attempts} attempt(s) in {elapsed:.1f}s",
+        attempts=attempts,
+        elapsed=elapsed,
+        resume_state=resume_state,
+    )
@@ -0,0 +1,238 @@
+# workmail_common/priming.py
+"""
+Init-phase priming of the caches a handler relies on.
+
+Each app.py declares what it needs at module level:
+
+    prime(clients=["workmail"], secrets=["KEAP_API_KEY_SECRET_NAME"], db=True,
+          schemas=[SCHEMA_PATH])
+
+Inside Lambda this runs while the function initializes (the init phase is
+billed like an invocation) and fills the same container-wide caches the
+handler reads lazily: AWS clients, secrets, the database pool (with one
+connection opened) and compiled schema validators. The first invocation then
+starts with warm connections and clients, and every later invocation in the
+container reuses them.
+A step that fails or does not finish within PRIMING_BUDGET_SECONDS is
+logged and left to the lazy path, so priming can never fail an init.
+
+Snapshot-restore runtimes (Lambda SnapStart) snapshot the primed process.
+Before the snapshot, open database connections are closed. After each
+restore, the random module is reseeded, the primed secrets are re-fetched,
+the database is primed again, and any callbacks registered with
+register_after_restore() are run.
+"""
+
+import importlib
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+PRIMING_ENABLED = os.environ.get("PRIMING_ENABLED", "true").lower() == "true"
+PRIMING_BUDGET_SECONDS = float(os.environ.get("PRIMING_BUDGET_SECONDS", "5"))
+PRIMING_MAX_WORKERS = int(os.environ.get("PRIMING_MAX_WORKERS", "4"))
+
+PRIMED = "primed"
+FAILED = "failed"
+TIMED_OUT = "timed out"
+
+# Environment variables db priming builds its config from (see db_connection()).
+DB_CONFIG_VARS = ["DB_BACKEND", "DB_CLUSTER_ARN", "DB_SECRET_ARN", "DATABASE_NAME"]
+
+# What was declared, so a restore can re-validate it; and how each step went.
+_declared: Dict[str, Any] = {"secrets": [], "db": False}
+_report: Dict[str, str] = {}
+_after_restore: List[Callable[[], None]] = []
+_hooks_registered = False
+_lock = threading.Lock()
+
+
+def in_lambda() -> bool:
+    return "AWS_LAMBDA_FUNCTION_NAME" in os.environ
+
+
+def _helpers(module_name: str) -> Any:
+    # Imported by name: priming only reaches modules the handler already imports
+    # for the needs it declared, and slim layer builds should not see more.
+    return importlib.import_module(f"workmail_common.{module_name}")
+
+
+def _prime_client(service_name: str) -> None:
+    _helpers("aws").get_aws_client(service_name)
+
+
+def _prime_secret(env_var: str) -> None:
+    _helpers("secrets").get_secret(os.environ[env_var])
+
+
+def _db_config() -> Dict[str, str]:
+    return {name: os.environ[name] for name in DB_CONFIG_VARS if name in os.environ}
+
+
+def _prime_db() -> None:
+    # Checking a connection out opens it; closing returns it to the pool.
+    with _helpers("db").db_connection(_db_config()) as connection:
+        connection.is_connected()
+
+
+def _prime_schema(schema_path: str) -> None:
+    _helpers("validation").get_validator(schema_path)
+
+
+def _bind(step: Callable[[str], None], argument: str) -> Callable[[], None]:
+    return lambda: step(argument)
+
+
+def _run_steps(
+    steps: List[Tuple[str, Callable[[], None]]], budget_seconds: float
+) -> Dict[str, str]:
+    """Run steps on a few threads; report each as primed, failed or timed out."""
+    results = {}
+
+    def run(name: str, step: Callable[[], None]) -> None:
+        try:
+            step()
+            results[name] = PRIMED
+        except Exception as e:
+            logger.warning(f"Priming {name} failed, it will be set up lazily: {e}")
+            results[name] = FAILED
+
+    executor = ThreadPoolExecutor(max_workers=PRIMING_MAX_WORKERS)
+    futures = [executor.submit(run, name, step) for name, step in steps]
+    wait(futures, timeout=budget_seconds)
+    # Stragglers finish in the background and their results still land in the
+    # caches; the handler simply does not wait for them.
+    executor.shutdown(wait=False)
+    for name, _ in steps:
+        if name not in results:
+            logger.warning(f"Priming {name} did not finish in {budget_seconds}s")
+            results[name] = TIMED_OUT
+    return results
+
+
+def prime(
+    clients: Iterable[str] = (),
+    secrets: Iterable[str] = (),
+    db: bool = False,
+    schemas: Iterable[str] = (),
+    budget_seconds: Optional[float] = None,
+    force: bool = False,
+) -> Dict[str, str]:
+    """
+    Warm the caches a handler needs; call it at module level in app.py.
+
+    clients are service names for get_aws_client(), secrets the names of
+    environment variables holding secret ids, db primes the pool configured
+    by DB_CONFIG_VARS, and schemas are paths passed to get_validator() (use
+    the same string the handler validates against). Does nothing outside
+    Lambda or with PRIMING_ENABLED=false, unless force is set.
+    """
+    if not force and not (PRIMING_ENABLED and in_lambda()):
+        return {}
+    secrets = list(secrets)
+    with _lock:
+        _declared["secrets"] = secrets
+        _declared["db"] = db
+    steps = [(f"client:{name}", _bind(_prime_client, name)) for name in clients]
+    steps += [(f"secret:{name}", _bind(_prime_secret, name)) for name in secrets]
+    if db:
+        steps.append(("db", _prime_db))
+    steps += [(f"schema:{path}", _bind(_prime_schema, path)) for path in schemas]
+
+    start = time.monotonic()
+    results = _run_steps(
+        steps,
+        PRIMING_BUDGET_SECONDS if budget_seconds is None else budget_seconds,
+    )
+    _report.update(results)
+    logger.info(
+        f"Primed {sum(status == PRIMED for status in results.values())}/{len(steps)} "
+        f"dependencies in {time.monotonic() - start:.2f}s"
+    )
+    register_snapshot_hooks()
+    return results
+
+
+def priming_report() -> Dict[str, str]:
+    """Status of every step primed in this container (for logs and tests)."""
+    return dict(_report)
+
+
+def register_after_restore(callback: Callable[[], None]) -> None:
+    """Run callback after each snapshot restore, after the built-in re-validation."""
+    with _lock:
+        _after_restore.append(callback)
+
+
+def before_snapshot() -> None:
+    """Close pooled database connections; they would be dead after a restore."""
+    db = sys.modules.get("workmail_common.db")
+    if db is not None:
+        db.close_db_pools()
+        logger.info("Closed database connections before snapshot")
+
+
+def after_restore() -> Dict[str, str]:
+    """
+    Re-validate primed state in a process restored from a snapshot.
+
+    Restored environments share the snapshot's random state and may start
+    long after it was taken, so random is reseeded, the primed secrets are
+    re-fetched (a rotation may have happened since), and the database pool is
+    primed again. Registered callbacks then run; a failing one is logged.
+    """
+    random.seed()
+    secrets = list(_declared["secrets"])
+    for env_var in secrets:
+        if env_var in os.environ:
+            _helpers("secrets").invalidate_secret(os.environ[env_var])
+    steps = [(f"secret:{name}", _bind(_prime_secret, name)) for name in secrets]
+    if _declared["db"]:
+        steps.append(("db", _prime_db))
+    results = _run_steps(steps, PRIMING_BUDGET_SECONDS)
+    _report.update(results)
+    for callback in list(_after_restore):
+        try:
+            callback()
+        except Exception as e:
+            logger.warning(f"After-restore hook {callback!r} failed: {e}")
+    logger.info("Re-validated primed dependencies after restore")
+    return results
+
+
+def register_snapshot_hooks() -> bool:
+    """Hook into the runtime's snapshot lifecycle, where it has one (once)."""
+    global _hooks_registered
+    with _lock:
+        if _hooks_registered:
+            return True
+        try:
+            from snapshot_restore_py import (
+                register_after_restore as runtime_after_restore,
+                register_before_snapshot as runtime_before_snapshot,
+            )
+        except ImportError:
+            return False
+        runtime_before_snapshot(before_snapshot)
+        runtime_after_restore(after_restore)
+        _hooks_registered = True
+        return True
+
+
+def reset_priming() -> None:
+    """Forget declarations, results and callbacks (used by tests)."""
+    global _hooks_registered
+    with _lock:
+        _declared["secrets"] = []
+        _declared["db"] = False
+        _report.clear()
+        _after_restore.clear()
+        _hooks_registered = False
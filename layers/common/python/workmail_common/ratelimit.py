@@ -0,0 +1,323 @@
+# workmail_common/ratelimit.py
+"""
+Token-bucket rate limiting of AWS API calls, shared across executions.
+
+Each limited API, named "<service>:<Operation>" (for example
+"route53:ChangeResourceRecordSets"), has a bucket that refills at its rate up
+to its burst. A botocore before-call hook on the clients get_aws_client()
+creates reserves a token before the call is sent and sleeps until that token
+is due, so concurrent executions stay inside one budget instead of each
+finding the limit through throttling errors.
+
+With RATE_LIMIT_STORE=database (the default, as in template.yaml) the
+buckets are rows of rate_limit_buckets, updated under a row lock on a
+connection of the store's own, so every container draws from the same
+budget. With "local" each container has its own buckets.
+
+If the store cannot be reached, the container's own buckets are used instead;
+each fallback is logged and counted as a StoreFallback error metric. A call
+that would wait longer than RATE_LIMIT_MAX_WAIT_SECONDS is not sent: it fails
+with a ThrottlingException ClientError, as if AWS had throttled it.
+"""
+
+import importlib
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, ContextManager, Dict, NamedTuple, Optional
+from workmail_common.instrumentation import record
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+RATE_LIMITS_ENABLED = os.environ.get("RATE_LIMITS_ENABLED", "true").lower() != "false"
+RATE_LIMIT_STORE_LOCAL = "local"
+RATE_LIMIT_STORE_DATABASE = "database"
+RATE_LIMIT_STORE = os.environ.get("RATE_LIMIT_STORE", RATE_LIMIT_STORE_DATABASE)
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.environ.get("RATE_LIMIT_MAX_WAIT_SECONDS", "30"))
+
+# "<service>:<Operation>=<calls per second>[/<burst>]", comma separated.
+# RATE_LIMITS entries are applied over these.
+DEFAULT_RATE_LIMITS = ",".join(
+    [
+        "route53:ChangeResourceRecordSets=4/5",
+        "route53:CreateHostedZone=2/2",
+        "workmail:CreateOrganization=1/2",
+        "workmail:CreateUser=5/5",
+        "iam:CreateUser=5/5",
+        "iam:CreateAccessKey=5/5",
+    ]
+)
+
+
+class RateLimit(NamedTuple):
+    rate: float
+    burst: float
+
+
+def parse_rate_limits(spec: str) -> Dict[str, RateLimit]:
+    """Parse "<service>:<Operation>=<rate>[/<burst>]" entries; burst defaults to the rate."""
+    limits = {}
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        bucket, _, value = entry.partition("=")
+        rate, _, burst = value.partition("/")
+        try:
+            limit = RateLimit(float(rate), float(burst) if burst else 0.0)
+        except ValueError:
+            raise ValueError(f"Invalid rate limit '{entry}'")
+        if ":" not in bucket or limit.rate <= 0:
+            raise ValueError(f"Invalid rate limit '{entry}'")
+        limits[bucket.strip()] = limit._replace(
+            burst=limit.burst or max(1.0, limit.rate)
+        )
+    return limits
+
+
+def configured_rate_limits() -> Dict[str, RateLimit]:
+    limits = parse_rate_limits(DEFAULT_RATE_LIMITS)
+    limits.update(parse_rate_limits(os.environ.get("RATE_LIMITS", "")))
+    return limits
+
+
+class TokenBucketStore:
+    """Where bucket state lives."""
+
+    def reserve(
+        self, bucket: str, limit: RateLimit, now: float, max_wait: float
+    ) -> Optional[float]:
+        """
+        Take a token from a bucket and return the seconds until it is due.
+
+        Returns None, and takes nothing, if the wait would exceed max_wait.
+        """
+        raise NotImplementedError
+
+
+class LocalTokenBucketStore(TokenBucketStore):
+    """Buckets in this container's memory."""
+
+    def __init__(self):
+        self._buckets: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def reserve(
+        self, bucket: str, limit: RateLimit, now: float, max_wait: float
+    ) -> Optional[float]:
+        with self._lock:
+            tokens, updated_at = self._buckets.get(bucket, (limit.burst, now))
+            elapsed = max(0.0, now - updated_at)
+            tokens = min(limit.burst, tokens + elapsed * limit.rate) - 1
+            wait = max(0.0, -tokens / limit.rate)
+            if wait > max_wait:
+                return None
+            self._buckets[bucket] = (tokens, max(now, updated_at))
+            return wait
+
+
+def _database_config() -> Dict[str, str]:
+    return {
+        var: os.environ[var]
+        for var in ("DB_SECRET_ARN", "DB_CLUSTER_ARN", "DATABASE_NAME")
+        if os.environ.get(var)
+    }
+
+
+def _dedicated_connection(config: Dict[str, str]) -> Callable[[], ContextManager[Any]]:
+    # Imported by name, so the slim layer build does not add workmail_common.db
+    # (and mysql.connector) to every function that creates an AWS client.
+    return (
+        importlib.import_module("workmail_common.db")
+        .DedicatedConnection(config)
+        .connection
+    )
+
+
+class DatabaseTokenBucketStore(TokenBucketStore):
+    """
+    Buckets in the rate_limit_buckets table, shared by every container.
+
+    A reservation is one UPDATE that refills and takes the token (holding the
+    row lock until commit) and one SELECT of the result. A wait over max_wait
+    is rolled back. The SQL is portable, so either DB_BACKEND works. The
+    store keeps its own connection rather than borrowing from the handler's
+    pool, which the call being limited may already hold.
+    """
+
+    # Refilled tokens; a clock behind updated_at adds nothing.
+    _REFILLED = (
+        "tokens + (CASE WHEN %s > updated_at THEN %s - updated_at ELSE 0 END) * %s"
+    )
+    _TAKE_SQL = f"""UPDATE rate_limit_buckets SET tokens = (CASE WHEN {_REFILLED} > %s THEN %s ELSE {_REFILLED} END) - 1, updated_at = (CASE WHEN %s > updated_at THEN %s ELSE updated_at END) WHERE bucket = %s"""
+
+    def __init__(
+        self,
+        config: Optional[Dict[str, str]] = None,
+        connection_factory: Optional[Callable[[], ContextManager[Any]]] = None,
+    ):
+        if connection_factory is None:
+            connection_factory = _dedicated_connection(config or _database_config())
+        self.connection_factory = connection_factory
+
+    def reserve(
+        self, bucket: str, limit: RateLimit, now: float, max_wait: float
+    ) -> Optional[float]:
+        # A concurrent first use of the bucket can win the INSERT; retry once.
+        for attempt in range(2):
+            with self.connection_factory() as connection:
+                try:
+                    return self._reserve(connection, bucket, limit, now, max_wait)
+                except Exception:
+                    connection.rollback()
+                    if attempt:
+                        raise
+
+    def _reserve(
+        self,
+        connection: Any,
+        bucket: str,
+        limit: RateLimit,
+        now: float,
+        max_wait: float,
+    ) -> Optional[float]:
+        try:
+            cursor = connection.cursor()
+            cursor.execute(
+                self._TAKE_SQL,
+                (
+                    *(now, now, limit.rate, limit.burst, limit.burst),
+                    *(now, now, limit.rate, now, now, bucket),
+                ),
+            )
+            if cursor.rowcount == 0:
+                sql = """INSERT INTO rate_limit_buckets (bucket, tokens, updated_at) VALUES (%s, %s, %s)"""
+                cursor.execute(sql, (bucket, limit.burst - 1, now))
+            sql = """SELECT tokens FROM rate_limit_buckets WHERE bucket = %s"""
+            cursor.execute(sql, (bucket,))
+            tokens = float(cursor.fetchone()[0])
+            wait = max(0.0, -tokens / limit.rate)
+            if wait > max_wait:
+                connection.rollback()
+                return None
+            connection.commit()
+            return wait
+        finally:
+            if "cursor" in locals() and cursor:
+                cursor.close()
+
+
+class RateLimiter:
+    """Reserves tokens for limited calls and sleeps until they are due."""
+
+    def __init__(
+        self,
+        limits: Dict[str, RateLimit],
+        store: Optional[TokenBucketStore] = None,
+        max_wait: float = RATE_LIMIT_MAX_WAIT_SECONDS,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.limits = limits
+        self.store = store or LocalTokenBucketStore()
+        self.fallback = LocalTokenBucketStore()
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep = sleep
+
+    def limits_service(self, service_name: str) -> bool:
+        return any(bucket.startswith(f"{service_name}:") for bucket in self.limits)
+
+    def acquire(self, bucket: str) -> float:
+        """
+        Wait for a token of bucket (if it is limited); return the seconds waited.
+
+        Raises a ThrottlingException ClientError if the token is not due
+        within max_wait.
+        """
+        limit = self.limits.get(bucket)
+        if limit is None:
+            return 0.0
+        now = self.clock()
+        try:
+            wait = self.store.reserve(bucket, limit, now, self.max_wait)
+        except Exception as e:
+            logger.warning(
+                f"Rate limit store failed for {bucket}, using local bucket: {e}"
+            )
+            record("ratelimit", "StoreFallback", 0.0, True)
+            wait = self.fallback.reserve(bucket, limit, now, self.max_wait)
+        if wait is None:
+            logger.warning(
+                f"{bucket} is over its rate limit for more than {self.max_wait}s"
+            )
+            record("ratelimit", bucket, 0.0, True)
+            raise throttling_error(bucket, self.max_wait)
+        if wait > 0:
+            self.sleep(wait)
+        record("ratelimit", bucket, wait * 1000, False)
+        return wait
+
+
+def throttling_error(bucket: str, max_wait: float) -> Exception:
+    """The ThrottlingException ClientError for a call the limiter will not send."""
+    from botocore.exceptions import ClientError
+
+    return ClientError(
+        {
+            "Error": {
+                "Code": "ThrottlingException",
+                "Message": f"Rate limit of {bucket} would delay the call over {max_wait}s",
+            }
+        },
+        bucket.partition(":")[2],
+    )
+
+
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the container-wide limiter for RATE_LIMITS and RATE_LIMIT_STORE."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                store = None
+                if RATE_LIMIT_STORE == RATE_LIMIT_STORE_DATABASE:
+                    if _database_config():
+                        store = DatabaseTokenBucketStore()
+                    else:
+                        logger.info(
+                            "RATE_LIMIT_STORE=database but no database is configured; using local buckets"
+                        )
+                _rate_limiter = RateLimiter(configured_rate_limits(), store)
+    return _rate_limiter
+
+
+def clear_rate_limiter() -> None:
+    """Drop the container-wide limiter (used by tests)."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = None
+
+
+def _before_call_rate_limit(model: Any, **kwargs: Any) -> None:
+    get_rate_limiter().acquire(f"{model.service_model.service_name}:{model.name}")
+
+
+def rate_limit_client(client: Any) -> Any:
+    """Hold the client's limited API calls to their shared rate."""
+    if not RATE_LIMITS_ENABLED:
+        return client
+    if not get_rate_limiter().limits_service(client.meta.service_model.service_name):
+        return client
+    client.meta.events.register_first(
+        "before-call.*.*",
+        _before_call_rate_limit,
+        unique_id="workmail-rate-limit",
+    )
+    return client
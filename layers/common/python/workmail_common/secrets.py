@@ -0,0 +1,103 @@
+# workmail_common/secrets.py
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from workmail_common import aws
+from workmail_common.errors import client_error_code
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Secrets are cached per container for SECRET_CACHE_TTL_SECONDS. A forced refresh
+# (after an auth failure) is rate limited so bad credentials cannot hammer the API.
+SECRET_CACHE_TTL_SECONDS = float(os.environ.get("SECRET_CACHE_TTL_SECONDS", "300"))
+SECRET_MIN_REFRESH_SECONDS = 10.0
+# Short-lived secrets holding credentials a queued Keap note will deliver
+# (workmail_common.outbox); deleted once the note is sent or given up on.
+NOTE_SECRET_PREFIX = os.environ.get("NOTE_SECRET_PREFIX", "workmail/keap-notes/")
+_secret_cache: Dict[str, Dict[str, Any]] = {}
+_secret_cache_lock = threading.Lock()
+
+
+def get_secret(
+    secret_id: str,
+    secretsmanager_client: Optional[Any] = None,
+    force_refresh: bool = False,
+) -> Dict[str, Any]:
+    """
+    Return the cached SecretString, VersionId and VersionStages for a secret.
+
+    The entry is re-fetched once it is older than SECRET_CACHE_TTL_SECONDS, or on
+    force_refresh (e.g. after a downstream auth failure following a rotation).
+    """
+    entry = _secret_cache.get(secret_id)
+    if _secret_entry_usable(entry, force_refresh):
+        return entry
+    with _secret_cache_lock:
+        entry = _secret_cache.get(secret_id)
+        if _secret_entry_usable(entry, force_refresh):
+            return entry
+        client = secretsmanager_client or aws.get_aws_client("secretsmanager")
+        response = client.get_secret_value(SecretId=secret_id)
+        fresh_entry = {
+            "SecretString": response["SecretString"],
+            "VersionId": response.get("VersionId"),
+            "VersionStages": response.get("VersionStages", []),
+            "fetched_at": time.monotonic(),
+        }
+        if entry and entry["VersionId"] != fresh_entry["VersionId"]:
+            logger.info(
+                f"Secret {secret_id} rotated from version {entry['VersionId']} to {fresh_entry['VersionId']}"
+            )
+        _secret_cache[secret_id] = fresh_entry
+        return fresh_entry
+
+
+def _secret_entry_usable(entry: Optional[Dict[str, Any]], force_refresh: bool) -> bool:
+    if not entry:
+        return False
+    age = time.monotonic() - entry["fetched_at"]
+    if force_refresh:
+        return age < SECRET_MIN_REFRESH_SECONDS
+    return age < SECRET_CACHE_TTL_SECONDS
+
+
+def get_secret_value(secret_name: str, force_refresh: bool = False) -> str:
+    """Retrieve the secret value from AWS Secrets Manager (cached per container)."""
+    try:
+        return get_secret(secret_name, force_refresh=force_refresh)["SecretString"]
+    except Exception as e:
+        raise
+
+
+def invalidate_secret(secret_name: Optional[str] = None) -> None:
+    """Drop one cached secret, or all of them when no name is given."""
+    with _secret_cache_lock:
+        if secret_name is None:
+            _secret_cache.clear()
+        else:
+            _secret_cache.pop(secret_name, None)
+
+
+def create_secret(
+    name: str, secret_string: str, secretsmanager_client: Optional[Any] = None
+) -> str:
+    """Store a new secret and return its ARN."""
+    client = secretsmanager_client or aws.get_aws_client("secretsmanager")
+    response = client.create_secret(Name=name, SecretString=secret_string)
+    logger.info(f"Created secret {name}")
+    return response["ARN"]
+
+
+def delete_secret(secret_id: str, secretsmanager_client: Optional[Any] = None) -> None:
+    """Delete a secret without a recovery window; one already gone is ignored."""
+    client = secretsmanager_client or aws.get_aws_client("secretsmanager")
+    try:
+        client.delete_secret(SecretId=secret_id, ForceDeleteWithoutRecovery=True)
+        logger.info(f"Deleted secret {secret_id}")
+    except Exception as e:
+        if client_error_code(e) != "ResourceNotFoundException":
+            raise
+    invalidate_secret(secret_id)
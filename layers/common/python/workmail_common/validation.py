@@ -0,0 +1,115 @@
+# workmail_common/validation.py
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+from workmail_common.domain import extract_domain
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# Compiled schema validators, keyed by schema path and by schema content hash.
+PRECOMPILED_VALIDATOR_SUFFIX = "_validator.py"
+_validators: Dict[str, Any] = {}
+_validators_by_digest: Dict[str, Any] = {}
+_validators_lock = threading.Lock()
+
+
+def load_schema(schema_path: str) -> Dict[str, Any]:
+    try:
+        with open(schema_path) as schema_file:
+            return json.load(schema_file)
+    except FileNotFoundError:
+        logger.error(f"Schema file not found: {schema_path}")
+        raise
+    except json.JSONDecodeError as e:
+        logger.error(f"Error decoding JSON schema: {e}")
+        raise
+
+
+def schema_digest(schema: Dict[str, Any]) -> str:
+    """Return a stable content hash for a parsed JSON schema."""
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def precompiled_validator_path(schema_path: str) -> str:
+    """Return where scripts/compile_schemas.py writes the validator for a schema."""
+    return os.path.splitext(schema_path)[0] + PRECOMPILED_VALIDATOR_SUFFIX
+
+
+def _load_precompiled_validator(schema_path: str, digest: str) -> Optional[Any]:
+    module_path = precompiled_validator_path(schema_path)
+    if not os.path.exists(module_path):
+        return None
+    spec = importlib.util.spec_from_file_location(
+        f"_schema_validator_{digest[:16]}", module_path
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if getattr(module, "SCHEMA_SHA256", None) != digest:
+        logger.warning(f"Ignoring stale precompiled validator {module_path}")
+        return None
+    return module.validate
+
+
+def get_validator(schema_path: str) -> Any:
+    """
+    Return the compiled validator for a schema file, building it once per container.
+
+    A precompiled module next to the schema is used when its hash matches,
+    otherwise the schema is compiled with fastjsonschema.compile(), which is
+    only imported when a schema has no usable precompiled module.
+    """
+    validator = _validators.get(schema_path)
+    if validator is not None:
+        return validator
+    with _validators_lock:
+        validator = _validators.get(schema_path)
+        if validator is None:
+            schema = load_schema(schema_path)
+            digest = schema_digest(schema)
+            validator = _validators_by_digest.get(digest)
+            if validator is None:
+                validator = _load_precompiled_validator(schema_path, digest)
+                if validator is None:
+                    import fastjsonschema
+
+                    logger.info(f"Compiling schema {schema_path}")
+                    validator = fastjsonschema.compile(schema)
+                _validators_by_digest[digest] = validator
+            _validators[schema_path] = validator
+    return validator
+
+
+def clear_validator_cache() -> None:
+    """Drop all compiled validators (used by tests)."""
+    with _validators_lock:
+        _validators.clear()
+        _validators_by_digest.clear()
+
+
+def validate(body: Dict[str, Any], schema_path: str) -> bool:
+    validator = get_validator(schema_path)
+    validator(body)
+    return True
+
+
+def process_input(body: Dict[str, Any], schema_path: str) -> Dict[str, Any]:
+    try:
+        validate(body, schema_path)
+
+        full_domain, root_domain = extract_domain(body["vanity_name"])
+        body["vanity_name"] = full_domain
+        body["organization_name"] = root_domain
+
+        email_address = f"{body['email_username']}@{body['vanity_name']}"
+        body["email_address"] = email_address
+
+    except Exception as e:
+        raise e
+
+    return body
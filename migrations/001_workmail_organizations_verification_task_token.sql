@@ -0,0 +1,4 @@
+-- Step Functions task token of the execution waiting for this organization's
+-- domain to verify (callback mode); cleared once the execution is resumed.
+ALTER TABLE workmail_organizations
+    ADD COLUMN verification_task_token TEXT NULL;
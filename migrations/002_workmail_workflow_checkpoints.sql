@@ -0,0 +1,9 @@
+-- Completed provisioning steps and their outputs, so a re-driven workflow
+-- skips work that already succeeded. Keyed by "<contact_id>:<vanity_name>".
+CREATE TABLE IF NOT EXISTS workmail_workflow_checkpoints (
+    workflow_key VARCHAR(320) NOT NULL,
+    step VARCHAR(64) NOT NULL,
+    output TEXT NOT NULL,
+    completed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (workflow_key, step)
+);
@@ -0,0 +1,23 @@
+-- Keap side effects (tag applications and notes) queued by the provisioning
+-- functions in the same transaction as their workmail_organizations change,
+-- and sent in batches by KeapOutboxDrainFunction. Sent rows are deleted.
+-- Note payloads never carry credentials: those are kept in a short-lived
+-- Secrets Manager secret referenced by the payload's "secret_ref", and a
+-- FAILED note keeps only its title.
+-- available_at is a unix timestamp: the earliest time the row may be sent
+-- (pushed back for retries and while a drainer holds it).
+CREATE TABLE IF NOT EXISTS keap_outbox (
+    id BIGINT NOT NULL AUTO_INCREMENT,
+    kind VARCHAR(16) NOT NULL,
+    contact_id BIGINT NOT NULL,
+    tag_id BIGINT NULL,
+    payload TEXT NULL,
+    status VARCHAR(16) NOT NULL DEFAULT 'PENDING',
+    attempts INT NOT NULL DEFAULT 0,
+    available_at BIGINT NOT NULL,
+    claim_id VARCHAR(36) NULL,
+    last_error TEXT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (id),
+    KEY keap_outbox_due (status, available_at)
+);
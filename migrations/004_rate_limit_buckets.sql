@@ -0,0 +1,11 @@
+-- Token buckets shared by every container for the rate-limited AWS APIs
+-- (workmail_common.ratelimit, RATE_LIMIT_STORE=database). One row per API,
+-- e.g. "route53:ChangeResourceRecordSets". tokens may go below zero: each
+-- call reserves its token and waits until it is due. updated_at is a unix
+-- timestamp with fractions of a second.
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    bucket VARCHAR(128) NOT NULL,
+    tokens DOUBLE NOT NULL,
+    updated_at DOUBLE NOT NULL,
+    PRIMARY KEY (bucket)
+);
@@ -0,0 +1,143 @@
+# scripts/bench_import_time.py
+"""
+Cold-start import cost of each Lambda entry point.
+
+    python scripts/bench_import_time.py [--runs N] [--record] [--check]
+
+Every *_function/app.py is imported in a fresh interpreter under
+`python -X importtime`, the way Lambda loads it (function directory as the
+working directory, the common layer on PYTHONPATH). The median cumulative
+import time of `app` over --runs, and the heavy dependencies it pulled in,
+are compared with scripts/import_time_baselines.json. --record rewrites the
+baselines; --check exits non-zero if an entry point got slower than
+--tolerance allows or imports a heavy dependency its baseline did not.
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_PATH = os.path.join(REPO_ROOT, "layers", "common", "python")
+BASELINES_PATH = os.path.join(REPO_ROOT, "scripts", "import_time_baselines.json")
+
+# Top-level packages worth knowing about when a handler imports them.
+HEAVY_MODULES = ["boto3", "botocore", "fastjsonschema", "mysql", "requests"]
+
+
+def entry_points():
+    return sorted(
+        os.path.basename(os.path.dirname(path))
+        for path in glob.glob(os.path.join(REPO_ROOT, "*_function", "app.py"))
+    )
+
+
+def measure_once(function_dir):
+    """Return (cumulative microseconds for `app`, top-level modules imported)."""
+    env = dict(os.environ, PYTHONPATH=LAYER_PATH, AWS_DEFAULT_REGION="us-east-1")
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=os.path.join(REPO_ROOT, function_dir),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise SystemExit(f"{function_dir}: import failed\n{process.stderr}")
+    cumulative = None
+    modules = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line[len("import time:") :].split("|")
+        if not cumulative_us.strip().isdigit():
+            continue
+        name = name.strip()
+        modules.add(name.split(".")[0])
+        if name == "app":
+            cumulative = int(cumulative_us)
+    return cumulative, modules
+
+
+def measure(function_dir, runs):
+    samples = []
+    modules = set()
+    for _ in range(runs):
+        cumulative, imported = measure_once(function_dir)
+        samples.append(cumulative)
+        modules |= imported
+    return {
+        "cumulative_us": int(statistics.median(samples)),
+        "heavy_modules": [name for name in HEAVY_MODULES if name in modules],
+    }
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as baselines_file:
+        return json.load(baselines_file).get("entry_points", {})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.5,
+        help="allowed slowdown over the baseline before --check fails",
+    )
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines()
+    results = {}
+    regressions = []
+    print(f"{'entry point':<42} {'ms':>8} {'baseline':>9}  heavy modules")
+    for function_dir in entry_points():
+        result = measure(function_dir, args.runs)
+        results[function_dir] = result
+        baseline = baselines.get(function_dir)
+        baseline_ms = (
+            f"{baseline['cumulative_us'] / 1000:9.1f}" if baseline else f"{'-':>9}"
+        )
+        print(
+            f"{function_dir:<42} {result['cumulative_us'] / 1000:8.1f} {baseline_ms}  "
+            f"{', '.join(result['heavy_modules']) or '-'}"
+        )
+        if baseline is None:
+            continue
+        if result["cumulative_us"] > baseline["cumulative_us"] * (1 + args.tolerance):
+            regressions.append(f"{function_dir} is slower than its baseline")
+        added = set(result["heavy_modules"]) - set(baseline["heavy_modules"])
+        if added:
+            regressions.append(f"{function_dir} now imports {', '.join(sorted(added))}")
+
+    if args.record:
+        with open(BASELINES_PATH, "w") as baselines_file:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "runs": args.runs,
+                    "entry_points": results,
+                },
+                baselines_file,
+                indent=2,
+            )
+            baselines_file.write("\n")
+        print(f"Recorded baselines in {os.path.relpath(BASELINES_PATH, REPO_ROOT)}")
+    for regression in regressions:
+        print(f"REGRESSION: {regression}")
+    if args.check and regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# scripts/bench_rate_limiter.py
+"""
+Throughput of the AWS API rate limiter with many executions contending.
+
+    python scripts/bench_rate_limiter.py [--workers 1,4,16,64] [--rate R]
+        [--seconds S] [--db-latency-ms MS]
+
+Each worker thread stands for one concurrent execution with its own
+RateLimiter. In a loop it takes a token for one bucket and makes a "call"
+that sleeps --call-ms. Every worker count runs twice:
+
+  local   each worker has its own LocalTokenBucketStore, as every container
+          had before buckets were shared. Together they exceed the budget.
+  shared  every worker has a DatabaseTokenBucketStore on one SQLite file.
+          Transactions take the write lock up front, the way the UPDATE takes
+          the row lock in MySQL. Each statement also sleeps --db-latency-ms
+          to stand in for the database round trip.
+
+For each run it reports the calls per second the API saw, the busiest
+one-second window, and the time spent in acquire() beyond the wait it asked
+for (the store's cost under contention). SQLite's busy handler retries on a
+timer where InnoDB queues lock waiters, so the shared p99 is pessimistic.
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "layers", "common", "python"))
+
+from workmail_common.ratelimit import (  # noqa: E402
+    DatabaseTokenBucketStore,
+    LocalTokenBucketStore,
+    RateLimit,
+    RateLimiter,
+)
+
+BUCKET = "workmail:CreateOrganization"
+SCHEMA = """CREATE TABLE rate_limit_buckets (bucket TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"""
+
+
+class SqliteCursor:
+    def __init__(self, db, latency):
+        self.db = db
+        self.latency = latency
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        time.sleep(self.latency)
+        cursor = self.db.execute(sql.replace("%s", "?"), params)
+        self.rowcount = cursor.rowcount
+        self._rows = cursor.fetchall()
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def close(self):
+        self._rows = []
+
+
+class SqliteConnection:
+    """The slice of a DB-API connection DatabaseTokenBucketStore uses."""
+
+    def __init__(self, db, latency):
+        self.db = db
+        self.latency = latency
+
+    def cursor(self):
+        return SqliteCursor(self.db, self.latency)
+
+    def commit(self):
+        self.db.execute("COMMIT")
+
+    def rollback(self):
+        if self.db.in_transaction:
+            self.db.execute("ROLLBACK")
+
+
+def sqlite_connection_factory(path, latency):
+    local = threading.local()
+
+    @contextmanager
+    def connection():
+        if not hasattr(local, "db"):
+            local.db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        local.db.execute("BEGIN IMMEDIATE")
+        wrapper = SqliteConnection(local.db, latency)
+        try:
+            yield wrapper
+        finally:
+            wrapper.rollback()
+
+    return connection
+
+
+def run(workers, limit, seconds, call_seconds, store_for):
+    calls, overheads = [], []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def work(index):
+        limiter = RateLimiter({BUCKET: limit}, store_for(index), max_wait=60)
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            waited = limiter.acquire(BUCKET)
+            overhead = time.perf_counter() - start - waited
+            sent = time.monotonic()
+            time.sleep(call_seconds)
+            with lock:
+                calls.append(sent)
+                overheads.append(overhead)
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(workers)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    # Busiest one-second window of sends.
+    calls.sort()
+    peak, first = 0, 0
+    for last, sent in enumerate(calls):
+        while sent - calls[first] >= 1.0:
+            first += 1
+        peak = max(peak, last - first + 1)
+    overheads.sort()
+    return {
+        "per_second": len(calls) / elapsed,
+        "peak": peak,
+        "p50_ms": statistics.median(overheads) * 1000 if overheads else 0.0,
+        "p99_ms": overheads[int(len(overheads) * 0.99)] * 1000 if overheads else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,4,16,64")
+    parser.add_argument("--rate", type=float, default=20.0)
+    parser.add_argument("--burst", type=float, default=None)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--call-ms", type=float, default=5.0)
+    parser.add_argument("--db-latency-ms", type=float, default=1.0)
+    args = parser.parse_args(argv)
+    logging.getLogger("workmail_common.ratelimit").setLevel(logging.ERROR)
+
+    limit = RateLimit(args.rate, args.burst or args.rate)
+    print(
+        f"bucket {BUCKET}: {limit.rate:g}/s, burst {limit.burst:g}; "
+        f"{args.seconds:g}s per run, store round trip {args.db_latency_ms:g} ms"
+    )
+    print(
+        f"{'store':<7} {'workers':>7} {'calls/s':>8} {'budget':>7} "
+        f"{'peak 1s':>8} {'p50 ms':>7} {'p99 ms':>7}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            path = os.path.join(directory, f"buckets_{workers}.db")
+            with sqlite3.connect(path) as db:
+                db.execute(SCHEMA)
+            factory = sqlite_connection_factory(path, args.db_latency_ms / 1000)
+            stores = {
+                "local": lambda index: LocalTokenBucketStore(),
+                "shared": lambda index: DatabaseTokenBucketStore(
+                    connection_factory=factory
+                ),
+            }
+            for name, store_for in stores.items():
+                result = run(
+                    workers, limit, args.seconds, args.call_ms / 1000, store_for
+                )
+                # The budget over the run: the burst plus the refill.
+                budget = (limit.burst + limit.rate * args.seconds) / args.seconds
+                print(
+                    f"{name:<7} {workers:>7} {result['per_second']:>8.1f} "
+                    f"{budget:>7.1f} {result['peak']:>8} "
+                    f"{result['p50_ms']:>7.2f} {result['p99_ms']:>7.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
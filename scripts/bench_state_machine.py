@@ -0,0 +1,114 @@
+# scripts/bench_state_machine.py
+"""
+End-to-end timing of WorkMailStepFunction on the local Step Functions stand-in.
+
+    python scripts/bench_state_machine.py [--scale S] [--dns-insync-wait SECONDS]
+
+Each task sleeps for a typical latency of its Lambda (multiplied by --scale
+so a run takes seconds, not minutes) and the same definition is executed
+twice: with the Parallel branches on threads, as Step Functions runs them,
+and one after the other, as the workflow ran before they were split out.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from tests.workmail_step_function.local_step_functions import (  # noqa: E402
+    LocalStepFunctions,
+    load_definition,
+)
+
+# Typical Lambda durations in seconds, before scaling.
+LATENCIES = {
+    "CreateWorkMailOrgFunction": 45.0,
+    "CreateHostedZoneFunction": 4.0,
+    "CreateIamUserFunction": 3.0,
+    "DomainVerificationWatcherFunction": 0.5,
+    "CheckDomainVerificationFunction": 1.5,
+    "CreateWorkMailUserFunction": 4.0,
+}
+
+OUTPUTS = {
+    "CreateWorkMailOrgFunction": {
+        "contact_id": 1,
+        "organization_id": "m-0123456789abcdef",
+        "organization_name": "example",
+        "email_username": "john",
+        "vanity_name": "example.com",
+        "email_address": "john@example.com",
+        "first_name": "John",
+        "last_name": "Doe",
+        "dns_records": [],
+    },
+    "CreateHostedZoneFunction": {
+        "hosted_zone_id": "/hostedzone/Z0123456789",
+        "dns_change_id": "/change/C0123456789",
+        "dns_insync": True,
+    },
+    "CreateIamUserFunction": {
+        "iamUserName": "workmail_example.com",
+        "apiKey": "AKIAEXAMPLE",
+        "secretKey": "example",
+    },
+    "DomainVerificationWatcherFunction": {"domainVerified": True},
+    "CheckDomainVerificationFunction": {"domainVerified": True},
+    "CreateWorkMailUserFunction": {"userCreated": True},
+}
+
+
+def make_handlers(latencies):
+    def task(name):
+        def handler(event, context):
+            time.sleep(latencies[name])
+            return OUTPUTS[name]
+
+        return handler
+
+    return {name: task(name) for name in latencies}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scale", type=float, default=0.02)
+    parser.add_argument(
+        "--dns-insync-wait",
+        type=float,
+        default=0.0,
+        help="seconds CreateHostedZoneFunction spends waiting for INSYNC",
+    )
+    parser.add_argument("--mode", choices=["callback", "polling"], default="callback")
+    args = parser.parse_args(argv)
+
+    latencies = {name: seconds * args.scale for name, seconds in LATENCIES.items()}
+    latencies["CreateHostedZoneFunction"] += args.dns_insync_wait * args.scale
+    definition = load_definition(
+        "WorkMailStepFunction", {"DomainVerificationMode": args.mode}
+    )
+
+    results = {}
+    for label, parallel in (("sequential (before)", False), ("parallel", True)):
+        execution = LocalStepFunctions(
+            make_handlers(latencies), parallel=parallel
+        ).start_execution(definition, {"body": "{}"})
+        if execution["status"] != "SUCCEEDED":
+            raise SystemExit(f"{label}: {execution['error']} {execution['cause']}")
+        results[label] = execution["elapsed"]
+        print(
+            f"{label:<20} {execution['elapsed'] / args.scale:8.1f} s "
+            f"(scaled run {execution['elapsed']:.3f} s)"
+        )
+
+    saved = results["sequential (before)"] - results["parallel"]
+    print(
+        f"critical path shortened by {saved / args.scale:.1f} s "
+        f"({saved / results['sequential (before)']:.0%})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# scripts/bench_validate.py
+"""
+Micro-benchmark for input validation.
+
+    python scripts/bench_validate.py [--iterations N]
+
+Compares the old per-call path (open + json.load + fastjsonschema.compile on
+every request) with the cached validator, and a cold fastjsonschema.compile()
+with importing the precompiled module from scripts/compile_schemas.py.
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "layers", "common", "python"))
+
+import fastjsonschema  # noqa: E402
+from workmail_common.validation import (  # noqa: E402
+    _load_precompiled_validator,
+    clear_validator_cache,
+    load_schema,
+    schema_digest,
+    validate,
+)
+
+SCHEMA_PATH = os.path.join(
+    REPO_ROOT, "create_workmail_org_function", "schemas", "input_schema.json"
+)
+BODY = {"contact_id": 12345, "email_username": "john.doe", "vanity_name": "example.com"}
+
+
+def per_call_compile():
+    with open(SCHEMA_PATH) as schema_file:
+        schema = json.load(schema_file)
+    fastjsonschema.compile(schema)(BODY)
+
+
+def cached_validate():
+    validate(BODY, SCHEMA_PATH)
+
+
+def cold_compile():
+    fastjsonschema.compile(load_schema(SCHEMA_PATH))
+
+
+def cold_precompiled():
+    schema = load_schema(SCHEMA_PATH)
+    if _load_precompiled_validator(SCHEMA_PATH, schema_digest(schema)) is None:
+        raise SystemExit("Run scripts/compile_schemas.py first")
+
+
+def report(label, func, iterations):
+    best = min(timeit.repeat(func, number=iterations, repeat=5)) / iterations
+    print(f"{label:<40} {best * 1e6:10.2f} us/call")
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    clear_validator_cache()
+    cached_validate()  # warm the cache, as a warm Lambda container would be
+
+    print("Per-call validation (warm container)")
+    before = report(
+        "  before: load + compile every call", per_call_compile, args.iterations
+    )
+    after = report("  after: cached validator", cached_validate, args.iterations)
+    print(f"  speedup: {before / after:.0f}x")
+
+    cold_iterations = max(1, args.iterations // 10)
+    print("First validation (cold start)")
+    before = report("  before: fastjsonschema.compile()", cold_compile, cold_iterations)
+    after = report(
+        "  after: import precompiled module", cold_precompiled, cold_iterations
+    )
+    print(f"  speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
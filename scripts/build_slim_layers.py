@@ -0,0 +1,367 @@
+# scripts/build_slim_layers.py
+"""
+Build per-function slim layers (or self-contained function bundles).
+
+    python scripts/build_slim_layers.py [--mode layer|bundle] [--template]
+                                        [--function NAME ...] [--runs N]
+
+WorkmailCommonLayer ships every vendored package to every function. This
+works out which layer modules each *_function actually needs by scanning
+its app.py and schema validators with modulefinder (which also sees the
+imports inside function bodies that workmail_common defers), adds the files
+those packages load dynamically, and copies only those into
+
+    build/slim/layers/<function>/python/   (--mode layer)
+    build/slim/functions/<function>/       (--mode bundle: code + packages)
+
+Each output is then smoke-tested in a fresh interpreter that sees only the
+output and the packages the Lambda runtime provides: `import app`, every
+workmail_common submodule and kept package must import, and the probes
+below must pass. The build
+fails if a function's cold import time (median of --runs) or unzipped size
+exceeds its budget in scripts/layer_budgets.json.
+
+--template writes build/slim/template.yaml, a copy of template.yaml pointing
+each function at its output: `sam build -t build/slim/template.yaml`.
+"""
+
+import argparse
+import glob
+import importlib.util
+import json
+import modulefinder
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import sysconfig
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAYER_PATH = os.path.join(REPO_ROOT, "layers", "common", "python")
+TEMPLATE_PATH = os.path.join(REPO_ROOT, "template.yaml")
+BUDGETS_PATH = os.path.join(REPO_ROOT, "scripts", "layer_budgets.json")
+BUILD_ROOT = os.path.join(REPO_ROOT, "build", "slim")
+
+# Provided by the Lambda Python runtime; never copied, but visible to smoke tests.
+RUNTIME_PACKAGES = ["boto3", "botocore", "s3transfer", "jmespath", "dateutil", "six"]
+# The runtime's botocore needs urllib3 too, but a function that keeps requests
+# also keeps the layer's urllib3 2.x, which KeapRetry (backoff_max=) needs and
+# which shadows the runtime's copy.
+RUNTIME_MODULES = RUNTIME_PACKAGES + ["urllib3"]
+
+# Reachable in the import graph but never loaded by these handlers.
+EXCLUDED_MODULES = [
+    # UTS46 remapping; requests only asks for it for non-ASCII hostnames.
+    "idna.uts46data",
+    # Platform- or opt-in-only urllib3 backends (Pyodide, SOCKS, pyOpenSSL).
+    "urllib3.contrib.emscripten",
+    "urllib3.contrib.socks",
+    "urllib3.contrib.pyopenssl",
+    # Imported by mysql.connector only when the opentelemetry SDK is installed.
+    "mysql.connector.opentelemetry.instrumentation",
+]
+
+# Modules loaded by name at runtime, which no import statement reveals.
+DYNAMIC_MODULES = {
+    "mysql": [
+        "mysql.connector.locales.eng.client_error",
+        # Server auth plugins Aurora MySQL and MySQL 8 default to.
+        "mysql.connector.plugins.mysql_native_password",
+        "mysql.connector.plugins.caching_sha2_password",
+    ],
+}
+
+# Non-Python files a kept package reads, relative to the layer.
+DATA_FILES = {
+    "certifi": ["certifi/cacert.pem"],
+}
+
+# Exercised in the smoke test when the package (or module) is kept.
+PROBES = {
+    "mysql": (
+        "import mysql.connector.pooling\n"
+        "from mysql.connector.locales import get_client_error\n"
+        "from mysql.connector.plugins import get_auth_plugin\n"
+        "assert get_client_error(2003)\n"
+        "get_auth_plugin('mysql_native_password')\n"
+        "get_auth_plugin('caching_sha2_password')\n"
+    ),
+    "certifi": "import certifi, os\nassert os.path.exists(certifi.where())\n",
+    "requests": "import requests\nrequests.Session()\n",
+    "fastjsonschema": "import fastjsonschema\nfastjsonschema.compile({})({})\n",
+    "workmail_common.keap": "from workmail_common.keap import keap_retry\nkeap_retry()\n",
+}
+
+
+def entry_points():
+    return sorted(
+        os.path.basename(os.path.dirname(path))
+        for path in glob.glob(os.path.join(REPO_ROOT, "*_function", "app.py"))
+    )
+
+
+def function_sources(function_dir):
+    """app.py plus the modules it loads from its own directory at runtime."""
+    return sorted(glob.glob(os.path.join(function_dir, "**", "*.py"), recursive=True))
+
+
+def is_excluded(module_name):
+    return any(
+        module_name == excluded or module_name.startswith(excluded + ".")
+        for excluded in EXCLUDED_MODULES
+    )
+
+
+def find_layer_modules(function_name):
+    """Return {module name: file} for the layer modules a function can import."""
+    function_dir = os.path.join(REPO_ROOT, function_name)
+    stdlib = sysconfig.get_paths()["stdlib"]
+    path = [function_dir, LAYER_PATH, stdlib, os.path.join(stdlib, "lib-dynload")]
+    finder = modulefinder.ModuleFinder(
+        path=path, excludes=RUNTIME_PACKAGES + EXCLUDED_MODULES
+    )
+    for source in function_sources(function_dir):
+        finder.run_script(source)
+    for package, modules in DYNAMIC_MODULES.items():
+        if package in finder.modules:
+            for module_name in modules:
+                finder.import_hook(module_name)
+    layer = os.path.join(LAYER_PATH, "")
+    return {
+        name: module.__file__
+        for name, module in finder.modules.items()
+        if module.__file__
+        and module.__file__.startswith(layer)
+        and not is_excluded(name)
+    }
+
+
+def copy_into(files, destination):
+    for source in sorted(files):
+        target = os.path.join(destination, os.path.relpath(source, LAYER_PATH))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copy2(source, target)
+
+
+def build(function_name, mode):
+    """Write a function's slim output; return (output, package root, module names)."""
+    modules = find_layer_modules(function_name)
+    packages = {name.split(".")[0] for name in modules}
+    files = set(modules.values())
+    for package in packages:
+        for relative in DATA_FILES.get(package, []):
+            files.add(os.path.join(LAYER_PATH, relative))
+
+    if mode == "layer":
+        output = os.path.join(BUILD_ROOT, "layers", function_name)
+        package_root = os.path.join(output, "python")
+    else:
+        output = os.path.join(BUILD_ROOT, "functions", function_name)
+        package_root = output
+    shutil.rmtree(output, ignore_errors=True)
+    if mode == "bundle":
+        # Keep the validators' precompiled bytecode, not the function's own cache.
+        shutil.copytree(
+            os.path.join(REPO_ROOT, function_name),
+            output,
+            ignore=lambda directory, names: (
+                ["__pycache__"]
+                if os.path.samefile(directory, os.path.join(REPO_ROOT, function_name))
+                else []
+            ),
+        )
+    copy_into(files, package_root)
+    return output, package_root, sorted(modules)
+
+
+def runtime_shim(directory):
+    """Link the runtime-provided packages into directory, and nothing else."""
+    for name in RUNTIME_MODULES:
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            raise SystemExit(f"{name} must be installed to smoke-test the build")
+        source = (
+            os.path.dirname(spec.origin)
+            if spec.submodule_search_locations
+            else spec.origin
+        )
+        os.symlink(source, os.path.join(directory, os.path.basename(source)))
+    return directory
+
+
+def run_isolated(code, function_name, package_root, shim, importtime=False):
+    # -S keeps site-packages (and whatever the build machine has installed) out.
+    command = [sys.executable, "-S"]
+    if importtime:
+        command += ["-X", "importtime"]
+    pythonpath = [os.path.join(REPO_ROOT, function_name), package_root, shim]
+    env = {
+        "PATH": os.environ.get("PATH", ""),
+        "PYTHONPATH": os.pathsep.join(pythonpath),
+        "PYTHONDONTWRITEBYTECODE": "1",
+        "AWS_DEFAULT_REGION": "us-east-1",
+    }
+    return subprocess.run(
+        command + ["-c", code],
+        cwd=os.path.join(REPO_ROOT, function_name),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+
+
+def smoke_test(function_name, package_root, modules, shim, runs):
+    """Check the slim output is complete; return the median import time in ms."""
+    packages = sorted({name.split(".")[0] for name in modules})
+    # The shared modules a handler defers (workmail_common imports its
+    # dependencies inside functions), each kept package, and its probe.
+    code = "import app\n"
+    code += "".join(
+        f"import {name}\n" for name in modules if name.startswith("workmail_common.")
+    )
+    code += "".join(f"import {package}\n" for package in packages)
+    code += "".join(
+        PROBES.get(name, "") for name in sorted(set(packages) | set(modules))
+    )
+    process = run_isolated(code, function_name, package_root, shim)
+    if process.returncode != 0:
+        raise SystemExit(
+            f"{function_name}: slim build is missing something\n{process.stderr}"
+        )
+    samples = []
+    for _ in range(runs):
+        process = run_isolated(
+            "import app", function_name, package_root, shim, importtime=True
+        )
+        match = re.search(r"\|\s*(\d+)\s*\|\s*app$", process.stderr, re.M)
+        samples.append(int(match.group(1)) / 1000)
+    return statistics.median(samples)
+
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, name))
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def zip_size(path):
+    archive = shutil.make_archive(path, "zip", path)
+    return os.path.getsize(archive)
+
+
+def load_budgets():
+    with open(BUDGETS_PATH) as budgets_file:
+        budgets = json.load(budgets_file)
+    return lambda name: dict(budgets["default"], **budgets["functions"].get(name, {}))
+
+
+def write_template(mode, function_names):
+    """Copy template.yaml with each built function pointed at its slim output."""
+    with open(TEMPLATE_PATH) as template_file:
+        lines = template_file.read().splitlines()
+    resource = None
+    layers = {}
+    output = []
+    for line in lines:
+        match = re.match(r"^  (\w+):\s*$", line)
+        if match:
+            resource = match.group(1)
+        code_uri = re.match(r"^(\s+)(CodeUri|ContentUri): (\S+?)/?$", line)
+        if code_uri:
+            indent, key, path = code_uri.groups()
+            if key == "CodeUri" and path in function_names:
+                layers[resource] = path
+                target = f"functions/{path}/" if mode == "bundle" else f"../../{path}/"
+            else:
+                target = f"../../{path}/"
+            line = f"{indent}{key}: {target}"
+        if "!Ref WorkmailCommonLayer" in line and resource in layers:
+            if mode == "bundle":
+                # Drop the reference; an emptied Layers key is removed below.
+                continue
+            line = line.replace("WorkmailCommonLayer", f"{resource}SlimLayer")
+        output.append(line)
+    # A Layers key left with no entries is invalid; remove it.
+    output = [
+        line
+        for i, line in enumerate(output)
+        if not (
+            line.strip() == "Layers:"
+            and (i + 1 == len(output) or not output[i + 1].strip().startswith("- "))
+        )
+    ]
+    if mode == "layer":
+        index = output.index("Resources:") + 1
+        for resource, function_name in sorted(layers.items(), reverse=True):
+            output[index:index] = [
+                f"  {resource}SlimLayer:",
+                "    Type: AWS::Serverless::LayerVersion",
+                "    Properties:",
+                f'      LayerName: "{resource}SlimLayer"',
+                f'      Description: "Layer modules used by {function_name}"',
+                f"      ContentUri: layers/{function_name}/",
+                "      CompatibleRuntimes:",
+                "        - python3.12",
+                "",
+            ]
+    path = os.path.join(BUILD_ROOT, "template.yaml")
+    with open(path, "w") as template_file:
+        template_file.write("\n".join(output) + "\n")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=["layer", "bundle"], default="layer")
+    parser.add_argument("--function", action="append", dest="functions")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--template", action="store_true")
+    args = parser.parse_args(argv)
+
+    function_names = args.functions or entry_points()
+    budget_for = load_budgets()
+    failures = []
+    full_layer_size = directory_size(LAYER_PATH)
+    print(f"full layer: {full_layer_size / 1024:.0f} KB unzipped")
+    print(f"{'function':<42} {'modules':>7} {'KB':>7} {'zip KB':>7} {'import ms':>9}")
+    with tempfile.TemporaryDirectory() as shim:
+        runtime_shim(shim)
+        for function_name in function_names:
+            output, package_root, modules = build(function_name, args.mode)
+            import_ms = smoke_test(
+                function_name, package_root, modules, shim, args.runs
+            )
+            size = directory_size(output)
+            zipped = zip_size(output)
+            print(
+                f"{function_name:<42} {len(modules):>7} {size / 1024:>7.0f} "
+                f"{zipped / 1024:>7.0f} {import_ms:>9.1f}"
+            )
+            budget = budget_for(function_name)
+            if size > budget["max_unzipped_kb"] * 1024:
+                failures.append(
+                    f"{function_name}: {size / 1024:.0f} KB unzipped exceeds "
+                    f"the {budget['max_unzipped_kb']} KB budget"
+                )
+            if import_ms > budget["max_import_ms"]:
+                failures.append(
+                    f"{function_name}: cold import {import_ms:.0f} ms exceeds "
+                    f"the {budget['max_import_ms']} ms budget"
+                )
+    if args.template:
+        print(
+            f"Wrote {os.path.relpath(write_template(args.mode, function_names), REPO_ROOT)}"
+        )
+    for failure in failures:
+        print(f"OVER BUDGET: {failure}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# scripts/compile_schemas.py
+"""
+Precompile each function's input schema into an importable validator module.
+
+    python scripts/compile_schemas.py          # (re)write *_validator.py files
+    python scripts/compile_schemas.py --check  # exit 1 if any are missing or stale
+
+workmail_common.validation.get_validator() loads these modules instead of running
+fastjsonschema.compile() at cold start, as long as SCHEMA_SHA256 matches.
+Run it with the Lambda runtime's Python (3.12) before `sam build`: it also
+writes unchecked-hash bytecode next to each module, because the deployed
+package is read-only and Python could not cache the bytecode itself.
+"""
+
+import argparse
+import glob
+import os
+import py_compile
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "layers", "common", "python"))
+
+import fastjsonschema  # noqa: E402
+from workmail_common.validation import (  # noqa: E402
+    load_schema,
+    precompiled_validator_path,
+    schema_digest,
+)
+
+HEADER = "# Generated by scripts/compile_schemas.py from {schema}. Do not edit.\n"
+
+
+def find_schemas():
+    pattern = os.path.join(REPO_ROOT, "*_function", "schemas", "*.json")
+    return sorted(glob.glob(pattern))
+
+
+def render_validator(schema_path):
+    schema = load_schema(schema_path)
+    return (
+        HEADER.format(schema=os.path.relpath(schema_path, REPO_ROOT))
+        + f'SCHEMA_SHA256 = "{schema_digest(schema)}"\n'
+        + fastjsonschema.compile_to_code(schema)
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="fail instead of writing when a validator module is out of date",
+    )
+    args = parser.parse_args(argv)
+
+    stale = []
+    for schema_path in find_schemas():
+        module_path = precompiled_validator_path(schema_path)
+        code = render_validator(schema_path)
+        current = None
+        if os.path.exists(module_path):
+            with open(module_path) as module_file:
+                current = module_file.read()
+        if current != code:
+            stale.append(os.path.relpath(module_path, REPO_ROOT))
+            if not args.check:
+                with open(module_path, "w") as module_file:
+                    module_file.write(code)
+        if not args.check:
+            py_compile.compile(
+                module_path,
+                doraise=True,
+                invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+            )
+
+    for path in stale:
+        print(f"{'stale' if args.check else 'wrote'}: {path}")
+    return 1 if args.check and stale else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
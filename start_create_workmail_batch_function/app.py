@@ -0,0 +1,185 @@
+# start_create_workmail_batch_function/app.py
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+from fastjsonschema import JsonSchemaException
+from workmail_common.aws import get_aws_client
+from workmail_common.domain import workflow_key
+from workmail_common.validation import get_validator
+from workmail_common.errors import handle_error
+from workmail_common.executions import execution_name, find_execution_name
+from workmail_common.instrumentation import instrumented_handler
+from workmail_common.priming import prime
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "schemas/item_schema.json"
+)
+
+prime(clients=["stepfunctions"], schemas=[SCHEMA_PATH])
+
+# Keeps the batch execution's input well inside the Step Functions payload limit.
+MAX_BATCH_ITEMS = int(os.environ.get("MAX_BATCH_ITEMS", "500"))
+# Concurrent DescribeExecution calls while resolving the items' execution names.
+EXECUTION_LOOKUP_MAX_WORKERS = int(os.environ.get("EXECUTION_LOOKUP_MAX_WORKERS", "8"))
+
+ACCEPTED = "ACCEPTED"
+INVALID = "INVALID"
+DUPLICATE = "DUPLICATE"
+ALREADY_STARTED = "ALREADY_STARTED"
+
+
+def get_config():
+    required_vars = ["WORKMAIL_BATCH_STEPFUNCTION_ARN", "WORKMAIL_STEPFUNCTION_ARN"]
+    config = {}
+    for var in required_vars:
+        value = os.environ.get(var)
+        if not value:
+            raise EnvironmentError(
+                f"Environment variable {var} is required but not set."
+            )
+        config[var] = value
+    return config
+
+
+def parse_items(event: Dict[str, Any]) -> List[Any]:
+    """The request body: a JSON array of items, or an object with an "items" array."""
+    body = json.loads(event.get("body") or "null")
+    if isinstance(body, dict):
+        body = body.get("items")
+    if not isinstance(body, list) or not body:
+        raise ValueError("Request body must be a non-empty array of items")
+    if len(body) > MAX_BATCH_ITEMS:
+        raise ValueError(f"A batch may contain at most {MAX_BATCH_ITEMS} items")
+    return body
+
+
+def check_items(items: List[Any]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Validate every item in one pass with the compiled item schema.
+
+    Returns the accepted items (tagged with their index and workflow key) and
+    a status entry for every item. Repeats of a workflow key are rejected so
+    one request cannot start two workflows for the same domain.
+    """
+    validator = get_validator(SCHEMA_PATH)
+    accepted, statuses, seen = [], [], set()
+    for index, item in enumerate(items):
+        status = {"index": index}
+        try:
+            validator(item)
+        except JsonSchemaException as e:
+            statuses.append(dict(status, status=INVALID, error=e.message))
+            continue
+        status.update(contact_id=item["contact_id"], vanity_name=item["vanity_name"])
+        try:
+            key = workflow_key(item["contact_id"], item["vanity_name"])
+        except ValueError as e:
+            statuses.append(dict(status, status=INVALID, error=str(e)))
+            continue
+        if key in seen:
+            statuses.append(dict(status, status=DUPLICATE))
+            continue
+        seen.add(key)
+        accepted.append({"item_index": index, "key": key, "body": json.dumps(item)})
+        statuses.append(dict(status, status=ACCEPTED))
+    return accepted, statuses
+
+
+def name_executions(
+    accepted: List[Dict[str, Any]],
+    statuses: List[Dict[str, Any]],
+    sfn_client: Any,
+    config: Dict[str, str],
+) -> List[Dict[str, Any]]:
+    """
+    Give each accepted item the execution name the create endpoint would use.
+
+    Items whose workflow is already running (or recently succeeded) are marked
+    ALREADY_STARTED with that execution's ARN and left out of the batch, so a
+    retried or resubmitted batch does not provision the same domains again.
+    Returns the Map items for the batch state machine.
+    """
+
+    def resolve(item: Dict[str, Any]) -> Tuple[str, Any]:
+        return find_execution_name(
+            sfn_client,
+            config["WORKMAIL_STEPFUNCTION_ARN"],
+            execution_name(item["key"]),
+        )
+
+    with ThreadPoolExecutor(max_workers=EXECUTION_LOOKUP_MAX_WORKERS) as executor:
+        resolved = list(executor.map(resolve, accepted))
+    items = []
+    for item, (name, existing_arn) in zip(accepted, resolved):
+        status = statuses[item["item_index"]]
+        if existing_arn:
+            status.update(status=ALREADY_STARTED, executionArn=existing_arn)
+            continue
+        status["executionName"] = name
+        items.append(
+            {
+                "item_index": item["item_index"],
+                "execution_name": name,
+                "body": item["body"],
+            }
+        )
+    return items
+
+
+@instrumented_handler
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+
+    logger.info(f"Received event: {event}")
+
+    config = get_config()
+
+    try:
+        accepted, statuses = check_items(parse_items(event))
+        if not accepted:
+            return {
+                "statusCode": 400,
+                "body": json.dumps(
+                    {"message": "No valid items in batch", "items": statuses}
+                ),
+            }
+
+        sfn_client = get_aws_client("stepfunctions")
+        items = name_executions(accepted, statuses, sfn_client, config)
+        if not items:
+            return {
+                "statusCode": 200,
+                "body": json.dumps(
+                    {
+                        "message": "WorkMail creation workflows already started",
+                        "items": statuses,
+                    }
+                ),
+            }
+
+        batch_id = str(uuid.uuid4())
+        logger.info(f"Launching batch {batch_id} with {len(items)} item(s)")
+        response = sfn_client.start_execution(
+            stateMachineArn=config["WORKMAIL_BATCH_STEPFUNCTION_ARN"],
+            name=f"create_workmail_batch_{batch_id}",
+            input=json.dumps({"batch_id": batch_id, "items": items}),
+        )
+        logger.info(f"State machine response: {response}")
+        return {
+            "statusCode": 200,
+            "body": json.dumps(
+                {
+                    "message": "WorkMail batch creation workflow started",
+                    "batchId": batch_id,
+                    "executionArn": response["executionArn"],
+                    "items": statuses,
+                }
+            ),
+        }
+    except Exception as e:
+        return handle_error(e)
@@ -2,21 +2,63 @@
 import json
 import logging
 import os
-import socket
+import threading
+import time
 import uuid
-from typing import Dict, Any
-from urllib.parse import urlparse
-from workmail_common.utils import (
-    get_aws_client,
-    handle_error,
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from workmail_common.aws import get_aws_client
+from workmail_common.domain import workflow_key
+from workmail_common.errors import handle_error, is_throttling_error
+from workmail_common.executions import (
+    EXECUTION_NAME_PREFIX,
+    execution_name,
+    start_or_find_execution,
 )
+from workmail_common.instrumentation import instrumented_handler
+from workmail_common.polling import remaining_time_seconds
+from workmail_common.priming import prime
+from workmail_common.validation import validate
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "schemas/input_schema.json"
+)
+
+# INTAKE_MODE=direct starts the workflow from the API request. INTAKE_MODE=queue
+# validates the request, queues it and answers 202; queue_handler then starts
+# the workflows at INTAKE_EXECUTIONS_PER_SECOND.
+INTAKE_MODE_DIRECT = "direct"
+INTAKE_MODE_QUEUE = "queue"
+INTAKE_MODE = os.environ.get("INTAKE_MODE", INTAKE_MODE_DIRECT)
+INTAKE_EXECUTIONS_PER_SECOND = float(
+    os.environ.get("INTAKE_EXECUTIONS_PER_SECOND", "1")
+)
+# Queued requests not started with less than this left are handed back to SQS.
+INTAKE_TIME_RESERVE_SECONDS = float(os.environ.get("INTAKE_TIME_RESERVE_SECONDS", "10"))
+
+prime(
+    clients=["sqs" if INTAKE_MODE == INTAKE_MODE_QUEUE else "stepfunctions"],
+    schemas=[SCHEMA_PATH],
+)
+
+# Executions started (or found) by this container, by workflow key, so repeat
+# requests are answered without calling Step Functions.
+EXECUTION_CACHE_TTL_SECONDS = float(
+    os.environ.get("EXECUTION_CACHE_TTL_SECONDS", "300")
+)
+EXECUTION_CACHE_MAX_ENTRIES = int(os.environ.get("EXECUTION_CACHE_MAX_ENTRIES", "1024"))
+
+_executions: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+_executions_lock = threading.Lock()
+
 
 def get_config():
     required_vars = ["WORKMAIL_STEPFUNCTION_ARN"]
+    if INTAKE_MODE == INTAKE_MODE_QUEUE:
+        required_vars.append("WORKMAIL_CREATE_QUEUE_URL")
     config = {}
     for var in required_vars:
         value = os.environ.get(var)
@@ -28,34 +70,198 @@ def get_config():
     return config
 
 
-def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+def request_key(event: Dict[str, Any]) -> Optional[str]:
+    """The workflow key of a create request, or None if it has no usable body."""
+    try:
+        body = json.loads(event.get("body") or "null")
+        return workflow_key(body["contact_id"], body["vanity_name"])
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return None
 
-    logger.info(f"Received event: {event}")
 
-    config = get_config()
+def get_cached_execution(key: str) -> Optional[str]:
+    with _executions_lock:
+        cached = _executions.get(key)
+        if cached is None:
+            return None
+        arn, cached_at = cached
+        if time.monotonic() - cached_at >= EXECUTION_CACHE_TTL_SECONDS:
+            del _executions[key]
+            return None
+        _executions.move_to_end(key)
+        return arn
+
+
+def cache_execution(key: str, arn: str) -> None:
+    with _executions_lock:
+        _executions[key] = (arn, time.monotonic())
+        _executions.move_to_end(key)
+        while len(_executions) > EXECUTION_CACHE_MAX_ENTRIES:
+            _executions.popitem(last=False)
+
+
+def clear_execution_cache() -> None:
+    with _executions_lock:
+        _executions.clear()
+
+
+class ExecutionPacer:
+    """Spaces calls at least 1/rate seconds apart for the life of the container."""
+
+    def __init__(
+        self,
+        rate: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.interval = 1 / rate
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = self.clock()
+            if self._next > now:
+                self.sleep(self._next - now)
+                now = self._next
+            self._next = now + self.interval
+
+
+_pacer = ExecutionPacer(INTAKE_EXECUTIONS_PER_SECOND)
 
+
+def enqueue_request(event: Dict[str, Any], config: Dict[str, str]) -> Dict[str, Any]:
+    """Validate a create request and queue it for queue_handler."""
+    body = json.loads(event.get("body") or "null")
+    validate(body, SCHEMA_PATH)
+    key = workflow_key(body["contact_id"], body["vanity_name"])
+    arn = get_cached_execution(key)
+    if arn:
+        logger.info(f"Workflow {key} already started as {arn}")
+        return {
+            "statusCode": 200,
+            "body": json.dumps(
+                {
+                    "message": "WorkMail creation workflow already started",
+                    "executionArn": arn,
+                }
+            ),
+        }
+    sqs_client = get_aws_client("sqs")
+    response = sqs_client.send_message(
+        QueueUrl=config["WORKMAIL_CREATE_QUEUE_URL"],
+        MessageBody=json.dumps({"body": event["body"]}),
+    )
+    logger.info(f"Queued workflow {key} as message {response['MessageId']}")
+    return {
+        "statusCode": 202,
+        "body": json.dumps(
+            {
+                "message": "WorkMail creation request queued",
+                "executionName": execution_name(key),
+            }
+        ),
+    }
+
+
+def start_queued_request(
+    record: Dict[str, Any], sfn_client: Any, config: Dict[str, str]
+) -> None:
+    """Start (or find) the workflow for one queued request, at the paced rate."""
+    message = json.loads(record["body"])
+    key = request_key(message)
+    if key is None:
+        raise ValueError(f"Queued message {record['messageId']} has no valid body")
+    if get_cached_execution(key):
+        logger.info(f"Workflow {key} already started, dropping repeat")
+        return
+    _pacer.wait()
+    arn, started = start_or_find_execution(
+        sfn_client,
+        config["WORKMAIL_STEPFUNCTION_ARN"],
+        execution_name(key),
+        json.dumps(message),
+    )
+    cache_execution(key, arn)
+    logger.info(f"Workflow {key} {'started' if started else 'already started'}: {arn}")
+
+
+@instrumented_handler
+def queue_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+    """
+    SQS handler: start the queued workflows one at a time, paced.
+
+    Reports the messages it could not start as batch item failures so SQS
+    redelivers only those. After a throttling error, or once the invocation
+    is nearly out of time, the rest of the batch is handed back unstarted.
+    """
+    config = get_config()
     sfn_client = get_aws_client("stepfunctions")
+    records = event.get("Records", [])
+    failures: List[str] = []
+    for index, record in enumerate(records):
+        remaining = remaining_time_seconds(context)
+        if remaining is not None and remaining < INTAKE_TIME_RESERVE_SECONDS:
+            failures.extend(r["messageId"] for r in records[index:])
+            break
+        try:
+            start_queued_request(record, sfn_client, config)
+        except Exception as e:
+            logger.warning(f"Could not start queued message {record['messageId']}: {e}")
+            failures.append(record["messageId"])
+            if is_throttling_error(e):
+                failures.extend(r["messageId"] for r in records[index + 1 :])
+                break
+    if failures:
+        logger.info(f"Handing {len(failures)} of {len(records)} message(s) back")
+    return {"batchItemFailures": [{"itemIdentifier": item} for item in failures]}
 
-    service_ip = socket.gethostbyname(urlparse(sfn_client.meta.endpoint_url).hostname)
-    logger.info(f"Step Functions client at {service_ip}")
+
+@instrumented_handler
+def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
+
+    logger.info(f"Received event: {event}")
+
+    config = get_config()
 
     try:
-        logger.info(f"Launching state machine")
-        execution_name = f"create_workmail_workflow_{uuid.uuid4()}"
-        response = sfn_client.start_execution(
-            stateMachineArn=config["WORKMAIL_STEPFUNCTION_ARN"],
-            name=execution_name,
-            input=json.dumps(event),
-        )
-        logger.info(f"State machine response: {response}")
+        if INTAKE_MODE == INTAKE_MODE_QUEUE:
+            return enqueue_request(event, config)
+        key = request_key(event)
+        arn = get_cached_execution(key) if key else None
+        started = False
+        if arn:
+            logger.info(f"Workflow {key} already started as {arn}")
+        else:
+            logger.info(f"Launching state machine")
+            sfn_client = get_aws_client("stepfunctions")
+            name = (
+                execution_name(key)
+                if key
+                else f"{EXECUTION_NAME_PREFIX}_{uuid.uuid4()}"
+            )
+            arn, started = start_or_find_execution(
+                sfn_client,
+                config["WORKMAIL_STEPFUNCTION_ARN"],
+                name,
+                json.dumps(event),
+            )
+            if key:
+                cache_execution(key, arn)
         return {
             "statusCode": 200,
             "body": json.dumps(
                 {
-                    "message": "WorkMail creation workflow started",
-                    "executionArn": response["executionArn"],
+                    "message": (
+                        "WorkMail creation workflow started"
+                        if started
+                        else "WorkMail creation workflow already started"
+                    ),
+                    "executionArn": arn,
                 }
             ),
         }
     except Exception as e:
-        handle_error(e)
+        return handle_error(e)
@@ -0,0 +1,34 @@
+# Generated by scripts/compile_schemas.py from start_create_workmail_workflow_function/schemas/input_schema.json. Do not edit.
+SCHEMA_SHA256 = "c0f1a44745ad19cd1e98f7e9cbbc44a5356469b137d5cd90a3f0f8dbc9442f4e"
+VERSION = "2.21.1"
+from decimal import Decimal
+from fastjsonschema import JsonSchemaValueException
+
+
+NoneType = type(None)
+
+def validate(data, custom_formats={}, name_prefix=None):
+    if not isinstance(data, (dict)):
+        raise JsonSchemaValueException("" + (name_prefix or "data") + " must be object", value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'properties': {'contact_id': {'type': 'integer'}, 'email_username': {'type': 'string'}, 'vanity_name': {'type': 'string'}}, 'required': ['contact_id', 'email_username', 'vanity_name'], 'additionalProperties': True}, rule='type')
+    data_is_dict = isinstance(data, dict)
+    if data_is_dict:
+        data__missing_keys = set(['contact_id', 'email_username', 'vanity_name']) - data.keys()
+        if data__missing_keys:
+            raise JsonSchemaValueException("" + (name_prefix or "data") + " must contain " + (str(sorted(data__missing_keys)) + " properties"), value=data, name="" + (name_prefix or "data") + "", definition={'type': 'object', 'properties': {'contact_id': {'type': 'integer'}, 'email_username': {'type': 'string'}, 'vanity_name': {'type': 'string'}}, 'required': ['contact_id', 'email_username', 'vanity_name'], 'additionalProperties': True}, rule='required')
+        data_keys = set(data.keys())
+        if "contact_id" in data_keys:
+            data_keys.remove("contact_id")
+            data__contactid = data["contact_id"]
+            if not isinstance(data__contactid, (int)) and not (isinstance(data__contactid, float) and data__contactid.is_integer()) or isinstance(data__contactid, bool):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".contact_id must be integer", value=data__contactid, name="" + (name_prefix or "data") + ".contact_id", definition={'type': 'integer'}, rule='type')
+        if "email_username" in data_keys:
+            data_keys.remove("email_username")
+            data__emailusername = data["email_username"]
+            if not isinstance(data__emailusername, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".email_username must be string", value=data__emailusername, name="" + (name_prefix or "data") + ".email_username", definition={'type': 'string'}, rule='type')
+        if "vanity_name" in data_keys:
+            data_keys.remove("vanity_name")
+            data__vanityname = data["vanity_name"]
+            if not isinstance(data__vanityname, (str)):
+                raise JsonSchemaValueException("" + (name_prefix or "data") + ".vanity_name must be string", value=data__vanityname, name="" + (name_prefix or "data") + ".vanity_name", definition={'type': 'string'}, rule='type')
+    return data
\ No newline at end of file
@@ -0,0 +1,133 @@
+# tests/create_hosted_zone_function/unit/test_add_dns_records.py
+import unittest
+from unittest.mock import patch, MagicMock
+from botocore.exceptions import WaiterError
+from create_hosted_zone_function.app import (
+    ROUTE53_MAX_VALUE_CHARS_PER_BATCH,
+    add_dns_records,
+    build_record_changes,
+    chunk_changes,
+    wait_for_dns_changes,
+)
+
+DNS_RECORDS = [
+    {"Type": "TXT", "Hostname": "_amazonses.example.com.", "Value": "token"},
+    {"Type": "MX", "Hostname": "example.com.", "Value": "10 inbound-smtp"},
+    {"Type": "CNAME", "Hostname": "autodiscover.example.com.", "Value": "auto"},
+    {"Type": "CNAME", "Hostname": "a._domainkey.example.com.", "Value": "a.dkim"},
+    {"Type": "CNAME", "Hostname": "b._domainkey.example.com.", "Value": "b.dkim"},
+    {"Type": "CNAME", "Hostname": "c._domainkey.example.com.", "Value": "c.dkim"},
+    {"Type": "TXT", "Hostname": "example.com.", "Value": "v=spf1"},
+    {"Type": "TXT", "Hostname": "_dmarc.example.com.", "Value": "v=DMARC1"},
+]
+
+
+class TestAddDnsRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.route53_client = MagicMock()
+        self.route53_client.change_resource_record_sets.return_value = {
+            "ChangeInfo": {"Id": "/change/C123", "Status": "PENDING"}
+        }
+
+    def test_add_dns_records_single_change_batch(self):
+        # Act
+        change_ids = add_dns_records("Z123", DNS_RECORDS, self.route53_client)
+
+        # Assert
+        self.assertEqual(change_ids, ["/change/C123"])
+        self.route53_client.change_resource_record_sets.assert_called_once()
+        _, kwargs = self.route53_client.change_resource_record_sets.call_args
+        self.assertEqual(kwargs["HostedZoneId"], "Z123")
+        changes = kwargs["ChangeBatch"]["Changes"]
+        self.assertEqual(len(changes), len(DNS_RECORDS))
+        self.assertTrue(all(c["Action"] == "UPSERT" for c in changes))
+        self.assertEqual(
+            changes[0]["ResourceRecordSet"]["ResourceRecords"], [{"Value": '"token"'}]
+        )
+
+    def test_build_record_changes_merges_same_name_and_type(self):
+        # Arrange
+        records = [
+            {"Type": "TXT", "Hostname": "example.com.", "Value": "v=spf1"},
+            {"Type": "TXT", "Hostname": "example.com.", "Value": "verify"},
+            {"Type": "TXT", "Hostname": "example.com.", "Value": "verify"},
+        ]
+
+        # Act
+        changes = build_record_changes(records)
+
+        # Assert
+        self.assertEqual(len(changes), 1)
+        self.assertEqual(
+            changes[0]["ResourceRecordSet"]["ResourceRecords"],
+            [{"Value": '"v=spf1"'}, {"Value": '"verify"'}],
+        )
+
+    def test_chunk_changes_respects_value_character_limit(self):
+        # Arrange
+        value = "x" * (ROUTE53_MAX_VALUE_CHARS_PER_BATCH // 4)
+        records = [
+            {"Type": "TXT", "Hostname": f"r{i}.example.com.", "Value": value}
+            for i in range(3)
+        ]
+
+        # Act
+        batches = chunk_changes(build_record_changes(records))
+
+        # Assert
+        self.assertEqual([len(batch) for batch in batches], [1, 1, 1])
+
+    def test_add_dns_records_failure(self):
+        # Arrange
+        self.route53_client.change_resource_record_sets.side_effect = Exception(
+            "InvalidChangeBatch"
+        )
+
+        # Act & Assert
+        with self.assertRaises(Exception):
+            add_dns_records("Z123", DNS_RECORDS, self.route53_client)
+
+
+class TestWaitForDnsChanges(unittest.TestCase):
+
+    def setUp(self):
+        self.route53_client = MagicMock()
+        self.waiter = self.route53_client.get_waiter.return_value
+
+    def test_wait_for_dns_changes_insync(self):
+        # Act
+        result = wait_for_dns_changes(["/change/C123"], self.route53_client, 60)
+
+        # Assert
+        self.assertTrue(result)
+        self.route53_client.get_waiter.assert_called_once_with(
+            "resource_record_sets_changed"
+        )
+        _, kwargs = self.waiter.wait.call_args
+        self.assertEqual(kwargs["Id"], "/change/C123")
+        self.assertEqual(kwargs["WaiterConfig"]["MaxAttempts"], 11)
+
+    def test_wait_for_dns_changes_gives_up(self):
+        # Arrange
+        self.waiter.wait.side_effect = WaiterError(
+            "ResourceRecordSetsChanged", "Max attempts exceeded", {}
+        )
+
+        # Act
+        result = wait_for_dns_changes(["/change/C123"], self.route53_client, 60)
+
+        # Assert
+        self.assertFalse(result)
+
+    def test_wait_for_dns_changes_disabled(self):
+        # Act
+        result = wait_for_dns_changes(["/change/C123"], self.route53_client, 0)
+
+        # Assert
+        self.assertFalse(result)
+        self.route53_client.get_waiter.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# tests/create_hosted_zone_function/unit/test_create_hosted_zone.py
+import unittest
+from unittest.mock import MagicMock
+from botocore.exceptions import ClientError
+from create_hosted_zone_function.app import caller_reference, create_hosted_zone
+
+CONFIG = {
+    "VPC_ID": "vpc-123",
+    "VPC_REGION": "us-east-1",
+    "DELEGATION_SET_ID": "N123",
+}
+REFERENCE = caller_reference("1:example.com")
+
+
+def already_exists():
+    return ClientError(
+        {"Error": {"Code": "HostedZoneAlreadyExists", "Message": "exists"}},
+        "CreateHostedZone",
+    )
+
+
+class TestCreateHostedZone(unittest.TestCase):
+
+    def setUp(self):
+        self.route53_client = MagicMock()
+        self.route53_client.create_hosted_zone.return_value = {
+            "HostedZone": {"Id": "/hostedzone/Z123"}
+        }
+
+    def test_caller_reference_is_derived_from_the_workflow(self):
+        # Act & Assert
+        self.assertEqual(REFERENCE, caller_reference("1:example.com"))
+        self.assertNotEqual(REFERENCE, caller_reference("2:example.com"))
+        self.assertLessEqual(len(REFERENCE), 128)
+
+    def test_creates_zone_with_the_caller_reference(self):
+        # Act
+        hosted_zone_id = create_hosted_zone(
+            "example.com", self.route53_client, CONFIG, REFERENCE
+        )
+
+        # Assert
+        self.assertEqual(hosted_zone_id, "/hostedzone/Z123")
+        self.assertEqual(
+            self.route53_client.create_hosted_zone.call_args.kwargs["CallerReference"],
+            REFERENCE,
+        )
+
+    def test_retry_resumes_with_the_existing_zone(self):
+        # Arrange
+        self.route53_client.create_hosted_zone.side_effect = already_exists()
+        self.route53_client.list_hosted_zones_by_name.return_value = {
+            "HostedZones": [
+                {
+                    "Id": "/hostedzone/ZOTHER",
+                    "Name": "example.com.",
+                    "CallerReference": "other",
+                },
+                {
+                    "Id": "/hostedzone/Z123",
+                    "Name": "example.com.",
+                    "CallerReference": REFERENCE,
+                },
+            ]
+        }
+
+        # Act
+        hosted_zone_id = create_hosted_zone(
+            "example.com", self.route53_client, CONFIG, REFERENCE
+        )
+
+        # Assert
+        self.assertEqual(hosted_zone_id, "/hostedzone/Z123")
+        self.route53_client.create_hosted_zone.assert_called_once()
+
+    def test_deleted_zone_is_followed_by_a_new_reference(self):
+        # Arrange
+        self.route53_client.create_hosted_zone.side_effect = [
+            already_exists(),
+            {"HostedZone": {"Id": "/hostedzone/Z456"}},
+        ]
+        self.route53_client.list_hosted_zones_by_name.return_value = {"HostedZones": []}
+
+        # Act
+        hosted_zone_id = create_hosted_zone(
+            "example.com", self.route53_client, CONFIG, REFERENCE
+        )
+
+        # Assert
+        self.assertEqual(hosted_zone_id, "/hostedzone/Z456")
+        retried = self.route53_client.create_hosted_zone.call_args.kwargs
+        self.assertTrue(retried["CallerReference"].startswith(f"{REFERENCE}-"))
+
+
+if __name__ == "__main__":
+    unittest.main()
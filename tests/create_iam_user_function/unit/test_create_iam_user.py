@@ -0,0 +1,64 @@
+# tests/create_iam_user_function/unit/test_create_iam_user.py
+import unittest
+from unittest.mock import patch, MagicMock
+from botocore.exceptions import ClientError
+from create_iam_user_function.app import create_iam_user
+
+CONFIG = {"DB_BACKEND": "data-api"}
+
+
+@patch("create_iam_user_function.app.enqueue_keap_note")
+@patch("create_iam_user_function.app.db_connection")
+class TestCreateIamUser(unittest.TestCase):
+
+    def setUp(self):
+        self.iam = MagicMock()
+        self.iam.create_user.return_value = {"User": {"UserName": "workmail_a.com"}}
+        self.iam.create_access_key.return_value = {
+            "AccessKey": {"AccessKeyId": "AKIANEW", "SecretAccessKey": "secret"}
+        }
+
+    def test_creates_user_and_sends_its_key(self, mock_db_connection, mock_enqueue):
+        # Act
+        result = create_iam_user(1, "a.com", self.iam, CONFIG)
+
+        # Assert
+        self.assertEqual(result["apiKey"], "AKIANEW")
+        self.iam.list_access_keys.assert_not_called()
+        mock_enqueue.assert_called_once()
+
+    def test_existing_user_is_resumed(self, mock_db_connection, mock_enqueue):
+        # Arrange
+        self.iam.create_user.side_effect = ClientError(
+            {"Error": {"Code": "EntityAlreadyExists", "Message": "exists"}},
+            "CreateUser",
+        )
+        self.iam.list_access_keys.return_value = {
+            "AccessKeyMetadata": [{"AccessKeyId": "AKIAOLD"}]
+        }
+
+        # Act
+        result = create_iam_user(1, "a.com", self.iam, CONFIG)
+
+        # Assert
+        self.assertEqual(result["apiKey"], "AKIANEW")
+        self.iam.delete_access_key.assert_called_once_with(
+            UserName="workmail_a.com", AccessKeyId="AKIAOLD"
+        )
+        self.iam.put_user_policy.assert_called_once()
+        mock_enqueue.assert_called_once()
+
+    def test_other_errors_are_raised(self, mock_db_connection, mock_enqueue):
+        # Arrange
+        self.iam.create_user.side_effect = ClientError(
+            {"Error": {"Code": "LimitExceeded", "Message": "limit"}}, "CreateUser"
+        )
+
+        # Act & Assert
+        with self.assertRaises(ClientError):
+            create_iam_user(1, "a.com", self.iam, CONFIG)
+        mock_enqueue.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,11 +2,12 @@
 import unittest
 from unittest.mock import patch, MagicMock
 from create_workmail_org_function.app import create_workmail_org
+from workmail_common.polling import PollTimeoutError
 
 
 class TestCreateWorkmailOrg(unittest.TestCase):
 
-    @patch("create_workmail_org_function.app.time.sleep", return_value=None)
+    @patch("workmail_common.polling.time.sleep", return_value=None)
     @patch(
         "create_workmail_org_function.app.uuid.uuid4", return_value="test-client-token"
     )
@@ -40,7 +41,7 @@ class TestCreateWorkmailOrg(unittest.TestCase):
             DomainName="test-vanity",
         )
 
-    @patch("create_workmail_org_function.app.time.sleep", return_value=None)
+    @patch("workmail_common.polling.time.sleep", return_value=None)
     @patch(
         "create_workmail_org_function.app.uuid.uuid4", return_value="test-client-token"
     )
@@ -72,38 +73,69 @@ class TestCreateWorkmailOrg(unittest.TestCase):
         )
         self.assertEqual(mock_workmail_client.describe_organization.call_count, 2)
 
-    @patch("create_workmail_org_function.app.time.sleep", return_value=None)
+    @patch("workmail_common.polling.time.sleep", return_value=None)
     @patch(
         "create_workmail_org_function.app.uuid.uuid4", return_value="test-client-token"
     )
     def test_create_workmail_org_timeout(self, mock_uuid, mock_sleep):
         # Arrange
+        clock = [0.0]
+        mock_sleep.side_effect = lambda seconds: clock.__setitem__(
+            0, clock[0] + seconds
+        )
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 35000
         mock_workmail_client = MagicMock()
         mock_workmail_client.create_organization.return_value = {
             "OrganizationId": "test-org-id"
         }
-        mock_workmail_client.describe_organization.side_effect = [
-            {"State": "PENDING"}
-        ] * 12  # Ensure enough items
+        mock_workmail_client.describe_organization.return_value = {"State": "PENDING"}
 
         # Act & Assert
-        with self.assertRaises(ValueError) as context:
-            create_workmail_org(
-                organization_name="test-org",
-                vanity_name="test-vanity",
-                workmail_client=mock_workmail_client,
-            )
+        with patch(
+            "workmail_common.polling.time.monotonic", side_effect=lambda: clock[0]
+        ):
+            with self.assertRaises(PollTimeoutError) as context_manager:
+                create_workmail_org(
+                    organization_name="test-org",
+                    vanity_name="test-vanity",
+                    workmail_client=mock_workmail_client,
+                    context=context,
+                )
 
         self.assertEqual(
-            str(context.exception),
-            "Organization test-org-id took too long to become Active",
+            context_manager.exception.resume_state,
+            {"organization_id": "test-org-id", "client_token": "test-client-token"},
         )
+        self.assertAlmostEqual(clock[0], 30.0)
         mock_workmail_client.create_organization.assert_called_once_with(
             Alias="test-org", ClientToken="test-client-token"
         )
-        self.assertEqual(mock_workmail_client.describe_organization.call_count, 12)
+        mock_workmail_client.register_mail_domain.assert_not_called()
+
+    @patch("workmail_common.polling.time.sleep", return_value=None)
+    def test_create_workmail_org_resumes_with_client_token(self, mock_sleep):
+        # Arrange
+        mock_workmail_client = MagicMock()
+        mock_workmail_client.create_organization.return_value = {
+            "OrganizationId": "test-org-id"
+        }
+        mock_workmail_client.describe_organization.return_value = {"State": "ACTIVE"}
+
+        # Act
+        create_workmail_org(
+            organization_name="test-org",
+            vanity_name="test-vanity",
+            workmail_client=mock_workmail_client,
+            client_token="execution-name",
+        )
+
+        # Assert
+        mock_workmail_client.create_organization.assert_called_once_with(
+            Alias="test-org", ClientToken="execution-name"
+        )
 
-    @patch("create_workmail_org_function.app.time.sleep", return_value=None)
+    @patch("workmail_common.polling.time.sleep", return_value=None)
     @patch(
         "create_workmail_org_function.app.uuid.uuid4", return_value="test-client-token"
     )
@@ -1,36 +1,42 @@
 # tests/create_workmail_org_function/unit/test_lambda_handler.py
 import unittest
 import json
+from contextlib import contextmanager
 from unittest.mock import patch, MagicMock
-from create_workmail_org_function.app import lambda_handler
+from create_workmail_org_function.app import lambda_handler, provision_workmail_org
+
+
+def run_uncheckpointed(config, key, step, run, *args, **kwargs):
+    return run()
 
 
 class TestLambdaHandler(unittest.TestCase):
 
-    @patch("create_workmail_org_function.app.keap_contact_add_to_group_via_proxy")
-    @patch("create_workmail_org_function.app.keap_contact_create_note_via_proxy")
+    @patch(
+        "create_workmail_org_function.app.run_checkpointed",
+        side_effect=run_uncheckpointed,
+    )
     @patch("create_workmail_org_function.app.prepare_keap_updates")
     @patch("create_workmail_org_function.app.get_dns_records")
     @patch("create_workmail_org_function.app.register_workmail_organization")
     @patch("create_workmail_org_function.app.create_workmail_org")
     @patch("create_workmail_org_function.app.get_client_info")
     @patch("create_workmail_org_function.app.process_input")
-    @patch("create_workmail_org_function.app.connect_to_rds")
+    @patch("create_workmail_org_function.app.db_connection")
     @patch("create_workmail_org_function.app.get_aws_clients")
     @patch("create_workmail_org_function.app.get_config")
     def test_lambda_handler_success(
         self,
         mock_get_config,
         mock_get_aws_clients,
-        mock_connect_to_rds,
+        mock_db_connection,
         mock_process_input,
         mock_get_client_info,
         mock_create_workmail_org,
         mock_register_workmail_organization,
         mock_get_dns_records,
         mock_prepare_keap_updates,
-        mock_keap_contact_create_note_via_proxy,
-        mock_keap_contact_add_to_group_via_proxy,
+        mock_run_checkpointed,
     ):
         # Arrange
         event = {
@@ -50,7 +56,7 @@ class TestLambdaHandler(unittest.TestCase):
             "workmail_client": MagicMock(),
             "secretsmanager_client": MagicMock(),
         }
-        mock_connect_to_rds.return_value = MagicMock()
+        mock_db_connection.return_value = MagicMock()
         mock_process_input.return_value = json.loads(event["body"])
         mock_get_client_info.return_value = ("John", "Doe")
         mock_create_workmail_org.return_value = {"organization_id": "test-org-id"}
@@ -75,31 +81,28 @@ class TestLambdaHandler(unittest.TestCase):
         self.assertEqual(result["email_address"], "testuser@example.com")
         self.assertEqual(result["first_name"], "John")
         self.assertEqual(result["last_name"], "Doe")
+        self.assertEqual(mock_run_checkpointed.call_args[0][1], "1:test-vanity")
 
-    @patch("create_workmail_org_function.app.keap_contact_add_to_group_via_proxy")
-    @patch("create_workmail_org_function.app.keap_contact_create_note_via_proxy")
     @patch("create_workmail_org_function.app.prepare_keap_updates")
     @patch("create_workmail_org_function.app.get_dns_records")
     @patch("create_workmail_org_function.app.register_workmail_organization")
     @patch("create_workmail_org_function.app.create_workmail_org")
     @patch("create_workmail_org_function.app.get_client_info")
     @patch("create_workmail_org_function.app.process_input")
-    @patch("create_workmail_org_function.app.connect_to_rds")
+    @patch("create_workmail_org_function.app.db_connection")
     @patch("create_workmail_org_function.app.get_aws_clients")
     @patch("create_workmail_org_function.app.get_config")
     def test_lambda_handler_exception(
         self,
         mock_get_config,
         mock_get_aws_clients,
-        mock_connect_to_rds,
+        mock_db_connection,
         mock_process_input,
         mock_get_client_info,
         mock_create_workmail_org,
         mock_register_workmail_organization,
         mock_get_dns_records,
         mock_prepare_keap_updates,
-        mock_keap_contact_create_note_via_proxy,
-        mock_keap_contact_add_to_group_via_proxy,
     ):
         # Arrange
         event = {
@@ -119,7 +122,7 @@ class TestLambdaHandler(unittest.TestCase):
             "workmail_client": MagicMock(),
             "secretsmanager_client": MagicMock(),
         }
-        mock_connect_to_rds.return_value = MagicMock()
+        mock_db_connection.return_value = MagicMock()
         exception = Exception("Test exception")
         mock_process_input.side_effect = exception
 
@@ -129,6 +132,59 @@ class TestLambdaHandler(unittest.TestCase):
 
         self.assertEqual(str(context_manager.exception), "Test exception")
 
+    @patch("create_workmail_org_function.app.get_dns_records", return_value=[])
+    @patch("create_workmail_org_function.app.register_workmail_organization")
+    @patch("create_workmail_org_function.app.create_workmail_org")
+    @patch(
+        "create_workmail_org_function.app.get_client_info",
+        return_value=("John", "Doe"),
+    )
+    @patch("create_workmail_org_function.app.db_connection")
+    def test_provision_releases_connection_while_organization_activates(
+        self,
+        mock_db_connection,
+        mock_get_client_info,
+        mock_create_workmail_org,
+        mock_register_workmail_organization,
+        mock_get_dns_records,
+    ):
+        # Arrange
+        checked_out, held_during_activation = [], []
+
+        @contextmanager
+        def connection(*args):
+            checked_out.append(True)
+            try:
+                yield MagicMock()
+            finally:
+                checked_out.pop()
+
+        mock_db_connection.side_effect = connection
+        mock_create_workmail_org.side_effect = lambda *args, **kwargs: (
+            held_during_activation.append(len(checked_out))
+            or {"organization_id": "test-org-id"}
+        )
+        clean_input = {
+            "contact_id": 1,
+            "vanity_name": "test-vanity",
+            "organization_name": "test-org",
+            "email_username": "testuser",
+            "email_address": "testuser@example.com",
+        }
+
+        # Act
+        result = provision_workmail_org(
+            clean_input,
+            {"KEAP_TAG_PENDING": "7"},
+            {"workmail_client": MagicMock(), "secretsmanager_client": MagicMock()},
+        )
+
+        # Assert
+        self.assertEqual(result["organization_id"], "test-org-id")
+        self.assertEqual(held_during_activation, [0])
+        self.assertEqual(mock_db_connection.call_count, 2)
+        mock_register_workmail_organization.assert_called_once()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,6 +1,6 @@
 # tests/create_workmail_org_function/unit/test_register_workmail_organization.py
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import patch, MagicMock
 from create_workmail_org_function.app import register_workmail_organization
 
 
@@ -10,6 +10,7 @@ class TestRegisterWorkmailOrganization(unittest.TestCase):
         # Arrange
         mock_connection = MagicMock()
         mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = None
         mock_connection.cursor.return_value = mock_cursor
 
         # Act
@@ -22,13 +23,38 @@ class TestRegisterWorkmailOrganization(unittest.TestCase):
         )
 
         # Assert
-        mock_cursor.execute.assert_called_once_with(
+        mock_cursor.execute.assert_called_with(
             """INSERT INTO workmail_organizations (ownerid, email_username, vanity_name, organization_id, state) VALUES (%s, %s, %s, %s, %s)""",
             (1, "testuser", "testvanity", "test-org-id", "PENDING"),
         )
         mock_connection.commit.assert_called_once()
         mock_cursor.close.assert_called_once()
 
+    @patch("create_workmail_org_function.app.enqueue_keap_tag")
+    def test_registered_organization_is_not_registered_again(self, mock_enqueue):
+        # Arrange
+        mock_connection = MagicMock()
+        mock_cursor = MagicMock()
+        mock_cursor.fetchone.return_value = (1,)
+        mock_connection.cursor.return_value = mock_cursor
+
+        # Act
+        register_workmail_organization(
+            ownerid=1,
+            email_username="testuser",
+            vanity_name="testvanity",
+            organization_id="test-org-id",
+            connection=mock_connection,
+            pending_tag_id=7,
+        )
+
+        # Assert
+        mock_cursor.execute.assert_called_once()
+        self.assertNotIn("INSERT", mock_cursor.execute.call_args.args[0])
+        mock_enqueue.assert_not_called()
+        mock_connection.commit.assert_not_called()
+        mock_cursor.close.assert_called_once()
+
     def test_register_workmail_organization_exception(self):
         # Arrange
         mock_connection = MagicMock()
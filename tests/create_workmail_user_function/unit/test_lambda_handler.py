@@ -4,24 +4,31 @@ from unittest.mock import patch, MagicMock
 from create_workmail_user_function.app import lambda_handler
 
 
+def run_uncheckpointed(config, key, step, run, *args, **kwargs):
+    return run()
+
+
 class TestLambdaHandler(unittest.TestCase):
 
+    @patch(
+        "create_workmail_user_function.app.run_checkpointed",
+        side_effect=run_uncheckpointed,
+    )
     @patch("create_workmail_user_function.app.get_config")
     @patch("create_workmail_user_function.app.validate")
     @patch("create_workmail_user_function.app.generate_random_password")
     @patch("create_workmail_user_function.app.get_aws_client")
-    @patch("create_workmail_user_function.app.connect_to_rds")
+    @patch("create_workmail_user_function.app.db_connection")
     @patch("create_workmail_user_function.app.update_workmail_registration")
-    @patch("create_workmail_user_function.app.keap_contact_create_note_via_proxy")
     def test_lambda_handler_success(
         self,
-        mock_keap_contact_create_note_via_proxy,
         mock_update_workmail_registration,
-        mock_connect_to_rds,
+        mock_db_connection,
         mock_get_aws_client,
         mock_generate_random_password,
         mock_validate,
         mock_get_config,
+        mock_run_checkpointed,
     ):
         # Mocking the configuration
         mock_get_config.return_value = {
@@ -57,6 +64,7 @@ class TestLambdaHandler(unittest.TestCase):
             "organization_id": "org-id",
             "organization_name": "example",
             "email_username": "user",
+            "vanity_name": "example.com",
             "email_address": "user@example.com",
             "first_name": "First",
             "last_name": "Last",
@@ -67,13 +75,72 @@ class TestLambdaHandler(unittest.TestCase):
         response = lambda_handler(event, context)
 
         # Assertions
-        self.assertEqual(response, {"userCreated": True})
+        self.assertEqual(response, {"userCreated": True, "user_id": "user-id"})
         mock_validate.assert_called_once()
         mock_generate_random_password.assert_called_once()
         mock_workmail_client.create_user.assert_called_once()
         mock_workmail_client.register_to_work_mail.assert_called_once()
-        mock_keap_contact_create_note_via_proxy.assert_called_once()
         mock_update_workmail_registration.assert_called_once()
+        self.assertIn(
+            "API7", mock_update_workmail_registration.call_args.kwargs["credentials"]
+        )
+
+    @patch("create_workmail_user_function.app.run_checkpointed")
+    @patch("create_workmail_user_function.app.get_config")
+    @patch("create_workmail_user_function.app.validate")
+    @patch("create_workmail_user_function.app.generate_random_password")
+    @patch("create_workmail_user_function.app.get_aws_client")
+    @patch("create_workmail_user_function.app.db_connection")
+    @patch("create_workmail_user_function.app.update_workmail_registration")
+    def test_lambda_handler_resumes_existing_mailbox(
+        self,
+        mock_update_workmail_registration,
+        mock_db_connection,
+        mock_get_aws_client,
+        mock_generate_random_password,
+        mock_validate,
+        mock_get_config,
+        mock_run_checkpointed,
+    ):
+        # Arrange
+        mock_get_config.return_value = {"KEAP_TAG_COMPLETE": "12345"}
+        mock_validate.return_value = True
+        mock_generate_random_password.return_value = "RandomPassword123!"
+        mock_workmail_client = MagicMock()
+        mock_get_aws_client.return_value = mock_workmail_client
+
+        def run_checkpointed(config, key, step, run, *args, **kwargs):
+            # An earlier attempt created the mailbox, then failed.
+            if step == "create_workmail_user.mailbox":
+                return {"user_id": "user-id"}
+            return run()
+
+        mock_run_checkpointed.side_effect = run_checkpointed
+        event = {
+            "contact_id": 1,
+            "organization_id": "org-id",
+            "organization_name": "example",
+            "email_username": "user",
+            "vanity_name": "example.com",
+            "email_address": "user@example.com",
+            "first_name": "First",
+            "last_name": "Last",
+        }
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        self.assertEqual(response, {"userCreated": True, "user_id": "user-id"})
+        mock_workmail_client.create_user.assert_not_called()
+        mock_workmail_client.register_to_work_mail.assert_not_called()
+        mock_workmail_client.reset_password.assert_called_once_with(
+            OrganizationId="org-id", UserId="user-id", Password="RandomPassword123!"
+        )
+        mock_update_workmail_registration.assert_called_once()
+        call_kwargs = mock_update_workmail_registration.call_args.kwargs
+        self.assertEqual(call_kwargs["credentials"]["API7"], "RandomPassword123!")
+        self.assertEqual(call_kwargs["complete_tag_id"], 12345)
 
     @patch("create_workmail_user_function.app.get_config")
     @patch("create_workmail_user_function.app.validate")
@@ -0,0 +1,272 @@
+# tests/delete_workmail_org_function/unit/test_cancel_batch.py
+import json
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from delete_workmail_org_function.app import MAX_BATCH_ITEMS, lambda_handler
+from tests.workmail_common.rds_data_stub import SqliteRdsDataClient
+
+ENVIRONMENT = {
+    "DB_BACKEND": "data-api",
+    "DB_SECRET_ARN": "arn:aws:secretsmanager:region:account-id:secret:secret-id",
+    "DB_CLUSTER_ARN": "arn:aws:rds:region:account-id:cluster:cluster-id",
+    "DATABASE_NAME": "test_db",
+    "SNS_BOUNCE_ARN": "arn:aws:sns:region:account-id:bounce",
+    "SNS_COMPLAINT_ARN": "arn:aws:sns:region:account-id:complaint",
+    "SNS_DELIVERY_ARN": "arn:aws:sns:region:account-id:delivery",
+    "KEAP_TAG_CANCEL": "99",
+    "KEAP_BASE_URL": "https://keap.example.com",
+    "PROXY_ENDPOINT": "https://proxy.example.com",
+    "PROXY_ENDPOINT_HOST": "proxy.example.com",
+}
+
+
+def batch_event(items):
+    return {"routeKey": "POST /workmail/cancel/batch", "body": json.dumps(items)}
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+class TestCancelBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.rds_data = SqliteRdsDataClient()
+        for ownerid, domain in ((1, "one.com"), (2, "two.com"), (3, "three.com")):
+            self.rds_data.rows(
+                "INSERT INTO workmail_organizations (ownerid, email_username, vanity_name, organization_id, state) VALUES (?, ?, ?, ?, ?)",
+                (ownerid, "john", domain, f"org-{ownerid}", "ACTIVE"),
+            )
+            self.rds_data.rows(
+                "INSERT INTO workmail_workflow_checkpoints (workflow_key, step, output) VALUES (?, ?, ?)",
+                (f"{ownerid}:{domain}", "create_workmail_org", "{}"),
+            )
+        self.workmail_client = MagicMock()
+        self.workmail_client.delete_organization.side_effect = lambda **kwargs: {
+            "OrganizationId": kwargs["OrganizationId"],
+            "State": "Deleting",
+        }
+        patchers = [
+            patch("workmail_common.aws.get_aws_client", return_value=self.rds_data),
+            patch(
+                "delete_workmail_org_function.app.get_aws_clients",
+                return_value={
+                    "workmail_client": self.workmail_client,
+                    "secretsmanager_client": MagicMock(),
+                    "route53_client": MagicMock(
+                        **{
+                            "list_hosted_zones_by_name.return_value": {
+                                "HostedZones": [],
+                                "IsTruncated": False,
+                            }
+                        }
+                    ),
+                    "iam_client": MagicMock(),
+                    "ses_client": MagicMock(),
+                },
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def queued_tags(self):
+        return self.rds_data.rows(
+            "SELECT kind, contact_id, tag_id FROM keap_outbox ORDER BY contact_id"
+        )
+
+    def statements(self):
+        return [
+            kwargs["sql"]
+            for name, kwargs in self.rds_data.calls
+            if name == "execute_statement"
+        ]
+
+    def test_cancel_batch_success(self):
+        # Arrange
+        items = [
+            {"contact_id": 1, "vanity_name": "one.com"},
+            {"contact_id": 2, "vanity_name": "two.com"},
+        ]
+
+        # Act
+        response = lambda_handler(batch_event(items), {})
+
+        # Assert
+        self.assertEqual(response["statusCode"], 200)
+        report = json.loads(response["body"])["items"]
+        self.assertEqual([item["status"] for item in report], ["DELETED", "DELETED"])
+        self.assertTrue(
+            all(item["tag_queued"] and item["unregistered"] for item in report)
+        )
+        self.assertEqual(
+            self.queued_tags(), [("apply_tag", 1, 99), ("apply_tag", 2, 99)]
+        )
+        self.assertEqual(
+            self.rds_data.rows("SELECT organization_id FROM workmail_organizations"),
+            [("org-3",)],
+        )
+        statements = self.statements()
+        self.assertIn("IN ((:p0, :p1), (:p2, :p3))", statements[0])
+        # Each organization is unregistered on its own as its teardown finishes.
+        self.assertEqual(
+            len(
+                [
+                    sql
+                    for sql in statements
+                    if sql.startswith("DELETE FROM workmail_organizations")
+                ]
+            ),
+            2,
+        )
+        self.assertEqual(
+            self.rds_data.rows(
+                "SELECT workflow_key FROM workmail_workflow_checkpoints"
+            ),
+            [("3:three.com",)],
+        )
+
+    def test_cancel_batch_reports_each_item(self):
+        # Arrange
+        self.workmail_client.delete_organization.side_effect = lambda **kwargs: (
+            (_ for _ in ()).throw(Exception("ResourceNotFound"))
+            if kwargs["OrganizationId"] == "org-2"
+            else {"OrganizationId": kwargs["OrganizationId"], "State": "Deleting"}
+        )
+        items = [
+            {"contact_id": 1, "vanity_name": "one.com"},
+            {"contact_id": 2, "vanity_name": "two.com"},
+            {"contact_id": 4, "vanity_name": "four.com"},
+            {"contact_id": "x"},
+            {"contact_id": 1, "vanity_name": "one.com"},
+        ]
+
+        # Act
+        response = lambda_handler(batch_event(items), {})
+
+        # Assert
+        report = json.loads(response["body"])["items"]
+        self.assertEqual(
+            [item["status"] for item in report],
+            ["DELETED", "FAILED", "NOT_FOUND", "INVALID", "DUPLICATE"],
+        )
+        self.assertEqual(self.queued_tags(), [("apply_tag", 1, 99)])
+        self.assertEqual(
+            self.rds_data.rows(
+                "SELECT organization_id FROM workmail_organizations ORDER BY organization_id"
+            ),
+            [("org-2",), ("org-3",)],
+        )
+
+    @patch("delete_workmail_org_function.app.CANCEL_MAX_CONCURRENCY", 2)
+    def test_cancel_batch_bounds_concurrency(self):
+        # Arrange
+        lock = threading.Lock()
+        active = [0, 0]
+
+        def delete_organization(**kwargs):
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return {"OrganizationId": kwargs["OrganizationId"], "State": "Deleting"}
+
+        self.workmail_client.delete_organization.side_effect = delete_organization
+        items = [
+            {"contact_id": i, "vanity_name": d}
+            for i, d in ((1, "one.com"), (2, "two.com"), (3, "three.com"))
+        ]
+
+        # Act
+        lambda_handler(batch_event(items), {})
+
+        # Assert
+        self.assertEqual(active[1], 2)
+
+    def test_cancel_batch_queues_tag_only_with_unregister(self):
+        # Arrange
+        self.rds_data.db.execute(
+            "CREATE TRIGGER no_deletes BEFORE DELETE ON workmail_organizations "
+            "BEGIN SELECT RAISE(ABORT, 'Database unavailable'); END"
+        )
+
+        # Act
+        response = lambda_handler(
+            batch_event([{"contact_id": 1, "vanity_name": "one.com"}]), {}
+        )
+
+        # Assert
+        report = json.loads(response["body"])["items"]
+        self.assertEqual(report[0]["status"], "DELETED")
+        self.assertFalse(report[0]["tag_queued"])
+        self.assertFalse(report[0]["unregistered"])
+        self.assertEqual(self.queued_tags(), [])
+
+    def test_cancel_batch_unregisters_each_organization_as_it_finishes(self):
+        # Arrange
+        registered_during_teardown = []
+
+        def delete_organization(**kwargs):
+            registered_during_teardown.append(
+                self.rds_data.rows(
+                    "SELECT organization_id FROM workmail_organizations ORDER BY organization_id"
+                )
+            )
+            if kwargs["OrganizationId"] == "org-2":
+                raise RuntimeError("Task timed out")
+            return {"OrganizationId": kwargs["OrganizationId"], "State": "Deleting"}
+
+        self.workmail_client.delete_organization.side_effect = delete_organization
+        items = [
+            {"contact_id": 1, "vanity_name": "one.com"},
+            {"contact_id": 2, "vanity_name": "two.com"},
+        ]
+
+        # Act
+        with patch("delete_workmail_org_function.app.CANCEL_MAX_CONCURRENCY", 1):
+            response = lambda_handler(batch_event(items), {})
+
+        # Assert
+        report = json.loads(response["body"])["items"]
+        self.assertEqual([item["status"] for item in report], ["DELETED", "FAILED"])
+        self.assertEqual(registered_during_teardown[1], [("org-2",), ("org-3",)])
+        self.assertEqual(self.queued_tags(), [("apply_tag", 1, 99)])
+
+    @patch("delete_workmail_org_function.app.CANCEL_BATCH_TIME_BUDGET_SECONDS", 0)
+    def test_cancel_batch_leaves_items_past_the_time_budget(self):
+        # Act
+        response = lambda_handler(
+            batch_event([{"contact_id": 1, "vanity_name": "one.com"}]), {}
+        )
+
+        # Assert
+        report = json.loads(response["body"])["items"]
+        self.assertEqual(report[0]["status"], "NOT_STARTED")
+        self.workmail_client.delete_organization.assert_not_called()
+        self.assertEqual(
+            len(self.rds_data.rows("SELECT * FROM workmail_organizations")), 3
+        )
+
+    def test_cancel_batch_rejects_oversized_batch(self):
+        # Arrange
+        items = [{"contact_id": 1, "vanity_name": "one.com"}] * (MAX_BATCH_ITEMS + 1)
+
+        # Act
+        response = lambda_handler(batch_event(items), {})
+
+        # Assert
+        self.assertEqual(response["statusCode"], 400)
+        self.workmail_client.delete_organization.assert_not_called()
+
+    def test_cancel_batch_rejects_empty_body(self):
+        # Act
+        response = lambda_handler(batch_event([]), {})
+
+        # Assert
+        self.assertEqual(response["statusCode"], 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,435 @@
+# tests/delete_workmail_org_function/unit/test_teardown_workmail_stack.py
+import json
+import os
+import threading
+import time
+import unittest
+from unittest.mock import patch, MagicMock
+from botocore.exceptions import ClientError
+from delete_workmail_org_function.app import (
+    ROUTE53_MAX_CHANGES_PER_BATCH,
+    delete_record_sets,
+    lambda_handler,
+    run_teardown,
+    summarize_teardown,
+    teardown_workmail_stack,
+)
+
+
+def paginated(client, pages):
+    def get_paginator(operation):
+        paginator = MagicMock()
+        paginator.paginate.return_value = pages.get(operation, [])
+        return paginator
+
+    client.get_paginator.side_effect = get_paginator
+
+
+def not_found(code):
+    return ClientError({"Error": {"Code": code, "Message": "Not found"}}, "operation")
+
+
+class TestTeardownWorkmailStack(unittest.TestCase):
+
+    def setUp(self):
+        self.log = []
+        self.lock = threading.Lock()
+        self.workmail_client = self.recording(MagicMock(), "workmail")
+        self.route53_client = self.recording(MagicMock(), "route53")
+        self.iam_client = self.recording(MagicMock(), "iam")
+        self.ses_client = self.recording(MagicMock(), "ses")
+        self.aws_clients = {
+            "workmail_client": self.workmail_client,
+            "route53_client": self.route53_client,
+            "iam_client": self.iam_client,
+            "ses_client": self.ses_client,
+        }
+        paginated(
+            self.workmail_client,
+            {
+                "list_users": [
+                    {
+                        "Users": [
+                            {"Id": "u-1", "State": "ENABLED", "UserRole": "USER"},
+                            {"Id": "u-2", "State": "DISABLED", "UserRole": "USER"},
+                        ]
+                    },
+                    {
+                        "Users": [
+                            {"Id": "u-3", "State": "DELETED", "UserRole": "USER"},
+                            {
+                                "Id": "u-4",
+                                "State": "ENABLED",
+                                "UserRole": "SYSTEM_USER",
+                            },
+                        ]
+                    },
+                ]
+            },
+        )
+        self.workmail_client.delete_organization.return_value = {
+            "OrganizationId": "org-id",
+            "State": "Deleting",
+        }
+        self.route53_client.list_hosted_zones_by_name.return_value = {
+            "HostedZones": [
+                {
+                    "Id": "/hostedzone/Z1",
+                    "Name": "example.com.",
+                    "Config": {"Comment": "WorkMail domain"},
+                },
+                {
+                    "Id": "/hostedzone/Z2",
+                    "Name": "example.com.",
+                    "Config": {"Comment": "Managed elsewhere"},
+                },
+                {
+                    "Id": "/hostedzone/Z3",
+                    "Name": "example.net.",
+                    "Config": {"Comment": "WorkMail domain"},
+                },
+            ],
+            "IsTruncated": False,
+        }
+        paginated(
+            self.route53_client,
+            {
+                "list_resource_record_sets": [
+                    {
+                        "ResourceRecordSets": [
+                            {"Name": "example.com.", "Type": "NS"},
+                            {"Name": "example.com.", "Type": "SOA"},
+                            {"Name": "example.com.", "Type": "MX"},
+                        ]
+                    },
+                    {
+                        "ResourceRecordSets": [
+                            {"Name": "_amazonses.example.com.", "Type": "TXT"},
+                            {"Name": "sub.example.com.", "Type": "NS"},
+                        ]
+                    },
+                ]
+            },
+        )
+        paginated(
+            self.iam_client,
+            {
+                "list_access_keys": [
+                    {
+                        "AccessKeyMetadata": [
+                            {"AccessKeyId": "AKIA1"},
+                            {"AccessKeyId": "AKIA2"},
+                        ]
+                    }
+                ],
+                "list_user_policies": [
+                    {"PolicyNames": ["workmail_example.com_fluentsmtp_policy"]}
+                ],
+            },
+        )
+
+    def recording(self, client, service):
+        """Record every call made on the client, in order, across threads."""
+        for name in (
+            "deregister_from_work_mail",
+            "delete_user",
+            "delete_organization",
+            "change_resource_record_sets",
+            "delete_hosted_zone",
+            "delete_access_key",
+            "delete_user_policy",
+            "delete_identity",
+        ):
+            method = getattr(client, name)
+
+            def record(*args, _name=name, _method=method, **kwargs):
+                with self.lock:
+                    self.log.append((service, _name, kwargs))
+                return _method.return_value
+
+            method.side_effect = record
+        return client
+
+    def position(self, service, name):
+        return [(s, n) for s, n, _ in self.log].index((service, name))
+
+    def test_teardown_deletes_every_artifact_in_dependency_order(self):
+        # Act
+        outcomes = teardown_workmail_stack("org-id", "example.com", self.aws_clients)
+
+        # Assert
+        self.assertEqual(
+            summarize_teardown(outcomes),
+            {
+                "iam_access_keys": "DELETED",
+                "iam_user": "DELETED",
+                "iam_user_policies": "DELETED",
+                "route53_hosted_zone:/hostedzone/Z1": "DELETED",
+                "route53_record_sets:/hostedzone/Z1": "DELETED",
+                "ses_identity": "DELETED",
+                "workmail_organization": "DELETED",
+                "workmail_users": "DELETED",
+            },
+        )
+        self.assertEqual(outcomes["workmail_users"]["result"], 2)
+        self.assertEqual(outcomes["route53_record_sets:/hostedzone/Z1"]["result"], 3)
+        self.workmail_client.deregister_from_work_mail.assert_called_once_with(
+            OrganizationId="org-id", EntityId="u-1"
+        )
+        self.assertEqual(self.workmail_client.delete_user.call_count, 2)
+        self.route53_client.delete_hosted_zone.assert_called_once_with(
+            Id="/hostedzone/Z1"
+        )
+        deleted = [
+            change["ResourceRecordSet"]
+            for change in self.route53_client.change_resource_record_sets.call_args[1][
+                "ChangeBatch"
+            ]["Changes"]
+        ]
+        self.assertEqual(
+            [(r["Name"], r["Type"]) for r in deleted],
+            [
+                ("example.com.", "MX"),
+                ("_amazonses.example.com.", "TXT"),
+                ("sub.example.com.", "NS"),
+            ],
+        )
+        self.assertEqual(self.iam_client.delete_access_key.call_count, 2)
+        self.iam_client.delete_user_policy.assert_called_once_with(
+            UserName="workmail_example.com",
+            PolicyName="workmail_example.com_fluentsmtp_policy",
+        )
+        self.ses_client.delete_identity.assert_called_once_with(Identity="example.com")
+        # Dependencies
+        self.assertLess(
+            self.position("workmail", "delete_user"),
+            self.position("workmail", "delete_organization"),
+        )
+        self.assertLess(
+            self.position("workmail", "delete_organization"),
+            self.position("ses", "delete_identity"),
+        )
+        self.assertLess(
+            self.position("route53", "change_resource_record_sets"),
+            self.position("route53", "delete_hosted_zone"),
+        )
+        self.assertLess(
+            max(
+                self.position("iam", "delete_access_key"),
+                self.position("iam", "delete_user_policy"),
+            ),
+            [(s, n) for s, n, _ in self.log].index(("iam", "delete_user")),
+        )
+
+    def test_failure_skips_only_dependent_steps(self):
+        # Arrange
+        self.route53_client.change_resource_record_sets.side_effect = RuntimeError(
+            "Throttled"
+        )
+
+        # Act
+        outcomes = teardown_workmail_stack("org-id", "example.com", self.aws_clients)
+
+        # Assert
+        self.assertEqual(
+            outcomes["route53_record_sets:/hostedzone/Z1"]["status"], "FAILED"
+        )
+        self.assertEqual(
+            outcomes["route53_hosted_zone:/hostedzone/Z1"],
+            {
+                "status": "SKIPPED",
+                "blocked_by": ["route53_record_sets:/hostedzone/Z1"],
+            },
+        )
+        self.route53_client.delete_hosted_zone.assert_not_called()
+        self.assertEqual(outcomes["workmail_organization"]["status"], "DELETED")
+        self.assertEqual(outcomes["iam_user"]["status"], "DELETED")
+
+    def test_already_deleted_artifacts_do_not_block(self):
+        # Arrange
+        self.iam_client.get_paginator.side_effect = lambda operation: MagicMock(
+            paginate=MagicMock(side_effect=not_found("NoSuchEntity"))
+        )
+        self.iam_client.delete_user.side_effect = not_found("NoSuchEntity")
+        self.route53_client.list_hosted_zones_by_name.return_value = {
+            "HostedZones": [],
+            "IsTruncated": False,
+        }
+
+        # Act
+        outcomes = teardown_workmail_stack("org-id", "example.com", self.aws_clients)
+
+        # Assert
+        self.assertEqual(outcomes["iam_access_keys"]["status"], "NOT_FOUND")
+        self.assertEqual(outcomes["iam_user"]["status"], "NOT_FOUND")
+        self.assertNotIn("route53_hosted_zone:/hostedzone/Z1", outcomes)
+
+    def test_independent_steps_run_concurrently(self):
+        # Arrange
+        active, peak = [0], [0]
+        lock = threading.Lock()
+
+        def step():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+        steps = {"a": (step, []), "b": (step, []), "c": (step, []), "d": (step, ["a"])}
+
+        # Act
+        outcomes = run_teardown(steps, max_workers=3)
+
+        # Assert
+        self.assertEqual(peak[0], 3)
+        self.assertEqual({o["status"] for o in outcomes.values()}, {"DELETED"})
+
+    def test_skips_propagate_through_chains(self):
+        # Arrange
+        def fail():
+            raise RuntimeError("Test exception")
+
+        steps = {
+            "a": (fail, []),
+            "b": (lambda: None, ["a"]),
+            "c": (lambda: None, ["b"]),
+            "d": (lambda: None, []),
+        }
+
+        # Act
+        outcomes = run_teardown(steps)
+
+        # Assert
+        self.assertEqual(
+            summarize_teardown(outcomes),
+            {"a": "FAILED", "b": "SKIPPED", "c": "SKIPPED", "d": "DELETED"},
+        )
+
+    def test_record_sets_are_deleted_in_batches(self):
+        # Arrange
+        route53_client = MagicMock()
+        paginated(
+            route53_client,
+            {
+                "list_resource_record_sets": [
+                    {
+                        "ResourceRecordSets": [
+                            {"Name": f"r{i}.example.com.", "Type": "TXT"}
+                            for i in range(ROUTE53_MAX_CHANGES_PER_BATCH + 1)
+                        ]
+                    }
+                ]
+            },
+        )
+
+        # Act
+        deleted = delete_record_sets("/hostedzone/Z1", route53_client)
+
+        # Assert
+        self.assertEqual(deleted, ROUTE53_MAX_CHANGES_PER_BATCH + 1)
+        self.assertEqual(route53_client.change_resource_record_sets.call_count, 2)
+
+
+@patch.dict(
+    os.environ,
+    {
+        "DB_SECRET_ARN": "arn:aws:secretsmanager:region:account-id:secret:secret-id",
+        "DB_CLUSTER_ARN": "arn:aws:rds:region:account-id:cluster:cluster-id",
+        "DATABASE_NAME": "test_db",
+        "SNS_BOUNCE_ARN": "arn:aws:sns:region:account-id:bounce",
+        "SNS_COMPLAINT_ARN": "arn:aws:sns:region:account-id:complaint",
+        "SNS_DELIVERY_ARN": "arn:aws:sns:region:account-id:delivery",
+        "KEAP_TAG_CANCEL": "99",
+        "KEAP_BASE_URL": "https://keap.example.com",
+        "PROXY_ENDPOINT": "https://proxy.example.com",
+        "PROXY_ENDPOINT_HOST": "proxy.example.com",
+    },
+)
+class TestLambdaHandlerTeardown(unittest.TestCase):
+
+    @patch("delete_workmail_org_function.app.clear_checkpoints")
+    @patch("delete_workmail_org_function.app.unregister_workmail_organization")
+    @patch("delete_workmail_org_function.app.teardown_workmail_stack")
+    @patch("delete_workmail_org_function.app.get_workmail_organization_id")
+    @patch("delete_workmail_org_function.app.db_connection")
+    @patch("delete_workmail_org_function.app.get_aws_clients")
+    def test_lambda_handler_reports_teardown(
+        self,
+        mock_get_aws_clients,
+        mock_db_connection,
+        mock_get_workmail_organization_id,
+        mock_teardown_workmail_stack,
+        mock_unregister_workmail_organization,
+        mock_clear_checkpoints,
+    ):
+        # Arrange
+        mock_get_aws_clients.return_value = {
+            "secretsmanager_client": MagicMock(),
+            "iam_client": MagicMock(),
+        }
+        mock_get_workmail_organization_id.return_value = "org-id"
+        mock_teardown_workmail_stack.return_value = {
+            "workmail_organization": {
+                "status": "DELETED",
+                "result": {"OrganizationId": "org-id", "State": "Deleting"},
+            },
+            "iam_user": {"status": "FAILED", "error": RuntimeError("Throttled")},
+        }
+        event = {"body": json.dumps({"contact_id": 1, "vanity_name": "example.com"})}
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        self.assertEqual(response["statusCode"], 200)
+        body = json.loads(response["body"])
+        self.assertEqual(body["state"], "Deleting")
+        self.assertEqual(
+            body["teardown"],
+            {"iam_user": "FAILED", "workmail_organization": "DELETED"},
+        )
+        mock_unregister_workmail_organization.assert_called_once()
+        self.assertEqual(
+            mock_unregister_workmail_organization.call_args.kwargs,
+            {"contact_id": 1, "cancel_tag_id": 99},
+        )
+
+    @patch("delete_workmail_org_function.app.unregister_workmail_organization")
+    @patch("delete_workmail_org_function.app.teardown_workmail_stack")
+    @patch("delete_workmail_org_function.app.get_workmail_organization_id")
+    @patch("delete_workmail_org_function.app.db_connection")
+    @patch("delete_workmail_org_function.app.get_aws_clients")
+    def test_lambda_handler_organization_failure(
+        self,
+        mock_get_aws_clients,
+        mock_db_connection,
+        mock_get_workmail_organization_id,
+        mock_teardown_workmail_stack,
+        mock_unregister_workmail_organization,
+    ):
+        # Arrange
+        mock_get_aws_clients.return_value = {
+            "secretsmanager_client": MagicMock(),
+            "iam_client": MagicMock(),
+        }
+        mock_get_workmail_organization_id.return_value = "org-id"
+        mock_teardown_workmail_stack.return_value = {
+            "workmail_organization": {
+                "status": "FAILED",
+                "error": RuntimeError("Internal error"),
+            },
+        }
+        event = {"body": json.dumps({"contact_id": 1, "vanity_name": "example.com"})}
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        self.assertEqual(response["statusCode"], 500)
+        mock_unregister_workmail_organization.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
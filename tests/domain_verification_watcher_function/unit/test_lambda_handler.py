@@ -0,0 +1,259 @@
+# tests/domain_verification_watcher_function/unit/test_lambda_handler.py
+import json
+import os
+import unittest
+from unittest.mock import patch
+from botocore.exceptions import ClientError
+from fastjsonschema import JsonSchemaException
+from domain_verification_watcher_function.app import lambda_handler
+from tests.workmail_common.rds_data_stub import SqliteRdsDataClient
+
+ENVIRONMENT = {
+    "DB_BACKEND": "data-api",
+    "DB_SECRET_ARN": "arn:aws:secretsmanager:region:account-id:secret:secret-id",
+    "DB_CLUSTER_ARN": "arn:aws:rds:region:account-id:cluster:cluster-id",
+    "DATABASE_NAME": "test_db",
+}
+
+
+class StubWorkMail:
+    """WorkMail stand-in whose domain statuses the test controls."""
+
+    def __init__(self):
+        self.domains = {}
+
+    def set_status(self, organization_id, domain, ownership, dkim):
+        self.domains[(organization_id, domain)] = {
+            "OwnershipVerificationStatus": ownership,
+            "DkimVerificationStatus": dkim,
+        }
+
+    def get_mail_domain(self, OrganizationId, DomainName):
+        return dict(self.domains[(OrganizationId, DomainName)])
+
+
+class StubSes:
+    """SES stand-in derived from the stub WorkMail's statuses."""
+
+    STATUSES = {"VERIFIED": "Success", "PENDING": "Pending", "FAILED": "Failed"}
+
+    def __init__(self, workmail):
+        self.workmail = workmail
+        self.batches = []
+
+    def _identities(self, identities):
+        assert len(identities) <= 100
+        self.batches.append(list(identities))
+        return {
+            domain: status
+            for (_, domain), status in self.workmail.domains.items()
+            if domain in identities
+        }
+
+    def get_identity_verification_attributes(self, Identities):
+        return {
+            "VerificationAttributes": {
+                domain: {
+                    "VerificationStatus": self.STATUSES[
+                        status["OwnershipVerificationStatus"]
+                    ]
+                }
+                for domain, status in self._identities(Identities).items()
+            }
+        }
+
+    def get_identity_dkim_attributes(self, Identities):
+        return {
+            "DkimAttributes": {
+                domain: {
+                    "DkimEnabled": True,
+                    "DkimVerificationStatus": self.STATUSES[
+                        status["DkimVerificationStatus"]
+                    ],
+                }
+                for domain, status in self._identities(Identities).items()
+            }
+        }
+
+
+class StubStepFunctions:
+
+    def __init__(self):
+        self.completed = {}
+        self.stale_tokens = set()
+
+    def send_task_success(self, taskToken, output):
+        if taskToken in self.stale_tokens:
+            raise ClientError(
+                {"Error": {"Code": "TaskTimedOut", "Message": "Task Timed Out"}},
+                "SendTaskSuccess",
+            )
+        self.completed[taskToken] = json.loads(output)
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+class TestLambdaHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.rds_data = SqliteRdsDataClient()
+        self.workmail = StubWorkMail()
+        self.ses = StubSes(self.workmail)
+        self.sfn = StubStepFunctions()
+        clients = {
+            "workmail": self.workmail,
+            "ses": self.ses,
+            "stepfunctions": self.sfn,
+        }
+        app_patcher = patch(
+            "domain_verification_watcher_function.app.get_aws_client",
+            side_effect=lambda service: clients[service],
+        )
+        utils_patcher = patch(
+            "workmail_common.aws.get_aws_client", return_value=self.rds_data
+        )
+        app_patcher.start()
+        utils_patcher.start()
+        self.addCleanup(app_patcher.stop)
+        self.addCleanup(utils_patcher.stop)
+        for organization_id, domain in (("org-1", "one.com"), ("org-2", "two.com")):
+            self.rds_data.rows(
+                "INSERT INTO workmail_organizations (ownerid, email_username, vanity_name, organization_id, state) VALUES (?, ?, ?, ?, ?)",
+                (1, "john", domain, organization_id, "PENDING"),
+            )
+            self.workmail.set_status(organization_id, domain, "PENDING", "PENDING")
+
+    def stored_token(self, organization_id):
+        return self.rds_data.rows(
+            "SELECT verification_task_token FROM workmail_organizations WHERE organization_id = ?",
+            (organization_id,),
+        )[0][0]
+
+    def test_registers_token_when_not_verified(self):
+        # Act
+        result = lambda_handler(
+            {"organization_id": "org-1", "vanity_name": "one.com", "task_token": "t1"},
+            {},
+        )
+
+        # Assert
+        self.assertEqual(result, {"watching": True, "resumed": False})
+        self.assertEqual(self.stored_token("org-1"), "t1")
+        self.assertEqual(self.sfn.completed, {})
+
+    def test_resumes_immediately_when_already_verified(self):
+        # Arrange
+        self.workmail.set_status("org-1", "one.com", "VERIFIED", "VERIFIED")
+
+        # Act
+        result = lambda_handler(
+            {"organization_id": "org-1", "vanity_name": "one.com", "task_token": "t1"},
+            {},
+        )
+
+        # Assert
+        self.assertEqual(result, {"watching": False, "resumed": True})
+        self.assertEqual(self.sfn.completed, {"t1": {"domainVerified": True}})
+        self.assertIsNone(self.stored_token("org-1"))
+
+    def test_sweep_resumes_only_fully_verified_domains(self):
+        # Arrange
+        lambda_handler(
+            {"organization_id": "org-1", "vanity_name": "one.com", "task_token": "t1"},
+            {},
+        )
+        lambda_handler(
+            {"organization_id": "org-2", "vanity_name": "two.com", "task_token": "t2"},
+            {},
+        )
+        self.workmail.set_status("org-1", "one.com", "VERIFIED", "VERIFIED")
+        self.workmail.set_status("org-2", "two.com", "VERIFIED", "PENDING")
+
+        # Act
+        result = lambda_handler({"source": "aws.events"}, {})
+
+        # Assert
+        self.assertEqual(result, {"checked": 2, "resumed": ["org-1"]})
+        self.assertEqual(self.sfn.completed, {"t1": {"domainVerified": True}})
+        self.assertIsNone(self.stored_token("org-1"))
+        self.assertEqual(self.stored_token("org-2"), "t2")
+
+    def test_sweep_drops_stale_tokens(self):
+        # Arrange
+        lambda_handler(
+            {"organization_id": "org-1", "vanity_name": "one.com", "task_token": "t1"},
+            {},
+        )
+        self.workmail.set_status("org-1", "one.com", "VERIFIED", "VERIFIED")
+        self.sfn.stale_tokens.add("t1")
+
+        # Act
+        result = lambda_handler({"source": "aws.events"}, {})
+
+        # Assert
+        self.assertEqual(result, {"checked": 1, "resumed": []})
+        self.assertIsNone(self.stored_token("org-1"))
+
+    def test_sweep_skips_domains_without_waiting_workflow(self):
+        # Arrange
+        self.workmail.set_status("org-2", "two.com", "VERIFIED", "VERIFIED")
+
+        # Act
+        first = lambda_handler({"source": "aws.events"}, {})
+        second = lambda_handler({"source": "aws.events"}, {})
+
+        # Assert
+        self.assertEqual(first, {"checked": 0, "resumed": []})
+        self.assertEqual(second, {"checked": 0, "resumed": []})
+        self.assertEqual(self.ses.batches, [])
+        self.assertEqual(self.sfn.completed, {})
+
+    def test_sweep_resumes_each_workflow_once(self):
+        # Arrange
+        lambda_handler(
+            {"organization_id": "org-1", "vanity_name": "one.com", "task_token": "t1"},
+            {},
+        )
+        self.workmail.set_status("org-1", "one.com", "VERIFIED", "VERIFIED")
+
+        # Act
+        first = lambda_handler({"source": "aws.events"}, {})
+        second = lambda_handler({"source": "aws.events"}, {})
+
+        # Assert
+        self.assertEqual(first, {"checked": 1, "resumed": ["org-1"]})
+        self.assertEqual(second, {"checked": 0, "resumed": []})
+
+    def test_sweep_batches_ses_lookups_and_confirms_candidates_only(self):
+        # Arrange
+        for i in range(150):
+            organization_id, domain = f"bulk-{i}", f"bulk{i}.com"
+            self.rds_data.rows(
+                "INSERT INTO workmail_organizations (ownerid, email_username, vanity_name, organization_id, state, verification_task_token) VALUES (?, ?, ?, ?, ?, ?)",
+                (i, "john", domain, organization_id, "PENDING", f"token-{i}"),
+            )
+            status = "VERIFIED" if i % 50 == 0 else "PENDING"
+            self.workmail.set_status(organization_id, domain, status, status)
+        calls = []
+        get_mail_domain = self.workmail.get_mail_domain
+        self.workmail.get_mail_domain = lambda **kwargs: calls.append(
+            kwargs
+        ) or get_mail_domain(**kwargs)
+
+        # Act
+        result = lambda_handler({"source": "aws.events"}, {})
+
+        # Assert
+        self.assertEqual(result["checked"], 150)
+        self.assertEqual(sorted(result["resumed"]), ["bulk-0", "bulk-100", "bulk-50"])
+        self.assertEqual(len(self.ses.batches), 4)
+        self.assertEqual(len(calls), 3)
+
+    def test_validation_failure(self):
+        # Act & Assert
+        with self.assertRaises(JsonSchemaException):
+            lambda_handler({"organization_id": "org-1", "task_token": "t1"}, {})
+        self.assertEqual(self.sfn.completed, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,269 @@
+# tests/keap_outbox_drain_function/unit/test_lambda_handler.py
+import json
+import os
+import time
+import unittest
+from unittest.mock import patch
+from keap_outbox_drain_function.app import lambda_handler
+from workmail_common.db import db_connection
+from workmail_common.secrets import invalidate_secret
+from workmail_common.outbox import (
+    OUTBOX_MAX_ATTEMPTS,
+    claim_keap_outbox,
+    enqueue_keap_note,
+    enqueue_keap_tag,
+)
+from tests.workmail_common.rds_data_stub import SqliteRdsDataClient
+from tests.workmail_common.secretsmanager_stub import LocalSecretsManager
+
+ENVIRONMENT = {
+    "DB_BACKEND": "data-api",
+    "DB_SECRET_ARN": "arn:aws:secretsmanager:region:account-id:secret:secret-id",
+    "DB_CLUSTER_ARN": "arn:aws:rds:region:account-id:cluster:cluster-id",
+    "DATABASE_NAME": "test_db",
+    "KEAP_API_KEY_SECRET_NAME": "keap-secret",
+    "PROXY_ENDPOINT": "https://proxy.example.com",
+    "PROXY_ENDPOINT_HOST": "proxy.example.com",
+}
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+class TestLambdaHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.rds_data = SqliteRdsDataClient()
+        self.secretsmanager = LocalSecretsManager()
+        invalidate_secret()
+        self.addCleanup(invalidate_secret)
+        patchers = [
+            patch(
+                "workmail_common.aws.get_aws_client",
+                side_effect=lambda service, *args, **kwargs: (
+                    self.secretsmanager
+                    if service == "secretsmanager"
+                    else self.rds_data
+                ),
+            ),
+            patch("workmail_common.keap.keap_contacts_add_to_group_via_proxy"),
+            patch("keap_outbox_drain_function.app.keap_contact_create_note_via_proxy"),
+        ]
+        _, self.mock_apply_tag, self.mock_create_note = [
+            patcher.start() for patcher in patchers
+        ]
+        for patcher in patchers:
+            self.addCleanup(patcher.stop)
+
+    def enqueue(self, tags=(), notes=(), secret_fields=()):
+        with db_connection(ENVIRONMENT) as connection:
+            for contact_ids, tag_id in tags:
+                enqueue_keap_tag(contact_ids, tag_id, connection)
+            for contact_id, title, content in notes:
+                enqueue_keap_note(contact_id, title, content, connection, secret_fields)
+            connection.commit()
+
+    def outbox(self):
+        return self.rds_data.rows(
+            "SELECT contact_id, status, attempts, available_at, last_error FROM keap_outbox ORDER BY id"
+        )
+
+    def test_merges_tags_into_applytags_calls(self):
+        # Arrange
+        self.enqueue(tags=[([1], 10), ([2], 10), ([2], 10), ([3], 20)])
+        self.enqueue(notes=[(4, "workmail_credentials", {"API7": "secret"})])
+
+        # Act
+        result = lambda_handler({}, None)
+
+        # Assert
+        self.assertEqual(result, {"sent": 5, "retrying": 0, "failed": 0})
+        self.assertEqual(
+            sorted(call.args[:2] for call in self.mock_apply_tag.call_args_list),
+            [([1, 2], 10), ([3], 20)],
+        )
+        self.assertEqual(
+            self.mock_create_note.call_args.args[:3],
+            (4, "workmail_credentials", {"API7": "secret"}),
+        )
+        self.assertEqual(self.outbox(), [])
+
+    @patch("workmail_common.keap.KEAP_APPLY_TAGS_MAX_CONTACTS", 2)
+    def test_splits_large_tag_batches(self):
+        # Arrange
+        self.enqueue(tags=[([1, 2, 3, 4, 5], 10)])
+
+        # Act
+        lambda_handler({}, None)
+
+        # Assert
+        self.assertEqual(
+            [call.args[0] for call in self.mock_apply_tag.call_args_list],
+            [[1, 2], [3, 4], [5]],
+        )
+
+    def test_partial_tag_failures_only_retry_untagged_contacts(self):
+        # Arrange
+        self.enqueue(tags=[([1, 2, 3], 10)])
+        self.mock_apply_tag.return_value = {
+            "results": {"1": "SUCCESS", "2": "FAILURE", "3": "DUPLICATE"}
+        }
+
+        # Act
+        result = lambda_handler({}, None)
+
+        # Assert
+        self.assertEqual(self.mock_apply_tag.call_count, 1)
+        self.assertEqual(result, {"sent": 2, "retrying": 1, "failed": 0})
+        self.assertEqual(
+            [row[:3] + row[4:] for row in self.outbox()],
+            [(2, "PENDING", 1, "Keap returned FAILURE")],
+        )
+
+    @patch("keap_outbox_drain_function.app.KeapTagApplier.flush")
+    def test_unconfirmed_tags_are_not_deleted(self, mock_flush):
+        # Arrange
+        self.enqueue(tags=[([1, 2], 10)])
+
+        # Act
+        result = lambda_handler({}, None)
+
+        # Assert
+        self.assertEqual(result, {"sent": 0, "retrying": 2, "failed": 0})
+        self.assertEqual(
+            [row[:3] + row[4:] for row in self.outbox()],
+            [
+                (1, "PENDING", 1, "Tag application was not confirmed"),
+                (2, "PENDING", 1, "Tag application was not confirmed"),
+            ],
+        )
+
+    def test_failed_items_are_retried_later(self):
+        # Arrange
+        self.enqueue(tags=[([1, 2], 10)], notes=[(3, "IAM User Info", {})])
+        self.mock_apply_tag.side_effect = ValueError("Keap unavailable")
+        before = int(time.time())
+
+        # Act
+        result = lambda_handler({}, None)
+
+        # Assert
+        self.assertEqual(result, {"sent": 1, "retrying": 2, "failed": 0})
+        rows = self.outbox()
+        self.assertEqual(
+            [row[:3] for row in rows], [(1, "PENDING", 1), (2, "PENDING", 1)]
+        )
+        self.assertTrue(all(row[3] > before for row in rows))
+        self.assertEqual(rows[0][4], "Keap unavailable")
+        # Not due yet, so the next run leaves them alone.
+        self.mock_apply_tag.reset_mock()
+        lambda_handler({}, None)
+        self.mock_apply_tag.assert_not_called()
+
+    def test_gives_up_after_max_attempts(self):
+        # Arrange
+        self.enqueue(tags=[([1], 10)])
+        self.rds_data.rows(
+            "UPDATE keap_outbox SET attempts = ?", (OUTBOX_MAX_ATTEMPTS - 1,)
+        )
+        self.mock_apply_tag.side_effect = ValueError("Keap unavailable")
+
+        # Act
+        result = lambda_handler({}, None)
+
+        # Assert
+        self.assertEqual(result, {"sent": 0, "retrying": 0, "failed": 1})
+        self.assertEqual(self.outbox()[0][1:3], ("FAILED", OUTBOX_MAX_ATTEMPTS))
+
+    def test_secret_fields_are_kept_out_of_the_outbox(self):
+        # Arrange
+        content = {"IAM User Name": "workmail_one.com", "Secret Key": "s3cr3t-key"}
+
+        # Act
+        self.enqueue(
+            notes=[(3, "IAM User Info", content)], secret_fields=("Secret Key",)
+        )
+
+        # Assert
+        [(payload,)] = self.rds_data.rows("SELECT payload FROM keap_outbox")
+        self.assertNotIn("s3cr3t-key", payload)
+        note = json.loads(payload)
+        self.assertEqual(
+            note["content"], {"IAM User Name": "workmail_one.com", "Secret Key": None}
+        )
+        self.assertEqual(
+            json.loads(self.secretsmanager.secrets[note["secret_ref"]]),
+            {"Secret Key": "s3cr3t-key"},
+        )
+
+    def test_sends_note_secrets_and_deletes_them(self):
+        # Arrange
+        self.enqueue(
+            notes=[(4, "workmail_credentials", {"API6": "info", "API7": "pa55"})],
+            secret_fields=("API7",),
+        )
+
+        # Act
+        result = lambda_handler({}, None)
+
+        # Assert
+        self.assertEqual(result, {"sent": 1, "retrying": 0, "failed": 0})
+        self.assertEqual(
+            self.mock_create_note.call_args.args[:3],
+            (4, "workmail_credentials", {"API6": "info", "API7": "pa55"}),
+        )
+        self.assertEqual(self.secretsmanager.secrets, {})
+
+    def test_failed_notes_are_scrubbed(self):
+        # Arrange
+        self.enqueue(
+            notes=[(4, "workmail_credentials", {"API6": "info", "API7": "pa55"})],
+            secret_fields=("API7",),
+        )
+        self.rds_data.rows(
+            "UPDATE keap_outbox SET attempts = ?", (OUTBOX_MAX_ATTEMPTS - 1,)
+        )
+        self.mock_create_note.side_effect = ValueError("Keap unavailable")
+
+        # Act
+        result = lambda_handler({}, None)
+
+        # Assert
+        self.assertEqual(result, {"sent": 0, "retrying": 0, "failed": 1})
+        [(status, payload)] = self.rds_data.rows(
+            "SELECT status, payload FROM keap_outbox"
+        )
+        self.assertEqual(status, "FAILED")
+        self.assertEqual(json.loads(payload), {"title": "workmail_credentials"})
+        self.assertEqual(self.secretsmanager.secrets, {})
+
+    def test_retried_notes_keep_their_secret(self):
+        # Arrange
+        self.enqueue(
+            notes=[(4, "workmail_credentials", {"API7": "pa55"})],
+            secret_fields=("API7",),
+        )
+        self.mock_create_note.side_effect = ValueError("Keap unavailable")
+
+        # Act
+        result = lambda_handler({}, None)
+
+        # Assert
+        self.assertEqual(result, {"sent": 0, "retrying": 1, "failed": 0})
+        [(payload,)] = self.rds_data.rows("SELECT payload FROM keap_outbox")
+        self.assertIn(json.loads(payload)["secret_ref"], self.secretsmanager.secrets)
+
+    def test_claimed_items_are_leased(self):
+        # Arrange
+        self.enqueue(tags=[([1, 2], 10)])
+
+        # Act
+        with db_connection(ENVIRONMENT) as connection:
+            first = claim_keap_outbox(10, connection)
+            second = claim_keap_outbox(10, connection)
+
+        # Assert
+        self.assertEqual([item["contact_id"] for item in first], [1, 2])
+        self.assertEqual(second, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
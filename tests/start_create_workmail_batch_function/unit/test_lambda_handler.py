@@ -0,0 +1,205 @@
+# tests/start_create_workmail_batch_function/unit/test_lambda_handler.py
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch, MagicMock
+import json
+import os
+from botocore.exceptions import ClientError
+from start_create_workmail_batch_function.app import (
+    MAX_BATCH_ITEMS,
+    lambda_handler,
+)
+from workmail_common.executions import execution_name
+
+ENVIRONMENT = {
+    "WORKMAIL_BATCH_STEPFUNCTION_ARN": "arn:aws:states:us-east-1:123456789012:stateMachine:batchStateMachine",
+    "WORKMAIL_STEPFUNCTION_ARN": "arn:aws:states:us-east-1:123456789012:stateMachine:stateMachine",
+}
+EXECUTION_ARN = (
+    "arn:aws:states:us-east-1:123456789012:execution:batchStateMachine:batch"
+)
+WORKFLOW_EXECUTION_ARN_PREFIX = (
+    "arn:aws:states:us-east-1:123456789012:execution:stateMachine:"
+)
+
+
+@patch.dict(os.environ, ENVIRONMENT)
+class TestLambdaHandler(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch("start_create_workmail_batch_function.app.get_aws_client")
+        self.mock_get_aws_client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_sfn_client = MagicMock()
+        self.mock_sfn_client.start_execution.return_value = {
+            "executionArn": EXECUTION_ARN
+        }
+        self.executions = {}
+        self.mock_sfn_client.describe_execution.side_effect = self.describe_execution
+        self.mock_get_aws_client.return_value = self.mock_sfn_client
+
+    def describe_execution(self, executionArn):
+        name = executionArn[len(WORKFLOW_EXECUTION_ARN_PREFIX) :]
+        if name not in self.executions:
+            raise ClientError(
+                {"Error": {"Code": "ExecutionDoesNotExist", "Message": "none"}},
+                "DescribeExecution",
+            )
+        return self.executions[name]
+
+    def batch_input(self):
+        return json.loads(self.mock_sfn_client.start_execution.call_args[1]["input"])
+
+    def test_lambda_handler_success(self):
+        # Arrange
+        items = [
+            {"contact_id": 1, "email_username": "john", "vanity_name": "one.com"},
+            {"contact_id": 2, "email_username": "jane", "vanity_name": "two.com"},
+        ]
+        event = {"body": json.dumps(items)}
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        self.assertEqual(response["statusCode"], 200)
+        body = json.loads(response["body"])
+        self.assertEqual(body["executionArn"], EXECUTION_ARN)
+        self.assertEqual(
+            [item["status"] for item in body["items"]], ["ACCEPTED", "ACCEPTED"]
+        )
+        _, kwargs = self.mock_sfn_client.start_execution.call_args
+        self.assertEqual(kwargs["name"], f"create_workmail_batch_{body['batchId']}")
+        execution_input = json.loads(kwargs["input"])
+        self.assertEqual(execution_input["batch_id"], body["batchId"])
+        self.assertEqual(
+            [json.loads(item["body"]) for item in execution_input["items"]], items
+        )
+        self.assertEqual(
+            [item["item_index"] for item in execution_input["items"]], [0, 1]
+        )
+        self.assertEqual(
+            [item["execution_name"] for item in execution_input["items"]],
+            [execution_name("1:one.com"), execution_name("2:two.com")],
+        )
+
+    def test_lambda_handler_skips_items_already_started(self):
+        # Arrange
+        started_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        self.executions[execution_name("1:one.com")] = {"status": "RUNNING"}
+        self.executions[execution_name("2:two.com")] = {
+            "status": "FAILED",
+            "startDate": started_at,
+        }
+        items = [
+            {"contact_id": 1, "email_username": "john", "vanity_name": "one.com"},
+            {"contact_id": 2, "email_username": "jane", "vanity_name": "two.com"},
+        ]
+
+        # Act
+        response = lambda_handler({"body": json.dumps(items)}, {})
+
+        # Assert
+        body = json.loads(response["body"])
+        self.assertEqual(
+            [item["status"] for item in body["items"]],
+            ["ALREADY_STARTED", "ACCEPTED"],
+        )
+        self.assertEqual(
+            body["items"][0]["executionArn"],
+            WORKFLOW_EXECUTION_ARN_PREFIX + execution_name("1:one.com"),
+        )
+        retry_name = f"{execution_name('2:two.com')}-{int(started_at.timestamp())}"
+        self.assertEqual(body["items"][1]["executionName"], retry_name)
+        self.assertEqual(
+            [item["execution_name"] for item in self.batch_input()["items"]],
+            [retry_name],
+        )
+
+    def test_lambda_handler_resubmitted_batch_starts_nothing(self):
+        # Arrange
+        self.executions[execution_name("1:one.com")] = {"status": "RUNNING"}
+        item = {"contact_id": 1, "email_username": "john", "vanity_name": "one.com"}
+
+        # Act
+        response = lambda_handler({"body": json.dumps([item])}, {})
+
+        # Assert
+        self.assertEqual(response["statusCode"], 200)
+        body = json.loads(response["body"])
+        self.assertEqual(body["items"][0]["status"], "ALREADY_STARTED")
+        self.mock_sfn_client.start_execution.assert_not_called()
+
+    def test_lambda_handler_reports_invalid_and_duplicate_items(self):
+        # Arrange
+        event = {
+            "body": json.dumps(
+                {
+                    "items": [
+                        {
+                            "contact_id": 1,
+                            "email_username": "john",
+                            "vanity_name": "one.com",
+                        },
+                        {"contact_id": "two", "email_username": "jane"},
+                        {
+                            "contact_id": 1,
+                            "email_username": "john",
+                            "vanity_name": "https://www.ONE.com",
+                        },
+                    ]
+                }
+            )
+        }
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        body = json.loads(response["body"])
+        self.assertEqual(
+            [item["status"] for item in body["items"]],
+            ["ACCEPTED", "INVALID", "DUPLICATE"],
+        )
+        self.assertIn("error", body["items"][1])
+        self.assertEqual(len(self.batch_input()["items"]), 1)
+
+    def test_lambda_handler_no_valid_items(self):
+        # Arrange
+        event = {"body": json.dumps([{"contact_id": 1}])}
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        self.assertEqual(response["statusCode"], 400)
+        self.mock_sfn_client.start_execution.assert_not_called()
+
+    def test_lambda_handler_rejects_oversized_batch(self):
+        # Arrange
+        item = {"contact_id": 1, "email_username": "john", "vanity_name": "one.com"}
+        event = {"body": json.dumps([item] * (MAX_BATCH_ITEMS + 1))}
+
+        # Act
+        response = lambda_handler(event, {})
+
+        # Assert
+        self.assertEqual(response["statusCode"], 400)
+        self.mock_sfn_client.start_execution.assert_not_called()
+
+    def test_lambda_handler_rejects_non_array_body(self):
+        # Act
+        response = lambda_handler({"body": json.dumps({"contact_id": 1})}, {})
+
+        # Assert
+        self.assertEqual(response["statusCode"], 400)
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_lambda_handler_missing_env_var(self):
+        # Act & Assert
+        with self.assertRaises(EnvironmentError):
+            lambda_handler({"body": "[]"}, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
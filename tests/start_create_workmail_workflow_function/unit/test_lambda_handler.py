@@ -3,7 +3,32 @@ import unittest
 from unittest.mock import patch, MagicMock
 import json
 import os
-from start_create_workmail_workflow_function.app import lambda_handler, get_config
+from datetime import datetime, timedelta, timezone
+from botocore.exceptions import ClientError
+from start_create_workmail_workflow_function.app import (
+    clear_execution_cache,
+    execution_name,
+    lambda_handler,
+    get_config,
+)
+
+STATE_MACHINE_ARN = (
+    "arn:aws:states:us-east-1:123456789012:stateMachine:exampleStateMachine"
+)
+EXECUTION_ARN_PREFIX = (
+    "arn:aws:states:us-east-1:123456789012:execution:exampleStateMachine:"
+)
+
+
+def create_event(contact_id="12345", vanity_name="example.com"):
+    return {"body": json.dumps({"contact_id": contact_id, "vanity_name": vanity_name})}
+
+
+def already_exists():
+    return ClientError(
+        {"Error": {"Code": "ExecutionAlreadyExists", "Message": "exists"}},
+        "StartExecution",
+    )
 
 
 class TestLambdaHandler(unittest.TestCase):
@@ -15,12 +40,9 @@ class TestLambdaHandler(unittest.TestCase):
         },
     )
     @patch("start_create_workmail_workflow_function.app.get_aws_client")
-    @patch("start_create_workmail_workflow_function.app.socket.gethostbyname")
-    def test_lambda_handler_success(self, mock_gethostbyname, mock_get_aws_client):
+    def test_lambda_handler_success(self, mock_get_aws_client):
         # Arrange
-        mock_gethostbyname.return_value = "127.0.0.1"
         mock_sfn_client = MagicMock()
-        mock_sfn_client.meta.endpoint_url = "https://states.us-east-1.amazonaws.com"
         mock_sfn_client.start_execution.return_value = {
             "executionArn": "arn:aws:states:us-east-1:123456789012:execution:exampleStateMachine:exampleExecution"
         }
@@ -58,16 +80,11 @@ class TestLambdaHandler(unittest.TestCase):
         },
     )
     @patch("start_create_workmail_workflow_function.app.get_aws_client")
-    @patch("start_create_workmail_workflow_function.app.socket.gethostbyname")
     @patch("start_create_workmail_workflow_function.app.handle_error")
-    def test_lambda_handler_exception(
-        self, mock_handle_error, mock_gethostbyname, mock_get_aws_client
-    ):
+    def test_lambda_handler_exception(self, mock_handle_error, mock_get_aws_client):
         # Arrange
         exception = Exception("Test exception")
-        mock_gethostbyname.return_value = "127.0.0.1"
         mock_sfn_client = MagicMock()
-        mock_sfn_client.meta.endpoint_url = "https://states.us-east-1.amazonaws.com"
         mock_sfn_client.start_execution.side_effect = exception
         mock_get_aws_client.return_value = mock_sfn_client
 
@@ -81,5 +98,106 @@ class TestLambdaHandler(unittest.TestCase):
         mock_handle_error.assert_called_once_with(exception)
 
 
+@patch.dict(os.environ, {"WORKMAIL_STEPFUNCTION_ARN": STATE_MACHINE_ARN})
+class TestExecutionDedup(unittest.TestCase):
+
+    def setUp(self):
+        clear_execution_cache()
+        self.addCleanup(clear_execution_cache)
+        self.sfn_client = MagicMock()
+        self.sfn_client.start_execution.side_effect = lambda **kwargs: {
+            "executionArn": EXECUTION_ARN_PREFIX + kwargs["name"]
+        }
+        patcher = patch(
+            "start_create_workmail_workflow_function.app.get_aws_client",
+            return_value=self.sfn_client,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_execution_name_is_derived_from_normalized_key(self):
+        # Act
+        name = execution_name("12345:example.com")
+
+        # Assert
+        self.assertTrue(name.startswith("create_workmail_workflow_12345_"))
+        lambda_handler(create_event(vanity_name=" Example.COM. "), {})
+        self.assertEqual(self.sfn_client.start_execution.call_args.kwargs["name"], name)
+
+    def test_url_forms_of_a_domain_share_an_execution_name(self):
+        # Arrange
+        variants = ["https://example.com", "www.example.com", "example.com"]
+
+        # Act
+        for vanity_name in variants:
+            clear_execution_cache()
+            lambda_handler(create_event(vanity_name=vanity_name), {})
+
+        # Assert
+        self.assertEqual(
+            [
+                call.kwargs["name"]
+                for call in self.sfn_client.start_execution.call_args_list
+            ],
+            [execution_name("12345:example.com")] * len(variants),
+        )
+
+    def test_repeat_requests_are_answered_from_cache(self):
+        # Act
+        first = json.loads(lambda_handler(create_event(), {})["body"])
+        second = json.loads(lambda_handler(create_event(), {})["body"])
+
+        # Assert
+        self.sfn_client.start_execution.assert_called_once()
+        self.assertEqual(first["executionArn"], second["executionArn"])
+        self.assertEqual(first["message"], "WorkMail creation workflow started")
+        self.assertEqual(
+            second["message"], "WorkMail creation workflow already started"
+        )
+
+    def test_running_execution_is_returned(self):
+        # Arrange
+        self.sfn_client.start_execution.side_effect = already_exists()
+        self.sfn_client.describe_execution.return_value = {"status": "RUNNING"}
+        name = execution_name("12345:example.com")
+
+        # Act
+        body = json.loads(lambda_handler(create_event(), {})["body"])
+
+        # Assert
+        self.assertEqual(body["executionArn"], EXECUTION_ARN_PREFIX + name)
+        self.assertEqual(body["message"], "WorkMail creation workflow already started")
+        self.sfn_client.describe_execution.assert_called_once_with(
+            executionArn=EXECUTION_ARN_PREFIX + name
+        )
+
+    def test_failed_execution_is_followed_by_a_new_one(self):
+        # Arrange
+        started_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        name = execution_name("12345:example.com")
+
+        def start_execution(**kwargs):
+            if kwargs["name"] == name:
+                raise already_exists()
+            return {"executionArn": EXECUTION_ARN_PREFIX + kwargs["name"]}
+
+        self.sfn_client.start_execution.side_effect = start_execution
+        self.sfn_client.describe_execution.return_value = {
+            "status": "FAILED",
+            "startDate": started_at,
+            "stopDate": started_at + timedelta(minutes=5),
+        }
+
+        # Act
+        body = json.loads(lambda_handler(create_event(), {})["body"])
+
+        # Assert
+        self.assertEqual(
+            body["executionArn"],
+            f"{EXECUTION_ARN_PREFIX}{name}-{int(started_at.timestamp())}",
+        )
+        self.assertEqual(body["message"], "WorkMail creation workflow started")
+
+
 if __name__ == "__main__":
     unittest.main()
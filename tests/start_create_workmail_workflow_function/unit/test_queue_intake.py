@@ -0,0 +1,171 @@
+# tests/start_create_workmail_workflow_function/unit/test_queue_intake.py
+import json
+import os
+import unittest
+from unittest.mock import patch, MagicMock
+from botocore.exceptions import ClientError
+from start_create_workmail_workflow_function.app import (
+    ExecutionPacer,
+    clear_execution_cache,
+    execution_name,
+    lambda_handler,
+    queue_handler,
+)
+from tests.workmail_common.sqs_stub import QUEUE_URL, LocalSqsQueue
+
+STATE_MACHINE_ARN = (
+    "arn:aws:states:us-east-1:123456789012:stateMachine:exampleStateMachine"
+)
+EXECUTION_ARN_PREFIX = (
+    "arn:aws:states:us-east-1:123456789012:execution:exampleStateMachine:"
+)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def create_event(contact_id=12345, vanity_name="example.com", **fields):
+    body = dict(contact_id=contact_id, vanity_name=vanity_name, **fields)
+    body.setdefault("email_username", "john.doe")
+    return {"body": json.dumps(body)}
+
+
+@patch.dict(
+    os.environ,
+    {
+        "WORKMAIL_STEPFUNCTION_ARN": STATE_MACHINE_ARN,
+        "WORKMAIL_CREATE_QUEUE_URL": QUEUE_URL,
+    },
+)
+@patch("start_create_workmail_workflow_function.app.INTAKE_MODE", "queue")
+class TestQueueIntake(unittest.TestCase):
+
+    def setUp(self):
+        clear_execution_cache()
+        self.addCleanup(clear_execution_cache)
+        self.queue = LocalSqsQueue(batch_size=3)
+        self.clock = FakeClock()
+        self.started_at = []
+        self.sfn_client = MagicMock()
+        self.sfn_client.start_execution.side_effect = self.start_execution
+        clients = {"sqs": self.queue, "stepfunctions": self.sfn_client}
+        patchers = [
+            patch(
+                "start_create_workmail_workflow_function.app.get_aws_client",
+                side_effect=clients.__getitem__,
+            ),
+            patch(
+                "start_create_workmail_workflow_function.app._pacer",
+                ExecutionPacer(2, clock=self.clock.monotonic, sleep=self.clock.sleep),
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def start_execution(self, **kwargs):
+        self.started_at.append(self.clock.now)
+        return {"executionArn": EXECUTION_ARN_PREFIX + kwargs["name"]}
+
+    def test_valid_request_is_queued_with_202(self):
+        # Act
+        response = lambda_handler(create_event(), {})
+
+        # Assert
+        self.assertEqual(response["statusCode"], 202)
+        self.assertEqual(
+            json.loads(response["body"])["executionName"],
+            execution_name("12345:example.com"),
+        )
+        self.assertEqual(len(self.queue.messages), 1)
+        self.sfn_client.start_execution.assert_not_called()
+
+    def test_invalid_request_is_rejected(self):
+        # Act
+        response = lambda_handler({"body": json.dumps({"contact_id": "x"})}, {})
+
+        # Assert
+        self.assertEqual(response["statusCode"], 400)
+        self.assertEqual(len(self.queue.messages), 0)
+
+    def test_worker_starts_executions_at_the_configured_rate(self):
+        # Arrange
+        for contact_id in range(1, 8):
+            lambda_handler(create_event(contact_id=contact_id), {})
+
+        # Act
+        responses = self.queue.drain(queue_handler)
+
+        # Assert
+        self.assertEqual(len(self.queue.batches), 3)
+        self.assertTrue(all(r["batchItemFailures"] == [] for r in responses))
+        self.assertEqual(len(self.started_at), 7)
+        gaps = [b - a for a, b in zip(self.started_at, self.started_at[1:])]
+        self.assertTrue(all(gap >= 0.5 for gap in gaps), gaps)
+        self.assertEqual(
+            json.loads(self.sfn_client.start_execution.call_args.kwargs["input"]),
+            {"body": create_event(contact_id=7)["body"]},
+        )
+
+    def test_throttling_hands_the_rest_of_the_batch_back(self):
+        # Arrange
+        for contact_id in range(1, 4):
+            lambda_handler(create_event(contact_id=contact_id), {})
+        throttled = ClientError(
+            {"Error": {"Code": "ThrottlingException", "Message": "slow down"}},
+            "StartExecution",
+        )
+        self.sfn_client.start_execution.side_effect = [
+            {"executionArn": EXECUTION_ARN_PREFIX + "first"},
+            throttled,
+        ]
+
+        # Act
+        response = queue_handler(
+            {"Records": [self.queue.record(m) for m in self.queue.messages]}, None
+        )
+
+        # Assert
+        self.assertEqual(
+            response["batchItemFailures"],
+            [{"itemIdentifier": "message-2"}, {"itemIdentifier": "message-3"}],
+        )
+        self.assertEqual(self.sfn_client.start_execution.call_count, 2)
+
+    def test_poison_messages_end_in_the_dead_letter_queue(self):
+        # Arrange
+        self.queue.send_message(QueueUrl=QUEUE_URL, MessageBody="not json")
+        lambda_handler(create_event(), {})
+
+        # Act
+        self.queue.drain(queue_handler)
+
+        # Assert
+        self.assertEqual(
+            [message["body"] for message in self.queue.dead_letters], ["not json"]
+        )
+        self.assertEqual(self.sfn_client.start_execution.call_count, 1)
+
+    def test_redelivered_requests_start_one_execution(self):
+        # Arrange
+        lambda_handler(create_event(), {})
+        lambda_handler(create_event(vanity_name="Example.com"), {})
+
+        # Act
+        self.queue.drain(queue_handler)
+
+        # Assert
+        self.sfn_client.start_execution.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+# tests/workmail_common/rds_data_stub.py
+"""
+Local stand-in for the boto3 ``rds-data`` client, backed by in-memory SQLite.
+
+Implements the calls DataApiConnection makes, with the Data API's request and
+response shapes, so the handlers' SQL can be exercised end to end without an
+Aurora cluster.
+"""
+
+import itertools
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE app (
+    ownerid INTEGER PRIMARY KEY,
+    ownerfirstname TEXT,
+    ownerlastname TEXT
+);
+CREATE TABLE workmail_organizations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ownerid INTEGER NOT NULL,
+    email_username TEXT,
+    vanity_name TEXT,
+    organization_id TEXT,
+    state TEXT,
+    verification_task_token TEXT
+);
+CREATE TABLE workmail_workflow_checkpoints (
+    workflow_key TEXT NOT NULL,
+    step TEXT NOT NULL,
+    output TEXT NOT NULL,
+    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (workflow_key, step)
+);
+CREATE TABLE keap_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    contact_id INTEGER NOT NULL,
+    tag_id INTEGER,
+    payload TEXT,
+    status TEXT NOT NULL DEFAULT 'PENDING',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at INTEGER NOT NULL,
+    claim_id TEXT,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE rate_limit_buckets (
+    bucket TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class SqliteRdsDataClient:
+
+    def __init__(self, schema=SCHEMA):
+        # Handlers may write from worker threads; one transaction at a time.
+        self.db = sqlite3.connect(
+            ":memory:", isolation_level=None, check_same_thread=False
+        )
+        self.db.executescript(schema)
+        self.calls = []
+        self._transaction_ids = itertools.count(1)
+        self.transaction_id = None
+
+    @staticmethod
+    def _value(field):
+        if field.get("isNull"):
+            return None
+        return next(iter(field.values()))
+
+    @staticmethod
+    def _field(value):
+        if value is None:
+            return {"isNull": True}
+        if isinstance(value, bool):
+            return {"booleanValue": value}
+        if isinstance(value, int):
+            return {"longValue": value}
+        if isinstance(value, float):
+            return {"doubleValue": value}
+        if isinstance(value, bytes):
+            return {"blobValue": value}
+        return {"stringValue": value}
+
+    def _check_transaction(self, kwargs):
+        transaction_id = kwargs.get("transactionId")
+        if transaction_id is not None and transaction_id != self.transaction_id:
+            raise AssertionError(f"Unknown transaction {transaction_id}")
+
+    def _params(self, parameters):
+        return {p["name"]: self._value(p["value"]) for p in parameters}
+
+    def begin_transaction(self, **kwargs):
+        self.calls.append(("begin_transaction", kwargs))
+        self.db.execute("BEGIN")
+        self.transaction_id = f"tx-{next(self._transaction_ids)}"
+        return {"transactionId": self.transaction_id}
+
+    def commit_transaction(self, **kwargs):
+        self.calls.append(("commit_transaction", kwargs))
+        self._check_transaction(kwargs)
+        self.db.execute("COMMIT")
+        self.transaction_id = None
+        return {"transactionStatus": "Transaction Committed"}
+
+    def rollback_transaction(self, **kwargs):
+        self.calls.append(("rollback_transaction", kwargs))
+        self._check_transaction(kwargs)
+        self.db.execute("ROLLBACK")
+        self.transaction_id = None
+        return {"transactionStatus": "Rollback Complete"}
+
+    def execute_statement(self, **kwargs):
+        self.calls.append(("execute_statement", kwargs))
+        self._check_transaction(kwargs)
+        cursor = self.db.execute(
+            kwargs["sql"], self._params(kwargs.get("parameters", []))
+        )
+        response = {"numberOfRecordsUpdated": max(cursor.rowcount, 0)}
+        if cursor.description is not None:
+            response["records"] = [
+                [self._field(value) for value in row] for row in cursor.fetchall()
+            ]
+            if kwargs.get("includeResultMetadata"):
+                response["columnMetadata"] = [
+                    {"name": column[0], "label": column[0]}
+                    for column in cursor.description
+                ]
+        elif cursor.lastrowid:
+            response["generatedFields"] = [{"longValue": cursor.lastrowid}]
+        return response
+
+    def batch_execute_statement(self, **kwargs):
+        self.calls.append(("batch_execute_statement", kwargs))
+        self._check_transaction(kwargs)
+        update_results = []
+        for parameters in kwargs["parameterSets"]:
+            cursor = self.db.execute(kwargs["sql"], self._params(parameters))
+            generated = [{"longValue": cursor.lastrowid}] if cursor.lastrowid else []
+            update_results.append({"generatedFields": generated})
+        return {"updateResults": update_results}
+
+    def rows(self, sql, params=()):
+        return self.db.execute(sql, params).fetchall()
@@ -0,0 +1,50 @@
+# tests/workmail_common/secretsmanager_stub.py
+"""
+Local stand-in for the boto3 ``secretsmanager`` client.
+
+Supports the calls the layer makes: create_secret(), get_secret_value() and
+delete_secret(). Unknown secrets raise ResourceNotFoundException like AWS does.
+"""
+
+import itertools
+from botocore.exceptions import ClientError
+
+SECRET_ARN_PREFIX = "arn:aws:secretsmanager:us-east-1:123456789012:secret:"
+
+
+class LocalSecretsManager:
+
+    def __init__(self):
+        self.secrets = {}
+        self._versions = itertools.count(1)
+
+    def _not_found(self, operation, secret_id):
+        return ClientError(
+            {
+                "Error": {
+                    "Code": "ResourceNotFoundException",
+                    "Message": f"Secret {secret_id} not found",
+                }
+            },
+            operation,
+        )
+
+    def create_secret(self, Name, SecretString, **kwargs):
+        arn = f"{SECRET_ARN_PREFIX}{Name}"
+        self.secrets[arn] = SecretString
+        return {"ARN": arn, "Name": Name, "VersionId": str(next(self._versions))}
+
+    def get_secret_value(self, SecretId, **kwargs):
+        if SecretId not in self.secrets:
+            raise self._not_found("GetSecretValue", SecretId)
+        return {
+            "ARN": SecretId,
+            "SecretString": self.secrets[SecretId],
+            "VersionId": "1",
+            "VersionStages": ["AWSCURRENT"],
+        }
+
+    def delete_secret(self, SecretId, **kwargs):
+        if self.secrets.pop(SecretId, None) is None:
+            raise self._not_found("DeleteSecret", SecretId)
+        return {"ARN": SecretId}
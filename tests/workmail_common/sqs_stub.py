@@ -0,0 +1,76 @@
+# tests/workmail_common/sqs_stub.py
+"""
+Local stand-in for an SQS queue and the Lambda event source that drains it.
+
+send_message() has the boto3 ``sqs`` client's shape. drain() hands the queued
+messages to a handler in batches, like an SQS event source mapping with
+ReportBatchItemFailures: reported (or, if the handler raises, all) messages are
+redelivered, and moved to dead_letters after max_receive_count receives.
+"""
+
+import itertools
+from collections import deque
+
+QUEUE_ARN = "arn:aws:sqs:us-east-1:123456789012:workmail-create"
+QUEUE_URL = "https://sqs.us-east-1.amazonaws.com/123456789012/workmail-create"
+
+
+class LocalSqsQueue:
+
+    def __init__(self, batch_size=10, max_receive_count=5):
+        self.batch_size = batch_size
+        self.max_receive_count = max_receive_count
+        self.messages = deque()
+        self.dead_letters = []
+        self.batches = []
+        self._message_ids = itertools.count(1)
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        message_id = f"message-{next(self._message_ids)}"
+        self.messages.append(
+            {"messageId": message_id, "body": MessageBody, "receiveCount": 0}
+        )
+        return {"MessageId": message_id}
+
+    @staticmethod
+    def record(message):
+        return {
+            "messageId": message["messageId"],
+            "receiptHandle": f"handle-{message['messageId']}",
+            "body": message["body"],
+            "attributes": {"ApproximateReceiveCount": str(message["receiveCount"])},
+            "eventSource": "aws:sqs",
+            "eventSourceARN": QUEUE_ARN,
+        }
+
+    def drain(self, handler, context=None, max_batches=100):
+        """Deliver batches until the queue is empty; return the handler responses."""
+        responses = []
+        while self.messages and len(responses) < max_batches:
+            batch = [
+                self.messages.popleft()
+                for _ in range(min(self.batch_size, len(self.messages)))
+            ]
+            for message in batch:
+                message["receiveCount"] += 1
+            self.batches.append([message["messageId"] for message in batch])
+            try:
+                response = handler(
+                    {"Records": [self.record(message) for message in batch]}, context
+                )
+                failed = {
+                    failure["itemIdentifier"]
+                    for failure in (response or {}).get("batchItemFailures", [])
+                }
+            except Exception as e:
+                response = e
+                failed = {message["messageId"] for message in batch}
+            responses.append(response)
+            for message in batch:
+                if message["messageId"] not in failed:
+                    continue
+                if message["receiveCount"] >= self.max_receive_count:
+                    self.dead_letters.append(message)
+                else:
+                    self.messages.append(message)
+        return responses
@@ -0,0 +1,148 @@
+# tests/workmail_common/unit/test_checkpoints.py
+import json
+import unittest
+from unittest.mock import patch, MagicMock
+from workmail_common.db import (
+    clear_checkpoints,
+    db_connection,
+    run_checkpointed,
+    workflow_key,
+)
+from tests.workmail_common.rds_data_stub import SqliteRdsDataClient
+
+CONFIG = {
+    "DB_BACKEND": "data-api",
+    "DB_CLUSTER_ARN": "arn:aws:rds:region:account-id:cluster:cluster-id",
+    "DB_SECRET_ARN": "arn:aws:secretsmanager:region:account-id:secret:secret-id",
+    "DATABASE_NAME": "test_db",
+}
+
+
+class TestCheckpoints(unittest.TestCase):
+
+    def setUp(self):
+        self.client = SqliteRdsDataClient()
+        patcher = patch("workmail_common.aws.get_aws_client", return_value=self.client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def stored(self, key, step):
+        rows = self.client.rows(
+            "SELECT output FROM workmail_workflow_checkpoints WHERE workflow_key = ? AND step = ?",
+            (key, step),
+        )
+        return json.loads(rows[0][0]) if rows else None
+
+    def test_workflow_key_is_normalized(self):
+        # Act & Assert
+        self.assertEqual(workflow_key("42", " Example.COM. "), "42:example.com")
+        self.assertEqual(
+            workflow_key(42, "example.com"), workflow_key("42", "EXAMPLE.com")
+        )
+
+    def test_workflow_key_matches_extracted_domain(self):
+        # Act
+        keys = {
+            workflow_key(42, vanity_name)
+            for vanity_name in [
+                "https://example.com",
+                "http://www.Example.com/path",
+                "www.example.com",
+                "example.com",
+            ]
+        }
+
+        # Assert
+        self.assertEqual(keys, {"42:example.com"})
+
+    def test_workflow_key_rejects_invalid_domains(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            workflow_key(42, "not a domain")
+
+    def test_completed_step_is_not_run_again(self):
+        # Arrange
+        run = MagicMock(return_value={"organization_id": "org-id"})
+
+        # Act
+        first = run_checkpointed(CONFIG, "1:example.com", "create_org", run)
+        second = run_checkpointed(CONFIG, "1:example.com", "create_org", run)
+
+        # Assert
+        self.assertEqual(first, {"organization_id": "org-id"})
+        self.assertEqual(second, first)
+        run.assert_called_once()
+        self.assertEqual(
+            self.stored("1:example.com", "create_org"), {"organization_id": "org-id"}
+        )
+
+    def test_failed_step_is_not_recorded(self):
+        # Arrange
+        run = MagicMock(
+            side_effect=[RuntimeError("Test exception"), {"organization_id": "org-id"}]
+        )
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            run_checkpointed(CONFIG, "1:example.com", "create_org", run)
+        self.assertIsNone(self.stored("1:example.com", "create_org"))
+        result = run_checkpointed(CONFIG, "1:example.com", "create_org", run)
+
+        # Assert
+        self.assertEqual(result, {"organization_id": "org-id"})
+        self.assertEqual(run.call_count, 2)
+
+    def test_steps_and_workflows_are_independent(self):
+        # Arrange
+        run_checkpointed(CONFIG, "1:example.com", "create_org", lambda: {"a": 1})
+
+        # Act
+        other_step = run_checkpointed(
+            CONFIG, "1:example.com", "create_iam_user", lambda: {"b": 2}
+        )
+        other_workflow = run_checkpointed(
+            CONFIG, "2:example.com", "create_org", lambda: {"c": 3}
+        )
+
+        # Assert
+        self.assertEqual(other_step, {"b": 2})
+        self.assertEqual(other_workflow, {"c": 3})
+
+    def test_recorded_trims_what_is_stored(self):
+        # Act
+        result = run_checkpointed(
+            CONFIG,
+            "1:example.com",
+            "create_iam_user",
+            lambda: {"apiKey": "key", "secretKey": "secret"},
+            recorded=lambda output: {"apiKey": output["apiKey"]},
+        )
+        cached = run_checkpointed(
+            CONFIG, "1:example.com", "create_iam_user", MagicMock()
+        )
+
+        # Assert
+        self.assertEqual(result, {"apiKey": "key", "secretKey": "secret"})
+        self.assertEqual(cached, {"apiKey": "key"})
+
+    def test_clear_checkpoints(self):
+        # Arrange
+        run_checkpointed(CONFIG, "1:example.com", "create_org", lambda: {"a": 1})
+        run_checkpointed(CONFIG, "1:example.com", "create_iam_user", lambda: {"b": 2})
+        run_checkpointed(CONFIG, "2:example.com", "create_org", lambda: {"c": 3})
+
+        # Act
+        with db_connection(CONFIG) as connection:
+            clear_checkpoints(["1:example.com"], connection)
+
+        # Assert
+        self.assertEqual(
+            self.client.rows(
+                "SELECT workflow_key, step FROM workmail_workflow_checkpoints"
+            ),
+            [("2:example.com", "create_org")],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,22 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from workmail_common.utils import connect_to_rds
+import mysql.connector
+from mysql.connector import errorcode
+from workmail_common.secrets import invalidate_secret
+from workmail_common.db import connect_to_rds
 
 
 class TestConnectToRds(unittest.TestCase):
 
-    @patch("workmail_common.utils.mysql.connector.connect")
-    @patch("workmail_common.utils.json.loads")
-    @patch("workmail_common.utils.boto3.client")
+    def setUp(self):
+        invalidate_secret()
+
+    def tearDown(self):
+        invalidate_secret()
+
+    @patch("mysql.connector.connect")
+    @patch("workmail_common.db.json.loads")
+    @patch("workmail_common.aws.boto3.client")
     def test_connect_to_rds_success(
         self, mock_boto_client, mock_json_loads, mock_mysql_connect
     ):
@@ -48,11 +57,11 @@ class TestConnectToRds(unittest.TestCase):
         mock_mysql_connect.assert_called_once_with(
             user="test_user", password="test_pass", host="test_host", database="test_db"
         )
-        self.assertEqual(connection, mock_connection)
+        self.assertIs(connection.wrapped, mock_connection)
 
-    @patch("workmail_common.utils.mysql.connector.connect")
-    @patch("workmail_common.utils.json.loads")
-    @patch("workmail_common.utils.boto3.client")
+    @patch("mysql.connector.connect")
+    @patch("workmail_common.db.json.loads")
+    @patch("workmail_common.aws.boto3.client")
     def test_connect_to_rds_secret_manager_exception(
         self, mock_boto_client, mock_json_loads, mock_mysql_connect
     ):
@@ -80,9 +89,9 @@ class TestConnectToRds(unittest.TestCase):
         mock_json_loads.assert_not_called()
         mock_mysql_connect.assert_not_called()
 
-    @patch("workmail_common.utils.mysql.connector.connect")
-    @patch("workmail_common.utils.json.loads")
-    @patch("workmail_common.utils.boto3.client")
+    @patch("mysql.connector.connect")
+    @patch("workmail_common.db.json.loads")
+    @patch("workmail_common.aws.boto3.client")
     def test_connect_to_rds_mysql_exception(
         self, mock_boto_client, mock_json_loads, mock_mysql_connect
     ):
@@ -124,6 +133,42 @@ class TestConnectToRds(unittest.TestCase):
             user="test_user", password="test_pass", host="test_host", database="test_db"
         )
 
+    @patch("workmail_common.secrets.SECRET_MIN_REFRESH_SECONDS", 0)
+    @patch("mysql.connector.connect")
+    def test_connect_to_rds_refreshes_secret_on_auth_error(self, mock_mysql_connect):
+        # Mock a cached secret that has since been rotated
+        mock_secret_manager_client = MagicMock()
+        mock_secret_manager_client.get_secret_value.side_effect = [
+            {
+                "SecretString": '{"username": "test_user", "password": "old_pass", "host": "test_host"}',
+                "VersionId": "v1",
+            },
+            {
+                "SecretString": '{"username": "test_user", "password": "new_pass", "host": "test_host"}',
+                "VersionId": "v2",
+            },
+        ]
+        mock_connection = MagicMock()
+        mock_mysql_connect.side_effect = [
+            mysql.connector.Error(errno=errorcode.ER_ACCESS_DENIED_ERROR),
+            mock_connection,
+        ]
+
+        config = {
+            "DB_SECRET_ARN": "arn:aws:secretsmanager:region:account-id:secret:secret-id",
+            "DATABASE_NAME": "test_db",
+        }
+
+        # Call the function
+        connection = connect_to_rds(mock_secret_manager_client, config)
+
+        # Assertions
+        self.assertIs(connection.wrapped, mock_connection)
+        self.assertEqual(mock_secret_manager_client.get_secret_value.call_count, 2)
+        mock_mysql_connect.assert_called_with(
+            user="test_user", password="new_pass", host="test_host", database="test_db"
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,219 @@
+# tests/workmail_common/unit/test_data_api_backend.py
+import os
+import unittest
+from unittest.mock import patch, MagicMock
+from workmail_common.db import (
+    DATA_API_BATCH_SIZE,
+    DataApiBackend,
+    MySQLBackend,
+    _translate_placeholders,
+    db_connection,
+    get_db_backend,
+)
+from create_workmail_org_function.app import (
+    get_client_info,
+    register_workmail_organization,
+)
+from create_workmail_user_function.app import update_workmail_registration
+from delete_workmail_org_function.app import (
+    get_workmail_organization_id,
+    unregister_workmail_organization,
+)
+from tests.workmail_common.rds_data_stub import SqliteRdsDataClient
+
+CONFIG = {
+    "DB_BACKEND": "data-api",
+    "DB_CLUSTER_ARN": "arn:aws:rds:region:account-id:cluster:cluster-id",
+    "DB_SECRET_ARN": "arn:aws:secretsmanager:region:account-id:secret:secret-id",
+    "DATABASE_NAME": "test_db",
+}
+
+
+class TestDataApiBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.client = SqliteRdsDataClient()
+        self.client.rows(
+            "INSERT INTO app (ownerid, ownerfirstname, ownerlastname) VALUES (?, ?, ?)",
+            (12345, "John", "Doe"),
+        )
+        self.backend = DataApiBackend(CONFIG, rds_data_client=self.client)
+
+    def call_names(self):
+        return [name for name, _ in self.client.calls]
+
+    def test_handler_sql_runs_unchanged(self):
+        # Act
+        with self.backend.connection() as connection:
+            first_name, last_name = get_client_info(12345, connection)
+            register_workmail_organization(
+                12345, "john.doe", "example.com", "org-id", connection
+            )
+        with self.backend.connection() as connection:
+            update_workmail_registration(12345, "org-id", connection)
+        with self.backend.connection() as connection:
+            organization_id = get_workmail_organization_id(
+                12345, "example.com", connection
+            )
+            state = self.client.rows(
+                "SELECT state FROM workmail_organizations WHERE organization_id = ?",
+                ("org-id",),
+            )
+            unregistered = unregister_workmail_organization(organization_id, connection)
+
+        # Assert
+        self.assertEqual((first_name, last_name), ("John", "Doe"))
+        self.assertEqual(organization_id, "org-id")
+        self.assertEqual(state, [("ACTIVE",)])
+        self.assertTrue(unregistered)
+        self.assertEqual(self.client.rows("SELECT * FROM workmail_organizations"), [])
+
+    def test_reads_run_outside_a_transaction(self):
+        # Act
+        with self.backend.connection() as connection:
+            get_client_info(12345, connection)
+
+        # Assert
+        self.assertEqual(self.call_names(), ["execute_statement"])
+        _, kwargs = self.client.calls[0]
+        self.assertEqual(
+            kwargs["sql"],
+            "SELECT ownerfirstname, ownerlastname FROM app WHERE ownerid = :p0 LIMIT 1",
+        )
+        self.assertEqual(
+            kwargs["parameters"], [{"name": "p0", "value": {"longValue": 12345}}]
+        )
+        self.assertEqual(kwargs["resourceArn"], CONFIG["DB_CLUSTER_ARN"])
+        self.assertEqual(kwargs["secretArn"], CONFIG["DB_SECRET_ARN"])
+        self.assertEqual(kwargs["database"], "test_db")
+        self.assertNotIn("transactionId", kwargs)
+
+    def test_writes_commit_in_a_transaction(self):
+        # Act
+        with self.backend.connection() as connection:
+            register_workmail_organization(
+                12345, "john.doe", "example.com", "org-id", connection
+            )
+
+        # Assert
+        self.assertEqual(
+            self.call_names(),
+            [
+                "execute_statement",
+                "begin_transaction",
+                "execute_statement",
+                "commit_transaction",
+            ],
+        )
+        self.assertNotIn("transactionId", self.client.calls[0][1])
+        self.assertEqual(self.client.calls[2][1]["transactionId"], "tx-1")
+
+    def test_uncommitted_writes_roll_back_on_close(self):
+        # Act
+        with self.assertRaises(RuntimeError):
+            with self.backend.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("DELETE FROM app WHERE ownerid = %s", (12345,))
+                raise RuntimeError("Test exception")
+
+        # Assert
+        self.assertEqual(self.call_names()[-1], "rollback_transaction")
+        self.assertEqual(len(self.client.rows("SELECT * FROM app")), 1)
+
+    def test_dictionary_cursor(self):
+        # Act
+        with self.backend.connection() as connection:
+            cursor = connection.cursor(dictionary=True)
+            cursor.execute(
+                "SELECT ownerfirstname, ownerlastname FROM app WHERE ownerid = %s",
+                (12345,),
+            )
+            row = cursor.fetchone()
+
+        # Assert
+        self.assertEqual(row, {"ownerfirstname": "John", "ownerlastname": "Doe"})
+
+    def test_execute_batch_uses_batch_execute_statement(self):
+        # Arrange
+        param_sets = [
+            (i, f"user{i}", f"example{i}.com", f"org-{i}", "PENDING")
+            for i in range(DATA_API_BATCH_SIZE + 1)
+        ]
+
+        # Act
+        count = self.backend.execute_batch(
+            "INSERT INTO workmail_organizations (ownerid, email_username, vanity_name, organization_id, state) VALUES (%s, %s, %s, %s, %s)",
+            param_sets,
+        )
+
+        # Assert
+        self.assertEqual(count, DATA_API_BATCH_SIZE + 1)
+        self.assertEqual(
+            self.call_names(),
+            [
+                "begin_transaction",
+                "batch_execute_statement",
+                "batch_execute_statement",
+                "commit_transaction",
+            ],
+        )
+        self.assertEqual(
+            self.client.rows("SELECT COUNT(*) FROM workmail_organizations"),
+            [(DATA_API_BATCH_SIZE + 1,)],
+        )
+
+    def test_translate_placeholders_skips_literals(self):
+        # Act
+        sql = _translate_placeholders(
+            "SELECT * FROM t WHERE a = %s AND b LIKE '%s' AND c = %s AND d LIKE 'x%%'"
+        )
+
+        # Assert
+        self.assertEqual(
+            sql,
+            "SELECT * FROM t WHERE a = :p0 AND b LIKE '%s' AND c = :p1 AND d LIKE 'x%%'",
+        )
+
+
+class TestGetDbBackend(unittest.TestCase):
+
+    @patch.dict(os.environ, {}, clear=True)
+    def test_defaults_to_mysql(self):
+        # Act
+        backend = get_db_backend({"DB_SECRET_ARN": "arn", "DATABASE_NAME": "db"})
+
+        # Assert
+        self.assertIsInstance(backend, MySQLBackend)
+
+    @patch.dict(os.environ, {"DB_BACKEND": "data-api"})
+    @patch("workmail_common.aws.get_aws_client")
+    def test_env_selects_data_api(self, mock_get_aws_client):
+        # Act
+        backend = get_db_backend({"DB_CLUSTER_ARN": "arn"})
+
+        # Assert
+        self.assertIsInstance(backend, DataApiBackend)
+        mock_get_aws_client.assert_called_once_with("rds-data")
+
+    @patch.dict(os.environ, {"DB_BACKEND": "postgres"})
+    def test_unknown_backend(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            get_db_backend({})
+
+    @patch("workmail_common.aws.get_aws_client")
+    def test_db_connection_uses_configured_backend(self, mock_get_aws_client):
+        # Arrange
+        mock_get_aws_client.return_value = MagicMock()
+
+        # Act
+        with db_connection(CONFIG) as connection:
+            pass
+
+        # Assert
+        self.assertEqual(connection.database, "test_db")
+        mock_get_aws_client.return_value.rollback_transaction.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+# tests/workmail_common/unit/test_db_connection.py
+import unittest
+from unittest.mock import patch, MagicMock
+import mysql.connector
+from mysql.connector import errorcode
+from mysql.connector.errors import PoolError
+from workmail_common.secrets import invalidate_secret
+from workmail_common.db import (
+    close_db_pools,
+    db_connection,
+    get_db_connection,
+    get_db_pool,
+)
+
+CONFIG = {
+    "DB_SECRET_ARN": "arn:aws:secretsmanager:region:account-id:secret:secret-id",
+    "DATABASE_NAME": "test_db",
+}
+
+
+class TestDbConnection(unittest.TestCase):
+
+    def setUp(self):
+        close_db_pools()
+        invalidate_secret()
+        self.secret_manager_client = MagicMock()
+        self.secret_manager_client.get_secret_value.return_value = {
+            "SecretString": '{"username": "test_user", "password": "test_pass", "host": "test_host"}',
+            "VersionId": "v1",
+        }
+
+    def tearDown(self):
+        close_db_pools()
+        invalidate_secret()
+
+    @patch("mysql.connector.pooling.MySQLConnectionPool")
+    def test_get_db_pool_created_once(self, mock_pool_class):
+        # Act
+        first = get_db_pool(CONFIG, self.secret_manager_client)
+        second = get_db_pool(CONFIG, self.secret_manager_client)
+
+        # Assert
+        self.assertIs(first, second)
+        mock_pool_class.assert_called_once_with(
+            pool_name=unittest.mock.ANY, pool_size=unittest.mock.ANY
+        )
+        first.set_config.assert_called_once_with(
+            user="test_user", password="test_pass", host="test_host", database="test_db"
+        )
+        self.secret_manager_client.get_secret_value.assert_called_once()
+
+    @patch("mysql.connector.pooling.MySQLConnectionPool")
+    def test_get_db_connection_opens_connections_lazily(self, mock_pool_class):
+        # Arrange
+        mock_pool = mock_pool_class.return_value
+        mock_pool.pool_name = "workmail_test"
+        mock_pool.pool_size = 2
+        mock_connection = MagicMock()
+        mock_pool.get_connection.side_effect = [
+            PoolError("Failed getting connection; pool exhausted"),
+            mock_connection,
+        ]
+
+        # Act
+        connection = get_db_connection(CONFIG, self.secret_manager_client)
+
+        # Assert
+        self.assertEqual(connection, mock_connection)
+        mock_pool.add_connection.assert_called_once()
+        self.assertEqual(mock_pool.get_connection.call_count, 2)
+
+    @patch("mysql.connector.pooling.MySQLConnectionPool")
+    def test_get_db_connection_pool_exhausted(self, mock_pool_class):
+        # Arrange
+        mock_pool = mock_pool_class.return_value
+        mock_pool.pool_name = "workmail_test"
+        mock_pool.pool_size = 0
+        mock_pool.get_connection.side_effect = PoolError("pool exhausted")
+
+        # Act & Assert
+        with self.assertRaises(PoolError):
+            get_db_connection(CONFIG, self.secret_manager_client)
+        mock_pool.add_connection.assert_not_called()
+
+    @patch("workmail_common.secrets.SECRET_MIN_REFRESH_SECONDS", 0)
+    @patch("mysql.connector.pooling.MySQLConnectionPool")
+    def test_get_db_connection_refreshes_credentials_on_auth_error(
+        self, mock_pool_class
+    ):
+        # Arrange
+        self.secret_manager_client.get_secret_value.side_effect = [
+            {
+                "SecretString": '{"username": "test_user", "password": "old_pass", "host": "test_host"}',
+                "VersionId": "v1",
+            },
+            {
+                "SecretString": '{"username": "test_user", "password": "new_pass", "host": "test_host"}',
+                "VersionId": "v2",
+            },
+        ]
+        mock_pool = mock_pool_class.return_value
+        mock_connection = MagicMock()
+        mock_pool.get_connection.side_effect = [
+            mysql.connector.Error(errno=errorcode.ER_ACCESS_DENIED_ERROR),
+            mock_connection,
+        ]
+
+        # Act
+        connection = get_db_connection(CONFIG, self.secret_manager_client)
+
+        # Assert
+        self.assertEqual(connection, mock_connection)
+        mock_pool.set_config.assert_called_with(
+            user="test_user", password="new_pass", host="test_host", database="test_db"
+        )
+
+    @patch("mysql.connector.pooling.MySQLConnectionPool")
+    def test_get_db_connection_other_error(self, mock_pool_class):
+        # Arrange
+        mock_pool = mock_pool_class.return_value
+        mock_pool.get_connection.side_effect = mysql.connector.InterfaceError(
+            "Can't connect"
+        )
+
+        # Act & Assert
+        with self.assertRaises(mysql.connector.InterfaceError):
+            get_db_connection(CONFIG, self.secret_manager_client)
+        self.assertEqual(mock_pool.set_config.call_count, 1)
+
+    @patch("mysql.connector.pooling.MySQLConnectionPool")
+    def test_db_connection_returns_connection_to_pool(self, mock_pool_class):
+        # Arrange
+        mock_connection = MagicMock()
+        mock_pool_class.return_value.get_connection.return_value = mock_connection
+
+        # Act
+        with db_connection(CONFIG, self.secret_manager_client) as connection:
+            self.assertIs(connection.wrapped, mock_connection)
+            mock_connection.close.assert_not_called()
+
+        # Assert
+        mock_connection.close.assert_called_once()
+
+    @patch("mysql.connector.pooling.MySQLConnectionPool")
+    def test_db_connection_returns_connection_on_exception(self, mock_pool_class):
+        # Arrange
+        mock_connection = MagicMock()
+        mock_pool_class.return_value.get_connection.return_value = mock_connection
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            with db_connection(CONFIG, self.secret_manager_client):
+                raise ValueError("Test exception")
+        mock_connection.close.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
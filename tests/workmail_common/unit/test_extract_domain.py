@@ -1,5 +1,5 @@
 import unittest
-from workmail_common.utils import extract_domain
+from workmail_common.domain import extract_domain
 
 
 class TestExtractDomain(unittest.TestCase):
@@ -1,12 +1,18 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from workmail_common.utils import get_account_id
+from workmail_common.aws import get_account_id, clear_aws_clients
 from botocore.exceptions import BotoCoreError, NoCredentialsError
 
 
 class TestGetAccountId(unittest.TestCase):
 
-    @patch("workmail_common.utils.boto3.client")
+    def setUp(self):
+        clear_aws_clients()
+
+    def tearDown(self):
+        clear_aws_clients()
+
+    @patch("workmail_common.aws.boto3.client")
     def test_get_account_id_success(self, mock_boto_client):
         # Mock the STS client and its response
         mock_sts_client = MagicMock()
@@ -17,11 +23,11 @@ class TestGetAccountId(unittest.TestCase):
         account_id = get_account_id()
 
         # Assertions
-        mock_boto_client.assert_called_once_with("sts")
+        mock_boto_client.assert_called_once_with("sts", config=unittest.mock.ANY)
         mock_sts_client.get_caller_identity.assert_called_once()
         self.assertEqual(account_id, "123456789012")
 
-    @patch("workmail_common.utils.boto3.client")
+    @patch("workmail_common.aws.boto3.client")
     def test_get_account_id_boto_core_error(self, mock_boto_client):
         # Mock the STS client to raise a BotoCoreError
         mock_sts_client = MagicMock()
@@ -32,10 +38,10 @@ class TestGetAccountId(unittest.TestCase):
         with self.assertRaises(BotoCoreError):
             get_account_id()
 
-        mock_boto_client.assert_called_once_with("sts")
+        mock_boto_client.assert_called_once_with("sts", config=unittest.mock.ANY)
         mock_sts_client.get_caller_identity.assert_called_once()
 
-    @patch("workmail_common.utils.boto3.client")
+    @patch("workmail_common.aws.boto3.client")
     def test_get_account_id_no_credentials_error(self, mock_boto_client):
         # Mock the STS client to raise a NoCredentialsError
         mock_sts_client = MagicMock()
@@ -46,7 +52,7 @@ class TestGetAccountId(unittest.TestCase):
         with self.assertRaises(NoCredentialsError):
             get_account_id()
 
-        mock_boto_client.assert_called_once_with("sts")
+        mock_boto_client.assert_called_once_with("sts", config=unittest.mock.ANY)
         mock_sts_client.get_caller_identity.assert_called_once()
 
 
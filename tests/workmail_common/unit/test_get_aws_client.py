@@ -1,35 +1,91 @@
 # tests/workmail_common/unit/test_get_aws_client.py
 import unittest
 import socket
+import threading
 from unittest.mock import patch, MagicMock
+from botocore.config import Config
 from botocore.exceptions import BotoCoreError, NoCredentialsError
-from workmail_common.utils import get_aws_client
+from workmail_common.aws import get_aws_client, clear_aws_clients, resolve_aws_endpoint
 
 
 class TestGetAwsClient(unittest.TestCase):
 
-    @patch("workmail_common.utils.boto3.client")
-    @patch("workmail_common.utils.socket.gethostbyname")
+    def setUp(self):
+        clear_aws_clients()
+
+    def tearDown(self):
+        clear_aws_clients()
+
+    @patch("workmail_common.aws.boto3.client")
+    @patch("workmail_common.aws.socket.gethostbyname")
     def test_get_aws_client_success(self, mock_gethostbyname, mock_boto_client):
         # Arrange
         mock_client = MagicMock()
-        mock_client.meta.endpoint_url = "https://service.us-east-1.amazonaws.com"
         mock_boto_client.return_value = mock_client
-        mock_gethostbyname.return_value = "127.0.0.1"
 
         # Act
         client = get_aws_client("s3")
 
         # Assert
         mock_boto_client.assert_called_once_with("s3", config=unittest.mock.ANY)
-        mock_gethostbyname.assert_called_once_with("service.us-east-1.amazonaws.com")
+        mock_gethostbyname.assert_not_called()
         self.assertEqual(client, mock_client)
 
-    @patch("workmail_common.utils.boto3.client")
-    @patch("workmail_common.utils.socket.gethostbyname")
-    def test_get_aws_client_no_credentials_error(
-        self, mock_gethostbyname, mock_boto_client
-    ):
+    @patch("workmail_common.aws.boto3.client")
+    def test_get_aws_client_reuses_cached_client(self, mock_boto_client):
+        # Arrange
+        mock_boto_client.side_effect = lambda *args, **kwargs: MagicMock()
+
+        # Act
+        first = get_aws_client("s3")
+        second = get_aws_client("s3")
+
+        # Assert
+        self.assertIs(first, second)
+        mock_boto_client.assert_called_once_with("s3", config=unittest.mock.ANY)
+
+    @patch("workmail_common.aws.boto3.client")
+    def test_get_aws_client_keyed_by_region_and_config(self, mock_boto_client):
+        # Arrange
+        mock_boto_client.side_effect = lambda *args, **kwargs: MagicMock()
+        custom_config = Config(connect_timeout=1)
+
+        # Act
+        default_client = get_aws_client("s3")
+        regional_client = get_aws_client("s3", region_name="us-west-2")
+        custom_client = get_aws_client("s3", config=custom_config)
+
+        # Assert
+        self.assertIsNot(default_client, regional_client)
+        self.assertIsNot(default_client, custom_client)
+        self.assertEqual(mock_boto_client.call_count, 3)
+        mock_boto_client.assert_any_call(
+            "s3", config=unittest.mock.ANY, region_name="us-west-2"
+        )
+        mock_boto_client.assert_any_call("s3", config=custom_config)
+
+    @patch("workmail_common.aws.boto3.client")
+    def test_get_aws_client_thread_safe(self, mock_boto_client):
+        # Arrange
+        mock_boto_client.side_effect = lambda *args, **kwargs: MagicMock()
+        results = []
+
+        def worker():
+            results.append(get_aws_client("workmail"))
+
+        # Act
+        threads = [threading.Thread(target=worker) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Assert
+        mock_boto_client.assert_called_once_with("workmail", config=unittest.mock.ANY)
+        self.assertEqual(len({id(client) for client in results}), 1)
+
+    @patch("workmail_common.aws.boto3.client")
+    def test_get_aws_client_no_credentials_error(self, mock_boto_client):
         # Arrange
         mock_boto_client.side_effect = NoCredentialsError()
 
@@ -38,11 +94,9 @@ class TestGetAwsClient(unittest.TestCase):
             get_aws_client("s3")
 
         mock_boto_client.assert_called_once_with("s3", config=unittest.mock.ANY)
-        mock_gethostbyname.assert_not_called()
 
-    @patch("workmail_common.utils.boto3.client")
-    @patch("workmail_common.utils.socket.gethostbyname")
-    def test_get_aws_client_boto_core_error(self, mock_gethostbyname, mock_boto_client):
+    @patch("workmail_common.aws.boto3.client")
+    def test_get_aws_client_boto_core_error(self, mock_boto_client):
         # Arrange
         mock_boto_client.side_effect = BotoCoreError()
 
@@ -51,22 +105,33 @@ class TestGetAwsClient(unittest.TestCase):
             get_aws_client("s3")
 
         mock_boto_client.assert_called_once_with("s3", config=unittest.mock.ANY)
-        mock_gethostbyname.assert_not_called()
 
-    @patch("workmail_common.utils.boto3.client")
-    @patch("workmail_common.utils.socket.gethostbyname")
-    def test_get_aws_client_socket_error(self, mock_gethostbyname, mock_boto_client):
+    @patch("workmail_common.aws.socket.gethostbyname")
+    def test_resolve_aws_endpoint_success(self, mock_gethostbyname):
+        # Arrange
+        mock_client = MagicMock()
+        mock_client.meta.endpoint_url = "https://service.us-east-1.amazonaws.com"
+        mock_gethostbyname.return_value = "127.0.0.1"
+
+        # Act
+        hostname, service_ip = resolve_aws_endpoint(mock_client)
+
+        # Assert
+        mock_gethostbyname.assert_called_once_with("service.us-east-1.amazonaws.com")
+        self.assertEqual(hostname, "service.us-east-1.amazonaws.com")
+        self.assertEqual(service_ip, "127.0.0.1")
+
+    @patch("workmail_common.aws.socket.gethostbyname")
+    def test_resolve_aws_endpoint_socket_error(self, mock_gethostbyname):
         # Arrange
         mock_client = MagicMock()
         mock_client.meta.endpoint_url = "https://service.us-east-1.amazonaws.com"
-        mock_boto_client.return_value = mock_client
         mock_gethostbyname.side_effect = socket.error()
 
         # Act & Assert
         with self.assertRaises(socket.error):
-            get_aws_client("s3")
+            resolve_aws_endpoint(mock_client)
 
-        mock_boto_client.assert_called_once_with("s3", config=unittest.mock.ANY)
         mock_gethostbyname.assert_called_once_with("service.us-east-1.amazonaws.com")
 
 
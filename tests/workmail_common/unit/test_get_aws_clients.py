@@ -1,12 +1,18 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from workmail_common.utils import get_aws_clients
+from workmail_common.aws import get_aws_clients, clear_aws_clients
 from botocore.exceptions import BotoCoreError, NoCredentialsError
 
 
 class TestGetAwsClients(unittest.TestCase):
 
-    @patch("workmail_common.utils.boto3.client")
+    def setUp(self):
+        clear_aws_clients()
+
+    def tearDown(self):
+        clear_aws_clients()
+
+    @patch("workmail_common.aws.boto3.client")
     def test_get_aws_clients_success(self, mock_boto_client):
         # Mock the clients
         mock_secretsmanager_client = MagicMock()
@@ -30,7 +36,7 @@ class TestGetAwsClients(unittest.TestCase):
         mock_boto_client.assert_any_call("ses", config=unittest.mock.ANY)
         mock_boto_client.assert_any_call("workmail", config=unittest.mock.ANY)
 
-    @patch("workmail_common.utils.boto3.client")
+    @patch("workmail_common.aws.boto3.client")
     def test_get_aws_clients_boto_core_error(self, mock_boto_client):
         # Mock the client to raise a BotoCoreError
         mock_boto_client.side_effect = BotoCoreError()
@@ -43,7 +49,7 @@ class TestGetAwsClients(unittest.TestCase):
             "secretsmanager", config=unittest.mock.ANY
         )
 
-    @patch("workmail_common.utils.boto3.client")
+    @patch("workmail_common.aws.boto3.client")
     def test_get_aws_clients_no_credentials_error(self, mock_boto_client):
         # Mock the client to raise a NoCredentialsError
         mock_boto_client.side_effect = NoCredentialsError()
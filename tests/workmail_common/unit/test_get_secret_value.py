@@ -1,12 +1,18 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from workmail_common.utils import get_secret_value
+from workmail_common.secrets import get_secret_value, get_secret, invalidate_secret
 from botocore.exceptions import BotoCoreError, NoCredentialsError, ClientError
 
 
 class TestGetSecretValue(unittest.TestCase):
 
-    @patch("workmail_common.utils.get_aws_client")
+    def setUp(self):
+        invalidate_secret()
+
+    def tearDown(self):
+        invalidate_secret()
+
+    @patch("workmail_common.aws.get_aws_client")
     def test_get_secret_value_success(self, mock_get_aws_client):
         # Mock the Secrets Manager client and its response
         mock_secretsmanager_client = MagicMock()
@@ -25,7 +31,7 @@ class TestGetSecretValue(unittest.TestCase):
         )
         self.assertEqual(secret_value, "my_secret_value")
 
-    @patch("workmail_common.utils.get_aws_client")
+    @patch("workmail_common.aws.get_aws_client")
     def test_get_secret_value_boto_core_error(self, mock_get_aws_client):
         # Mock the Secrets Manager client to raise a BotoCoreError
         mock_secretsmanager_client = MagicMock()
@@ -41,7 +47,7 @@ class TestGetSecretValue(unittest.TestCase):
             SecretId="my_secret_name"
         )
 
-    @patch("workmail_common.utils.get_aws_client")
+    @patch("workmail_common.aws.get_aws_client")
     def test_get_secret_value_no_credentials_error(self, mock_get_aws_client):
         # Mock the Secrets Manager client to raise a NoCredentialsError
         mock_secretsmanager_client = MagicMock()
@@ -57,7 +63,7 @@ class TestGetSecretValue(unittest.TestCase):
             SecretId="my_secret_name"
         )
 
-    @patch("workmail_common.utils.get_aws_client")
+    @patch("workmail_common.aws.get_aws_client")
     def test_get_secret_value_client_error(self, mock_get_aws_client):
         # Mock the Secrets Manager client to raise a ClientError
         mock_secretsmanager_client = MagicMock()
@@ -81,6 +87,78 @@ class TestGetSecretValue(unittest.TestCase):
             SecretId="my_secret_name"
         )
 
+    @patch("workmail_common.aws.get_aws_client")
+    def test_get_secret_value_cached_within_ttl(self, mock_get_aws_client):
+        # Mock the Secrets Manager client and its response
+        mock_secretsmanager_client = MagicMock()
+        mock_get_aws_client.return_value = mock_secretsmanager_client
+        mock_secretsmanager_client.get_secret_value.return_value = {
+            "SecretString": "my_secret_value",
+            "VersionId": "v1",
+            "VersionStages": ["AWSCURRENT"],
+        }
+
+        # Call the function twice
+        first = get_secret_value("my_secret_name")
+        second = get_secret_value("my_secret_name")
+
+        # Assertions
+        self.assertEqual(first, "my_secret_value")
+        self.assertEqual(second, "my_secret_value")
+        mock_secretsmanager_client.get_secret_value.assert_called_once_with(
+            SecretId="my_secret_name"
+        )
+
+    @patch("workmail_common.secrets.time.monotonic")
+    @patch("workmail_common.aws.get_aws_client")
+    def test_get_secret_value_refreshes_after_ttl(
+        self, mock_get_aws_client, mock_monotonic
+    ):
+        # Mock the Secrets Manager client returning a rotated version
+        mock_secretsmanager_client = MagicMock()
+        mock_get_aws_client.return_value = mock_secretsmanager_client
+        mock_secretsmanager_client.get_secret_value.side_effect = [
+            {"SecretString": "old_value", "VersionId": "v1"},
+            {"SecretString": "new_value", "VersionId": "v2"},
+        ]
+        mock_monotonic.return_value = 1000.0
+
+        # Call the function before and after the TTL expires
+        first = get_secret_value("my_secret_name")
+        mock_monotonic.return_value = 1000.0 + 301
+        second = get_secret_value("my_secret_name")
+
+        # Assertions
+        self.assertEqual(first, "old_value")
+        self.assertEqual(second, "new_value")
+        self.assertEqual(get_secret("my_secret_name")["VersionId"], "v2")
+        self.assertEqual(mock_secretsmanager_client.get_secret_value.call_count, 2)
+
+    @patch("workmail_common.secrets.time.monotonic")
+    @patch("workmail_common.aws.get_aws_client")
+    def test_get_secret_value_force_refresh(self, mock_get_aws_client, mock_monotonic):
+        # Mock the Secrets Manager client returning a rotated version
+        mock_secretsmanager_client = MagicMock()
+        mock_get_aws_client.return_value = mock_secretsmanager_client
+        mock_secretsmanager_client.get_secret_value.side_effect = [
+            {"SecretString": "old_value", "VersionId": "v1"},
+            {"SecretString": "new_value", "VersionId": "v2"},
+        ]
+        mock_monotonic.return_value = 1000.0
+        get_secret_value("my_secret_name")
+
+        # A forced refresh right after a fetch is rate limited
+        self.assertEqual(
+            get_secret_value("my_secret_name", force_refresh=True), "old_value"
+        )
+
+        # Once the minimum interval has passed the forced refresh goes through
+        mock_monotonic.return_value = 1000.0 + 11
+        self.assertEqual(
+            get_secret_value("my_secret_name", force_refresh=True), "new_value"
+        )
+        self.assertEqual(mock_secretsmanager_client.get_secret_value.call_count, 2)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,91 @@
+# tests/workmail_common/unit/test_get_validator.py
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from fastjsonschema import JsonSchemaException
+from workmail_common.validation import (
+    clear_validator_cache,
+    get_validator,
+    precompiled_validator_path,
+    schema_digest,
+    validate,
+)
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"name": {"type": "string"}},
+    "required": ["name"],
+}
+
+
+class TestGetValidator(unittest.TestCase):
+
+    def setUp(self):
+        clear_validator_cache()
+        self.tmpdir = tempfile.mkdtemp()
+        self.schema_path = os.path.join(self.tmpdir, "input_schema.json")
+        with open(self.schema_path, "w") as schema_file:
+            json.dump(SCHEMA, schema_file)
+
+    def tearDown(self):
+        clear_validator_cache()
+        shutil.rmtree(self.tmpdir)
+
+    def write_precompiled(self, digest, body):
+        with open(precompiled_validator_path(self.schema_path), "w") as module_file:
+            module_file.write(f'SCHEMA_SHA256 = "{digest}"\n{body}')
+
+    @patch("fastjsonschema.compile")
+    def test_get_validator_compiles_once(self, mock_compile):
+        # Act
+        first = get_validator(self.schema_path)
+        second = get_validator(self.schema_path)
+
+        # Assert
+        self.assertIs(first, second)
+        mock_compile.assert_called_once_with(SCHEMA)
+
+    @patch("fastjsonschema.compile")
+    def test_get_validator_shares_validator_for_identical_schema(self, mock_compile):
+        # Arrange
+        other_path = os.path.join(self.tmpdir, "other_schema.json")
+        with open(other_path, "w") as schema_file:
+            json.dump(SCHEMA, schema_file, indent=2)
+
+        # Act
+        first = get_validator(self.schema_path)
+        second = get_validator(other_path)
+
+        # Assert
+        self.assertIs(first, second)
+        mock_compile.assert_called_once()
+
+    @patch("fastjsonschema.compile")
+    def test_get_validator_uses_precompiled_module(self, mock_compile):
+        # Arrange
+        self.write_precompiled(
+            schema_digest(SCHEMA), "def validate(data):\n    return 'precompiled'\n"
+        )
+
+        # Act
+        validator = get_validator(self.schema_path)
+
+        # Assert
+        self.assertEqual(validator({}), "precompiled")
+        mock_compile.assert_not_called()
+
+    def test_get_validator_ignores_stale_precompiled_module(self):
+        # Arrange
+        self.write_precompiled("0" * 64, "def validate(data):\n    return data\n")
+
+        # Act & Assert
+        with self.assertRaises(JsonSchemaException):
+            validate({"name": 123}, self.schema_path)
+        self.assertTrue(validate({"name": "example"}, self.schema_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from workmail_common.utils import handle_error
+from workmail_common.errors import handle_error, is_throttling_error
 from botocore.exceptions import (
     BotoCoreError,
     NoCredentialsError,
@@ -8,6 +8,7 @@ from botocore.exceptions import (
     PartialCredentialsError,
 )
 import json
+from fastjsonschema import JsonSchemaValueException
 from requests import RequestException
 
 
@@ -69,20 +70,57 @@ class TestHandleError(unittest.TestCase):
         )
         response = handle_error(error)
         self.assertEqual(response["statusCode"], 500)
-        self.assertIn("Secret not found", response["errorMessage"])
+        self.assertEqual(response["errorMessage"], str(error))
 
-    @patch("workmail_common.utils.get_aws_clients")
+    @patch("workmail_common.aws.get_aws_clients")
     def test_handle_error_custom_client_exception(self, mock_get_aws_clients):
-        mock_client = MagicMock()
-        mock_client.exceptions.CustomException = type(
-            "CustomException", (Exception,), {}
+        # Modeled service exceptions are ClientError subclasses named after the code
+        custom_exception = type("CustomException", (ClientError,), {})
+        error = custom_exception(
+            error_response={
+                "Error": {"Code": "CustomException", "Message": "Custom error"}
+            },
+            operation_name="CreateOrganization",
         )
-        mock_get_aws_clients.return_value = {"mock_client": mock_client}
+        response = handle_error(error)
+        self.assertEqual(response["statusCode"], 500)
+        self.assertIn("CustomException: ", response["errorMessage"])
+        self.assertIn("Custom error", response["errorMessage"])
+        mock_get_aws_clients.assert_not_called()
 
-        error = mock_client.exceptions.CustomException("Custom error")
+    def test_handle_error_throttling_client_error(self):
+        throttling_exception = type("TooManyRequestsException", (ClientError,), {})
+        error = throttling_exception(
+            error_response={
+                "Error": {"Code": "TooManyRequestsException", "Message": "Slow down"}
+            },
+            operation_name="CreateOrganization",
+        )
         response = handle_error(error)
         self.assertEqual(response["statusCode"], 500)
-        self.assertIn("CustomException: Custom error", response["errorMessage"])
+        self.assertEqual(
+            response["errorMessage"],
+            f"TooManyRequestsException: {str(error)}",
+        )
+
+    def test_is_throttling_error(self):
+        throttled = ClientError(
+            error_response={"Error": {"Code": "ThrottlingException"}},
+            operation_name="StartExecution",
+        )
+        denied = ClientError(
+            error_response={"Error": {"Code": "AccessDeniedException"}},
+            operation_name="StartExecution",
+        )
+        self.assertTrue(is_throttling_error(throttled))
+        self.assertFalse(is_throttling_error(denied))
+        self.assertFalse(is_throttling_error(ValueError("nope")))
+
+    def test_handle_error_schema_error_before_value_error(self):
+        error = JsonSchemaValueException("data must contain ['contact_id'] properties")
+        response = handle_error(error)
+        self.assertEqual(response["statusCode"], 400)
+        self.assertIn("Schema validation error: ", response["errorMessage"])
 
     def test_handle_error_unexpected_error(self):
         error = Exception("Unexpected error")
@@ -0,0 +1,162 @@
+# tests/workmail_common/unit/test_instrumentation.py
+import io
+import json
+import sqlite3
+import unittest
+from unittest.mock import patch, MagicMock
+import boto3
+import requests
+from botocore.stub import Stubber
+from workmail_common import instrumentation
+from workmail_common.instrumentation import (
+    InstrumentedConnection,
+    clear_metrics,
+    flush,
+    instrument_client,
+    instrument_session,
+    instrumented_handler,
+    record,
+    statement_name,
+)
+
+
+def emitted_documents(stdout):
+    return [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        clear_metrics()
+        self.addCleanup(clear_metrics)
+
+    def flushed(self, properties=None):
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            flush(properties)
+        return emitted_documents(stdout)
+
+    def test_aws_calls_are_timed_by_service_and_operation(self):
+        # Arrange
+        client = instrument_client(
+            boto3.client(
+                "sts",
+                region_name="us-east-1",
+                aws_access_key_id="test",
+                aws_secret_access_key="test",
+            )
+        )
+        stubber = Stubber(client)
+        stubber.add_response("get_caller_identity", {"Account": "123456789012"})
+        stubber.add_client_error("get_caller_identity", http_status_code=403)
+
+        # Act
+        with stubber:
+            client.get_caller_identity()
+            with self.assertRaises(client.exceptions.ClientError):
+                client.get_caller_identity()
+
+        # Assert
+        (document,) = self.flushed()
+        self.assertEqual(document["Dependency"], "sts")
+        self.assertEqual(document["Operation"], "GetCallerIdentity")
+        self.assertEqual(document["Calls"], 2)
+        self.assertEqual(document["Errors"], 1)
+
+    def test_mysql_statements_are_timed_through_the_cursor(self):
+        # Arrange
+        connection = InstrumentedConnection(sqlite3.connect(":memory:"))
+        cursor = connection.cursor()
+
+        # Act
+        cursor.execute("CREATE TABLE app (id INTEGER)")
+        cursor.executemany("INSERT INTO app (id) VALUES (?)", [(1,), (2,)])
+        connection.commit()
+        cursor.execute("SELECT id FROM app WHERE id = ?", (2,))
+        rows = cursor.fetchall()
+        with self.assertRaises(sqlite3.OperationalError):
+            cursor.execute("SELECT id FROM missing")
+
+        # Assert
+        self.assertEqual(rows, [(2,)])
+        documents = {document["Operation"]: document for document in self.flushed()}
+        self.assertEqual(
+            sorted(documents),
+            ["COMMIT", "CREATE", "INSERT app", "SELECT app", "SELECT missing"],
+        )
+        self.assertEqual(documents["SELECT missing"]["Errors"], 1)
+        self.assertEqual(documents["SELECT app"]["Errors"], 0)
+
+    def test_keap_requests_are_timed_by_forwarded_path(self):
+        # Arrange
+        session = requests.Session()
+        response = MagicMock(status_code=500)
+        session.request = MagicMock(return_value=response)
+        instrument_session(session, "keap")
+
+        # Act
+        session.post(
+            "https://proxy.example.com/",
+            headers={"Forward-to": "tags/123/contacts:applyTags"},
+        )
+
+        # Assert
+        (document,) = self.flushed()
+        self.assertEqual(document["Dependency"], "keap")
+        self.assertEqual(document["Operation"], "POST tags/{id}/contacts:applyTags")
+        self.assertEqual(document["Errors"], 1)
+
+    def test_statement_name(self):
+        self.assertEqual(
+            statement_name("update workmail_organizations SET x = %s"),
+            "UPDATE workmail_organizations",
+        )
+        self.assertEqual(
+            statement_name("DELETE FROM `app` WHERE id = %s"), "DELETE app"
+        )
+        self.assertEqual(statement_name(""), "UNKNOWN")
+
+    def test_flush_writes_emf_chunks_once(self):
+        # Arrange
+        for value in range(150):
+            record("mysql", "SELECT app", value)
+        record("mysql", "SELECT app", 20000, error=True)
+
+        # Act
+        documents = self.flushed({"Phase": "invoke"})
+
+        # Assert
+        self.assertEqual([len(d["Latency"]) for d in documents], [100, 51])
+        self.assertEqual([d["Errors"] for d in documents], [1, 0])
+        metrics = documents[0]["_aws"]["CloudWatchMetrics"][0]
+        self.assertEqual(metrics["Namespace"], instrumentation.METRICS_NAMESPACE)
+        self.assertIn(["Service", "Dependency", "Operation"], metrics["Dimensions"])
+        self.assertEqual(documents[0]["LatencyHistogram"]["<=5"], 6)
+        self.assertEqual(documents[1]["LatencyHistogram"][">10000"], 1)
+        self.assertEqual(documents[0]["Phase"], "invoke")
+        self.assertEqual(self.flushed(), [])
+
+    def test_handler_flushes_init_and_invocation_separately(self):
+        # Arrange
+        record("secretsmanager", "GetSecretValue", 12.0)
+
+        @instrumented_handler
+        def handler(event, context):
+            record("workmail", "CreateOrganization", 80.0)
+            raise ValueError("Test exception")
+
+        # Act
+        with patch("sys.stdout", new_callable=io.StringIO) as stdout:
+            with self.assertRaises(ValueError):
+                handler({}, MagicMock(aws_request_id="request-1"))
+
+        # Assert
+        documents = emitted_documents(stdout)
+        self.assertEqual(
+            [(d["Operation"], d["Phase"]) for d in documents],
+            [("GetSecretValue", "init"), ("CreateOrganization", "invoke")],
+        )
+        self.assertEqual(documents[1]["RequestId"], "request-1")
+
+
+if __name__ == "__main__":
+    unittest.main()
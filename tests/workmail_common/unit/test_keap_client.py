@@ -0,0 +1,168 @@
+# tests/workmail_common/unit/test_keap_client.py
+import json
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch, MagicMock
+from workmail_common.keap import (
+    KEAP_RETRY_MAX_WAIT_SECONDS,
+    KeapClient,
+    clear_keap_clients,
+    get_keap_client,
+    get_keap_session,
+    keap_contact_add_to_group_via_proxy,
+    keap_retry,
+)
+
+CONFIG = {
+    "KEAP_API_KEY_SECRET_NAME": "keap-secret",
+    "PROXY_ENDPOINT_HOST": "proxy.example.com",
+}
+
+
+class KeapStubHandler(BaseHTTPRequestHandler):
+    # Each request pops the next (status, headers) from the server's script.
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0) or 0)
+        self.server.requests.append(
+            (dict(self.headers), json.loads(self.rfile.read(length) or "null"))
+        )
+        status, headers = self.server.script.pop(0)
+        body = json.dumps({"status": status}).encode("utf-8")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestKeapClient(unittest.TestCase):
+
+    def setUp(self):
+        clear_keap_clients()
+        self.addCleanup(clear_keap_clients)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), KeapStubHandler)
+        self.server.requests = []
+        self.server.script = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.config = dict(
+            CONFIG, PROXY_ENDPOINT=f"http://127.0.0.1:{self.server.server_port}/"
+        )
+        patcher = patch("workmail_common.keap.get_secret_value", return_value="token-1")
+        self.get_secret_value = patcher.start()
+        self.addCleanup(patcher.stop)
+        backoff = patch("workmail_common.keap.KEAP_RETRY_BACKOFF_SECONDS", 0)
+        backoff.start()
+        self.addCleanup(backoff.stop)
+
+    def test_helpers_share_one_client_and_cache_the_token(self):
+        # Arrange
+        self.server.script = [(200, {}), (200, {})]
+
+        # Act
+        keap_contact_add_to_group_via_proxy(1, 10, self.config)
+        keap_contact_add_to_group_via_proxy(2, 10, self.config)
+
+        # Assert
+        self.assertIs(get_keap_client(self.config).session, get_keap_session())
+        self.get_secret_value.assert_called_once_with(
+            "keap-secret", force_refresh=False
+        )
+        self.assertEqual(
+            [headers["Authorization"] for headers, _ in self.server.requests],
+            ["Bearer token-1", "Bearer token-1"],
+        )
+        self.assertEqual(self.server.requests[1][1], {"contact_ids": [2]})
+
+    def test_retries_throttled_requests(self):
+        # Arrange
+        self.server.script = [(429, {"Retry-After": "0"}), (429, {}), (200, {})]
+
+        # Act
+        result = keap_contact_add_to_group_via_proxy(1, 10, self.config)
+
+        # Assert
+        self.assertEqual(result, {"status": 200})
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_does_not_replay_posts_after_server_errors(self):
+        # Arrange
+        self.server.script = [(502, {}), (200, {})]
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            keap_contact_add_to_group_via_proxy(1, 10, self.config)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_retries_idempotent_requests_after_server_errors(self):
+        # Arrange
+        self.server.script = [(503, {}), (200, {})]
+        client = get_keap_client(self.config)
+
+        # Act
+        response = client.request("GET", self.config["PROXY_ENDPOINT"])
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 2)
+
+    @patch("workmail_common.keap.KEAP_MAX_RETRIES", 1)
+    def test_returns_last_response_when_retries_run_out(self):
+        # Arrange
+        self.server.script = [(429, {}), (429, {})]
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            keap_contact_add_to_group_via_proxy(1, 10, self.config)
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_rejected_token_is_refreshed_once(self):
+        # Arrange
+        self.server.script = [(401, {}), (200, {})]
+        self.get_secret_value.side_effect = ["stale", "fresh"]
+
+        # Act
+        keap_contact_add_to_group_via_proxy(1, 10, self.config)
+
+        # Assert
+        self.get_secret_value.assert_called_with("keap-secret", force_refresh=True)
+        self.assertEqual(
+            [headers["Authorization"] for headers, _ in self.server.requests],
+            ["Bearer stale", "Bearer fresh"],
+        )
+
+    def test_requests_carry_timeouts(self):
+        # Arrange
+        session = MagicMock()
+        session.request.return_value = MagicMock(status_code=200)
+        client = KeapClient("keap-secret", session, timeout=(1.0, 2.0))
+
+        # Act
+        client.post("https://proxy.example.com/", {"Forward-to": "contacts"}, {})
+
+        # Assert
+        self.assertEqual(session.request.call_args.kwargs["timeout"], (1.0, 2.0))
+
+    def test_retry_after_is_capped(self):
+        # Arrange
+        response = MagicMock()
+        response.headers = {"Retry-After": "3600"}
+
+        # Act
+        retry_after = keap_retry().get_retry_after(response)
+
+        # Assert
+        self.assertEqual(retry_after, KEAP_RETRY_MAX_WAIT_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+# tests/workmail_common/unit/test_keap_tag_applier.py
+import unittest
+from unittest.mock import patch
+from workmail_common.keap import KeapTagApplier, tag_application_failures
+
+CONFIG = {
+    "KEAP_API_KEY_SECRET_NAME": "keap-secret",
+    "PROXY_ENDPOINT": "https://proxy.example.com/",
+    "PROXY_ENDPOINT_HOST": "proxy.example.com",
+}
+
+
+class TestKeapTagApplier(unittest.TestCase):
+
+    def setUp(self):
+        patcher = patch(
+            "workmail_common.keap.keap_contacts_add_to_group_via_proxy",
+            return_value={},
+        )
+        self.mock_apply = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def calls(self):
+        return [call.args[:2] for call in self.mock_apply.call_args_list]
+
+    def test_coalesces_contacts_per_tag(self):
+        # Act
+        with KeapTagApplier(CONFIG, window_seconds=60) as applier:
+            for contact_id, tag_id in [(1, 10), (2, 10), (1, 10), (3, 20)]:
+                applier.add(contact_id, tag_id)
+            self.mock_apply.assert_not_called()
+
+        # Assert
+        self.assertEqual(self.calls(), [([1, 2], 10), ([3], 20)])
+        self.assertEqual(applier.calls, 2)
+        self.assertEqual(applier.failures, {})
+
+    def test_full_tags_are_sent_without_waiting(self):
+        # Arrange
+        applier = KeapTagApplier(CONFIG, max_contacts=2, window_seconds=60)
+
+        # Act
+        for contact_id in [1, 2, 3]:
+            applier.add(contact_id, 10)
+
+        # Assert
+        self.assertEqual(self.calls(), [([1, 2], 10)])
+        applier.flush()
+        self.assertEqual(self.calls(), [([1, 2], 10), ([3], 10)])
+
+    def test_overdue_tags_are_sent_on_add(self):
+        # Arrange
+        applier = KeapTagApplier(CONFIG, window_seconds=0)
+
+        # Act
+        applier.add(1, 10)
+
+        # Assert
+        self.assertEqual(self.calls(), [([1], 10)])
+
+    @patch("workmail_common.keap.time.monotonic")
+    def test_full_tag_is_sent_when_the_window_has_also_passed(self, mock_monotonic):
+        # Arrange
+        mock_monotonic.return_value = 1000.0
+        applier = KeapTagApplier(CONFIG, max_contacts=2, window_seconds=5)
+        applier.add(1, 10)
+        applier.add(3, 20)
+        mock_monotonic.return_value = 1010.0
+
+        # Act
+        applier.add(2, 10)
+
+        # Assert
+        self.assertEqual(sorted(self.calls()), [([1, 2], 10), ([3], 20)])
+        self.assertEqual(sorted(applier.applied), [(10, 1), (10, 2), (20, 3)])
+        self.assertEqual(applier.failures, {})
+
+    def test_partial_failures_are_mapped_to_contacts(self):
+        # Arrange
+        self.mock_apply.side_effect = [
+            {"results": {"1": "SUCCESS", "2": "FAILURE"}},
+            ValueError("Keap unavailable"),
+        ]
+        applier = KeapTagApplier(CONFIG, window_seconds=60)
+        applier.add(1, 10)
+        applier.add(2, 10)
+        applier.add(3, 20)
+
+        # Act
+        failures = applier.flush()
+
+        # Assert
+        self.assertEqual(
+            failures,
+            {(10, 2): "Keap returned FAILURE", (20, 3): "Keap unavailable"},
+        )
+        self.assertEqual(applier.applied, [(10, 1)])
+
+    def test_tag_application_failures(self):
+        # Act & Assert
+        self.assertEqual(tag_application_failures([1, 2], {}), {})
+        self.assertEqual(
+            tag_application_failures([1, 2], {"1": "DUPLICATE"}),
+            {2: "Keap returned no result for contact"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+# tests/workmail_common/unit/test_lazy_imports.py
+import json
+import os
+import subprocess
+import sys
+import unittest
+import workmail_common
+from workmail_common import utils
+
+LAYER_PATH = os.path.dirname(os.path.dirname(workmail_common.__file__))
+HEAVY_MODULES = ["boto3", "fastjsonschema", "mysql", "requests"]
+
+
+def loaded_after(statement):
+    """Import in a fresh interpreter and report which heavy packages came along."""
+    script = (
+        "import json, sys\n"
+        f"{statement}\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        env=dict(os.environ, PYTHONPATH=LAYER_PATH, AWS_DEFAULT_REGION="us-east-1"),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output)
+
+
+class TestLazyImports(unittest.TestCase):
+
+    def test_utils_names_are_the_submodule_objects(self):
+        # Act & Assert
+        for name in utils.__all__:
+            module = __import__(
+                f"workmail_common.{utils._EXPORTS[name]}", fromlist=[name]
+            )
+            self.assertIs(getattr(utils, name), getattr(module, name), name)
+
+    def test_utils_keeps_private_helpers_private(self):
+        # Act & Assert
+        for name in ("_secret_entry_usable", "_checkout_connection", "get_db_pool"):
+            with self.subTest(name=name), self.assertRaises(AttributeError):
+                getattr(utils, name)
+
+    def test_unknown_utils_name_raises_attribute_error(self):
+        # Act & Assert
+        with self.assertRaises(AttributeError):
+            utils.not_a_helper
+
+    def test_importing_utils_loads_nothing(self):
+        # Act & Assert
+        self.assertEqual(loaded_after("import workmail_common.utils"), [])
+
+    def test_authorizer_imports_skip_database_and_http_clients(self):
+        # Act
+        loaded = loaded_after(
+            "from workmail_common.utils import handle_error, get_secret_value"
+        )
+
+        # Assert
+        self.assertEqual(loaded, ["boto3"])
+
+    def test_data_api_backend_skips_mysql_driver(self):
+        # Act
+        loaded = loaded_after(
+            "from workmail_common.db import db_connection, run_checkpointed"
+        )
+
+        # Assert
+        self.assertNotIn("mysql", loaded)
+
+    def test_handle_error_maps_optional_exceptions_once_loaded(self):
+        # Arrange
+        import requests
+        from workmail_common.errors import handle_error
+
+        # Act
+        response = handle_error(requests.ConnectionError("refused"))
+
+        # Assert
+        self.assertEqual(response["statusCode"], 502)
+        self.assertEqual(response["errorMessage"], "Bad Gateway")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import patch, mock_open
-from workmail_common.utils import load_schema
+from workmail_common.validation import load_schema
 import json
 
 
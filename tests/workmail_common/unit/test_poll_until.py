@@ -0,0 +1,112 @@
+# tests/workmail_common/unit/test_poll_until.py
+import itertools
+import unittest
+from unittest.mock import patch, MagicMock
+from workmail_common.polling import PollTimeoutError, poll_delays, poll_until
+
+
+class TestPollUntil(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = 0.0
+        self.sleeps = []
+        sleep_patcher = patch(
+            "workmail_common.polling.time.sleep", side_effect=self.fake_sleep
+        )
+        monotonic_patcher = patch(
+            "workmail_common.polling.time.monotonic", side_effect=lambda: self.clock
+        )
+        sleep_patcher.start()
+        monotonic_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+        self.addCleanup(monotonic_patcher.stop)
+
+    def fake_sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.clock += seconds
+
+    def test_poll_until_returns_first_result(self):
+        # Arrange
+        check = MagicMock(side_effect=[None, None, "done"])
+
+        # Act
+        result = poll_until(check, description="test")
+
+        # Assert
+        self.assertEqual(result, "done")
+        self.assertEqual(check.call_count, 3)
+        self.assertEqual(self.sleeps, [1.0, 1.0])
+
+    def test_poll_until_propagates_check_errors(self):
+        # Arrange
+        check = MagicMock(side_effect=ValueError("failed"))
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            poll_until(check)
+        self.assertEqual(self.sleeps, [])
+
+    def test_poll_until_budget_from_context(self):
+        # Arrange
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 25000
+        check = MagicMock(return_value=None)
+
+        # Act & Assert
+        with self.assertRaises(PollTimeoutError) as context_manager:
+            poll_until(check, context, timeout_seconds=120, resume_state={"id": "x"})
+        self.assertAlmostEqual(self.clock, 20.0)
+        self.assertEqual(context_manager.exception.resume_state, {"id": "x"})
+        self.assertEqual(context_manager.exception.attempts, check.call_count)
+
+    def test_poll_until_timeout_caps_budget(self):
+        # Arrange
+        context = MagicMock()
+        context.get_remaining_time_in_millis.return_value = 300000
+
+        # Act & Assert
+        with self.assertRaises(PollTimeoutError):
+            poll_until(lambda: None, context, timeout_seconds=12)
+        self.assertAlmostEqual(self.clock, 12.0)
+
+    def test_poll_until_is_a_timeout_error(self):
+        # Act & Assert
+        with self.assertRaises(TimeoutError):
+            poll_until(lambda: None, timeout_seconds=1)
+
+
+class TestPollDelays(unittest.TestCase):
+
+    @patch("workmail_common.polling.random.uniform", side_effect=lambda a, b: b)
+    def test_poll_delays_fast_window_then_backoff(self, mock_uniform):
+        # Act
+        delays = list(
+            itertools.islice(
+                poll_delays(
+                    fast_window_seconds=2,
+                    fast_delay_seconds=1,
+                    initial_delay_seconds=2,
+                    max_delay_seconds=10,
+                ),
+                7,
+            )
+        )
+
+        # Assert
+        self.assertEqual(delays, [1, 1, 2, 4, 8, 10, 10])
+
+    def test_poll_delays_jitter_bounds(self):
+        # Act
+        delays = list(
+            itertools.islice(
+                poll_delays(fast_window_seconds=0, initial_delay_seconds=8), 50
+            )
+        )
+
+        # Assert
+        self.assertTrue(all(4 <= d <= 8 for d in delays[:1]))
+        self.assertTrue(all(d <= 15.0 for d in delays))
+
+
+if __name__ == "__main__":
+    unittest.main()
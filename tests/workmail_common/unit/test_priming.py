@@ -0,0 +1,190 @@
+# tests/workmail_common/unit/test_priming.py
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch, MagicMock
+from workmail_common import priming
+from workmail_common.aws import clear_aws_clients
+from workmail_common.secrets import get_secret, invalidate_secret
+from workmail_common.validation import clear_validator_cache, get_validator
+from tests.workmail_common.rds_data_stub import SqliteRdsDataClient
+
+SCHEMA_PATH = os.path.join(
+    os.path.dirname(__file__),
+    "..",
+    "..",
+    "..",
+    "create_workmail_org_function",
+    "schemas",
+    "input_schema.json",
+)
+
+LAMBDA_ENV = {
+    "AWS_LAMBDA_FUNCTION_NAME": "test-function",
+    "KEAP_API_KEY_SECRET_NAME": "keap-secret",
+    "DB_BACKEND": "data-api",
+    "DB_CLUSTER_ARN": "arn:aws:rds:region:account-id:cluster:cluster-id",
+    "DB_SECRET_ARN": "arn:aws:secretsmanager:region:account-id:secret:secret-id",
+    "DATABASE_NAME": "test_db",
+}
+
+
+class TestPriming(unittest.TestCase):
+
+    def setUp(self):
+        priming.reset_priming()
+        clear_aws_clients()
+        invalidate_secret()
+        clear_validator_cache()
+        self.rds_data = SqliteRdsDataClient()
+        self.secretsmanager = MagicMock()
+        self.secretsmanager.get_secret_value.return_value = {
+            "SecretString": "token",
+            "VersionId": "v1",
+        }
+        self.clients = {
+            "rds-data": self.rds_data,
+            "secretsmanager": self.secretsmanager,
+        }
+        patcher = patch(
+            "workmail_common.aws.get_aws_client",
+            side_effect=lambda name, *args, **kwargs: self.clients.setdefault(
+                name, MagicMock()
+            ),
+        )
+        self.get_aws_client = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(priming.reset_priming)
+
+    def test_prime_does_nothing_outside_lambda(self):
+        # Act
+        with patch.dict(os.environ, {}, clear=False):
+            os.environ.pop("AWS_LAMBDA_FUNCTION_NAME", None)
+            result = priming.prime(clients=["workmail"], db=True)
+
+        # Assert
+        self.assertEqual(result, {})
+        self.get_aws_client.assert_not_called()
+
+    @patch.dict(os.environ, LAMBDA_ENV)
+    def test_prime_warms_declared_needs(self):
+        # Act
+        result = priming.prime(
+            clients=["workmail", "ses"],
+            secrets=["KEAP_API_KEY_SECRET_NAME"],
+            db=True,
+            schemas=[SCHEMA_PATH],
+        )
+
+        # Assert
+        self.assertEqual(
+            result,
+            {
+                "client:workmail": priming.PRIMED,
+                "client:ses": priming.PRIMED,
+                "secret:KEAP_API_KEY_SECRET_NAME": priming.PRIMED,
+                "db": priming.PRIMED,
+                f"schema:{SCHEMA_PATH}": priming.PRIMED,
+            },
+        )
+        self.assertIn("workmail", self.clients)
+        self.assertIn("ses", self.clients)
+        # The handler's first use is served from the primed caches.
+        get_secret("keap-secret")
+        self.secretsmanager.get_secret_value.assert_called_once_with(
+            SecretId="keap-secret"
+        )
+        with patch("workmail_common.validation.load_schema") as mock_load_schema:
+            get_validator(SCHEMA_PATH)
+        mock_load_schema.assert_not_called()
+
+    @patch.dict(os.environ, LAMBDA_ENV)
+    def test_failed_step_falls_back_to_lazy_setup(self):
+        # Arrange
+        self.secretsmanager.get_secret_value.side_effect = [
+            RuntimeError("Test exception"),
+            {"SecretString": "token", "VersionId": "v1"},
+        ]
+
+        # Act
+        result = priming.prime(
+            clients=["workmail"], secrets=["KEAP_API_KEY_SECRET_NAME"]
+        )
+
+        # Assert
+        self.assertEqual(result["client:workmail"], priming.PRIMED)
+        self.assertEqual(result["secret:KEAP_API_KEY_SECRET_NAME"], priming.FAILED)
+        self.assertEqual(get_secret("keap-secret")["SecretString"], "token")
+
+    @patch.dict(os.environ, LAMBDA_ENV)
+    def test_slow_step_does_not_hold_up_init(self):
+        # Arrange
+        release = threading.Event()
+        self.secretsmanager.get_secret_value.side_effect = lambda **kwargs: (
+            release.wait(5) and {"SecretString": "token", "VersionId": "v1"}
+        )
+        self.addCleanup(release.set)
+
+        # Act
+        result = priming.prime(
+            clients=["workmail"],
+            secrets=["KEAP_API_KEY_SECRET_NAME"],
+            budget_seconds=0.05,
+        )
+
+        # Assert
+        self.assertEqual(result["client:workmail"], priming.PRIMED)
+        self.assertEqual(result["secret:KEAP_API_KEY_SECRET_NAME"], priming.TIMED_OUT)
+
+    @patch.dict(os.environ, LAMBDA_ENV)
+    def test_after_restore_revalidates(self):
+        # Arrange
+        priming.prime(secrets=["KEAP_API_KEY_SECRET_NAME"], db=True)
+        self.secretsmanager.get_secret_value.return_value = {
+            "SecretString": "rotated",
+            "VersionId": "v2",
+        }
+        callback = MagicMock()
+        priming.register_after_restore(callback)
+
+        # Act
+        with patch("workmail_common.priming.random.seed") as mock_seed:
+            result = priming.after_restore()
+
+        # Assert
+        mock_seed.assert_called_once_with()
+        self.assertEqual(
+            result,
+            {"secret:KEAP_API_KEY_SECRET_NAME": priming.PRIMED, "db": priming.PRIMED},
+        )
+        self.assertEqual(get_secret("keap-secret")["SecretString"], "rotated")
+        callback.assert_called_once_with()
+
+    @patch.dict(os.environ, LAMBDA_ENV)
+    def test_snapshot_hooks_register_with_runtime(self):
+        # Arrange
+        runtime = MagicMock()
+
+        # Act
+        with patch.dict(sys.modules, {"snapshot_restore_py": runtime}):
+            priming.prime(clients=["workmail"])
+            priming.prime(clients=["ses"])
+
+        # Assert
+        runtime.register_before_snapshot.assert_called_once_with(
+            priming.before_snapshot
+        )
+        runtime.register_after_restore.assert_called_once_with(priming.after_restore)
+
+    @patch("workmail_common.db.close_db_pools")
+    def test_before_snapshot_closes_db_pools(self, mock_close_db_pools):
+        # Act
+        priming.before_snapshot()
+
+        # Assert
+        mock_close_db_pools.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,13 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from workmail_common.utils import process_input, extract_domain, validate
+from workmail_common.validation import process_input, validate
+from workmail_common.domain import extract_domain
 
 
 class TestProcessInput(unittest.TestCase):
 
-    @patch("workmail_common.utils.validate")
-    @patch("workmail_common.utils.extract_domain")
+    @patch("workmail_common.validation.validate")
+    @patch("workmail_common.validation.extract_domain")
     def test_process_input_valid(self, mock_extract_domain, mock_validate):
         # Mocking the validation and domain extraction
         mock_validate.return_value = True
@@ -35,8 +36,8 @@ class TestProcessInput(unittest.TestCase):
         mock_validate.assert_called_once_with(body, schema_path)
         mock_extract_domain.assert_called_once_with("example.com")
 
-    @patch("workmail_common.utils.validate")
-    @patch("workmail_common.utils.extract_domain")
+    @patch("workmail_common.validation.validate")
+    @patch("workmail_common.validation.extract_domain")
     def test_process_input_invalid_domain(self, mock_extract_domain, mock_validate):
         # Mocking the validation and domain extraction
         mock_validate.return_value = True
@@ -57,8 +58,8 @@ class TestProcessInput(unittest.TestCase):
         mock_validate.assert_called_once_with(body, schema_path)
         mock_extract_domain.assert_called_once_with("invalid_domain")
 
-    @patch("workmail_common.utils.validate")
-    @patch("workmail_common.utils.extract_domain")
+    @patch("workmail_common.validation.validate")
+    @patch("workmail_common.validation.extract_domain")
     def test_process_input_validation_failure(self, mock_extract_domain, mock_validate):
         # Mocking the validation and domain extraction
         mock_validate.side_effect = Exception("Schema validation error")
@@ -79,8 +80,8 @@ class TestProcessInput(unittest.TestCase):
         mock_validate.assert_called_once_with(body, schema_path)
         mock_extract_domain.assert_not_called()
 
-    @patch("workmail_common.utils.validate")
-    @patch("workmail_common.utils.extract_domain")
+    @patch("workmail_common.validation.validate")
+    @patch("workmail_common.validation.extract_domain")
     def test_process_input_missing_email_username(
         self, mock_extract_domain, mock_validate
     ):
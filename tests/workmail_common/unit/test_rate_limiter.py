@@ -0,0 +1,274 @@
+# tests/workmail_common/unit/test_rate_limiter.py
+import os
+import unittest
+from unittest.mock import patch, MagicMock
+import boto3
+from botocore.exceptions import ClientError
+from botocore.stub import Stubber
+from workmail_common import ratelimit
+from workmail_common.db import DataApiBackend, DedicatedConnection
+from workmail_common.errors import is_throttling_error
+from workmail_common.ratelimit import (
+    DatabaseTokenBucketStore,
+    LocalTokenBucketStore,
+    RateLimit,
+    RateLimiter,
+    parse_rate_limits,
+    rate_limit_client,
+)
+from tests.workmail_common.rds_data_stub import SqliteRdsDataClient
+
+CONFIG = {
+    "DB_SECRET_ARN": "arn:aws:secretsmanager:region:account-id:secret:secret-id",
+    "DB_CLUSTER_ARN": "arn:aws:rds:region:account-id:cluster:cluster-id",
+    "DATABASE_NAME": "test_db",
+}
+LIMIT = RateLimit(rate=2.0, burst=2.0)
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestTokenBucketStores(unittest.TestCase):
+
+    def setUp(self):
+        self.rds_data = SqliteRdsDataClient()
+        backend = DataApiBackend(CONFIG, self.rds_data)
+        self.stores = {
+            "local": LocalTokenBucketStore(),
+            "database": DatabaseTokenBucketStore(connection_factory=backend.connection),
+        }
+
+    def test_burst_then_reservations_queue_at_the_rate(self):
+        for name, store in self.stores.items():
+            with self.subTest(store=name):
+                # Act
+                waits = [
+                    store.reserve("iam:CreateUser", LIMIT, 1000.0, 30) for _ in range(5)
+                ]
+
+                # Assert
+                self.assertEqual(waits, [0.0, 0.0, 0.5, 1.0, 1.5])
+
+    def test_bucket_refills_up_to_its_burst(self):
+        for name, store in self.stores.items():
+            with self.subTest(store=name):
+                # Arrange
+                for _ in range(2):
+                    store.reserve("iam:CreateUser", LIMIT, 1000.0, 30)
+
+                # Act
+                waits = [
+                    store.reserve("iam:CreateUser", LIMIT, 1100.0, 30) for _ in range(3)
+                ]
+
+                # Assert
+                self.assertEqual(waits, [0.0, 0.0, 0.5])
+
+    def test_waits_over_the_maximum_take_nothing(self):
+        for name, store in self.stores.items():
+            with self.subTest(store=name):
+                # Arrange
+                for _ in range(2):
+                    store.reserve("iam:CreateUser", LIMIT, 1000.0, 30)
+
+                # Act
+                over = store.reserve("iam:CreateUser", LIMIT, 1000.0, 0.25)
+                under = store.reserve("iam:CreateUser", LIMIT, 1000.0, 30)
+
+                # Assert
+                self.assertIsNone(over)
+                self.assertEqual(under, 0.5)
+
+    def test_database_buckets_are_shared(self):
+        # Arrange
+        other = DatabaseTokenBucketStore(
+            connection_factory=DataApiBackend(CONFIG, self.rds_data).connection
+        )
+        store = self.stores["database"]
+
+        # Act
+        waits = [
+            s.reserve("iam:CreateUser", LIMIT, 1000.0, 30)
+            for s in (store, other, store)
+        ]
+
+        # Assert
+        self.assertEqual(waits, [0.0, 0.0, 0.5])
+        self.assertEqual(
+            self.rds_data.rows("SELECT bucket, tokens FROM rate_limit_buckets"),
+            [("iam:CreateUser", -1.0)],
+        )
+
+
+class TestDedicatedConnection(unittest.TestCase):
+
+    @patch("workmail_common.db.get_db_connection")
+    @patch("workmail_common.db.connect_to_rds")
+    def test_store_connection_is_not_borrowed_from_the_pool(
+        self, mock_connect_to_rds, mock_get_db_connection
+    ):
+        # Arrange
+        store = DedicatedConnection(dict(CONFIG, DB_BACKEND="mysql"))
+
+        # Act
+        for _ in range(2):
+            with store.connection() as connection:
+                connection.cursor()
+
+        # Assert
+        mock_get_db_connection.assert_not_called()
+        mock_connect_to_rds.assert_called_once()
+        self.assertEqual(mock_connect_to_rds.return_value.rollback.call_count, 2)
+
+    @patch("workmail_common.db.connect_to_rds")
+    def test_dropped_connection_is_reopened(self, mock_connect_to_rds):
+        # Arrange
+        store = DedicatedConnection(dict(CONFIG, DB_BACKEND="mysql"))
+        with store.connection():
+            pass
+        mock_connect_to_rds.return_value.is_connected.return_value = False
+
+        # Act
+        with store.connection():
+            pass
+
+        # Assert
+        self.assertEqual(mock_connect_to_rds.call_count, 2)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def limiter(self, store=None):
+        return RateLimiter(
+            {"iam:CreateUser": LIMIT},
+            store,
+            max_wait=5,
+            clock=self.clock.time,
+            sleep=self.clock.sleep,
+        )
+
+    def test_parse_rate_limits(self):
+        # Act & Assert
+        self.assertEqual(
+            parse_rate_limits(
+                "route53:ChangeResourceRecordSets=4/5, iam:CreateUser=0.5"
+            ),
+            {
+                "route53:ChangeResourceRecordSets": RateLimit(4.0, 5.0),
+                "iam:CreateUser": RateLimit(0.5, 1.0),
+            },
+        )
+        with self.assertRaises(ValueError):
+            parse_rate_limits("CreateUser=5")
+
+    def test_calls_are_spaced_at_the_rate(self):
+        # Arrange
+        limiter = self.limiter()
+
+        # Act
+        waits = [limiter.acquire("iam:CreateUser") for _ in range(4)]
+        unlimited = limiter.acquire("iam:GetUser")
+
+        # Assert
+        self.assertEqual(waits, [0.0, 0.0, 0.5, 0.5])
+        self.assertEqual(self.clock.now, 1001.0)
+        self.assertEqual(unlimited, 0.0)
+
+    @patch("workmail_common.ratelimit.record")
+    def test_store_failures_fall_back_to_local_buckets(self, mock_record):
+        # Arrange
+        store = MagicMock()
+        store.reserve.side_effect = Exception("database unavailable")
+        limiter = self.limiter(store)
+
+        # Act
+        waits = [limiter.acquire("iam:CreateUser") for _ in range(3)]
+
+        # Assert
+        self.assertEqual(waits, [0.0, 0.0, 0.5])
+        fallbacks = [
+            c for c in mock_record.call_args_list if c.args[1] == "StoreFallback"
+        ]
+        self.assertEqual(len(fallbacks), 3)
+        self.assertTrue(all(c.args[3] for c in fallbacks))
+
+    def test_over_limit_calls_are_throttled_without_waiting(self):
+        # Arrange
+        store = MagicMock()
+        store.reserve.return_value = None
+
+        # Act
+        with self.assertRaises(ClientError) as raised:
+            self.limiter(store).acquire("iam:CreateUser")
+
+        # Assert
+        self.assertTrue(is_throttling_error(raised.exception))
+        self.assertEqual(raised.exception.operation_name, "CreateUser")
+        self.assertEqual(self.clock.now, 1000.0)
+
+
+@patch.dict(os.environ, {"AWS_DEFAULT_REGION": "us-east-1"})
+class TestRateLimitHook(unittest.TestCase):
+
+    def test_limited_calls_wait_before_they_are_sent(self):
+        # Arrange
+        clock = FakeClock()
+        limiter = RateLimiter(
+            {"iam:CreateUser": RateLimit(1.0, 1.0)}, clock=clock.time, sleep=clock.sleep
+        )
+        with patch.object(ratelimit, "_rate_limiter", limiter):
+            client = rate_limit_client(
+                boto3.client(
+                    "iam", aws_access_key_id="test", aws_secret_access_key="test"
+                )
+            )
+            stubber = Stubber(client)
+            user = {
+                "Path": "/",
+                "UserName": "user",
+                "UserId": "AIDAEXAMPLEEXAMPLE01",
+                "Arn": "arn:aws:iam::123456789012:user/user",
+                "CreateDate": "2024-01-01T00:00:00Z",
+            }
+            for _ in range(3):
+                stubber.add_response("create_user", {"User": user})
+            stubber.add_response("get_user", {"User": user})
+
+            # Act
+            with stubber:
+                for _ in range(3):
+                    client.create_user(UserName="user")
+                client.get_user(UserName="user")
+
+        # Assert
+        self.assertEqual(clock.now, 1002.0)
+
+    def test_clients_without_limits_get_no_hook(self):
+        # Arrange
+        limiter = RateLimiter({"iam:CreateUser": LIMIT})
+        client = MagicMock()
+        client.meta.service_model.service_name = "rds-data"
+
+        # Act
+        with patch.object(ratelimit, "_rate_limiter", limiter):
+            rate_limit_client(client)
+
+        # Assert
+        client.meta.events.register_first.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,18 +1,24 @@
 import unittest
 import json
 from unittest.mock import patch, mock_open
-from workmail_common.utils import validate, load_schema
+from workmail_common.validation import validate, load_schema, clear_validator_cache
 from fastjsonschema import JsonSchemaException
 
 
 class TestValidate(unittest.TestCase):
 
+    def setUp(self):
+        clear_validator_cache()
+
+    def tearDown(self):
+        clear_validator_cache()
+
     @patch(
         "builtins.open",
         new_callable=mock_open,
         read_data='{"type": "object", "properties": {"name": {"type": "string"}}}',
     )
-    @patch("workmail_common.utils.json.load")
+    @patch("workmail_common.validation.json.load")
     def test_validate_valid_input(self, mock_json_load, mock_open):
         # Mocking the schema loading
         mock_json_load.return_value = {
@@ -37,7 +43,7 @@ class TestValidate(unittest.TestCase):
         new_callable=mock_open,
         read_data='{"type": "object", "properties": {"name": {"type": "string"}}}',
     )
-    @patch("workmail_common.utils.json.load")
+    @patch("workmail_common.validation.json.load")
     def test_validate_invalid_input(self, mock_json_load, mock_open):
         # Mocking the schema loading
         mock_json_load.return_value = {
@@ -57,7 +63,7 @@ class TestValidate(unittest.TestCase):
         mock_json_load.assert_called_once()
 
     @patch("builtins.open", new_callable=mock_open)
-    @patch("workmail_common.utils.json.load")
+    @patch("workmail_common.validation.json.load")
     def test_validate_schema_file_not_found(self, mock_json_load, mock_open):
         # Mocking the schema loading to raise FileNotFoundError
         mock_open.side_effect = FileNotFoundError
@@ -78,7 +84,7 @@ class TestValidate(unittest.TestCase):
         new_callable=mock_open,
         read_data='{"type": "object", "properties": {"name": {"type": "string"}}}',
     )
-    @patch("workmail_common.utils.json.load")
+    @patch("workmail_common.validation.json.load")
     def test_validate_json_decode_error(self, mock_json_load, mock_open):
         # Mocking the schema loading to raise JSONDecodeError
         mock_json_load.side_effect = json.JSONDecodeError("Expecting value", "doc", 0)
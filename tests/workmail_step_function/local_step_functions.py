@@ -0,0 +1,320 @@
+# tests/workmail_step_function/local_step_functions.py
+"""
+Local stand-in for Step Functions that runs template.yaml state machines.
+
+Interprets the subset of the Amazon States Language the WorkMail definitions
+use (Task, Pass, Choice, Wait, Parallel, Succeed, Fail; InputPath, Parameters,
+ResultSelector, ResultPath, OutputPath, Retry and Catch; the States.Format
+intrinsic) against in-process task handlers, and records when each state ran
+and what it output, so the critical path of an execution can be measured
+without deploying anything.
+
+Wait states do not sleep. Parallel branches run on threads, or one after the
+other with parallel=False, which is how the same workflow ran before the
+branches were split out.
+"""
+
+import copy
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TEMPLATE_PATH = os.path.join(REPO_ROOT, "template.yaml")
+
+PSEUDO_PARAMETERS = {
+    "AWS::Region": "us-east-1",
+    "AWS::AccountId": "123456789012",
+    "AWS::StackName": "workmail-local",
+}
+
+_PATH_TOKEN = re.compile(r"\.([^.\[]+)|\[(\d+)\]")
+_FORMAT_CALL = re.compile(r"^States\.Format\('((?:[^'\\]|\\.)*)'((?:\s*,\s*[^,]+)*)\)$")
+
+
+class _TemplateLoader(yaml.SafeLoader):
+    pass
+
+
+# Keep the scalar under an intrinsic tag (!Sub, !Ref, ...); ignore the rest.
+_TemplateLoader.add_multi_constructor(
+    "!",
+    lambda loader, suffix, node: (
+        loader.construct_scalar(node) if isinstance(node, yaml.ScalarNode) else None
+    ),
+)
+
+
+def load_definition(
+    resource: str = "WorkMailStepFunction",
+    parameters: Optional[Dict[str, Any]] = None,
+    template_path: str = TEMPLATE_PATH,
+) -> Dict[str, Any]:
+    """Load a state machine's definition, resolving its ${} substitutions."""
+    with open(template_path) as template_file:
+        template = yaml.load(template_file, Loader=_TemplateLoader)
+    values = {
+        name: spec.get("Default", "")
+        for name, spec in template.get("Parameters", {}).items()
+    }
+    values.update(PSEUDO_PARAMETERS)
+    values.update(parameters or {})
+
+    def substitute(match):
+        name = match.group(1)
+        # Logical ids of functions and state machines stand in for their ARNs.
+        return str(values.get(name, name))
+
+    definition = template["Resources"][resource]["Properties"]["DefinitionString"]
+    return json.loads(re.sub(r"\$\{([^}]+)\}", substitute, definition))
+
+
+class StatesError(Exception):
+    """A failure the interpreter raises on behalf of a state."""
+
+    def __init__(self, error: str, cause: str = ""):
+        super().__init__(f"{error}: {cause}")
+        self.error = error
+        self.cause = cause
+
+
+def get_path(data: Any, path: str, context: Dict[str, Any]) -> Any:
+    if path.startswith("$$"):
+        data, path = context, path[1:]
+    if not path.startswith("$"):
+        raise StatesError("States.Runtime", f"Invalid path {path}")
+    for key, index in _PATH_TOKEN.findall(path[1:]):
+        try:
+            data = data[int(index)] if index else data[key]
+        except (KeyError, IndexError, TypeError):
+            raise StatesError("States.Runtime", f"Path {path} not found in input")
+    return data
+
+
+def set_path(data: Any, path: Optional[str], value: Any) -> Any:
+    if path is None:
+        return data
+    if path == "$":
+        return value
+    data = copy.deepcopy(data) if isinstance(data, dict) else {}
+    keys = [key for key, _ in _PATH_TOKEN.findall(path[1:])]
+    target = data
+    for key in keys[:-1]:
+        target = target.setdefault(key, {})
+    target[keys[-1]] = value
+    return data
+
+
+def evaluate(expression: str, data: Any, context: Dict[str, Any]) -> Any:
+    """A path, or a States.Format() call whose arguments are paths."""
+    match = _FORMAT_CALL.match(expression)
+    if not match:
+        return get_path(data, expression, context)
+    template, arguments = match.groups()
+    values = iter(
+        get_path(data, argument.strip(), context)
+        for argument in arguments.split(",")[1:]
+    )
+    return re.sub(
+        r"\\(.)|\{\}",
+        lambda m: m.group(1) if m.group(1) else str(next(values)),
+        template,
+    )
+
+
+def apply_template(template: Any, data: Any, context: Dict[str, Any]) -> Any:
+    """Evaluate a Parameters or ResultSelector block."""
+    if isinstance(template, dict):
+        result = {}
+        for key, value in template.items():
+            if key.endswith(".$"):
+                result[key[:-2]] = evaluate(value, data, context)
+            else:
+                result[key] = apply_template(value, data, context)
+        return result
+    if isinstance(template, list):
+        return [apply_template(value, data, context) for value in template]
+    return template
+
+
+class LocalStepFunctions:
+    """
+    Runs state machine definitions against local task handlers.
+
+    handlers maps a function's logical id (the last segment of a Lambda
+    Resource ARN, or FunctionName for lambda:invoke integrations) to a
+    callable taking (event, context). For waitForTaskToken tasks, the
+    handler's return value is taken as the output sent with the task token.
+    AWS SDK integrations are looked up as "<service>:<action>", for example
+    "sfn:sendTaskSuccess", and get the task's Parameters.
+    """
+
+    def __init__(
+        self, handlers: Dict[str, Callable[[Any, Any], Any]], parallel: bool = True
+    ):
+        self.handlers = handlers
+        self.parallel = parallel
+        self.history: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._started = 0.0
+
+    def start_execution(
+        self, definition: Dict[str, Any], input: Any, name: str = "local-execution"
+    ) -> Dict[str, Any]:
+        self.history = []
+        self._started = time.perf_counter()
+        context = {"Execution": {"Name": name, "Id": f"local:{name}"}}
+        try:
+            output = self._run(definition, input, context)
+            result = {"status": "SUCCEEDED", "output": output}
+        except StatesError as e:
+            result = {"status": "FAILED", "error": e.error, "cause": e.cause}
+        result["elapsed"] = time.perf_counter() - self._started
+        result["history"] = list(self.history)
+        return result
+
+    def _run(self, machine: Dict[str, Any], data: Any, context: Dict[str, Any]):
+        name = machine["StartAt"]
+        while True:
+            state = machine["States"][name]
+            entry = {
+                "state": name,
+                "type": state["Type"],
+                "start": time.perf_counter() - self._started,
+            }
+            try:
+                data, following = self._run_state(name, state, data, context)
+                entry["output"] = data
+            finally:
+                entry["end"] = time.perf_counter() - self._started
+                with self._lock:
+                    self.history.append(entry)
+            if following is None:
+                return data
+            name = following
+
+    def _run_state(self, name, state, data, context):
+        kind = state["Type"]
+        if kind == "Succeed":
+            return data, None
+        if kind == "Fail":
+            raise StatesError(state.get("Error", "States.Fail"), state.get("Cause", ""))
+        if kind == "Choice":
+            return data, self._choose(state, data, context)
+
+        context = dict(context, State={"Name": name})
+        if state.get("Resource", "").endswith(".waitForTaskToken"):
+            context["Task"] = {"Token": f"token-{name}"}
+        effective = get_path(data, state.get("InputPath", "$"), context)
+        if "Parameters" in state:
+            effective = apply_template(state["Parameters"], effective, context)
+        try:
+            if kind == "Pass":
+                result = state.get("Result", effective)
+            elif kind == "Wait":
+                result = effective
+            elif kind == "Task":
+                result = self._with_retries(
+                    state, lambda: self._invoke(name, state, effective, context)
+                )
+            elif kind == "Parallel":
+                result = self._with_retries(
+                    state, lambda: self._branches(state, effective, context)
+                )
+            else:
+                raise StatesError("States.Runtime", f"Unsupported state type {kind}")
+            if "ResultSelector" in state:
+                result = apply_template(state["ResultSelector"], result, context)
+        except StatesError as e:
+            for catcher in state.get("Catch", []):
+                if e.error in catcher["ErrorEquals"] or (
+                    "States.ALL" in catcher["ErrorEquals"]
+                ):
+                    error_output = {"Error": e.error, "Cause": e.cause}
+                    return (
+                        set_path(data, catcher.get("ResultPath", "$"), error_output),
+                        catcher["Next"],
+                    )
+            raise
+
+        if kind == "Wait":
+            output = data
+        else:
+            output = set_path(data, state.get("ResultPath", "$"), result)
+        output = get_path(output, state.get("OutputPath", "$"), context)
+        return output, None if state.get("End") else state["Next"]
+
+    def _choose(self, state, data, context):
+        for choice in state["Choices"]:
+            if "IsPresent" in choice:
+                try:
+                    get_path(data, choice["Variable"], context)
+                    present = True
+                except StatesError:
+                    present = False
+                if present == choice["IsPresent"]:
+                    return choice["Next"]
+                continue
+            value = get_path(data, choice["Variable"], context)
+            for operator in ("StringEquals", "BooleanEquals", "NumericEquals"):
+                if operator in choice and value == choice[operator]:
+                    return choice["Next"]
+        if "Default" not in state:
+            raise StatesError("States.NoChoiceMatched")
+        return state["Default"]
+
+    def _with_retries(self, state, attempt):
+        attempts = {}
+        while True:
+            try:
+                return attempt()
+            except StatesError as e:
+                retrier = next(
+                    (
+                        r
+                        for r in state.get("Retry", [])
+                        if e.error in r["ErrorEquals"]
+                        or "States.ALL" in r["ErrorEquals"]
+                    ),
+                    None,
+                )
+                if retrier is None:
+                    raise
+                key = id(retrier)
+                attempts[key] = attempts.get(key, 0) + 1
+                if attempts[key] > retrier.get("MaxAttempts", 3):
+                    raise
+
+    def _invoke(self, name, state, payload, context):
+        resource = state["Resource"]
+        if resource.startswith("arn:aws:states:::lambda:invoke"):
+            function = payload["FunctionName"]
+            payload = payload.get("Payload", {})
+        elif resource.startswith("arn:aws:states:::aws-sdk:"):
+            function = resource.split(":::aws-sdk:", 1)[1]
+        elif ":function:" in resource:
+            function = resource.rsplit(":", 1)[-1]
+        else:
+            raise StatesError("States.Runtime", f"Unsupported resource {resource}")
+        handler = self.handlers.get(function)
+        if handler is None:
+            raise StatesError("States.Runtime", f"No local handler for {function}")
+        try:
+            return json.loads(json.dumps(handler(payload, None), default=str))
+        except StatesError:
+            raise
+        except Exception as e:
+            raise StatesError(type(e).__name__, str(e))
+
+    def _branches(self, state, data, context):
+        run = lambda branch: self._run(branch, copy.deepcopy(data), context)
+        if not self.parallel:
+            return [run(branch) for branch in state["Branches"]]
+        with ThreadPoolExecutor(max_workers=len(state["Branches"])) as executor:
+            return list(executor.map(run, state["Branches"]))
@@ -0,0 +1,248 @@
+# tests/workmail_step_function/unit/test_workmail_step_function.py
+import json
+import time
+import unittest
+from tests.workmail_step_function.local_step_functions import (
+    LocalStepFunctions,
+    StatesError,
+    load_definition,
+)
+
+ORG_RESULT = {
+    "contact_id": 1,
+    "organization_id": "org-id",
+    "organization_name": "example",
+    "email_username": "john",
+    "vanity_name": "example.com",
+    "email_address": "john@example.com",
+    "first_name": "John",
+    "last_name": "Doe",
+    "dns_records": [],
+}
+
+
+def make_handlers(latency=0.0, calls=None, fail=None):
+    calls = calls if calls is not None else {}
+
+    def task(name, output):
+        def handler(event, context):
+            calls.setdefault(name, []).append(event)
+            time.sleep(latency)
+            if name == fail:
+                raise RuntimeError(f"{name} failed")
+            return output
+
+        return handler
+
+    return {
+        "CreateWorkMailOrgFunction": task("CreateWorkMailOrgFunction", ORG_RESULT),
+        "CreateHostedZoneFunction": task(
+            "CreateHostedZoneFunction",
+            {
+                "hosted_zone_id": "/hostedzone/Z123",
+                "dns_change_id": "/change/C123",
+                "dns_insync": False,
+            },
+        ),
+        "CreateIamUserFunction": task(
+            "CreateIamUserFunction",
+            {
+                "iamUserName": "workmail_example.com",
+                "apiKey": "AKIA123",
+                "secretKey": "secret",
+            },
+        ),
+        "DomainVerificationWatcherFunction": task(
+            "DomainVerificationWatcherFunction", {"domainVerified": True}
+        ),
+        "CheckDomainVerificationFunction": task(
+            "CheckDomainVerificationFunction", {"domainVerified": True}
+        ),
+        "CreateWorkMailUserFunction": task(
+            "CreateWorkMailUserFunction", {"userCreated": True, "user_id": "user-id"}
+        ),
+    }
+
+
+class TestWorkMailStepFunction(unittest.TestCase):
+
+    def setUp(self):
+        self.definition = load_definition("WorkMailStepFunction")
+        self.input = {"body": '{"contact_id": 1}'}
+
+    def spans(self, execution):
+        return {entry["state"]: entry for entry in execution["history"]}
+
+    def test_domain_resources_merge_into_one_result(self):
+        # Arrange
+        calls = {}
+        local = LocalStepFunctions(make_handlers(calls=calls))
+
+        # Act
+        execution = local.start_execution(self.definition, self.input, name="exec-1")
+
+        # Assert
+        self.assertEqual(execution["status"], "SUCCEEDED")
+        self.assertEqual(
+            execution["output"], {"userCreated": True, "user_id": "user-id"}
+        )
+        output = self.spans(execution)["ProvisionDomainResources"]["output"]
+        self.assertEqual(output["createWorkMailOrgResult"], ORG_RESULT)
+        self.assertEqual(
+            output["domainResources"],
+            {
+                "hosted_zone_id": "/hostedzone/Z123",
+                "dns_change_id": "/change/C123",
+                "dns_insync": False,
+                "iamUserName": "workmail_example.com",
+                "apiKey": "AKIA123",
+            },
+        )
+        self.assertEqual(calls["CreateHostedZoneFunction"], [ORG_RESULT])
+        self.assertEqual(calls["CreateIamUserFunction"], [ORG_RESULT])
+        self.assertEqual(calls["CreateWorkMailUserFunction"], [ORG_RESULT])
+        self.assertEqual(
+            calls["CreateWorkMailOrgFunction"],
+            [{"body": '{"contact_id": 1}', "client_token": "exec-1"}],
+        )
+
+    def test_independent_steps_overlap(self):
+        # Arrange
+        local = LocalStepFunctions(make_handlers(latency=0.05))
+
+        # Act
+        execution = local.start_execution(self.definition, self.input)
+
+        # Assert
+        spans = self.spans(execution)
+        hosted_zone = spans["CreateHostedZoneFunction"]
+        iam_user = spans["CreateIamUserFunction"]
+        self.assertLess(iam_user["start"], hosted_zone["end"])
+        self.assertLess(hosted_zone["start"], iam_user["end"])
+        verification = spans["WaitForDomainVerificationCallback"]
+        self.assertGreaterEqual(
+            verification["start"], max(hosted_zone["end"], iam_user["end"])
+        )
+
+    def test_critical_path_reduction(self):
+        # Act
+        parallel = LocalStepFunctions(make_handlers(latency=0.1)).start_execution(
+            self.definition, self.input
+        )
+        sequential = LocalStepFunctions(
+            make_handlers(latency=0.1), parallel=False
+        ).start_execution(self.definition, self.input)
+
+        # Assert: one task's latency comes off the critical path.
+        self.assertEqual(parallel["output"], sequential["output"])
+        self.assertGreater(sequential["elapsed"] - parallel["elapsed"], 0.07)
+
+    def test_branch_failure_is_handled(self):
+        # Arrange
+        calls = {}
+        local = LocalStepFunctions(
+            make_handlers(calls=calls, fail="CreateIamUserFunction")
+        )
+
+        # Act
+        execution = local.start_execution(self.definition, self.input)
+
+        # Assert
+        self.assertEqual(execution["status"], "FAILED")
+        self.assertEqual(execution["error"], "CreateWorkMailWorkflowError")
+        self.assertNotIn("CreateWorkMailUserFunction", calls)
+
+    def test_batch_item_releases_its_slot_before_verification(self):
+        # Arrange
+        calls = {}
+        handlers = make_handlers(calls=calls)
+        handlers["sfn:sendTaskSuccess"] = lambda event, context: calls.setdefault(
+            "sfn:sendTaskSuccess", []
+        ).append(event)
+        local = LocalStepFunctions(handlers)
+
+        # Act
+        execution = local.start_execution(
+            self.definition,
+            dict(self.input, batch_task_token="batch-token"),
+            name="exec-1",
+        )
+
+        # Assert
+        self.assertEqual(execution["status"], "SUCCEEDED")
+        [released] = calls["sfn:sendTaskSuccess"]
+        self.assertEqual(released["TaskToken"], "batch-token")
+        self.assertEqual(
+            json.loads(released["Output"]),
+            {"executionArn": "local:exec-1", "status": "PROVISIONED"},
+        )
+        spans = self.spans(execution)
+        self.assertLess(
+            spans["ReleaseBatchSlot"]["end"],
+            spans["WaitForDomainVerificationCallback"]["start"],
+        )
+
+    def test_failed_batch_item_reports_its_failure(self):
+        # Arrange
+        calls = {}
+        handlers = make_handlers(calls=calls, fail="CreateHostedZoneFunction")
+        handlers["sfn:sendTaskFailure"] = lambda event, context: calls.setdefault(
+            "sfn:sendTaskFailure", []
+        ).append(event)
+        local = LocalStepFunctions(handlers)
+
+        # Act
+        execution = local.start_execution(
+            self.definition, dict(self.input, batch_task_token="batch-token")
+        )
+
+        # Assert
+        self.assertEqual(execution["status"], "FAILED")
+        self.assertEqual(execution["error"], "CreateWorkMailWorkflowError")
+        self.assertEqual(
+            [call["TaskToken"] for call in calls["sfn:sendTaskFailure"]],
+            ["batch-token"],
+        )
+
+    def test_throttled_callback_start_is_retried(self):
+        # Arrange
+        calls = {}
+        handlers = make_handlers(calls=calls)
+        watcher = handlers["DomainVerificationWatcherFunction"]
+
+        def throttled_once(event, context):
+            if "DomainVerificationWatcherFunction" not in calls:
+                calls["DomainVerificationWatcherFunction"] = []
+                raise StatesError("Lambda.TooManyRequestsException", "Rate exceeded")
+            return watcher(event, context)
+
+        handlers["DomainVerificationWatcherFunction"] = throttled_once
+        local = LocalStepFunctions(handlers)
+
+        # Act
+        execution = local.start_execution(self.definition, self.input)
+
+        # Assert
+        self.assertEqual(execution["status"], "SUCCEEDED")
+        self.assertEqual(len(calls["DomainVerificationWatcherFunction"]), 1)
+        self.assertNotIn("CheckDomainVerificationFunction", calls)
+
+    def test_polling_mode_checks_after_both_branches(self):
+        # Arrange
+        calls = {}
+        definition = load_definition(
+            "WorkMailStepFunction", {"DomainVerificationMode": "polling"}
+        )
+        local = LocalStepFunctions(make_handlers(calls=calls))
+
+        # Act
+        execution = local.start_execution(definition, self.input)
+
+        # Assert
+        self.assertEqual(execution["status"], "SUCCEEDED")
+        self.assertEqual(calls["CheckDomainVerificationFunction"], [ORG_RESULT])
+        self.assertNotIn("DomainVerificationWatcherFunction", calls)
+
+
+if __name__ == "__main__":
+    unittest.main()